@@ -4,8 +4,11 @@ Application Configuration using Pydantic Settings
 
 from typing import List, Optional
 from pydantic_settings import BaseSettings
-from pydantic import Field
+from pydantic import Field, model_validator
 from functools import lru_cache
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class Settings(BaseSettings):
@@ -39,9 +42,102 @@ class Settings(BaseSettings):
     SESSION_TTL_MINUTES: int = Field(default=30, description="Session expiration time in minutes")
 
     # Context
-    MAX_CONTEXT_SIZE: int = Field(default=8000, description="Max context size in bytes")
+    MAX_CONTEXT_SIZE: Optional[int] = Field(
+        default=None,
+        description="Deprecated and ignored (use CONTEXT_TOKEN_BUDGET); accepted so older .env files still load"
+    )
+    CONTEXT_TOKEN_BUDGET: int = Field(
+        default=2000,
+        description="Section HTML tokens sent with a local change (sections that do not fit are trimmed or left out)"
+    )
+    CONTEXT_REPEAT_COMPRESSION: bool = Field(
+        default=True,
+        description="Send repeated rows of local-change sections as a few exemplars (patches on them cover every row)"
+    )
     MAX_SEARCH_RESULTS: int = Field(default=10, description="Max vector search results")
 
+    # Gemini
+    GEMINI_TIMEOUT_SECONDS: float = Field(default=60.0, description="Timeout per Gemini generation call")
+    GEMINI_MAX_ATTEMPTS: int = Field(default=3, description="Attempts per call (each 429 fails over to another key)")
+    GEMINI_RPM_LIMIT: int = Field(default=10, description="Requests per minute allowed per API key")
+    GEMINI_TPM_LIMIT: int = Field(default=250000, description="Tokens per minute allowed per API key")
+    GEMINI_RATE_LIMIT_COOLDOWN_SECONDS: float = Field(
+        default=60.0,
+        description="Cool-down after a 429 when the server gives no retry delay"
+    )
+    GEMINI_QUEUE_TIMEOUT_SECONDS: float = Field(
+        default=30.0,
+        description="Max wait for a key when all keys are rate limited"
+    )
+
+    # Chat
+    CHAT_COMBINED_MODE: bool = Field(
+        default=False,
+        description="Analyze intent and generate patches/answers in one Gemini call"
+    )
+    INTENT_RULES_ENABLED: bool = Field(
+        default=True,
+        description="Classify unambiguous requests by rules instead of Gemini"
+    )
+    INTENT_RULES_MIN_CONFIDENCE: float = Field(
+        default=0.85,
+        description="Rule confidence needed to skip the LLM intent classifier"
+    )
+    INTENT_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="Reuse intent analysis results for near-identical messages"
+    )
+    INTENT_CACHE_TTL_SECONDS: int = Field(default=86400, description="Lifetime of a cached intent analysis")
+    INTENT_CACHE_MAX_ENTRIES: int = Field(default=2048, description="Max cached analyses in memory (LRU)")
+    INTENT_CACHE_MIN_CONFIDENCE: float = Field(
+        default=0.75,
+        description="LLM confidence needed to cache an analysis"
+    )
+    INTENT_CACHE_MONGO: bool = Field(default=True, description="Share cached analyses across workers via MongoDB")
+    PATCH_CACHE_ENABLED: bool = Field(
+        default=True,
+        description="Reuse patches for the same request on identical sections"
+    )
+    PATCH_CACHE_MAX_ENTRIES: int = Field(default=1024, description="Max cached patch sets (LRU)")
+    GLOBAL_CHANGE_EDIT_SCRIPT: bool = Field(
+        default=True,
+        description="Generate global changes as an edit script (patches) before regenerating the document"
+    )
+    GLOBAL_CHANGE_SECTION_PARALLEL: bool = Field(
+        default=True,
+        description="Regenerate multi-section documents section by section, concurrently"
+    )
+    GLOBAL_CHANGE_UNIT_TOKENS: int = Field(
+        default=3000,
+        description="Section HTML tokens per rewrite call (keeps output far below the cap)"
+    )
+    GLOBAL_CHANGE_MAX_CONCURRENCY: int = Field(
+        default=8,
+        description="Section rewrite calls in flight at once (the key scheduler still applies RPM/TPM limits)"
+    )
+    TRANSLATION_CHUNK_TOKENS: int = Field(
+        default=1500,
+        description="Source text tokens per translation call (output grows with input)"
+    )
+    TRANSLATION_MAX_CONCURRENCY: int = Field(default=4, description="Translation chunks in flight at once")
+    TRANSLATION_MEMORY_MAX_ENTRIES: int = Field(default=20000, description="Max translations kept in memory (LRU)")
+    TRANSLATION_MEMORY_MONGO: bool = Field(default=True, description="Persist translations in MongoDB")
+    CHAT_SPECULATIVE_MODE: bool = Field(
+        default=False,
+        description="Generate local-change patches concurrently with intent analysis"
+    )
+    CHAT_SPECULATIVE_MIN_SCORE: float = Field(
+        default=2.0,
+        description="Top section match score needed to start patch generation speculatively"
+    )
+
+    # Document Cache (parsed session HTML, per process)
+    DOCUMENT_CACHE_MAX_ENTRIES: int = Field(default=64, description="Max cached session documents")
+    DOCUMENT_CACHE_MAX_BYTES: int = Field(
+        default=512 * 1024 * 1024,
+        description="Memory budget for cached documents in bytes (estimated)"
+    )
+
     # CORS
     ALLOWED_ORIGINS: str = Field(
         default="http://localhost:3000",
@@ -58,6 +154,13 @@ class Settings(BaseSettings):
         description="Embedding vector dimension"
     )
 
+    @model_validator(mode="after")
+    def _warn_deprecated(self) -> "Settings":
+        """Warn about settings that are still accepted but no longer used"""
+        if self.MAX_CONTEXT_SIZE is not None:
+            logger.warning("MAX_CONTEXT_SIZE is deprecated and ignored; set CONTEXT_TOKEN_BUDGET instead")
+        return self
+
     @property
     def allowed_origins_list(self) -> List[str]:
         """Parse ALLOWED_ORIGINS into a list"""
@@ -9,6 +9,7 @@ import logging
 
 from app.config import settings
 from app.utils.mongodb import MongoDBClient
+from app.utils.gemini_client_pool import get_client_pool
 
 # Configure logging
 logging.basicConfig(
@@ -30,11 +31,15 @@ async def lifespan(app: FastAPI):
     else:
         logger.warning("MongoDB connection failed - service may not work correctly")
 
+    # Create per-key Gemini clients once (reused by every request)
+    await get_client_pool().warm_up()
+
     yield
 
     # Shutdown
     logger.info("Shutting down Chat Service...")
     await MongoDBClient.close()
+    await get_client_pool().close()
 
 
 # Create FastAPI app
@@ -16,11 +16,13 @@ from .chat import (
     PatchAction,
     SearchResult,
     DebugInfo,
+    LLMAttempt,
 )
 from .ast import (
     ASTNode,
     TextNode,
     SectionInfo,
+    SectionFeatures,
     ParseResult,
 )
 from .common import (
@@ -43,10 +45,12 @@ __all__ = [
     "PatchAction",
     "SearchResult",
     "DebugInfo",
+    "LLMAttempt",
     # AST
     "ASTNode",
     "TextNode",
     "SectionInfo",
+    "SectionFeatures",
     "ParseResult",
     # Common
     "IntentType",
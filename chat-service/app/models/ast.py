@@ -2,8 +2,9 @@
 AST (Abstract Syntax Tree) related Pydantic models
 """
 
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pydantic import BaseModel, Field
+import bisect
 
 
 class ASTNode(BaseModel):
@@ -14,12 +15,148 @@ class ASTNode(BaseModel):
     classes: List[str] = Field(default_factory=list, description="CSS 클래스 목록")
     selector: str = Field(default="", description="CSS 선택자")
     path: str = Field(default="", description="DOM 경로")
-    html: str = Field(default="", description="해당 노드의 HTML")
+    start: Optional[int] = Field(default=None, description="원본 HTML 내 시작 오프셋 (문자 단위, 저장된 노드는 기준 섹션에 대한 상대값)")
+    end: Optional[int] = Field(default=None, description="원본 HTML 내 끝 오프셋 (문자 단위, 저장된 노드는 기준 섹션에 대한 상대값)")
+    anchor: Optional[str] = Field(default=None, description="start/end의 기준 최상위 섹션 ID (그 섹션 시작 기준, 섹션 안 노드)")
+    start_after: Optional[str] = Field(default=None, description="start의 기준 최상위 섹션 ID (그 섹션 끝 기준, 섹션 밖 노드)")
+    end_after: Optional[str] = Field(default=None, description="end의 기준 최상위 섹션 ID (그 섹션 끝 기준, 섹션 밖 노드)")
     text_content: str = Field(default="", description="텍스트 내용 (최대 500자)")
     children: List[str] = Field(default_factory=list, description="자식 노드 ID 목록")
     parent: Optional[str] = Field(default=None, description="부모 노드 ID")
     attributes: Dict[str, str] = Field(default_factory=dict, description="속성 (class 제외)")
 
+    @property
+    def html_length(self) -> int:
+        """노드 HTML 길이 (오프셋이 없으면 0)"""
+        if self.start is None or self.end is None:
+            return 0
+        return self.end - self.start
+
+    def get_html(self, source: str) -> Optional[str]:
+        """
+        원본 HTML에서 노드 HTML을 잘라서 반환 (파싱 직후의 절대 오프셋 노드용,
+        저장된 노드는 resolve_node_offsets 사용)
+
+        Args:
+            source: 파싱에 사용된 HTML
+
+        Returns:
+            노드의 HTML, 오프셋이 없거나 원본과 맞지 않으면 None
+        """
+        return slice_node_html(source, self.start, self.end, self.tag)
+
+
+# Characters that may follow a tag name in a start tag
+_TAG_NAME_END = frozenset([" ", "\t", "\n", "\r", "\f", "/", ">"])
+
+
+def slice_node_html(
+    source: str,
+    start: Optional[int],
+    end: Optional[int],
+    tag: str
+) -> Optional[str]:
+    """
+    오프셋으로 원본 HTML을 잘라냄 (세션 문서의 dict 형태 노드에도 사용)
+
+    오프셋이 가리키는 위치가 해당 태그로 시작하지 않으면 (HTML이 바뀐 경우) None
+    (태그 이름 뒤는 공백, "/" 또는 ">"여야 함: "<div"가 "<divider"와 맞지 않도록)
+    """
+    if start is None or end is None or end > len(source):
+        return None
+    if source[start:start + len(tag) + 1].lower() != f"<{tag}":
+        return None
+    if source[start + len(tag) + 1:start + len(tag) + 2] not in _TAG_NAME_END:
+        return None
+    return source[start:end]
+
+
+def anchored_node_dumps(
+    nodes: List["ASTNode"],
+    features: List["SectionFeatures"]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    세션에 저장할 노드 dict (노드ID -> dict), 오프셋은 최상위 섹션 기준 상대값
+
+    섹션 안 노드는 감싸는 최상위 섹션의 시작 기준(anchor), 섹션 밖 노드
+    (레이아웃 래퍼 등)는 start/end 각각 앞선 최상위 섹션의 끝 기준
+    (start_after/end_after, 없으면 문서 시작 = 절대값)으로 저장합니다.
+    섹션 절대 위치는 함께 저장되는 section_features에 있으므로, 한 섹션이
+    바뀌어도 다른 섹션과 래퍼의 노드는 다시 쓸 필요가 없습니다.
+
+    Args:
+        nodes: 절대 오프셋을 가진 노드 (HTMLParser 결과)
+        features: 같은 HTML의 섹션 특징 (문서 순서)
+
+    Returns:
+        노드ID -> 저장용 dict
+    """
+    roots: List[SectionFeatures] = []
+    for feature in features:
+        if feature.start is None or feature.end is None:
+            continue
+        if roots and feature.start < roots[-1].end:
+            continue
+        roots.append(feature)
+    starts = [root.start for root in roots]
+    ends = [root.end for root in roots]
+
+    stored = {}
+    for node in nodes:
+        data = node.model_dump()
+        if node.start is not None and node.end is not None:
+            index = bisect.bisect_right(starts, node.start) - 1
+            if index >= 0 and node.end <= roots[index].end:
+                data["anchor"] = roots[index].section_id
+                data["start"] -= roots[index].start
+                data["end"] -= roots[index].start
+            else:
+                for key in ("start", "end"):
+                    index = bisect.bisect_right(ends, data[key]) - 1
+                    if index >= 0:
+                        data[f"{key}_after"] = roots[index].section_id
+                        data[key] -= roots[index].end
+        stored[node.node_id] = data
+    return stored
+
+
+def resolve_node_offsets(
+    node: Dict[str, Any],
+    sections: Dict[str, "SectionFeatures"]
+) -> Tuple[Optional[int], Optional[int]]:
+    """
+    저장된 노드 dict의 절대 오프셋 (기준 섹션 위치는 section_features에서)
+
+    기준 필드가 없는 노드(이전 세션)는 절대 오프셋으로 간주합니다.
+
+    Args:
+        node: 세션 문서의 노드 dict
+        sections: 섹션ID -> 현재 HTML의 SectionFeatures
+
+    Returns:
+        (start, end), 오프셋이 없거나 기준 섹션을 모르면 (None, None)
+    """
+    start, end = node.get("start"), node.get("end")
+    if start is None or end is None:
+        return None, None
+
+    anchor = node.get("anchor")
+    if anchor is not None:
+        feature = sections.get(anchor)
+        if feature is None or feature.start is None:
+            return None, None
+        return start + feature.start, end + feature.start
+
+    resolved = []
+    for offset, after in ((start, node.get("start_after")), (end, node.get("end_after"))):
+        if after is not None:
+            feature = sections.get(after)
+            if feature is None or feature.end is None:
+                return None, None
+            offset += feature.end
+        resolved.append(offset)
+    return resolved[0], resolved[1]
+
 
 class TextNode(BaseModel):
     """텍스트 노드 (임베딩 대상)"""
@@ -40,6 +177,33 @@ class SectionInfo(BaseModel):
     text_preview: str = Field(default="", description="텍스트 미리보기")
 
 
+class SectionFeatures(BaseModel):
+    """편집 가능 섹션의 매칭용 특징 (세션 시작 시 한 번 계산하여 저장)"""
+    section_id: str = Field(..., description="섹션 ID")
+    position: int = Field(default=0, description="문서 내 섹션 순서")
+    tags: List[str] = Field(default_factory=list, description="섹션 내 태그 집합")
+    classes: List[str] = Field(default_factory=list, description="섹션 내 CSS 클래스 집합")
+    tokens: List[str] = Field(default_factory=list, description="정규화된 텍스트 토큰 (소문자, 중복 제거)")
+    text_content: str = Field(default="", description="텍스트 내용 (최대 500자)")
+    byte_size: int = Field(default=0, description="섹션 HTML 크기 (bytes)")
+    subtree_hash: str = Field(default="", description="섹션 HTML 해시 (md5)")
+    start: Optional[int] = Field(default=None, description="원본 HTML 내 시작 오프셋 (문자 단위)")
+    end: Optional[int] = Field(default=None, description="원본 HTML 내 끝 오프셋 (문자 단위)")
+    tag: str = Field(default="div", description="섹션 루트 태그명")
+
+    def get_html(self, source: str) -> Optional[str]:
+        """
+        원본 HTML에서 섹션 HTML을 잘라서 반환
+
+        Args:
+            source: 특징 계산에 사용된 HTML (세션의 current_html)
+
+        Returns:
+            섹션 HTML, 오프셋이 원본과 맞지 않으면 None
+        """
+        return slice_node_html(source, self.start, self.end, self.tag)
+
+
 class ParseResult(BaseModel):
     """HTML 파싱 결과"""
     nodes: List[ASTNode] = Field(default_factory=list)
@@ -48,6 +212,18 @@ class ParseResult(BaseModel):
         default_factory=dict,
         description="섹션ID -> 노드ID 목록 매핑"
     )
+    section_roots: Dict[str, str] = Field(
+        default_factory=dict,
+        description="섹션ID -> 섹션 루트 노드ID (data-section-id를 가진 요소)"
+    )
+    section_parents: Dict[str, Optional[str]] = Field(
+        default_factory=dict,
+        description="섹션ID -> 감싸는 섹션ID (최상위 섹션은 None), 문서 순서"
+    )
+    section_text_nodes: Dict[str, int] = Field(
+        default_factory=dict,
+        description="섹션ID -> 텍스트 노드 수 (중첩 섹션의 텍스트는 중첩 섹션에만 계산)"
+    )
     sections: List[SectionInfo] = Field(default_factory=list)
 
     # 통계
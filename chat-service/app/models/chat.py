@@ -45,6 +45,13 @@ class SearchResult(BaseModel):
     score: float = Field(default=0.0, description="유사도 점수")
 
 
+class LLMAttempt(BaseModel):
+    """Gemini API 호출 시도 기록"""
+    key_index: int = Field(..., description="사용한 API 키 번호")
+    latency_ms: float = Field(default=0.0, description="시도 소요 시간 (ms)")
+    status: str = Field(default="ok", description="ok | rate_limited | timeout | error")
+
+
 class DebugInfo(BaseModel):
     """디버그 정보"""
     search_results: List[SearchResult] = Field(default_factory=list)
@@ -54,6 +61,7 @@ class DebugInfo(BaseModel):
     confidence: float = Field(default=0.0)
     fallback_reason: Optional[str] = None
     reasoning: Optional[str] = Field(default=None, description="LLM의 분석 근거")
+    llm_attempts: List[LLMAttempt] = Field(default_factory=list, description="요청 처리 중 Gemini 호출 시도 (키 failover 포함)")
 
 
 class ChatResponseType(str, Enum):
@@ -64,14 +64,19 @@ class SessionDocument(BaseModel):
     # HTML 데이터
     original_html: str
     current_html: str
+    html_hash: Optional[str] = None  # current_html 해시 (동시 수정 감지용)
 
     # Pinecone 정보
     pinecone_namespace: str
     vector_count: int
 
     # AST 캐시
-    ast_nodes: List[Dict[str, Any]] = Field(default_factory=list)
+    ast_nodes: Dict[str, Dict[str, Any]] = Field(default_factory=dict)  # 노드ID -> ASTNode
     section_index: Dict[str, List[str]] = Field(default_factory=dict)
+    section_roots: Dict[str, str] = Field(default_factory=dict)  # 섹션ID -> 루트 노드ID
+    section_parents: Dict[str, Optional[str]] = Field(default_factory=dict)  # 섹션ID -> 감싸는 섹션ID
+    section_text_nodes: Dict[str, int] = Field(default_factory=dict)  # 섹션ID -> 텍스트 노드 수
+    section_features: List[Dict[str, Any]] = Field(default_factory=list)  # SectionFeatures (섹션 매칭용)
     text_nodes: List[Dict[str, Any]] = Field(default_factory=list)
 
     # 메타데이터
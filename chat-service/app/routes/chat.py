@@ -3,34 +3,63 @@ Chat Routes
 
 Endpoints:
 - POST /chat - Send message and get modification response
+- POST /chat/stream - Same, as server-sent events (sections, intent,
+  patches / HTML chunks as they are generated, final response)
+- GET /chat/stats - In-process cache and speculation counters
 
 Dependencies:
 - app.models.chat
-- app.services (EmbeddingService, ContextBuilder, IntentAnalyzer, ModificationEngine)
+- app.services (EmbeddingService, ContextBuilder, IntentAnalyzer, ModificationEngine,
+  CombinedProcessor, SpeculativeLocalChange, PatchEngine, ASTReindexer, IntentCache,
+  PatchCache, TranslationMemory)
 - app.routes.session (update_session_activity)
 """
 
+from dataclasses import dataclass
 from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+import asyncio
+import json
 import uuid
 import time
 import logging
 
-from fastapi import APIRouter, HTTPException, status
+from bs4 import BeautifulSoup
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
 from motor.motor_asyncio import AsyncIOMotorCollection
 
 from app.models.chat import (
     ChatRequest,
+    Patch,
     ChatResponse,
     ChatResponseType,
     SearchResult,
     DebugInfo,
+    LLMAttempt,
     ChatMessage,
     ChatMessageRole,
 )
-from app.models.common import IntentType
-from app.services.section_extractor import SectionExtractor, build_context_from_sections
+from app.models.common import AnalysisResult, IntentType
+from app.services.keyword_matcher import RequestMatch
+from app.models.ast import SectionFeatures
+from app.services.section_extractor import (
+    ExtractedSection,
+    SectionExtractor,
+    match_request,
+)
+from app.services.context_packer import pack_context
+from app.services.document_cache import content_hash, get_document_cache
 from app.services.intent_analyzer import IntentAnalyzer
 from app.services.modification_engine import ModificationEngine
+from app.services.combined_processor import CombinedProcessor
+from app.services.intent_cache import get_intent_cache
+from app.services.patch_cache import get_patch_cache
+from app.services.translation_memory import get_translation_memory
+from app.services.speculation import SpeculativeLocalChange, get_speculation_stats, should_speculate
+from app.services.patch_engine import PatchEngine
+from app.services.ast_reindexer import ASTReindexer
+from app.services.gemini_client import start_attempt_log
 from app.utils.mongodb import get_collection, SESSIONS_COLLECTION, CHAT_HISTORY_COLLECTION
 from app.routes.session import update_session_activity
 from app.config import settings
@@ -39,8 +68,90 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+# Interval for checking whether the client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+
 @router.post("", response_model=ChatResponse)
-async def send_message(request: ChatRequest):
+async def send_message(request: ChatRequest, http_request: Request):
+    """
+    Process chat message and return modification
+
+    Processing (including in-flight Gemini calls) is cancelled if the
+    client disconnects before the response is ready. 409 if another
+    request changed the session HTML while this one was processed.
+    """
+    task = asyncio.ensure_future(_process_message(request))
+
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+
+            if await http_request.is_disconnected():
+                logger.info(f"Client disconnected, cancelling message for session: {request.session_id}")
+                task.cancel()
+                raise HTTPException(
+                    status_code=499,
+                    detail="Client closed request"
+                )
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+@router.post("/stream")
+async def stream_message(request: ChatRequest):
+    """
+    Process chat message, streaming progress as server-sent events
+
+    The session is validated before the stream starts (404 / 410 are
+    regular HTTP errors); later failures arrive as an "error" event.
+    See _stream_message for the event types.
+    """
+    start_time = time.time()
+    llm_attempts = start_attempt_log()
+    context = await _build_message_context(request)
+
+    return StreamingResponse(
+        _stream_message(request, context, start_time, llm_attempts),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/stats")
+async def get_stats():
+    """
+    In-process cache and speculation counters of this worker
+
+    Returns:
+        Stats of the document, intent and patch caches, the translation
+        memory and speculation
+    """
+    return {
+        "document_cache": get_document_cache().get_stats(),
+        "intent_cache": get_intent_cache().get_stats(),
+        "patch_cache": get_patch_cache().get_stats(),
+        "translation_memory": get_translation_memory().get_stats(),
+        "speculation": get_speculation_stats().get_stats(),
+    }
+
+
+@dataclass
+class MessageContext:
+    """Session and section context of one chat message (steps 1-4)"""
+    session: dict
+    current_html: str
+    request_match: RequestMatch
+    extracted_sections: List[ExtractedSection]
+    search_results: List[SearchResult]
+    html_fragments: Dict[str, str]
+    context_size: int
+
+
+async def _process_message(request: ChatRequest) -> ChatResponse:
     """
     Process chat message and return modification
 
@@ -48,152 +159,505 @@ async def send_message(request: ChatRequest):
     1. Validate session exists
     2. Embed user message
     3. Search for relevant sections
-    4. Analyze intent
-    5. Generate modification (patch or full)
-    6. Update session and history
+    4. Build context
+    5. Analyze intent and generate modification (patch or full;
+       one Gemini call in CHAT_COMBINED_MODE, patch generation started
+       alongside the analysis in CHAT_SPECULATIVE_MODE)
+    6. Update session and history (patches are applied server-side)
     7. Return response
     """
     start_time = time.time()
+    llm_attempts = start_attempt_log()
 
     try:
-        # 1. Get session from MongoDB
-        session = await _get_session_or_404(request.session_id)
-        logger.info(f"Processing message for session: {request.session_id}")
-
-        # 2. Update session activity
-        await update_session_activity(request.session_id)
-
-        # 3. Extract relevant sections using rule-based matching (no Vector DB)
-        current_html = session.get("current_html", "")
-        section_extractor = SectionExtractor()
-        extracted_sections = section_extractor.find_relevant_sections(
-            html=current_html,
-            user_request=request.message,
-            max_sections=5
+        # 1-4. Session, relevant sections and context
+        context = await _build_message_context(request)
+
+        # 5-6. Analyze intent and generate modification
+        analysis, response = await _analyze_and_modify(
+            message=request.message,
+            html_fragments=context.html_fragments,
+            search_results=context.search_results,
+            full_html=context.current_html,
+            speculate=should_speculate(
+                context.extracted_sections[0].score if context.extracted_sections else 0.0,
+                context.request_match.is_global
+            ),
+            match=context.request_match,
+            # Validates cached patches; not parsed here on a cache miss
+            document=_cached_soup(request.session_id, context.current_html)
         )
-        logger.info(f"Found {len(extracted_sections)} relevant sections (rule-based)")
 
-        # Convert to SearchResult objects for compatibility
-        search_result_objects = [
-            SearchResult(
-                node_id=None,
-                section_id=section.section_id,
-                selector=None,
-                type="section",
-                content=section.text_content[:200],
-                score=section.score
-            )
-            for section in extracted_sections
-        ]
+        # 7-8. History and session HTML
+        return await _finish_message(request, context, analysis, response, start_time, llm_attempts)
+
+    except HTTPException:
+        raise
+    except asyncio.TimeoutError:
+        logger.error("Gemini call timed out")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Failed to process message: model request timed out"
+        )
+    except Exception as e:
+        logger.error(f"Failed to process message: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to process message: {str(e)}"
+        )
+
+
+async def _stream_message(
+    request: ChatRequest,
+    context: MessageContext,
+    start_time: float,
+    llm_attempts: List[dict]
+) -> AsyncIterator[str]:
+    """
+    Process chat message as server-sent events
+
+    Events (data is JSON):
+    - sections: {"sections": [{"section_id", "score"}], "context_size"}
+    - intent: AnalysisResult
+    - patch: {"index", "patch"} - local changes and global edit scripts,
+      as each patch is parsed
+    - html: {"chunk"} - regenerated global changes, the new HTML as it is
+      generated
+    - discard: {"patches", "html", "reason"} - the patch events (count)
+      and html chunks sent so far are void and must be rolled back: the
+      response failed, or an unusable edit script is followed by a
+      regenerated document. Always sent before such an error / html event
+    - done: ChatResponse (same as POST /chat)
+    - error: {"status", "detail"}
+
+    Rule-based and cached intents apply as in POST /chat; the combined
+    and speculative modes do not (patches stream from the patch call).
+
+    Args:
+        request: Chat request
+        context: Context built before the response started
+        start_time: time.time() when the request arrived
+        llm_attempts: Attempt log of the request
+
+    Yields:
+        SSE-formatted events
+    """
+    index = 0
+    html_sent = False
+    try:
+        yield _sse_event("sections", {
+            "sections": [
+                {"section_id": section.section_id, "score": section.score}
+                for section in context.extracted_sections
+            ],
+            "context_size": context.context_size,
+        })
 
-        # 4. Analyze intent with IntentAnalyzer
         intent_analyzer = IntentAnalyzer()
         analysis = await intent_analyzer.analyze(
             message=request.message,
-            search_results=search_result_objects
+            search_results=context.search_results,
+            match=context.request_match
         )
         logger.info(f"Intent: {analysis.intent}, confidence: {analysis.confidence}")
+        yield _sse_event("intent", analysis.model_dump(mode="json"))
 
-        # 5. Build context from extracted sections
-        html_context, context_size = build_context_from_sections(extracted_sections)
-
-        # Create html_fragments dict for compatibility with modification_engine
-        html_fragments = {
-            section.section_id: section.html
-            for section in extracted_sections
-        }
-        sections_included = [section.section_id for section in extracted_sections]
-
-        logger.info(f"Context built: {context_size} bytes, {len(sections_included)} sections")
-
-        # 6. Generate modification with ModificationEngine
         modification_engine = ModificationEngine()
-
-        if analysis.intent == IntentType.OFF_TOPIC:
-            # HTML과 무관한 요청 - 완곡히 거절
-            response = modification_engine.process_off_topic()
-            logger.info("Off-topic request detected, returning decline message")
-        elif analysis.intent == IntentType.UNCLEAR:
-            # 불명확한 요청 - 자세한 설명 요청
-            response = modification_engine.process_unclear()
-            logger.info("Unclear request detected, asking for clarification")
-        elif analysis.intent == IntentType.LOCAL_CHANGE:
-            response = await modification_engine.process_local_change(
+        if analysis.intent == IntentType.LOCAL_CHANGE:
+            stream = modification_engine.stream_local_change(
                 message=request.message,
-                context=html_fragments,
-                analysis=analysis
+                context=context.html_fragments,
+                analysis=analysis,
+                document=_cached_soup(request.session_id, context.current_html)
             )
         elif analysis.intent == IntentType.GLOBAL_CHANGE:
-            response = await modification_engine.process_global_change(
+            stream = modification_engine.stream_global_change(
                 message=request.message,
-                full_html=session.get("current_html", ""),
-                analysis=analysis
+                full_html=context.current_html,
+                analysis=analysis,
+                document=_cached_soup(request.session_id, context.current_html)
             )
-        elif analysis.intent == IntentType.QUERY:
-            # HTML 관련 질문
-            context_html = "\n".join(html_fragments.values())
-            response = await modification_engine.process_query(
-                message=request.message,
-                context_html=context_html
+        else:
+            stream = None
+
+        response: Optional[ChatResponse] = None
+        if stream is None:
+            response = await _modify(
+                modification_engine, analysis, request.message,
+                context.html_fragments, context.current_html
             )
         else:
-            # Fallback - 예상치 못한 intent
-            response = modification_engine.process_unclear()
-            logger.warning(f"Unexpected intent: {analysis.intent}")
-
-        # Update processing time
-        response.processing_time = time.time() - start_time
-
-        # Add debug info if needed
-        # Get intent value (handle both enum and string)
-        intent_value = analysis.intent.value if hasattr(analysis.intent, 'value') else str(analysis.intent)
-        response.debug = _build_debug_info(
-            search_results=[
-                {"section_id": s.section_id, "content": s.text_content[:100], "score": s.score}
-                for s in extracted_sections
-            ],
-            target_sections=sections_included,
-            context_size=context_size,
-            intent=intent_value,
-            confidence=analysis.confidence,
-            reasoning=analysis.reasoning
+            async for item in stream:
+                if isinstance(item, ChatResponse):
+                    response = item
+                elif isinstance(item, Patch):
+                    yield _sse_event("patch", {"index": index, "patch": item.model_dump(mode="json")})
+                    index += 1
+                else:
+                    if index and not html_sent:
+                        # Edit script unusable: the document is regenerated instead
+                        yield _discard_event(index, False, "regenerating")
+                        index = 0
+                    yield _sse_event("html", {"chunk": item})
+                    html_sent = True
+
+        if response.type in (ChatResponseType.ERROR, "error") and (index or html_sent):
+            yield _discard_event(index, html_sent, "failed")
+        response = await _finish_message(request, context, analysis, response, start_time, llm_attempts)
+        yield _sse_event("done", response.model_dump(mode="json"))
+
+    except HTTPException as e:
+        if index or html_sent:
+            yield _discard_event(index, html_sent, "failed")
+        yield _sse_event("error", {"status": e.status_code, "detail": e.detail})
+    except asyncio.TimeoutError:
+        logger.error("Gemini call timed out")
+        if index or html_sent:
+            yield _discard_event(index, html_sent, "failed")
+        yield _sse_event("error", {
+            "status": status.HTTP_504_GATEWAY_TIMEOUT,
+            "detail": "Failed to process message: model request timed out"
+        })
+    except Exception as e:
+        logger.error(f"Failed to stream message: {e}")
+        if index or html_sent:
+            yield _discard_event(index, html_sent, "failed")
+        yield _sse_event("error", {
+            "status": status.HTTP_500_INTERNAL_SERVER_ERROR,
+            "detail": f"Failed to process message: {str(e)}"
+        })
+
+
+def _discard_event(patches: int, html: bool, reason: str) -> str:
+    """
+    SSE event voiding the patch / html events already sent
+
+    Args:
+        patches: Patch events sent since the last discard
+        html: Whether html chunks were sent
+        reason: "failed" or "regenerating"
+
+    Returns:
+        SSE-formatted discard event
+    """
+    logger.info(f"Discarding streamed output ({patches} patches, html: {html}): {reason}")
+    return _sse_event("discard", {"patches": patches, "html": html, "reason": reason})
+
+
+def _sse_event(event: str, data) -> str:
+    """
+    Format one server-sent event
+
+    Args:
+        event: Event name
+        data: JSON-serializable payload
+
+    Returns:
+        "event: ...\ndata: ...\n\n"
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _build_message_context(request: ChatRequest) -> MessageContext:
+    """
+    Load the session and pick the sections relevant to the message
+
+    Args:
+        request: Chat request
+
+    Returns:
+        MessageContext
+
+    Raises:
+        HTTPException: If the session is not found or expired
+    """
+    # 1. Get session from MongoDB
+    session = await _get_session_or_404(request.session_id)
+    logger.info(f"Processing message for session: {request.session_id}")
+
+    # 2. Update session activity
+    await update_session_activity(request.session_id)
+
+    # 3. Extract relevant sections using rule-based matching (no Vector DB)
+    #    (scored against stored section features - no DOM parsing)
+    current_html = session.get("current_html", "")
+    section_features = _load_section_features(request.session_id, session)
+    request_match = match_request(request.message)
+    section_extractor = SectionExtractor()
+    extracted_sections = section_extractor.find_relevant_sections(
+        html=current_html,
+        user_request=request.message,
+        max_sections=5,
+        features=section_features,
+        match=request_match
+    )
+    logger.info(f"Found {len(extracted_sections)} relevant sections (rule-based)")
+
+    # Convert to SearchResult objects for compatibility
+    search_result_objects = [
+        SearchResult(
+            node_id=None,
+            section_id=section.section_id,
+            selector=None,
+            type="section",
+            content=section.text_content[:200],
+            score=section.score
         )
+        for section in extracted_sections
+    ]
+
+    # 4. Pack the extracted sections into the context token budget
+    #    (section_id -> HTML for modification_engine; oversized sections trimmed)
+    packed = pack_context(
+        [(section.section_id, section.html, section.score) for section in extracted_sections],
+        query=request.message
+    )
+    html_fragments = packed.fragments
+    context_size = packed.size
+
+    logger.info(
+        f"Context built: {packed.tokens} tokens ({context_size} bytes), {len(html_fragments)} sections "
+        f"(skeletons: {packed.skeletons}, dropped: {packed.dropped})"
+    )
+
+    return MessageContext(
+        session=session,
+        current_html=current_html,
+        request_match=request_match,
+        extracted_sections=extracted_sections,
+        search_results=search_result_objects,
+        html_fragments=html_fragments,
+        context_size=context_size
+    )
+
+
+async def _finish_message(
+    request: ChatRequest,
+    context: MessageContext,
+    analysis: AnalysisResult,
+    response: ChatResponse,
+    start_time: float,
+    llm_attempts: List[dict]
+) -> ChatResponse:
+    """
+    Add debug info, update the session HTML and save the chat history
+
+    The HTML is stored first: if another turn changed the session in the
+    meantime (409), the exchange is not recorded either.
+
+    Args:
+        request: Chat request
+        context: Message context
+        analysis: Intent analysis result
+        response: Generated response
+        start_time: time.time() when the request arrived
+        llm_attempts: Attempt log of the request
+
+    Returns:
+        The response, completed
+    """
+    # Update processing time
+    response.processing_time = time.time() - start_time
 
-        # 7. Save to chat history
-        await _save_chat_message(
-            session_id=request.session_id,
-            role=ChatMessageRole.USER,
-            content=request.message
+    # Add debug info if needed
+    # Get intent value (handle both enum and string)
+    intent_value = analysis.intent.value if hasattr(analysis.intent, 'value') else str(analysis.intent)
+    response.debug = _build_debug_info(
+        search_results=[
+            {"section_id": s.section_id, "content": s.text_content[:100], "score": s.score}
+            for s in context.extracted_sections
+        ],
+        target_sections=list(context.html_fragments),
+        context_size=context.context_size,
+        intent=intent_value,
+        confidence=analysis.confidence,
+        reasoning=analysis.reasoning,
+        llm_attempts=llm_attempts
+    )
+
+    # 7. Update session HTML (full replacement, or patches applied to the cached DOM)
+    session = context.session
+    if response.type in (ChatResponseType.FULL, "full") and response.html:
+        await _update_session_html(session, response.html)
+    elif response.type in (ChatResponseType.PATCH, "patch") and response.patches:
+        response.metadata["patches_applied"] = await _apply_session_patches(
+            session, response.patches
         )
 
-        # Get type value (handle both enum and string due to use_enum_values)
-        type_value = response.type.value if hasattr(response.type, 'value') else str(response.type)
-        await _save_chat_message(
-            session_id=request.session_id,
-            role=ChatMessageRole.ASSISTANT,
-            content=response.message or "",
-            analysis=analysis.model_dump(),
-            result={
-                "type": type_value,
-                "patches_count": len(response.patches) if response.patches else 0
-            }
+    # 8. Save to chat history
+    await _save_chat_message(
+        session_id=request.session_id,
+        role=ChatMessageRole.USER,
+        content=request.message
+    )
+
+    # Get type value (handle both enum and string due to use_enum_values)
+    type_value = response.type.value if hasattr(response.type, 'value') else str(response.type)
+    await _save_chat_message(
+        session_id=request.session_id,
+        role=ChatMessageRole.ASSISTANT,
+        content=response.message or "",
+        analysis=analysis.model_dump(),
+        result={
+            "type": type_value,
+            "patches_count": len(response.patches) if response.patches else 0,
+            "speculation": response.metadata.get("speculation")
+        }
+    )
+
+    logger.info(f"Response generated in {response.processing_time:.2f}s")
+    return response
+
+
+async def _analyze_and_modify(
+    message: str,
+    html_fragments: Dict[str, str],
+    search_results: List[SearchResult],
+    full_html: str,
+    combined: Optional[bool] = None,
+    speculate: bool = False,
+    match: Optional[RequestMatch] = None,
+    document: Optional[BeautifulSoup] = None
+) -> Tuple[AnalysisResult, ChatResponse]:
+    """
+    Classify the request and generate the modification
+
+    Requests the intent rules are confident about, and repeats of cached
+    analyses, skip the LLM classifier (and the combined call). Otherwise,
+    with CHAT_COMBINED_MODE one Gemini call does both for local changes
+    and queries; the two-step flow (IntentAnalyzer, then
+    ModificationEngine) runs only for the steps the combined response
+    could not cover.
+    With `speculate`, the local change is generated concurrently with the
+    intent analysis and kept only if the intent is local.
+
+    Args:
+        message: User message
+        html_fragments: Section ID -> HTML of the relevant sections
+        search_results: Rule-based section matches
+        full_html: Session's current HTML (global changes)
+        combined: Override CHAT_COMBINED_MODE
+        speculate: Start the local change before the intent is known
+        match: RequestMatch of the message (computed if omitted)
+        document: Current session DOM (validates cached patches)
+
+    Returns:
+        (AnalysisResult, ChatResponse); response.metadata["speculation"]
+        holds the outcome when a speculative call was started
+    """
+    if combined is None:
+        combined = settings.CHAT_COMBINED_MODE
+
+    intent_analyzer = IntentAnalyzer()
+    analysis = intent_analyzer.classify_by_rules(message, search_results, match)
+    if analysis is None:
+        analysis = await intent_analyzer.lookup_cache(message, search_results)
+    response: Optional[ChatResponse] = None
+
+    if analysis is None and combined:
+        combined_result = await CombinedProcessor().process(
+            message=message,
+            context=html_fragments,
+            search_results=search_results
+        )
+        if combined_result:
+            analysis, response = combined_result.analysis, combined_result.response
+            await intent_analyzer.remember(message, search_results, analysis)
+
+    modification_engine = ModificationEngine()
+    speculation: Optional[SpeculativeLocalChange] = None
+
+    if analysis is None:
+        if speculate and html_fragments:
+            speculation = SpeculativeLocalChange(modification_engine, message, html_fragments, document)
+
+        try:
+            analysis = await intent_analyzer.analyze(
+                message=message,
+                search_results=search_results,
+                match=match,
+                use_rules=False,
+                use_cache=False
+            )
+        except BaseException:
+            # Includes cancellation on client disconnect
+            if speculation:
+                speculation.discard()
+            raise
+    logger.info(f"Intent: {analysis.intent}, confidence: {analysis.confidence}")
+
+    if response is None and speculation is not None:
+        response = await speculation.resolve(analysis)
+
+    if response is None:
+        response = await _modify(
+            modification_engine, analysis, message, html_fragments, full_html, document
         )
 
-        # 8. Update session HTML if full replacement
-        if response.type in (ChatResponseType.FULL, "full") and response.html:
-            await _update_session_html(request.session_id, response.html)
+    if speculation is not None:
+        response.metadata["speculation"] = speculation.outcome
 
-        logger.info(f"Response generated in {response.processing_time:.2f}s")
-        return response
+    return analysis, response
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Failed to process message: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to process message: {str(e)}"
+
+async def _modify(
+    modification_engine: ModificationEngine,
+    analysis: AnalysisResult,
+    message: str,
+    html_fragments: Dict[str, str],
+    full_html: str,
+    document: Optional[BeautifulSoup] = None
+) -> ChatResponse:
+    """
+    Generate the response for an analyzed request
+
+    Args:
+        modification_engine: Engine generating the modification
+        analysis: Intent analysis result
+        message: User message
+        html_fragments: Section ID -> HTML of the relevant sections
+        full_html: Session's current HTML (global changes)
+        document: Current session DOM (validates cached patches and
+            global edit scripts)
+
+    Returns:
+        ChatResponse
+    """
+    if analysis.intent == IntentType.OFF_TOPIC:
+        # HTML과 무관한 요청 - 완곡히 거절
+        response = modification_engine.process_off_topic()
+        logger.info("Off-topic request detected, returning decline message")
+    elif analysis.intent == IntentType.UNCLEAR:
+        # 불명확한 요청 - 자세한 설명 요청
+        response = modification_engine.process_unclear()
+        logger.info("Unclear request detected, asking for clarification")
+    elif analysis.intent == IntentType.LOCAL_CHANGE:
+        response = await modification_engine.process_local_change(
+            message=message,
+            context=html_fragments,
+            analysis=analysis,
+            document=document
+        )
+    elif analysis.intent == IntentType.GLOBAL_CHANGE:
+        response = await modification_engine.process_global_change(
+            message=message,
+            full_html=full_html,
+            analysis=analysis,
+            document=document
+        )
+    elif analysis.intent == IntentType.QUERY:
+        # HTML 관련 질문
+        context_html = "\n".join(html_fragments.values())
+        response = await modification_engine.process_query(
+            message=message,
+            context_html=context_html
         )
+    else:
+        # Fallback - 예상치 못한 intent
+        response = modification_engine.process_unclear()
+        logger.warning(f"Unexpected intent: {analysis.intent}")
+
+    return response
 
 
 async def _get_session_or_404(session_id: str) -> dict:
@@ -268,20 +732,153 @@ async def _save_chat_message(
     )
 
 
-async def _update_session_html(session_id: str, new_html: str):
+def _load_section_features(session_id: str, session: dict) -> List[SectionFeatures]:
     """
-    Update session's current HTML
+    Get section features of the session's current HTML
+
+    Uses the features stored with the session; sessions created before
+    features were stored fall back to the document cache.
 
     Args:
         session_id: Session ID
+        session: Session document
+
+    Returns:
+        SectionFeatures list
+    """
+    stored = session.get("section_features")
+    if stored is not None:
+        return [SectionFeatures(**feature) for feature in stored]
+
+    return get_document_cache().get_or_parse(session_id, session.get("current_html", "")).features
+
+
+def _cached_soup(session_id: str, html: str) -> Optional[BeautifulSoup]:
+    """
+    Parsed session DOM if the document cache already holds it
+
+    Args:
+        session_id: Session ID
+        html: Current HTML of the session
+
+    Returns:
+        BeautifulSoup or None (never parses)
+    """
+    document = get_document_cache().get(session_id, html)
+    return document.soup if document is not None else None
+
+
+async def _update_session_html(session: dict, new_html: str):
+    """
+    Update session's current HTML
+
+    Args:
+        session: Session document (still describing the old HTML)
         new_html: New HTML content
     """
-    collection: AsyncIOMotorCollection = get_collection(SESSIONS_COLLECTION)
+    # Re-parse once: refreshes the cached DOM and the stored section features
+    document = get_document_cache().put(session["session_id"], new_html)
 
-    await collection.update_one(
-        {"session_id": session_id},
-        {"$set": {"current_html": new_html}}
+    await _store_session_html(session, new_html, document.features)
+
+
+async def _apply_session_patches(session: dict, patches: List[Patch]) -> int:
+    """
+    Apply patches to the session's cached DOM and store the new HTML
+
+    Only the sections touched by the patches are re-serialized; the stored
+    section features are updated from those sections alone.
+
+    Args:
+        session: Session document (current_html is the HTML the patches
+            were generated against)
+        patches: Patches returned to the client
+
+    Returns:
+        Number of patches applied
+    """
+    session_id = session["session_id"]
+    current_html = session.get("current_html", "")
+    cache = get_document_cache()
+    document = cache.get_or_parse(session_id, current_html)
+
+    try:
+        result = PatchEngine().apply(current_html, patches, document.soup, document.features)
+    except Exception:
+        # The cached DOM may be half-patched
+        cache.invalidate(session_id)
+        raise
+
+    if result.failed:
+        logger.warning(f"{len(result.failed)} patches not applied server-side: {result.failed}")
+    if result.html == current_html:
+        return result.applied
+
+    cache.store(session_id, result.html, result.soup, result.features)
+    await _store_session_html(session, result.html, result.features)
+
+    logger.info(
+        f"Applied {result.applied}/{len(patches)} patches server-side "
+        f"({'full document' if result.full_serialization else f'sections: {result.touched_sections}'})"
+    )
+    return result.applied
+
+
+async def _store_session_html(session: dict, new_html: str, features: List[SectionFeatures]):
+    """
+    Store new HTML with its section features and re-indexed AST
+
+    Only the AST nodes of changed sections are written; see ASTReindexer.
+    The write only goes through if current_html is still the HTML the
+    change was made against (html_hash): two overlapping turns on one
+    session would otherwise silently drop the earlier edit.
+
+    Args:
+        session: Session document (still describing the old HTML)
+        new_html: New HTML content
+        features: Section features of new_html
+
+    Raises:
+        HTTPException: 409 if another request changed the session HTML
+    """
+    reindex = ASTReindexer().reindex(session, new_html, features)
+    update = reindex.update
+    update["$set"].update({
+        "current_html": new_html,
+        "html_hash": content_hash(new_html),
+        "section_features": [feature.model_dump() for feature in features]
+    })
+
+    collection: AsyncIOMotorCollection = get_collection(SESSIONS_COLLECTION)
+    result = await collection.update_one(
+        {"session_id": session["session_id"], **_html_version_filter(session)},
+        update
     )
+    if result.matched_count == 0:
+        # The cached DOM holds this turn's edit, not the stored HTML
+        get_document_cache().invalidate(session["session_id"])
+        logger.warning(f"Session {session['session_id']} HTML changed by another request, edit not stored")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Session HTML was changed by another request; reload the session and retry"
+        )
+
+
+def _html_version_filter(session: dict) -> dict:
+    """
+    Filter matching the session only while its HTML is unchanged
+
+    Args:
+        session: Session document as loaded for this turn
+
+    Returns:
+        Filter on html_hash (on current_html itself for sessions stored
+        before html_hash)
+    """
+    stored_hash = session.get("html_hash")
+    if stored_hash:
+        return {"html_hash": stored_hash}
+    return {"html_hash": {"$exists": False}, "current_html": session.get("current_html", "")}
 
 
 def _build_debug_info(
@@ -291,7 +888,8 @@ def _build_debug_info(
     intent: str,
     confidence: float,
     fallback_reason: str = None,
-    reasoning: str = None
+    reasoning: str = None,
+    llm_attempts: list = None
 ) -> DebugInfo:
     """
     Build debug information for response
@@ -304,6 +902,7 @@ def _build_debug_info(
         confidence: Confidence score
         fallback_reason: Reason for fallback (if any)
         reasoning: LLM's analysis reasoning
+        llm_attempts: Gemini attempts (key index, latency, status)
 
     Returns:
         DebugInfo object
@@ -325,5 +924,6 @@ def _build_debug_info(
         intent=intent,
         confidence=confidence,
         fallback_reason=fallback_reason,
-        reasoning=reasoning
+        reasoning=reasoning,
+        llm_attempts=[LLMAttempt(**attempt) for attempt in llm_attempts or []]
     )
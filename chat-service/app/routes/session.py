@@ -8,7 +8,7 @@ Endpoints:
 
 Dependencies:
 - app.models.session
-- app.services (HTMLParser)
+- app.services (HTMLParser, SectionExtractor)
 - app.utils.mongodb
 
 Note: Vector DB (Pinecone) removed - using rule-based section extraction instead
@@ -22,6 +22,7 @@ import logging
 from fastapi import APIRouter, HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorCollection
 
+from app.models.ast import anchored_node_dumps
 from app.models.session import (
     SessionCreate,
     SessionResponse,
@@ -30,6 +31,8 @@ from app.models.session import (
     SessionDocument,
 )
 from app.services.html_parser import HTMLParser
+from app.services.document_cache import content_hash, get_document_cache
+from app.services.section_extractor import SectionExtractor
 from app.utils.mongodb import get_collection, SESSIONS_COLLECTION
 from app.config import settings
 
@@ -47,7 +50,7 @@ async def start_session(request: SessionCreate):
     """
     Start a new chat session
 
-    1. Parse HTML into AST
+    1. Parse HTML into AST and section features
     2. Store session in MongoDB
     3. Return session ID and stats
 
@@ -72,7 +75,15 @@ async def start_session(request: SessionCreate):
             html_size=parse_result.html_size
         )
 
-        # 4. Store session document in MongoDB
+        # 4. Section features from the same parse, spans cross-checked against
+        #    the source scan (cached without a DOM; the patch engine's DOM is
+        #    parsed by the first patch)
+        features = SectionExtractor().features_from_elements(
+            request.html, parser.section_elements, parser.source_elements
+        )
+        get_document_cache().store(session_id, request.html, None, features)
+
+        # 5. Store session document in MongoDB
         collection: AsyncIOMotorCollection = get_collection(SESSIONS_COLLECTION)
 
         now = datetime.utcnow()
@@ -83,9 +94,14 @@ async def start_session(request: SessionCreate):
             "status": SessionStatus.ACTIVE.value,
             "original_html": request.html,
             "current_html": request.html,
+            "html_hash": content_hash(request.html),
             "stats": stats.model_dump(),
-            "ast_nodes": {node.node_id: node.model_dump() for node in parse_result.nodes},
+            "ast_nodes": anchored_node_dumps(parse_result.nodes, features),
             "section_index": parse_result.section_index,
+            "section_roots": parse_result.section_roots,
+            "section_parents": parse_result.section_parents,
+            "section_text_nodes": parse_result.section_text_nodes,
+            "section_features": [feature.model_dump() for feature in features],
             "created_at": now,
             "last_active_at": now,
             "expires_at": expires_at
@@ -94,7 +110,7 @@ async def start_session(request: SessionCreate):
         await collection.insert_one(session_doc)
         logger.info(f"Session {session_id} stored in MongoDB")
 
-        # 5. Return SessionResponse
+        # 6. Return SessionResponse
         return SessionResponse(
             session_id=session_id,
             status=SessionStatus.ACTIVE,
@@ -175,6 +191,9 @@ async def end_session(session_id: str):
     result = await collection.delete_one({"session_id": session_id})
     mongo_deleted = result.deleted_count > 0
 
+    # Drop cached document
+    get_document_cache().invalidate(session_id)
+
     return {
         "success": mongo_deleted,
         "message": "Session terminated",
@@ -8,6 +8,13 @@ from .context_builder import ContextBuilder
 from .intent_analyzer import IntentAnalyzer
 from .modification_engine import ModificationEngine
 from .gemini_client import GeminiClient
+from .patch_engine import PatchEngine
+from .ast_reindexer import ASTReindexer
+from .combined_processor import CombinedProcessor
+from .intent_rules import IntentRules
+from .intent_cache import IntentCache
+from .patch_cache import PatchCache
+from .translation_memory import TranslationMemory
 
 __all__ = [
     "HTMLParser",
@@ -16,4 +23,11 @@ __all__ = [
     "IntentAnalyzer",
     "ModificationEngine",
     "GeminiClient",
+    "PatchEngine",
+    "ASTReindexer",
+    "CombinedProcessor",
+    "IntentRules",
+    "IntentCache",
+    "PatchCache",
+    "TranslationMemory",
 ]
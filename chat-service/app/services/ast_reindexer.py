@@ -0,0 +1,305 @@
+"""
+AST Re-indexer
+
+Responsibilities:
+- Keep the stored ast_nodes / section_index / section_roots /
+  section_parents / section_text_nodes / stats of a session in step
+  with current_html after patches and full replacements
+- Re-parse only the sections whose subtree hash changed
+- Produce a targeted MongoDB update ($set / $unset per node and section)
+
+Dependencies:
+- app.services.html_parser (HTMLParser)
+- app.models.ast (SectionFeatures)
+- app.models.session (SessionStats)
+
+Implementation Notes:
+- Old and new section features are compared by (section_id, subtree_hash);
+  a change inside a nested section re-parses its outermost section
+- Stored node offsets are relative to an outermost section (its start
+  for nodes inside it, the end of the preceding one for nodes outside
+  sections), resolved through the stored section_features: a section that
+  changes length moves nothing else, so the update covers the changed
+  sections only, however many sections follow
+- Text nodes are not stored; the old count of a re-parsed section comes
+  from section_text_nodes
+- Re-parsed nodes get IDs namespaced by the section's new subtree hash,
+  so they never collide with the IDs they replace
+- A re-parsed outermost section has no enclosing section, so the root and
+  parent entries of the fragment's parse are stored as they are
+- Falls back to a full re-parse (whole-field $set) when content outside
+  sections changed, section IDs are duplicated or unusable as Mongo field
+  names, a section fragment does not re-parse to the same root element,
+  or the session predates the section root / parent / text node maps or
+  section-relative node offsets
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import logging
+
+from app.models.ast import SectionFeatures, anchored_node_dumps
+from app.models.session import SessionStats
+from app.services.html_parser import HTMLParser
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ReindexResult:
+    """MongoDB update that brings the stored AST up to date"""
+    update: Dict[str, Dict[str, Any]]                         # {"$set": {...}, "$unset": {...}}
+    changed_sections: List[str] = field(default_factory=list)  # Re-parsed outermost sections
+    full: bool = False                                         # Whole document re-parsed
+
+
+class ASTReindexer:
+    """
+    Incremental re-indexer for the AST stored with a session
+
+    Usage:
+        reindexer = ASTReindexer()
+        result = reindexer.reindex(session, new_html, new_features)
+        await collection.update_one({"session_id": session_id}, result.update)
+    """
+
+    def reindex(
+        self,
+        session: Dict[str, Any],
+        new_html: str,
+        new_features: List[SectionFeatures]
+    ) -> ReindexResult:
+        """
+        Build the update for a session whose current_html becomes new_html
+
+        Args:
+            session: Session document (current_html, ast_nodes, section_index,
+                section_features and stats still describe the old HTML)
+            new_html: New HTML
+            new_features: Section features of new_html
+
+        Returns:
+            ReindexResult
+        """
+        old_html = session.get("current_html", "")
+        ast_nodes = session.get("ast_nodes")
+        section_index = session.get("section_index") or {}
+        stats = session.get("stats")
+        old_features = [SectionFeatures(**feature) for feature in session.get("section_features") or []]
+
+        if (
+            not isinstance(ast_nodes, dict)
+            or "section_roots" not in session
+            or "section_parents" not in session
+            or "section_text_nodes" not in session
+            or not self._anchored(ast_nodes)
+            or not stats
+            or not self._usable(old_features, section_index)
+            or not self._usable(new_features)
+        ):
+            return self._full(new_html, new_features)
+
+        old_roots = self._outermost(old_features)
+        new_roots = self._outermost(new_features)
+        if not self._same_outside_sections(old_html, old_roots, new_html, new_roots):
+            return self._full(new_html, new_features)
+
+        section_text_nodes = session.get("section_text_nodes") or {}
+        update: Dict[str, Dict[str, Any]] = {"$set": {}, "$unset": {}}
+        changed: List[str] = []
+        replaced_children: Dict[str, List[str]] = {}  # wrapper node ID -> children with new roots
+        node_delta = text_delta = 0
+
+        for old_root, new_root in zip(old_roots, new_roots):
+            if old_root.subtree_hash == new_root.subtree_hash:
+                if old_root.byte_size != new_root.byte_size:
+                    return self._full(new_html, new_features)
+                continue
+
+            section_update = self._reindex_section(
+                new_html, old_root, new_root,
+                old_features, ast_nodes, section_index, section_text_nodes
+            )
+            if section_update is None:
+                return self._full(new_html, new_features)
+
+            sets, unsets, nodes_added, nodes_removed, texts_added, texts_removed, new_root_id = section_update
+            update["$set"].update(sets)
+            update["$unset"].update(unsets)
+
+            # The wrapper holding the section points at the new root (several
+            # changed sections may share one wrapper)
+            old_root_id = section_index[old_root.section_id][0]
+            parent_id = ast_nodes[old_root_id].get("parent")
+            if parent_id in ast_nodes:
+                children = replaced_children.get(parent_id, ast_nodes[parent_id].get("children", []))
+                replaced_children[parent_id] = [new_root_id if child == old_root_id else child for child in children]
+            node_delta += nodes_added - nodes_removed
+            text_delta += texts_added - texts_removed
+            changed.append(new_root.section_id)
+
+        for parent_id, children in replaced_children.items():
+            update["$set"][f"ast_nodes.{parent_id}.children"] = children
+
+        update["$set"].update({
+            "stats.node_count": stats.get("node_count", 0) + node_delta,
+            "stats.text_node_count": stats.get("text_node_count", 0) + text_delta,
+            "stats.section_count": len(new_features),
+            "stats.html_size": len(new_html),
+        })
+        if not update["$unset"]:
+            del update["$unset"]
+
+        logger.info(f"Re-indexed {len(changed)} changed sections: {changed}")
+        return ReindexResult(update=update, changed_sections=changed)
+
+    def _reindex_section(
+        self,
+        new_html: str,
+        old_root: SectionFeatures,
+        new_root: SectionFeatures,
+        old_features: List[SectionFeatures],
+        ast_nodes: Dict[str, Dict[str, Any]],
+        section_index: Dict[str, List[str]],
+        section_text_nodes: Dict[str, int]
+    ) -> Optional[tuple]:
+        """
+        Re-parse one outermost section
+
+        Returns:
+            ($set fields, $unset fields, nodes added, nodes removed,
+            text nodes added, text nodes removed, new root node ID), or
+            None if the section cannot be re-indexed on its own
+        """
+        old_root_id = (section_index.get(old_root.section_id) or [None])[0]
+        old_root_node = ast_nodes.get(old_root_id)
+        if old_root_node is None or old_root_node.get("tag") != new_root.tag:
+            return None
+
+        fragment = new_html[new_root.start:new_root.end]
+        parsed = HTMLParser(fragment, id_namespace=f":{new_root.subtree_hash}").parse()
+
+        # lxml wraps the fragment in <body>; its only child must be the section
+        body, nodes = parsed.nodes[0], parsed.nodes[1:]
+        if body.tag != "body" or len(body.children) != 1 or not nodes:
+            return None
+        root = nodes[0]
+        if root.node_id != body.children[0] or root.tag != new_root.tag or (root.start, root.end) != (0, len(fragment)):
+            return None
+
+        sets: Dict[str, Any] = {}
+        unsets: Dict[str, str] = {}
+
+        # New nodes: offsets relative to the section (as parsed from the
+        # fragment), paths under the old root's path
+        relative_prefix = root.path
+        for node in nodes:
+            data = node.model_dump()
+            data["path"] = old_root_node.get("path", "") + data["path"][len(relative_prefix):]
+            if data["start"] is not None:
+                data["anchor"] = new_root.section_id
+            if node is root:
+                data["parent"] = old_root_node.get("parent")
+            sets[f"ast_nodes.{node.node_id}"] = data
+
+        # Old nodes of the section and of the sections nested in it
+        old_section_ids = [
+            feature.section_id for feature in old_features
+            if old_root.start <= feature.start and feature.end <= old_root.end
+        ]
+        nodes_removed = texts_removed = 0
+        for section_id in old_section_ids:
+            for node_id in section_index.get(section_id, []):
+                unsets[f"ast_nodes.{node_id}"] = ""
+                nodes_removed += 1
+            texts_removed += section_text_nodes.get(section_id, 0)
+            if section_id not in parsed.section_index:
+                unsets[f"section_index.{section_id}"] = ""
+            if section_id not in parsed.section_roots:
+                unsets[f"section_roots.{section_id}"] = ""
+                unsets[f"section_parents.{section_id}"] = ""
+            if section_id not in parsed.section_text_nodes:
+                unsets[f"section_text_nodes.{section_id}"] = ""
+
+        for section_id, node_ids in parsed.section_index.items():
+            sets[f"section_index.{section_id}"] = node_ids
+        for section_id, root_id in parsed.section_roots.items():
+            sets[f"section_roots.{section_id}"] = root_id
+            sets[f"section_parents.{section_id}"] = parsed.section_parents[section_id]
+        for section_id, count in parsed.section_text_nodes.items():
+            sets[f"section_text_nodes.{section_id}"] = count
+
+        return sets, unsets, len(nodes), nodes_removed, parsed.total_text_nodes, texts_removed, root.node_id
+
+    def _full(self, new_html: str, new_features: List[SectionFeatures]) -> ReindexResult:
+        """Re-parse the whole document and replace all AST fields"""
+        parse_result = HTMLParser(new_html).parse()
+        stats = SessionStats(
+            node_count=parse_result.total_nodes,
+            text_node_count=parse_result.total_text_nodes,
+            section_count=parse_result.total_sections,
+            vector_count=0,
+            html_size=parse_result.html_size
+        )
+
+        logger.info("Re-indexed full document")
+        return ReindexResult(
+            update={"$set": {
+                "ast_nodes": anchored_node_dumps(parse_result.nodes, new_features),
+                "section_index": parse_result.section_index,
+                "section_roots": parse_result.section_roots,
+                "section_parents": parse_result.section_parents,
+                "section_text_nodes": parse_result.section_text_nodes,
+                "stats": stats.model_dump(),
+            }},
+            full=True
+        )
+
+    @staticmethod
+    def _anchored(ast_nodes: Dict[str, Dict[str, Any]]) -> bool:
+        """Whether stored nodes have section-relative offsets (all or none do)"""
+        node = next(iter(ast_nodes.values()), None)
+        return node is None or "anchor" in node
+
+    @staticmethod
+    def _usable(
+        features: List[SectionFeatures],
+        section_index: Optional[Dict[str, List[str]]] = None
+    ) -> bool:
+        """Unique section IDs usable in field paths, known offsets, matching the index"""
+        section_ids = {feature.section_id for feature in features}
+        if len(section_ids) != len(features):
+            return False
+        if any("." in section_id or section_id.startswith("$") for section_id in section_ids):
+            return False
+        if any(feature.start is None or feature.end is None for feature in features):
+            return False
+        return section_index is None or set(section_index) == section_ids
+
+    @staticmethod
+    def _outermost(features: List[SectionFeatures]) -> List[SectionFeatures]:
+        """Sections not nested in another section (document order)"""
+        roots: List[SectionFeatures] = []
+        for feature in features:
+            if roots and feature.start < roots[-1].end:
+                continue
+            roots.append(feature)
+        return roots
+
+    @staticmethod
+    def _same_outside_sections(
+        old_html: str,
+        old_roots: List[SectionFeatures],
+        new_html: str,
+        new_roots: List[SectionFeatures]
+    ) -> bool:
+        """Whether everything between the outermost sections is unchanged"""
+        if [root.section_id for root in old_roots] != [root.section_id for root in new_roots]:
+            return False
+
+        old_cursor = new_cursor = 0
+        for old_root, new_root in zip(old_roots, new_roots):
+            if old_html[old_cursor:old_root.start] != new_html[new_cursor:new_root.start]:
+                return False
+            old_cursor, new_cursor = old_root.end, new_root.end
+        return old_html[old_cursor:] == new_html[new_cursor:]
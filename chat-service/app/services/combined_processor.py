@@ -0,0 +1,225 @@
+"""
+Combined Processor
+
+Responsibilities:
+- Classify intent and generate the modification in a single Gemini call
+- Return patches for local changes and an answer for queries
+- Report when the combined response cannot be used (caller falls back
+  to IntentAnalyzer + ModificationEngine)
+
+Dependencies:
+- app.services.gemini_client
+- app.services.intent_analyzer (INTENT_GUIDELINES, JSON extraction, AnalysisResult building)
+- app.services.modification_engine (prompt parts, Patch building, static responses)
+- app.models.chat (SearchResult, ChatResponse, ChatResponseType)
+- app.models.common (AnalysisResult, IntentType)
+
+Implementation Notes:
+- Enabled by CHAT_COMBINED_MODE
+- The prompt carries the section HTML up front, so local changes and
+  queries need no second call
+- Global changes still need the full HTML: the analysis is returned
+  without a response and the caller makes the (single) follow-up call
+- A local change without valid patches or a query without an answer
+  also returns the analysis alone, so only the missing step is repeated
+- Unusable = the call failed or no JSON with a known intent came back;
+  only then is the two-step flow run from the start
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+import asyncio
+import logging
+import time
+
+from app.models.chat import SearchResult, ChatResponse, ChatResponseType
+from app.models.common import AnalysisResult, IntentType
+from app.services.gemini_client import GeminiClient
+from app.services.intent_analyzer import IntentAnalyzer, INTENT_GUIDELINES
+from app.services.modification_engine import (
+    ModificationEngine,
+    VALUE_RULES,
+    PATCH_ACTIONS,
+    PATCH_NOTES,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CombinedResult:
+    """Result of a combined call"""
+    analysis: AnalysisResult
+    response: Optional[ChatResponse] = None   # None: follow-up call still needed
+
+
+class CombinedProcessor:
+    """
+    Intent analysis and modification in one round trip
+
+    Usage:
+        processor = CombinedProcessor()
+        result = await processor.process(
+            message="헤더 색깔 바꿔줘",
+            context={"header": "<header>...</header>"},
+            search_results=[...]
+        )
+        if result is None:
+            ...  # two-step flow
+        elif result.response is None:
+            ...  # dispatch on result.analysis
+    """
+
+    def __init__(self):
+        """Initialize combined processor"""
+        self.gemini = GeminiClient()
+        self.intent_analyzer = IntentAnalyzer()
+        self.modification_engine = ModificationEngine()
+
+    async def process(
+        self,
+        message: str,
+        context: Dict[str, str],
+        search_results: List[SearchResult]
+    ) -> Optional[CombinedResult]:
+        """
+        Analyze and modify with one Gemini call
+
+        Args:
+            message: User message
+            context: Section ID -> HTML mapping
+            search_results: Rule-based section matches
+
+        Returns:
+            CombinedResult, or None if the response is unusable
+        """
+        start_time = time.time()
+
+        try:
+            prompt = self._build_combined_prompt(message, context, search_results)
+
+            result = await self.gemini.generate_content(
+                prompt=prompt,
+                temperature=0.3  # Same as classification and patch generation
+            )
+        except asyncio.TimeoutError:
+            # A two-step retry would wait for the same model again
+            raise
+        except Exception as e:
+            logger.error(f"Combined processing failed: {e}")
+            return None
+
+        data = self.intent_analyzer._extract_json(result["text"])
+        if not data or data.get("intent") not in {intent.value for intent in IntentType}:
+            logger.warning("Combined response unusable, falling back to two-step flow")
+            return None
+
+        analysis = self.intent_analyzer._build_analysis(data)
+        metadata = {
+            "tokens_used": result.get("tokens_used", 0),
+            "processing_time": time.time() - start_time,
+            "combined": True
+        }
+
+        logger.info(
+            f"Combined analysis complete: intent={analysis.intent}, "
+            f"confidence={analysis.confidence:.2f}"
+        )
+
+        response = None
+        if analysis.intent == IntentType.OFF_TOPIC:
+            response = self.modification_engine.process_off_topic()
+        elif analysis.intent == IntentType.UNCLEAR:
+            response = self.modification_engine.process_unclear()
+        elif analysis.intent == IntentType.LOCAL_CHANGE:
+            patches = self.modification_engine._build_patches(data.get("patches") or [])
+            if patches:
+                response = ChatResponse(
+                    type=ChatResponseType.PATCH,
+                    patches=patches,
+                    message=data.get("summary") or f"수정 패치 {len(patches)}개 생성됨",
+                    metadata=metadata
+                )
+        elif analysis.intent == IntentType.QUERY:
+            answer = (data.get("answer") or "").strip()
+            if answer:
+                response = ChatResponse(
+                    type=ChatResponseType.MESSAGE,
+                    message=answer,
+                    metadata=metadata
+                )
+
+        if response is None and analysis.intent in (IntentType.LOCAL_CHANGE, IntentType.QUERY):
+            logger.warning(f"Combined response has no {analysis.intent} payload, generating separately")
+
+        return CombinedResult(analysis=analysis, response=response)
+
+    def _build_combined_prompt(
+        self,
+        message: str,
+        context: Dict[str, str],
+        search_results: List[SearchResult]
+    ) -> str:
+        """
+        Build prompt for combined analysis + modification
+
+        Args:
+            message: User message
+            context: Section HTML mapping
+            search_results: Search results
+
+        Returns:
+            Prompt string
+        """
+        search_summary = self.intent_analyzer._summarize_search_results(search_results)
+        html_sections = self.modification_engine._format_sections(context) or "관련 섹션 없음"
+
+        prompt = f"""당신은 HTML 수정 전문 어시스턴트입니다. 사용자의 요청을 분석하고, 필요하면 바로 수정 패치나 답변을 작성하세요.
+
+## 사용자 요청
+"{message}"
+
+## 검색된 관련 HTML 요소
+{search_summary}
+
+## 대상 HTML
+{html_sections}
+
+## 분석 지침 (중요!)
+
+**먼저 요청이 HTML/웹페이지 수정과 관련있는지 판단하세요:**
+
+{INTENT_GUIDELINES}
+
+## 작성 지침
+- intent가 "local"이면: patches에 대상 HTML을 수정하는 패치를 작성하고 summary에 요약
+- intent가 "query"이면: answer에 대상 HTML을 근거로 간결한 답변 (HTML 수정 금지)
+- 그 외 intent: patches는 빈 배열, answer는 null
+
+{VALUE_RULES}
+
+{PATCH_NOTES}
+
+## JSON 응답 형식 (반드시 JSON만 출력)
+{{
+    "intent": "off_topic" | "local" | "global" | "query" | "unclear",
+    "changeType": "style" | "content" | "structure" | "translation" | "deletion" | null,
+    "targetDescription": "대상 설명",
+    "actionDescription": "작업 설명",
+    "confidence": 0.0-1.0,
+    "useSearchResults": true | false,
+    "reasoning": "분석 근거",
+    "patches": [
+        {{
+            "selector": "CSS 선택자 (예: #header, .button, div.card)",
+            "action": "{PATCH_ACTIONS}",
+            "oldValue": "기존 값 (setText, replaceClass 등에서 사용)",
+            "newValue": "새 값",
+            "value": "적용할 값 (단일 값인 경우)"
+        }}
+    ],
+    "summary": "수정 내용 요약",
+    "answer": "질문에 대한 답변" | null
+}}"""
+
+        return prompt
@@ -4,24 +4,34 @@ Context Builder
 Responsibilities:
 - Build HTML context from vector search results
 - Assemble relevant HTML fragments for LLM
-- Manage context size limits
+- Pack fragments into the context token budget
 - Handle fallback to full HTML when needed
 
 Dependencies:
 - app.models.ast (ContextResult)
 - app.models.chat (SearchResult)
+- app.services.context_packer (pack_context)
 
 Implementation Notes:
 - Extract section IDs from search results
-- Retrieve HTML fragments for each section
-- Respect MAX_CONTEXT_SIZE limit
-- Prioritize by search score
+- Retrieve HTML fragments for each section (section feature spans,
+  falling back to AST node offsets, which are section-relative and
+  resolved through section_features)
+- Section lookups are O(1): the section root and parent maps are built
+  by HTMLParser during parsing and stored with the session; sibling
+  groups (sections sharing a parent, document order) are indexed once
+  per builder. Sessions stored without the maps get them derived from
+  section_index and the parent links of the AST nodes
+- Sections are packed by score per token within CONTEXT_TOKEN_BUDGET
+  (oversized ones as a trimmed skeleton, see context_packer)
 """
 
 from typing import List, Dict, Optional, Set, Any
+import warnings
 
-from app.models.ast import ContextResult
+from app.models.ast import ContextResult, SectionFeatures, resolve_node_offsets, slice_node_html
 from app.models.chat import SearchResult
+from app.services.context_packer import pack_context
 from app.config import settings
 
 
@@ -39,6 +49,7 @@ class ContextBuilder:
     def __init__(
         self,
         session_data: Dict[str, Any],
+        max_context_tokens: Optional[int] = None,
         max_context_size: Optional[int] = None
     ):
         """
@@ -46,13 +57,51 @@ class ContextBuilder:
 
         Args:
             session_data: Session document from MongoDB
-            max_context_size: Override max context size
+            max_context_tokens: Override the context token budget
+            max_context_size: Deprecated byte budget, use max_context_tokens
+                (converted at ~4 bytes per token, as in estimate_tokens)
         """
+        if max_context_size is not None:
+            warnings.warn(
+                "ContextBuilder(max_context_size=...) is deprecated, use max_context_tokens",
+                DeprecationWarning,
+                stacklevel=2
+            )
+            if max_context_tokens is None:
+                max_context_tokens = max(1, max_context_size // 4)
+
         self.session = session_data
-        self.ast_nodes = session_data.get("ast_nodes", [])
-        self.section_index = session_data.get("section_index", {})
         self.current_html = session_data.get("current_html", "")
-        self.max_context_size = max_context_size or settings.MAX_CONTEXT_SIZE
+        self.section_features = {
+            feature["section_id"]: SectionFeatures(**feature)
+            for feature in session_data.get("section_features") or []
+        }
+        self.max_context_tokens = max_context_tokens or settings.CONTEXT_TOKEN_BUDGET
+
+        # start_session stores ast_nodes keyed by node ID (older documents: a list)
+        ast_nodes = session_data.get("ast_nodes") or {}
+        if not isinstance(ast_nodes, dict):
+            ast_nodes = {node["node_id"]: node for node in ast_nodes}
+        self.ast_nodes: Dict[str, Dict[str, Any]] = ast_nodes
+
+        self.section_index: Dict[str, List[str]] = session_data.get("section_index") or {}
+        self.section_roots: Dict[str, str] = session_data.get("section_roots") or {
+            section_id: node_ids[0] for section_id, node_ids in self.section_index.items() if node_ids
+        }
+        self.section_parents: Dict[str, Optional[str]] = (
+            session_data.get("section_parents") or self._derive_section_parents()
+        )
+
+        # Sections sharing a parent, in document order (features are stored in order)
+        self._sibling_groups: Dict[Optional[str], List[str]] = {}
+        self._sibling_position: Dict[str, int] = {}
+        ordered = list(self.section_features) + [
+            section_id for section_id in self.section_roots if section_id not in self.section_features
+        ]
+        for section_id in ordered:
+            group = self._sibling_groups.setdefault(self.section_parents.get(section_id), [])
+            self._sibling_position[section_id] = len(group)
+            group.append(section_id)
 
     def build_context(
         self,
@@ -74,19 +123,21 @@ class ContextBuilder:
         # Step 1: Extract section IDs from search results
         section_ids = self._extract_section_ids(search_results)
 
-        # Step 2: Optionally add parent sections
-        if include_parents:
-            additional_sections = set()
-            for section_id in section_ids:
+        # Step 2: Optionally add parent / sibling sections
+        additional_sections = set()
+        for section_id in section_ids:
+            if include_parents:
                 parent_id = self._find_parent_section(section_id)
                 if parent_id:
                     additional_sections.add(parent_id)
-            section_ids.update(additional_sections)
+            if include_siblings:
+                additional_sections.update(self._find_sibling_sections(section_id))
+        section_ids.update(additional_sections)
 
         # Step 3: Calculate section scores and sort
         section_scores = self._calculate_section_scores(search_results)
 
-        # For sections without scores (e.g., parent sections), assign a default score
+        # For sections without scores (parent / sibling sections), assign a default score
         for section_id in section_ids:
             if section_id not in section_scores:
                 section_scores[section_id] = 0.5
@@ -98,47 +149,32 @@ class ContextBuilder:
             reverse=True
         )
 
-        # Step 4: Collect HTML fragments within size limit
-        html_fragments: Dict[str, str] = {}
-        total_size = 0
-        sections_included = []
-        nodes_matched = []
-
+        # Step 4: Pack HTML fragments into the token budget
+        candidates = []
         for section_id, score in sorted_sections:
-            # Get HTML for this section
             section_html = self._get_section_html(section_id)
-            if not section_html:
-                continue
-
-            html_size = len(section_html.encode('utf-8'))
-
-            # Check if adding this section would exceed limit
-            if total_size + html_size > self.max_context_size:
-                # Try to include smaller sections if possible
-                if html_size > self.max_context_size // 2:
-                    continue
-                else:
-                    break
-
-            # Add section
-            html_fragments[section_id] = section_html
-            total_size += html_size
-            sections_included.append(section_id)
-
-            # Record matched nodes
-            for result in search_results:
-                if result.section_id == section_id:
-                    nodes_matched.append({
-                        "node_id": result.node_id,
-                        "section_id": result.section_id,
-                        "score": result.score,
-                        "type": result.type
-                    })
+            if section_html:
+                candidates.append((section_id, section_html, score))
+        packed = pack_context(candidates, self.max_context_tokens)
+
+        html_fragments = packed.fragments
+        sections_included = list(html_fragments)
+        nodes_matched = [
+            {
+                "node_id": result.node_id,
+                "section_id": result.section_id,
+                "score": result.score,
+                "type": result.type
+            }
+            for section_id in sections_included
+            for result in search_results
+            if result.section_id == section_id
+        ]
 
         # Step 5: Return ContextResult
         return ContextResult(
             html_fragments=html_fragments,
-            total_size=total_size,
+            total_size=packed.size,
             sections_included=sections_included,
             nodes_matched=nodes_matched
         )
@@ -174,17 +210,32 @@ class ContextBuilder:
         Returns:
             HTML string or None
         """
-        # Get node IDs for this section from section_index
-        node_ids = self.section_index.get(section_id, [])
-        if not node_ids:
+        # Section features carry the current span (no node lookup needed)
+        feature = self.section_features.get(section_id)
+        if feature is not None:
+            return feature.get_html(self.current_html)
+
+        node_data = self._get_node(self.section_roots.get(section_id))
+        if not node_data:
             return None
 
-        # Find the section root node (should be first node with matching section_id)
-        for node_data in self.ast_nodes:
-            if node_data.get("section_id") == section_id and node_data.get("html"):
-                return node_data.get("html")
+        # Nodes store section-relative offsets instead of HTML copies
+        start, end = resolve_node_offsets(node_data, self.section_features)
+        return slice_node_html(self.current_html, start, end, node_data.get("tag", ""))
 
-        return None
+    def _get_node(self, node_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Get cached AST node data by ID
+
+        Args:
+            node_id: Node ID
+
+        Returns:
+            Node dict or None
+        """
+        if node_id is None:
+            return None
+        return self.ast_nodes.get(node_id)
 
     def _find_parent_section(self, section_id: str) -> Optional[str]:
         """
@@ -194,10 +245,42 @@ class ContextBuilder:
             section_id: Current section ID
 
         Returns:
-            Parent section ID or None
+            ID of the section enclosing it, or None for a top-level section
+        """
+        return self.section_parents.get(section_id)
+
+    def _find_sibling_sections(self, section_id: str) -> List[str]:
+        """
+        Find the sections right before and after a section under the same parent
+
+        Args:
+            section_id: Current section ID
+
+        Returns:
+            Sibling section IDs (document order, at most two)
+        """
+        position = self._sibling_position.get(section_id)
+        if position is None:
+            return []
+        group = self._sibling_groups[self.section_parents.get(section_id)]
+        return group[max(position - 1, 0):position] + group[position + 1:position + 2]
+
+    def _derive_section_parents(self) -> Dict[str, Optional[str]]:
+        """
+        Section parents of a session stored without the map
+
+        The section of the node holding a section root is its parent section.
+
+        Returns:
+            Section ID -> parent section ID
         """
-        # TODO: Implement in Phase 2 - Session B
-        raise NotImplementedError()
+        parents: Dict[str, Optional[str]] = {}
+        for section_id, root_id in self.section_roots.items():
+            root = self._get_node(root_id) or {}
+            holder = self._get_node(root.get("parent")) or {}
+            parent_id = holder.get("section_id")
+            parents[section_id] = parent_id if parent_id != section_id else None
+        return parents
 
     def _calculate_section_scores(
         self,
@@ -0,0 +1,188 @@
+"""
+Context Packer
+
+Responsibilities:
+- Choose the section HTML sent with a local change within a token budget
+- Trim sections that do not fit to a skeleton instead of dropping them
+
+Dependencies:
+- beautifulsoup4
+- app.services.gemini_client (estimate_tokens)
+- app.services.structure_compressor (compress_html)
+
+Implementation Notes:
+- Each section is an item of a multiple-choice 0/1 knapsack: left out,
+  full HTML (value = match score) or skeleton (value = score x
+  SKELETON_VALUE); the DP maximizes the total value within the budget,
+  so sections with the best score per token win
+- Token costs are rounded up to TOKEN_GRANULARITY so the DP stays small
+- Costs are the tokens actually sent: with CONTEXT_REPEAT_COMPRESSION,
+  the size after ModificationEngine collapses repeated rows
+  (structure_compressor), so long tables are not trimmed needlessly
+- If every section fits as is, nothing is parsed or trimmed (the common case)
+- Skeleton: every element and attribute is kept (selectors written
+  against it match the real DOM) and text longer than
+  SKELETON_TEXT_CHARS is cut with "…"
+- The best-scored section is always included (as a skeleton if even
+  that does not fit): a local change without its target cannot be patched
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+from bs4 import BeautifulSoup
+from bs4.element import PreformattedString
+
+from app.services.gemini_client import estimate_tokens
+from app.services.structure_compressor import compress_html
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_GRANULARITY = 16
+
+# Value of a skeleton relative to the full section
+SKELETON_VALUE = 0.5
+# Skeletons saving less than this fraction are not offered
+SKELETON_MIN_SAVING = 0.2
+SKELETON_TEXT_CHARS = 80
+SKELETON_NOTE = (
+    "<!-- 요약본: 긴 텍스트는 …로 줄였습니다 "
+    "(태그와 속성은 원본과 같음, 요약된 요소의 내용을 setHtml로 다시 쓰지 마세요) -->\n"
+)
+
+
+@dataclass
+class PackedContext:
+    """Section HTML chosen for a prompt"""
+    fragments: Dict[str, str] = field(default_factory=dict)  # section ID -> HTML (score order)
+    tokens: int = 0
+    skeletons: List[str] = field(default_factory=list)  # sections sent as a skeleton
+    dropped: List[str] = field(default_factory=list)  # sections left out
+
+    @property
+    def size(self) -> int:
+        """Context size in bytes"""
+        return sum(len(html.encode("utf-8")) for html in self.fragments.values())
+
+
+def pack_context(
+    candidates: Sequence[Tuple[str, str, float]],
+    max_tokens: Optional[int] = None,
+    query: str = ""
+) -> PackedContext:
+    """
+    Pack relevant sections into a token budget
+
+    Args:
+        candidates: (section ID, HTML, match score), best match first
+        max_tokens: Token budget (default: CONTEXT_TOKEN_BUDGET)
+        query: User request (rows it names stay visible when repeated
+            structure is collapsed)
+
+    Returns:
+        PackedContext (fragments keep the candidate order)
+    """
+    budget = max_tokens if max_tokens is not None else settings.CONTEXT_TOKEN_BUDGET
+    candidates = [(section_id, html, score) for section_id, html, score in candidates if html]
+    if not candidates:
+        return PackedContext()
+
+    raw_tokens = [estimate_tokens(html) for _, html, _ in candidates]
+    if sum(raw_tokens) <= budget:
+        return PackedContext(
+            fragments={section_id: html for section_id, html, _ in candidates},
+            tokens=sum(raw_tokens)
+        )
+    full_tokens = [_prompt_tokens(html, query) for _, html, _ in candidates]
+
+    # Options per section: (HTML, tokens, value, is skeleton)
+    options: List[List[Tuple[str, int, float, bool]]] = []
+    for (section_id, html, score), tokens in zip(candidates, full_tokens):
+        value = max(score, 0.0) + 1e-3
+        section_options = [(html, tokens, value, False)]
+        skeleton = skeleton_html(html)
+        skeleton_tokens = _prompt_tokens(skeleton, query)
+        if skeleton_tokens <= tokens * (1 - SKELETON_MIN_SAVING):
+            section_options.append((skeleton, skeleton_tokens, value * SKELETON_VALUE, True))
+        options.append(section_options)
+
+    choices = _solve(options, budget)
+    if choices is None:
+        # Not even the best section fits: send its smallest form alone
+        logger.info(f"Section {candidates[0][0]} exceeds the context budget ({budget} tokens)")
+        choices = [min(range(len(options[0])), key=lambda index: options[0][index][1])]
+        choices += [-1] * (len(candidates) - 1)
+
+    packed = PackedContext()
+    for (section_id, _, _), section_options, choice in zip(candidates, options, choices):
+        if choice < 0:
+            packed.dropped.append(section_id)
+            continue
+        html, tokens, _, is_skeleton = section_options[choice]
+        packed.fragments[section_id] = html
+        packed.tokens += tokens
+        if is_skeleton:
+            packed.skeletons.append(section_id)
+    return packed
+
+
+def _solve(options: List[List[Tuple[str, int, float, bool]]], budget: int) -> Optional[List[int]]:
+    """
+    Multiple-choice knapsack over rounded token costs
+
+    Args:
+        options: Options per section (first section is required)
+        budget: Token budget
+
+    Returns:
+        Chosen option index per section (-1: left out), or None if no
+        option of the first section fits
+    """
+    capacity = budget // TOKEN_GRANULARITY
+    # Units used -> (total value, choices); fewer units win ties
+    states: Dict[int, Tuple[float, List[int]]] = {0: (0.0, [])}
+    for position, section_options in enumerate(options):
+        next_states: Dict[int, Tuple[float, List[int]]] = {}
+        for used, (value, chosen) in states.items():
+            moves = [] if position == 0 else [(used, value, -1)]
+            for index, (_, tokens, option_value, _) in enumerate(section_options):
+                units = used + -(-tokens // TOKEN_GRANULARITY)
+                if units <= capacity:
+                    moves.append((units, value + option_value, index))
+            for units, total, index in moves:
+                best = next_states.get(units)
+                if best is None or total > best[0]:
+                    next_states[units] = (total, chosen + [index])
+        if not next_states:
+            return None
+        states = next_states
+
+    _, (_, chosen) = max(states.items(), key=lambda item: (item[1][0], -item[0]))
+    return chosen
+
+
+def skeleton_html(html: str) -> str:
+    """
+    Trimmed copy of a section: markup and attributes kept, long text cut
+
+    Args:
+        html: Section outer HTML
+
+    Returns:
+        Skeleton HTML (starts with SKELETON_NOTE)
+    """
+    fragment = BeautifulSoup(html, "html.parser")
+    for text in fragment.find_all(string=True):
+        # Comments, doctype and CDATA are preformatted
+        if not isinstance(text, PreformattedString) and len(text) > SKELETON_TEXT_CHARS:
+            text.replace_with(text[:SKELETON_TEXT_CHARS].rstrip() + "…")
+    return SKELETON_NOTE + fragment.decode()
+
+
+def _prompt_tokens(html: str, query: str) -> int:
+    """Tokens of a section as sent (repeated structure collapsed, see ModificationEngine)"""
+    if settings.CONTEXT_REPEAT_COMPRESSION:
+        html = compress_html(html, query)
+    return estimate_tokens(html)
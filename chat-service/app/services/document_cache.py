@@ -0,0 +1,225 @@
+"""
+Session Document Cache
+
+Responsibilities:
+- Keep the parsed DOM and section features of each session in memory
+- Skip re-parsing when the same HTML is used across chat turns
+- Evict by LRU order and by an overall memory budget
+
+Dependencies:
+- beautifulsoup4
+- app.services.section_extractor (SectionExtractor)
+- app.models.ast (SectionFeatures)
+
+Implementation Notes:
+- Entries are keyed by session ID and validated by a hash of the HTML,
+  so a stale entry is never served after the HTML changes
+- Memory use is estimated from the HTML size (a parsed html.parser tree
+  takes roughly 50 bytes per source character)
+- In-process only: each worker keeps its own cache
+- Patched DOMs are stored as-is (store()); their source positions are
+  stale, so features are never rebuilt from a cached soup
+- Entries may hold features without a DOM (session start builds them from
+  the HTMLParser parse); get_or_parse() parses the DOM on first use
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Any
+import hashlib
+import logging
+
+from bs4 import BeautifulSoup
+
+from app.models.ast import SectionFeatures
+from app.services.section_extractor import SectionExtractor
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Approximate memory (bytes) per character of source HTML
+SOUP_MEMORY_FACTOR = 50      # BeautifulSoup tree
+FEATURE_MEMORY_FACTOR = 3    # Section feature text/tag/class lists
+
+
+@dataclass
+class CachedDocument:
+    """Parsed session document"""
+    session_id: str
+    content_hash: str
+    soup: Optional[BeautifulSoup]  # None until get_or_parse() needs the DOM
+    features: List[SectionFeatures]
+    size: int  # Estimated memory (bytes)
+
+
+def content_hash(html: str) -> str:
+    """Hash identifying an HTML version"""
+    return hashlib.md5(html.encode("utf-8")).hexdigest()
+
+
+class DocumentCache:
+    """
+    Per-session parsed document cache (LRU + memory budget)
+
+    Usage:
+        cache = get_document_cache()
+        document = cache.get_or_parse(session_id, current_html)
+        # document.soup - parsed DOM
+        # document.features - editable section features
+        cache.invalidate(session_id)  # after the HTML changes
+    """
+
+    _instance: Optional["DocumentCache"] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        """Initialize cache state from settings"""
+        self._entries: "OrderedDict[str, CachedDocument]" = OrderedDict()
+        self._total_size = 0
+        self.max_entries = settings.DOCUMENT_CACHE_MAX_ENTRIES
+        self.max_bytes = settings.DOCUMENT_CACHE_MAX_BYTES
+        self.extractor = SectionExtractor()
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, session_id: str, html: str) -> Optional[CachedDocument]:
+        """
+        Get cached document if it matches the given HTML
+
+        Args:
+            session_id: Session ID
+            html: Current HTML of the session
+
+        Returns:
+            CachedDocument or None
+        """
+        entry = self._entries.get(session_id)
+        if entry is None or entry.content_hash != content_hash(html):
+            return None
+
+        self._entries.move_to_end(session_id)
+        return entry
+
+    def get_or_parse(self, session_id: str, html: str) -> CachedDocument:
+        """
+        Get cached document, parsing and caching the HTML on a miss
+
+        An entry cached without its DOM gets the DOM parsed here.
+
+        Args:
+            session_id: Session ID
+            html: Current HTML of the session
+
+        Returns:
+            CachedDocument
+        """
+        entry = self.get(session_id, html)
+        if entry is not None:
+            self._stats["hits"] += 1
+            if entry.soup is None:
+                # Features-only entry: parse the DOM now
+                entry.soup = self.extractor.parse_document(html)
+                soup_size = len(html) * SOUP_MEMORY_FACTOR
+                entry.size += soup_size
+                self._total_size += soup_size
+                self._evict()
+            return entry
+
+        self._stats["misses"] += 1
+        return self.put(session_id, html)
+
+    def put(self, session_id: str, html: str) -> CachedDocument:
+        """
+        Parse HTML and cache it for the session
+
+        Args:
+            session_id: Session ID
+            html: HTML to parse
+
+        Returns:
+            CachedDocument
+        """
+        soup = self.extractor.parse_document(html)
+        features = self.extractor.build_section_features(html, soup=soup)
+        return self.store(session_id, html, soup, features)
+
+    def store(
+        self,
+        session_id: str,
+        html: str,
+        soup: Optional[BeautifulSoup],
+        features: List[SectionFeatures]
+    ) -> CachedDocument:
+        """
+        Cache an already parsed document (e.g. the DOM after patches)
+
+        Args:
+            session_id: Session ID
+            html: HTML the document represents
+            soup: Parsed DOM of html (None: parsed by get_or_parse() on first use)
+            features: Section features of html
+
+        Returns:
+            CachedDocument
+        """
+        entry = CachedDocument(
+            session_id=session_id,
+            content_hash=content_hash(html),
+            soup=soup,
+            features=features,
+            size=(
+                (len(html) * SOUP_MEMORY_FACTOR if soup is not None else 0)
+                + sum(len(feature.text_content) for feature in features) * FEATURE_MEMORY_FACTOR
+            )
+        )
+
+        self.invalidate(session_id)
+        self._entries[session_id] = entry
+        self._total_size += entry.size
+        self._evict()
+
+        logger.debug(
+            f"Cached document for {session_id} "
+            f"({entry.size / 1024 / 1024:.1f}MB, {len(self._entries)} entries)"
+        )
+        return entry
+
+    def invalidate(self, session_id: str):
+        """
+        Drop the cached document of a session
+
+        Args:
+            session_id: Session ID
+        """
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._total_size -= entry.size
+
+    def _evict(self):
+        """Evict least recently used entries over the count or memory budget"""
+        # Keep at least the newest entry, even if it alone exceeds the budget
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._total_size > self.max_bytes
+        ):
+            session_id, entry = self._entries.popitem(last=False)
+            self._total_size -= entry.size
+            self._stats["evictions"] += 1
+            logger.debug(f"Evicted cached document for {session_id}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        return {
+            **self._stats,
+            "entries": len(self._entries),
+            "total_size": self._total_size,
+        }
+
+
+# Singleton instance getter
+def get_document_cache() -> DocumentCache:
+    """Get document cache singleton"""
+    return DocumentCache()
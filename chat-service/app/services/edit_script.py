@@ -0,0 +1,106 @@
+"""
+Global Change Edit Script
+
+Responsibilities:
+- Compile the compact edit script of a global change (CSS rules,
+  class substitutions, selector-scoped patches) into patch dicts
+- Check each edit against the current document before it is used
+
+Dependencies:
+- beautifulsoup4 (soupsieve for CSS selectors)
+
+Implementation Notes:
+- Output is patch dicts in the LLM patch format (camelCase keys), so
+  ModificationEngine._build_patches turns them into Patch objects and
+  the result is applied like any local change: server-side by
+  PatchEngine, client-side by lib/patch-utils.ts
+- css: appended to <head> (or <body> without a head) as
+  <style data-chat-edit>; later edits come later in the cascade
+- classMap: one replaceClass patch on [class~="from"] - every element
+  carrying the class, no selector escaping needed for Tailwind names
+  like "hover:bg-blue-500"
+- patch: passed through unchanged
+- Edits that cannot apply (unknown type, class not in the document,
+  CSS that would close the style element) compile to nothing
+"""
+
+from typing import Any, Dict, List
+import logging
+import re
+
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Marks style elements added by edit scripts
+EDIT_STYLE_ATTRIBUTE = "data-chat-edit"
+
+# A single class token (no whitespace, quotes or markup)
+CLASS_TOKEN = re.compile(r'^[^\s"\'<>]+$')
+
+
+def compile_edit(edit: Dict[str, Any], soup: BeautifulSoup) -> List[Dict[str, Any]]:
+    """
+    Compile one edit of an edit script
+
+    Args:
+        edit: {"type": "css", "css"} | {"type": "classMap", "from", "to"}
+            | {"type": "patch", <patch fields>}
+        soup: Current document (read only)
+
+    Returns:
+        Patch dicts (camelCase keys); empty if the edit cannot apply
+    """
+    if not isinstance(edit, dict):
+        return []
+
+    edit_type = edit.get("type")
+    if edit_type == "css":
+        return _compile_css(edit.get("css"), soup)
+    if edit_type == "classMap":
+        return _compile_class_map(edit.get("from"), edit.get("to"), soup)
+    if edit_type == "patch":
+        return [{key: value for key, value in edit.items() if key != "type"}]
+
+    logger.warning(f"Unknown edit type: {edit_type!r}")
+    return []
+
+
+def _compile_css(css: Any, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+    """CSS rules -> appendChild of a style element"""
+    if not isinstance(css, str) or not css.strip():
+        return []
+    if "</" in css or "<!--" in css:
+        logger.warning(f"Skipping edit CSS containing markup: {css[:200]}")
+        return []
+
+    target = "head" if soup.find("head") is not None else "body"
+    return [{
+        "selector": target,
+        "action": "appendChild",
+        "value": f'<style {EDIT_STYLE_ATTRIBUTE}="">{css.strip()}</style>',
+    }]
+
+
+def _compile_class_map(old: Any, new: Any, soup: BeautifulSoup) -> List[Dict[str, Any]]:
+    """Class substitution -> replaceClass on every element carrying the class"""
+    if not isinstance(old, str) or not isinstance(new, str):
+        return []
+    old_tokens, new_tokens = old.split(), new.split()
+    if len(old_tokens) != 1 or not new_tokens or not CLASS_TOKEN.match(old_tokens[0]):
+        logger.warning(f"Skipping invalid class substitution: {old!r} -> {new!r}")
+        return []
+    if any(not CLASS_TOKEN.match(token) for token in new_tokens):
+        logger.warning(f"Skipping invalid class substitution: {old!r} -> {new!r}")
+        return []
+
+    selector = f'[class~="{old_tokens[0]}"]'
+    if soup.select_one(selector) is None:
+        return []
+
+    return [{
+        "selector": selector,
+        "action": "replaceClass",
+        "oldValue": old_tokens[0],
+        "newValue": " ".join(new_tokens),
+    }]
@@ -26,6 +26,7 @@ import google.generativeai as genai
 from app.models.ast import EmbeddingItem, TextNode, ASTNode, SectionInfo, ParseResult
 from app.utils.pinecone_client import PineconeClient, get_pinecone_client
 from app.utils.api_key_manager import get_key_manager
+from app.utils.gemini_client_pool import get_client_pool
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -395,17 +396,16 @@ class EmbeddingService:
             batch = texts[i:i + batch_size]
 
             # Get API key from manager
-            key, key_idx = self.key_manager.get_key()
+            _, key_idx = self.key_manager.get_key()
 
             try:
-                # Configure Gemini with the selected key
-                genai.configure(api_key=key)
-
-                # Generate embeddings
-                result = genai.embed_content(
+                # Generate embeddings with the key's pooled client
+                # (async - does not block the event loop)
+                result = await genai.embed_content_async(
                     model=f"models/{self.model}",
                     content=batch,
-                    task_type="retrieval_document"
+                    task_type="retrieval_document",
+                    client=get_client_pool().get_async_client(key_idx)
                 )
 
                 # Extract embeddings
@@ -4,31 +4,55 @@ Gemini API Client
 Responsibilities:
 - Wrap Google Generative AI SDK
 - Handle API key rotation via GeminiKeyManager
-- Provide content generation and embedding APIs
+- Provide content generation (whole or streamed) and embedding APIs
 - Track token usage
 
 Dependencies:
 - google-generativeai
 - app.utils.api_key_manager
+- app.utils.gemini_client_pool
 
 Implementation Notes:
 - Use gemini-2.5-flash for generation
 - Use text-embedding-004 for embeddings
-- Implement retry with backoff for 429 errors
+- On 429 errors, fail over to another key (no sleep unless all keys are throttled)
 - Log token usage to MongoDB
+- Generation uses the SDK async API (never blocks the event loop),
+  bounded by GEMINI_TIMEOUT_SECONDS; cancelling the awaiting task
+  cancels the in-flight request
+- Models come from the per-key client pool; genai.configure() is never
+  called on the request path
+- Keys are acquired through the rate-limit scheduler (RPM/TPM buckets);
+  actual token usage from usage_metadata settles the TPM bucket, and a
+  429 puts the key into cool-down for the server-indicated delay
+- Streamed generation fails over on 429 only until the first chunk has
+  been yielded; GEMINI_TIMEOUT_SECONDS bounds the whole stream
 """
 
-from typing import List, Optional, Dict, Any
+from contextvars import ContextVar
+from typing import AsyncIterator, List, Optional, Dict, Any
 import google.generativeai as genai
+import re
+import time
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import logging
 import asyncio
 
 from app.utils.api_key_manager import GeminiKeyManager, get_key_manager
+from app.utils.gemini_client_pool import get_client_pool
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Retry delay in 429 errors ("retry_delay { seconds: 13 }" or "Please retry in 13.2s")
+RETRY_DELAY_PATTERNS = [
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)'),
+    re.compile(r'retry in ([\d.]+)\s*s', re.IGNORECASE),
+]
+
+# Attempts of all Gemini calls made while handling the current request
+_attempt_log: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("gemini_attempt_log", default=None)
+
 # Safety settings - 낮은 수준으로 설정 (HTML 수정 분석용)
 SAFETY_SETTINGS = {
     HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
@@ -45,12 +69,15 @@ class GeminiClient:
     Usage:
         client = GeminiClient()
         response = await client.generate_content("Hello!")
+        stream = client.generate_content_stream("Hello!")
+        async for chunk in stream: ...  # stream.tokens_used when done
         embeddings = await client.embed_texts(["text1", "text2"])
     """
 
     def __init__(self):
         """Initialize Gemini client"""
         self.key_manager = get_key_manager()
+        self.client_pool = get_client_pool()
         self.generation_model = "gemini-2.5-flash"
         self.embedding_model = settings.EMBEDDING_MODEL
 
@@ -63,71 +90,155 @@ class GeminiClient:
         """
         Generate content using Gemini
 
+        On a 429/quota error the key is put into cool-down and the call is
+        retried right away on another key; the scheduler only makes the call
+        wait when every key is throttled.
+
         Args:
             prompt: Input prompt
             temperature: Generation temperature
             max_tokens: Max output tokens
 
         Returns:
-            Dict with text, tokens_used, key_index
+            Dict with text, tokens_used, key_index, attempts
+            (attempts: [{"key_index", "latency_ms", "status"}, ...])
 
         Raises:
-            Exception: If generation fails after retries
+            asyncio.TimeoutError: If the call exceeds GEMINI_TIMEOUT_SECONDS
+            Exception: If generation fails on all attempts
         """
-        # Get API key from key manager
-        key, key_idx = self.key_manager.get_key()
-        is_error = False
+        generation_config = self._create_generation_config(temperature, max_tokens)
+
+        estimated_tokens = estimate_tokens(prompt)
+        attempts: List[Dict[str, Any]] = []
+        last_exception = None
 
-        try:
-            # Define async wrapper for retry
-            async def _generate():
-                # Configure genai with key
-                genai.configure(api_key=key)
+        for attempt in range(settings.GEMINI_MAX_ATTEMPTS):
+            # Get API key from the rate-limit scheduler (skips cooling keys,
+            # waits only if all keys are saturated)
+            _, key_idx = await self.key_manager.acquire(estimated_tokens)
+            started_at = time.perf_counter()
+            status = "error"
+            tokens_used = None
 
-                # Create model
-                model = genai.GenerativeModel(self.generation_model)
+            try:
+                # Generate content (async call, bounded by timeout)
+                response = await asyncio.wait_for(
+                    self._get_model(key_idx).generate_content_async(
+                        prompt,
+                        generation_config=generation_config,
+                        safety_settings=SAFETY_SETTINGS,
+                        request_options={"timeout": settings.GEMINI_TIMEOUT_SECONDS}
+                    ),
+                    timeout=settings.GEMINI_TIMEOUT_SECONDS
+                )
 
-                # Create generation config
-                config_dict = {
-                    "temperature": temperature,
+                # Extract text from response
+                result_text = response.text
+                tokens_used = self._get_tokens_used(response)
+                status = "ok"
+
+                # Return response with metadata
+                return {
+                    "text": result_text,
+                    "tokens_used": tokens_used or 0,
+                    "key_index": key_idx,
+                    "attempts": attempts
                 }
-                if max_tokens:
-                    config_dict["max_output_tokens"] = max_tokens
-                else:
-                    config_dict["max_output_tokens"] = 8192
-
-                generation_config = genai.types.GenerationConfig(**config_dict)
-
-                # Generate content (synchronous call)
-                response = model.generate_content(
-                    prompt,
-                    generation_config=generation_config,
-                    safety_settings=SAFETY_SETTINGS
+
+            except asyncio.TimeoutError:
+                status = "timeout"
+                logger.error(f"Content generation timed out after {settings.GEMINI_TIMEOUT_SECONDS}s")
+                raise
+
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    logger.error(f"Content generation failed: {e}")
+                    raise
+
+                # Fail over: cool this key down and retry on another one
+                status = "rate_limited"
+                last_exception = e
+                self.key_manager.mark_rate_limited(key_idx, parse_retry_delay(e))
+                logger.warning(
+                    f"Rate limit hit on key {key_idx} "
+                    f"(attempt {attempt + 1}/{settings.GEMINI_MAX_ATTEMPTS}), failing over"
                 )
 
-                return response
+            finally:
+                self._record_attempt(attempts, key_idx, started_at, status)
+
+                # Always release key (settles the TPM bucket with actual usage)
+                self.key_manager.release_key(
+                    key_idx,
+                    is_error=status != "ok",
+                    tokens_used=tokens_used,
+                    estimated_tokens=estimated_tokens
+                )
+
+        # All attempts rate limited
+        logger.error(f"All {settings.GEMINI_MAX_ATTEMPTS} attempts rate limited")
+        raise last_exception
+
+    def generate_content_stream(
+        self,
+        prompt: str,
+        temperature: float = 0.7,
+        max_tokens: Optional[int] = None
+    ) -> "ContentStream":
+        """
+        Generate content as a stream of text chunks
+
+        Args:
+            prompt: Input prompt
+            temperature: Generation temperature
+            max_tokens: Max output tokens
+
+        Returns:
+            ContentStream (async iterator of text chunks; text, tokens_used,
+            key_index and attempts are set as the stream is consumed)
+        """
+        return ContentStream(self, prompt, self._create_generation_config(temperature, max_tokens))
 
-            # Execute with retry logic
-            response = await self._retry_with_backoff(_generate)
+    def _record_attempt(
+        self,
+        attempts: List[Dict[str, Any]],
+        key_index: int,
+        started_at: float,
+        status: str
+    ):
+        """
+        Record one API attempt (returned with the result and added to the
+        request's attempt log, if one is active)
 
-            # Extract text from response
-            result_text = response.text
+        Args:
+            attempts: Attempts of the current call
+            key_index: Key used
+            started_at: time.perf_counter() at the start of the attempt
+            status: ok | rate_limited | timeout | error
+        """
+        record = {
+            "key_index": key_index,
+            "latency_ms": round((time.perf_counter() - started_at) * 1000, 1),
+            "status": status
+        }
+        attempts.append(record)
 
-            # Return response with metadata
-            return {
-                "text": result_text,
-                "tokens_used": 0,  # Gemini SDK doesn't provide token count in response
-                "key_index": key_idx
-            }
+        request_log = _attempt_log.get()
+        if request_log is not None:
+            request_log.append(record)
 
-        except Exception as e:
-            is_error = True
-            logger.error(f"Content generation failed: {e}")
-            raise
+    def _get_model(self, key_index: int) -> genai.GenerativeModel:
+        """
+        Get generation model bound to a key's pooled client
 
-        finally:
-            # Always release key
-            self.key_manager.release_key(key_idx, is_error=is_error)
+        Args:
+            key_index: Key index from GeminiKeyManager
+
+        Returns:
+            GenerativeModel
+        """
+        return self.client_pool.get_model(key_index, self.generation_model)
 
     async def embed_texts(
         self,
@@ -155,81 +266,225 @@ class GeminiClient:
 
         raise NotImplementedError("GeminiClient.embed_texts() - To be implemented in Phase 2")
 
-    async def _retry_with_backoff(
-        self,
-        func,
-        max_retries: int = 3,
-        initial_delay: float = 1.0
-    ) -> Any:
+    def _get_tokens_used(self, response) -> Optional[int]:
         """
-        Retry function with exponential backoff
+        Get total tokens (prompt + output) from response usage metadata
 
         Args:
-            func: Async function to retry
-            max_retries: Maximum retry attempts
-            initial_delay: Initial delay in seconds
+            response: Gemini response
 
         Returns:
-            Function result
-
-        Raises:
-            Exception: Last exception if all retries fail
-        """
-        delay = initial_delay
-        last_exception = None
-
-        for attempt in range(max_retries):
-            try:
-                return await func()
-            except Exception as e:
-                last_exception = e
-                error_msg = str(e)
-
-                # Check if it's a rate limit error (429)
-                if "429" in error_msg or "quota" in error_msg.lower() or "rate limit" in error_msg.lower():
-                    if attempt < max_retries - 1:
-                        logger.warning(
-                            f"Rate limit hit (attempt {attempt + 1}/{max_retries}), "
-                            f"retrying in {delay}s"
-                        )
-                        await asyncio.sleep(delay)
-                        delay *= 2  # Exponential backoff
-                        continue
-
-                # For non-429 errors, raise immediately
-                raise
-
-        # All retries exhausted
-        logger.error(f"All {max_retries} retries exhausted")
-        raise last_exception
-
-    def _configure_api(self, api_key: str):
-        """
-        Configure genai with API key
-
-        Args:
-            api_key: Gemini API key
+            Token count, or None if not reported
         """
-        genai.configure(api_key=api_key)
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None) if usage is not None else None
+        return total or None
 
     def _create_generation_config(
         self,
         temperature: float,
         max_tokens: Optional[int]
-    ) -> Dict[str, Any]:
+    ) -> genai.types.GenerationConfig:
         """
         Create generation configuration
 
         Args:
             temperature: Temperature value
-            max_tokens: Max tokens
+            max_tokens: Max tokens (8192 if omitted)
 
         Returns:
-            Config dict
+            GenerationConfig
         """
         config = {
             "temperature": temperature,
+            "max_output_tokens": max_tokens or 8192,
         }
-        if max_tokens:
-            config["max_output_tokens"] = max_tokens
-        return config
+        return genai.types.GenerationConfig(**config)
+
+
+class ContentStream:
+    """
+    Streamed Gemini generation
+
+    Usage:
+        stream = GeminiClient().generate_content_stream(prompt)
+        async for chunk in stream:
+            ...
+        stream.text, stream.tokens_used, stream.attempts
+    """
+
+    def __init__(
+        self,
+        client: GeminiClient,
+        prompt: str,
+        generation_config: genai.types.GenerationConfig
+    ):
+        self.client = client
+        self.prompt = prompt
+        self.generation_config = generation_config
+        self.text = ""
+        self.tokens_used = 0
+        self.key_index: Optional[int] = None
+        self.attempts: List[Dict[str, Any]] = []
+
+    def __aiter__(self) -> AsyncIterator[str]:
+        return self._stream()
+
+    async def _stream(self) -> AsyncIterator[str]:
+        """
+        Yield text chunks, failing over to another key on 429 before the
+        first chunk
+
+        Raises:
+            asyncio.TimeoutError: If the stream exceeds GEMINI_TIMEOUT_SECONDS
+            Exception: If generation fails (or all attempts are rate limited)
+        """
+        key_manager = self.client.key_manager
+        estimated_tokens = estimate_tokens(self.prompt)
+        last_exception = None
+
+        for attempt in range(settings.GEMINI_MAX_ATTEMPTS):
+            _, key_idx = await key_manager.acquire(estimated_tokens)
+            started_at = time.perf_counter()
+            deadline = time.monotonic() + settings.GEMINI_TIMEOUT_SECONDS
+            status = "error"
+            tokens_used = None
+            yielded = False
+
+            try:
+                response = await asyncio.wait_for(
+                    self.client._get_model(key_idx).generate_content_async(
+                        self.prompt,
+                        generation_config=self.generation_config,
+                        safety_settings=SAFETY_SETTINGS,
+                        stream=True,
+                        request_options={"timeout": settings.GEMINI_TIMEOUT_SECONDS}
+                    ),
+                    timeout=settings.GEMINI_TIMEOUT_SECONDS
+                )
+
+                chunks = response.__aiter__()
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(
+                            chunks.__anext__(),
+                            timeout=max(deadline - time.monotonic(), 0.0)
+                        )
+                    except StopAsyncIteration:
+                        break
+
+                    text = _chunk_text(chunk)
+                    if text:
+                        self.text += text
+                        yielded = True
+                        yield text
+
+                tokens_used = self.client._get_tokens_used(response)
+                self.tokens_used = tokens_used or 0
+                self.key_index = key_idx
+                status = "ok"
+                return
+
+            except asyncio.TimeoutError:
+                status = "timeout"
+                logger.error(f"Streamed generation timed out after {settings.GEMINI_TIMEOUT_SECONDS}s")
+                raise
+
+            except Exception as e:
+                if yielded or not is_rate_limit_error(e):
+                    logger.error(f"Streamed generation failed: {e}")
+                    raise
+
+                status = "rate_limited"
+                last_exception = e
+                key_manager.mark_rate_limited(key_idx, parse_retry_delay(e))
+                logger.warning(
+                    f"Rate limit hit on key {key_idx} "
+                    f"(attempt {attempt + 1}/{settings.GEMINI_MAX_ATTEMPTS}), failing over"
+                )
+
+            finally:
+                self.client._record_attempt(self.attempts, key_idx, started_at, status)
+                key_manager.release_key(
+                    key_idx,
+                    is_error=status != "ok",
+                    tokens_used=tokens_used,
+                    estimated_tokens=estimated_tokens
+                )
+
+        logger.error(f"All {settings.GEMINI_MAX_ATTEMPTS} attempts rate limited")
+        raise last_exception
+
+
+def _chunk_text(chunk) -> str:
+    """Text of a streamed chunk ("" for chunks without text parts)"""
+    try:
+        return chunk.text
+    except ValueError:
+        return ""
+
+
+def start_attempt_log() -> List[Dict[str, Any]]:
+    """
+    Start collecting Gemini attempts for the current request (task context)
+
+    Returns:
+        List that receives {"key_index", "latency_ms", "status"} per attempt
+    """
+    attempts: List[Dict[str, Any]] = []
+    _attempt_log.set(attempts)
+    return attempts
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """
+    Check whether an API error is a 429 / quota error
+
+    Args:
+        error: Exception raised by the API call
+
+    Returns:
+        True for rate limit errors
+    """
+    error_msg = str(error).lower()
+    return "429" in error_msg or "quota" in error_msg or "rate limit" in error_msg or "resource exhausted" in error_msg
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate for rate-limit accounting (before the call)
+
+    ~4 bytes of UTF-8 per token: ASCII ≈ 4 chars/token, Korean ≈ 1.3 chars/token.
+    Corrected with the actual usage when the key is released.
+
+    Args:
+        text: Prompt text
+
+    Returns:
+        Estimated token count
+    """
+    return len(text.encode("utf-8")) // 4 + 1
+
+
+def parse_retry_delay(error: Exception) -> Optional[float]:
+    """
+    Get server-indicated retry delay from a 429 error
+
+    Args:
+        error: Exception raised by the API call
+
+    Returns:
+        Delay in seconds, or None if the error has none
+    """
+    # google.api_core errors carry RetryInfo in details
+    for detail in getattr(error, "details", None) or []:
+        retry_delay = getattr(detail, "retry_delay", None)
+        if retry_delay is not None:
+            return retry_delay.seconds + retry_delay.nanos / 1e9
+
+    message = str(error)
+    for pattern in RETRY_DELAY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
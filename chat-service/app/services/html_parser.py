@@ -5,25 +5,38 @@ Responsibilities:
 - Parse HTML into AST (Abstract Syntax Tree)
 - Extract text nodes for embedding
 - Build section index from data-section-id attributes
+- Build section root / parent maps for O(1) section lookups
 - Generate CSS selectors for each node
 
 Dependencies:
 - beautifulsoup4, lxml
+- app.services.source_spans (SourceSpanScanner, SpanAligner)
 - app.models.ast (ASTNode, TextNode, ParseResult, SectionInfo)
 
 Implementation Notes:
 - Use BeautifulSoup with lxml parser for performance
+- Build the AST in one traversal (linear in document size)
 - Skip script, style, noscript tags
 - Generate unique node IDs using hash
 - Build CSS selector from data-section-id, id, or classes
 - Limit text_content to 500 characters
+- Store node HTML as (start, end) offsets into the source HTML
+- section_roots / section_parents come from the same traversal: the
+  first element carrying a data-section-id is its root, and the section
+  it inherits from is its parent
+- section_text_nodes counts text nodes per (innermost) section, so the
+  re-indexer can keep stats without re-parsing the old section HTML
+- section_elements keeps every data-section-id element with its span, so
+  section features are built from this parse instead of a second one;
+  source_elements keeps the scan those spans were aligned to
 """
 
-from typing import Dict, List, Optional
-from bs4 import BeautifulSoup, NavigableString
+from typing import Dict, List, Optional, Tuple
+from bs4 import BeautifulSoup, NavigableString, CData, Tag
 import hashlib
 
 from app.models.ast import ASTNode, TextNode, ParseResult, SectionInfo
+from app.services.source_spans import SourceElement, SourceSpanScanner, SpanAligner
 
 
 class HTMLParser:
@@ -36,20 +49,37 @@ class HTMLParser:
         # result.nodes - list of ASTNode
         # result.text_nodes - list of TextNode
         # result.section_index - dict of section_id -> node_ids
+        # result.section_roots - dict of section_id -> root node_id
+        # result.section_parents - dict of section_id -> enclosing section_id
+        # result.section_text_nodes - dict of section_id -> text node count
     """
 
-    def __init__(self, html: str):
+    # Tags excluded from the AST
+    SKIP_TAGS = frozenset(['script', 'style', 'noscript'])
+
+    # String types counted by get_text() on regular elements
+    MAIN_STRING_TYPES = frozenset([NavigableString, CData])
+
+    def __init__(self, html: str, id_namespace: str = ""):
         """
         Initialize parser with HTML string
 
         Args:
             html: Raw HTML string to parse
+            id_namespace: Mixed into node IDs so a re-parsed fragment never
+                reuses the IDs of the document it belongs to
         """
         self.html = html
+        self.id_namespace = id_namespace
         self.soup: Optional[BeautifulSoup] = None
         self.nodes: Dict[str, ASTNode] = {}
         self.text_nodes: List[TextNode] = []
         self.section_index: Dict[str, List[str]] = {}
+        self.section_roots: Dict[str, str] = {}
+        self.section_parents: Dict[str, Optional[str]] = {}
+        # (element, (start, end) or None) of data-section-id elements, in document order
+        self.section_elements: List[Tuple[Tag, Optional[Tuple[int, int]]]] = []
+        self.source_elements: List[SourceElement] = []
         self._node_counter = 0
 
     def parse(self) -> ParseResult:
@@ -67,8 +97,8 @@ class HTMLParser:
         if body is None:
             body = self.soup
 
-        # Build AST recursively from body
-        self._build_ast(body, parent_id=None, path="")
+        # Build AST from body in a single traversal
+        self._build_ast(body)
 
         # Build section information for all sections
         sections = []
@@ -79,6 +109,10 @@ class HTMLParser:
         # Calculate statistics
         total_nodes = len(self.nodes)
         total_text_nodes = len(self.text_nodes)
+        section_text_nodes: Dict[str, int] = {}
+        for text_node in self.text_nodes:
+            if text_node.section_id:
+                section_text_nodes[text_node.section_id] = section_text_nodes.get(text_node.section_id, 0) + 1
         total_sections = len(sections)
         html_size = len(self.html)
 
@@ -87,6 +121,9 @@ class HTMLParser:
             nodes=list(self.nodes.values()),
             text_nodes=self.text_nodes,
             section_index=self.section_index,
+            section_roots=self.section_roots,
+            section_parents=self.section_parents,
+            section_text_nodes=section_text_nodes,
             sections=sections,
             total_nodes=total_nodes,
             total_text_nodes=total_text_nodes,
@@ -94,101 +131,177 @@ class HTMLParser:
             html_size=html_size
         )
 
-    def _build_ast(
-        self,
-        element,
-        parent_id: Optional[str],
-        path: str
-    ) -> Optional[str]:
+    def _build_ast(self, root) -> Optional[str]:
         """
-        Recursively build AST from DOM element
+        Build AST from DOM in a single traversal
+
+        Section ID, path and selector are carried down the tree instead of
+        being looked up per node. Text is collected bottom-up as a range
+        over one shared list of stripped strings, and node HTML is stored
+        as (start, end) offsets into the source instead of a serialized copy.
 
         Args:
-            element: BeautifulSoup element
-            parent_id: Parent node ID
-            path: Current DOM path
+            root: BeautifulSoup element to start from (usually <body>)
 
         Returns:
-            Node ID of created node, or None
+            Node ID of the root node, or None
         """
-        # Handle NavigableString (text nodes)
-        if isinstance(element, NavigableString):
-            if parent_id:
-                self._add_text_node(element, parent_id, path)
-            return None
-
-        # Skip script, style, noscript tags
-        if element.name in ['script', 'style', 'noscript']:
+        if isinstance(root, NavigableString) or root.name in self.SKIP_TAGS:
             return None
 
-        # Generate node ID
-        node_id = self._generate_node_id(element)
-
-        # Find section_id
-        section_id = self._find_section_id(element)
-
-        # Build selector
-        selector = self._build_selector(element)
-
-        # Update path
-        current_path = f"{path}/{element.name}" if path else element.name
-
-        # Extract attributes (excluding class)
-        attributes = {}
-        for key, value in element.attrs.items():
-            if key != 'class':
-                if isinstance(value, list):
-                    attributes[key] = ' '.join(value)
-                else:
-                    attributes[key] = str(value)
-
-        # Get classes
-        classes = element.get('class', [])
-
-        # Get HTML (limited)
-        html_str = str(element)
-
-        # Get text content (limited to 500 chars)
-        text_content = element.get_text(strip=True)[:500]
-
-        # Create ASTNode
-        node = ASTNode(
-            node_id=node_id,
-            section_id=section_id,
-            tag=element.name,
-            classes=classes,
-            selector=selector,
-            path=current_path,
-            html=html_str,
-            text_content=text_content,
-            children=[],
-            parent=parent_id,
-            attributes=attributes
-        )
-
-        # Store node
-        self.nodes[node_id] = node
-
-        # Add to parent's children
-        if parent_id and parent_id in self.nodes:
-            self.nodes[parent_id].children.append(node_id)
+        self.source_elements = SourceSpanScanner(self.html).scan()
+        aligner = SpanAligner(self.source_elements, self.html)
+        texts: List[str] = []    # Stripped main-content strings, in document order
+        records: Dict[str, dict] = {}
+        root_id: Optional[str] = None
+
+        # Stack entries: (element, parent record, parent path, inherited section ID)
+        # A record on the stack marks the point where its element closes.
+        stack: list = [(root, None, "", self._find_section_id(root.parent))]
+
+        while stack:
+            entry = stack.pop()
+
+            # Closing an element: its text range is complete
+            if isinstance(entry, dict):
+                entry["text_end"] = len(texts)
+                continue
+
+            element, parent, path, inherited_section_id = entry
+
+            # Text nodes
+            if isinstance(element, NavigableString):
+                if type(element) in self.MAIN_STRING_TYPES:
+                    stripped = element.strip()
+                    if stripped:
+                        texts.append(stripped)
+                if parent is not None:
+                    self._add_text_node(element, parent, path)
+                continue
+
+            # Skipped tags: their text still counts towards the ancestors'
+            # text content, and their elements still occupy source spans
+            if element.name in self.SKIP_TAGS:
+                self._add_section_element(element, aligner.match(element.name, element.attrs))
+                for descendant in element.descendants:
+                    if type(descendant) in self.MAIN_STRING_TYPES:
+                        stripped = descendant.strip()
+                        if stripped:
+                            texts.append(stripped)
+                    elif not isinstance(descendant, NavigableString):
+                        self._add_section_element(descendant, aligner.match(descendant.name, descendant.attrs))
+                continue
+
+            # data-section-id on the element itself wins over the inherited one
+            if element.has_attr('data-section-id'):
+                section_id = element.get('data-section-id')
+            else:
+                section_id = inherited_section_id
+
+            node_id = self._generate_node_id(element, section_id)
+            current_path = f"{path}/{element.name}" if path else element.name
+
+            record = {
+                "node_id": node_id,
+                "element": element,
+                "section_id": section_id,
+                "selector": self._build_selector(element),
+                "path": current_path,
+                "parent": parent["node_id"] if parent is not None else None,
+                "children": [],
+                "span": aligner.match(element.name, element.attrs),
+                "text_start": len(texts),
+            }
+            records[node_id] = record
+            self._add_section_element(element, record["span"])
+            if root_id is None:
+                root_id = node_id
+
+            # Add to parent's children
+            if record["parent"] and record["parent"] in records:
+                records[record["parent"]]["children"].append(node_id)
+
+            # Section root: first element carrying the ID, nested in the inherited section
+            if element.has_attr('data-section-id') and section_id not in self.section_roots:
+                self.section_roots[section_id] = node_id
+                self.section_parents[section_id] = (
+                    inherited_section_id if inherited_section_id != section_id else None
+                )
+
+            # Add to section_index
+            if section_id:
+                if section_id not in self.section_index:
+                    self.section_index[section_id] = []
+                self.section_index[section_id].append(node_id)
+
+            # Children are pushed in reverse so they pop in document order
+            stack.append(record)
+            for child in reversed(element.contents):
+                stack.append((child, record, current_path, section_id))
+
+        for record in records.values():
+            element = record["element"]
+
+            # Extract attributes (excluding class)
+            attributes = {}
+            for key, value in element.attrs.items():
+                if key != 'class':
+                    if isinstance(value, list):
+                        attributes[key] = ' '.join(value)
+                    else:
+                        attributes[key] = str(value)
+
+            start, end = record["span"] or (None, None)
+
+            self.nodes[record["node_id"]] = ASTNode(
+                node_id=record["node_id"],
+                section_id=record["section_id"],
+                tag=element.name,
+                classes=element.get('class', []),
+                selector=record["selector"],
+                path=record["path"],
+                start=start,
+                end=end,
+                text_content=self._join_texts(element, texts, record),
+                children=record["children"],
+                parent=record["parent"],
+                attributes=attributes
+            )
+
+        return root_id
+
+    def _join_texts(self, element, texts: List[str], record: dict) -> str:
+        """
+        Join the stripped strings collected inside an element (max 500 chars)
 
-        # Add to section_index
-        if section_id:
-            if section_id not in self.section_index:
-                self.section_index[section_id] = []
-            self.section_index[section_id].append(node_id)
+        Equivalent to element.get_text(strip=True)[:500], but only reads as
+        many strings as needed to fill the limit.
 
-        # Recursively process children
-        for child in element.children:
-            self._build_ast(child, node_id, current_path)
+        Args:
+            element: BeautifulSoup element
+            texts: Shared list of stripped strings
+            record: Node record with text_start/text_end
 
-        return node_id
+        Returns:
+            Text content (max 500 chars)
+        """
+        # Elements like <template> only count their own string types
+        if element.interesting_string_types not in (None, self.MAIN_STRING_TYPES):
+            return element.get_text(strip=True)[:500]
+
+        parts = []
+        length = 0
+        for index in range(record["text_start"], record["text_end"]):
+            parts.append(texts[index])
+            length += len(texts[index])
+            if length >= 500:
+                break
+        return "".join(parts)[:500]
 
     def _add_text_node(
         self,
         text_element: NavigableString,
-        parent_id: str,
+        parent: dict,
         path: str
     ):
         """
@@ -196,7 +309,7 @@ class HTMLParser:
 
         Args:
             text_element: NavigableString containing text
-            parent_id: Parent AST node ID
+            parent: Record of the parent AST node
             path: DOM path
         """
         text = str(text_element).strip()
@@ -205,45 +318,54 @@ class HTMLParser:
         if len(text) < 2:
             return
 
-        # Find section_id and selector from parent
-        parent_node = self.nodes.get(parent_id)
-        section_id = parent_node.section_id if parent_node else None
-        selector = parent_node.selector if parent_node else ""
+        parent_id = parent["node_id"]
 
         # Generate node ID
         self._node_counter += 1
-        hash_input = f"text_{self._node_counter}_{parent_id}"
+        hash_input = f"text_{self._node_counter}_{parent_id}{self.id_namespace}"
         hash_digest = hashlib.md5(hash_input.encode()).hexdigest()
         node_id = f"node_{hash_digest[:8]}"
 
-        # Create TextNode
+        # Create TextNode (section and selector inherited from parent)
         text_node = TextNode(
             node_id=node_id,
-            selector=selector,
+            selector=parent["selector"],
             path=path,
             text=text,
-            section_id=section_id,
+            section_id=parent["section_id"],
             parent_node_id=parent_id
         )
 
         self.text_nodes.append(text_node)
 
-    def _generate_node_id(self, element) -> str:
+    def _add_section_element(self, element, span: Optional[Tuple[int, int]]):
+        """
+        Remember an element carrying a data-section-id (for section features)
+
+        Args:
+            element: BeautifulSoup element
+            span: (start, end) of the element in the source, or None
+        """
+        if element.get('data-section-id'):
+            self.section_elements.append((element, span))
+
+    def _generate_node_id(self, element, section_id: Optional[str]) -> str:
         """
         Generate unique node ID using hash
 
         Args:
             element: BeautifulSoup element
+            section_id: Section ID of the element (inherited or own)
 
         Returns:
             Unique node ID string
         """
         self._node_counter += 1
         tag = element.name if hasattr(element, 'name') else 'text'
-        section_id = self._find_section_id(element) or 'root'
+        section_id = section_id or 'root'
 
         # Create unique hash
-        hash_input = f"{tag}_{self._node_counter}_{section_id}"
+        hash_input = f"{tag}_{self._node_counter}_{section_id}{self.id_namespace}"
         hash_digest = hashlib.md5(hash_input.encode()).hexdigest()
 
         return f"node_{hash_digest[:8]}"
@@ -310,19 +432,15 @@ class HTMLParser:
         Returns:
             HTML string or None
         """
-        node_ids = self.section_index.get(section_id)
-        if not node_ids:
+        root_id = self.section_roots.get(section_id)
+        if root_id is None:
             return None
 
-        # Find the section element in soup
-        if not self.soup:
+        section_root = self.nodes.get(root_id)
+        if section_root is None:
             return None
 
-        section_element = self.soup.find(attrs={'data-section-id': section_id})
-        if section_element:
-            return str(section_element)
-
-        return None
+        return section_root.get_html(self.html)
 
     def _build_section_info(self, section_id: str) -> SectionInfo:
         """
@@ -345,7 +463,7 @@ class HTMLParser:
             if node:
                 if node.text_content:
                     texts.append(node.text_content)
-                total_html_size += len(node.html)
+                total_html_size += node.html_length
 
         # Build description from texts
         description = ' '.join(texts)
@@ -11,25 +11,70 @@ Dependencies:
 - app.services.gemini_client
 - app.models.common (IntentType, ChangeType, AnalysisResult)
 - app.models.chat (SearchResult)
+- app.services.intent_rules (rule-based fast path)
+- app.services.intent_cache (cached LLM results)
 
 Implementation Notes:
+- Unambiguous requests are classified by IntentRules; Gemini is called
+  only when the rule confidence is below INTENT_RULES_MIN_CONFIDENCE
+- Confident LLM results are cached per normalized message and search
+  result signature (IntentCache) and reused before calling Gemini
 - Use Gemini for intent classification
-- Parse JSON response from LLM
+- Parse JSON response from LLM (JSONStreamParser: fences, trailing
+  commas and truncation handled in one pass)
 - Handle parsing failures gracefully
 - Return confidence scores
 """
 
 from typing import List, Dict, Optional
-import json
-import re
+import asyncio
 import logging
 
 from app.models.common import IntentType, ChangeType, AnalysisResult
 from app.models.chat import SearchResult
 from app.services.gemini_client import GeminiClient
+from app.services.intent_rules import get_intent_rules
+from app.services.intent_cache import cache_key, get_intent_cache
+from app.utils.json_stream import JSONStreamParser
+from app.services.keyword_matcher import RequestMatch
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Classification rules shared with the combined (single-call) prompt
+INTENT_GUIDELINES = """1. intent: 요청의 의도를 분류하세요
+   - "off_topic": HTML/웹페이지와 전혀 관련없는 요청 (예: 날씨, 음식 추천, 일상 대화, 코딩 외 질문 등)
+   - "local": 특정 HTML 요소만 수정 (예: 헤더 색상 변경, 버튼 텍스트 변경)
+   - "global": 전체 HTML 수정 필요 (예: 전체 번역, 테마 변경)
+   - "query": HTML 관련 질문이지만 수정 요청 아님 (예: "이 페이지에 몇 개의 버튼이 있어?")
+   - "unclear": HTML 수정 요청 같지만 불명확함 (예: "좀 바꿔줘")
+
+   **off_topic 예시:**
+   - "점심 메뉴 추천해줘" → off_topic
+   - "오늘 날씨 어때?" → off_topic
+   - "파이썬 코드 짜줘" → off_topic
+   - "농담 해줘" → off_topic
+   - "안녕하세요" → off_topic
+
+   **local/global 예시:**
+   - "헤더 배경색 파란색으로" → local
+   - "버튼 텍스트를 'Submit'으로" → local
+   - "전체 내용 영어로 번역해줘" → global
+   - "폰트 사이즈 키워줘" → local/global
+
+2. changeType: 변경 유형 (수정 요청인 경우만, off_topic이면 null)
+   - "style": 스타일/색상 변경
+   - "content": 텍스트 내용 변경
+   - "structure": 구조 변경 (추가/삭제)
+   - "translation": 번역
+   - "deletion": 삭제
+
+3. targetDescription: 수정 대상 설명 (짧게)
+4. actionDescription: 수행할 작업 설명 (짧게)
+5. confidence: 분석 확신도 (0.0-1.0)
+6. useSearchResults: 검색 결과를 사용할지 여부
+7. reasoning: 분석 근거 (짧게)"""
+
 
 class IntentAnalyzer:
     """
@@ -54,7 +99,10 @@ class IntentAnalyzer:
         self,
         message: str,
         search_results: List[SearchResult],
-        context_html: Optional[str] = None
+        context_html: Optional[str] = None,
+        match: Optional[RequestMatch] = None,
+        use_rules: bool = True,
+        use_cache: bool = True
     ) -> AnalysisResult:
         """
         Analyze user message intent
@@ -63,10 +111,24 @@ class IntentAnalyzer:
             message: User message
             search_results: Vector search results
             context_html: Optional context HTML
+            match: RequestMatch of the message (computed if omitted)
+            use_rules: Try the rule-based fast path first
+            use_cache: Look up the intent cache before calling Gemini
+                (the result is cached either way)
 
         Returns:
             AnalysisResult with intent classification
         """
+        if use_rules:
+            result = self.classify_by_rules(message, search_results, match)
+            if result is not None:
+                return result
+
+        if use_cache:
+            result = await self.lookup_cache(message, search_results)
+            if result is not None:
+                return result
+
         try:
             # Build analysis prompt
             prompt = self._build_analysis_prompt(message, search_results)
@@ -86,12 +148,89 @@ class IntentAnalyzer:
                 f"confidence={result.confidence:.2f}"
             )
 
+            await self.remember(message, search_results, result)
             return result
 
+        except asyncio.TimeoutError:
+            # Surfaces as 504 (routes/chat.py), not as an UNCLEAR fallback
+            raise
         except Exception as e:
             logger.error(f"Intent analysis failed: {e}")
             return self._get_fallback_result(len(search_results) > 0)
 
+    def classify_by_rules(
+        self,
+        message: str,
+        search_results: List[SearchResult],
+        match: Optional[RequestMatch] = None
+    ) -> Optional[AnalysisResult]:
+        """
+        Classify without Gemini when the rules are confident enough
+
+        Args:
+            message: User message
+            search_results: Rule-based section matches (best score is used)
+            match: RequestMatch of the message (computed if omitted)
+
+        Returns:
+            AnalysisResult, or None if the LLM classifier is needed
+        """
+        if not settings.INTENT_RULES_ENABLED:
+            return None
+
+        top_score = max((result.score for result in search_results), default=0.0)
+        result = get_intent_rules().classify(message, match=match, top_score=top_score)
+        if result.confidence < settings.INTENT_RULES_MIN_CONFIDENCE:
+            return None
+
+        logger.info(
+            f"Intent classified by rules: intent={result.intent}, "
+            f"confidence={result.confidence:.2f} ({result.reasoning})"
+        )
+        return result
+
+    async def lookup_cache(
+        self,
+        message: str,
+        search_results: List[SearchResult]
+    ) -> Optional[AnalysisResult]:
+        """
+        Get a cached analysis of a near-identical message
+
+        Args:
+            message: User message
+            search_results: Rule-based section matches
+
+        Returns:
+            Cached AnalysisResult, or None on a miss / when disabled
+        """
+        if not settings.INTENT_CACHE_ENABLED:
+            return None
+
+        result = await get_intent_cache().get(cache_key(message, search_results))
+        if result is not None:
+            logger.info(f"Intent served from cache: intent={result.intent}")
+        return result
+
+    async def remember(
+        self,
+        message: str,
+        search_results: List[SearchResult],
+        result: AnalysisResult
+    ):
+        """
+        Cache an LLM analysis if it is confident enough
+
+        Args:
+            message: User message
+            search_results: Section matches the analysis was made with
+            result: LLM analysis result
+        """
+        if not settings.INTENT_CACHE_ENABLED or result.confidence < settings.INTENT_CACHE_MIN_CONFIDENCE:
+            return
+
+        await get_intent_cache().put(cache_key(message, search_results), result)
+
     def _build_analysis_prompt(
         self,
         message: str,
@@ -121,38 +260,7 @@ class IntentAnalyzer:
 
 **먼저 요청이 HTML/웹페이지 수정과 관련있는지 판단하세요:**
 
-1. intent: 요청의 의도를 분류하세요
-   - "off_topic": HTML/웹페이지와 전혀 관련없는 요청 (예: 날씨, 음식 추천, 일상 대화, 코딩 외 질문 등)
-   - "local": 특정 HTML 요소만 수정 (예: 헤더 색상 변경, 버튼 텍스트 변경)
-   - "global": 전체 HTML 수정 필요 (예: 전체 번역, 테마 변경)
-   - "query": HTML 관련 질문이지만 수정 요청 아님 (예: "이 페이지에 몇 개의 버튼이 있어?")
-   - "unclear": HTML 수정 요청 같지만 불명확함 (예: "좀 바꿔줘")
-
-   **off_topic 예시:**
-   - "점심 메뉴 추천해줘" → off_topic
-   - "오늘 날씨 어때?" → off_topic
-   - "파이썬 코드 짜줘" → off_topic
-   - "농담 해줘" → off_topic
-   - "안녕하세요" → off_topic
-
-   **local/global 예시:**
-   - "헤더 배경색 파란색으로" → local
-   - "버튼 텍스트를 'Submit'으로" → local
-   - "전체 내용 영어로 번역해줘" → global
-   - "폰트 사이즈 키워줘" → local/global
-
-2. changeType: 변경 유형 (수정 요청인 경우만, off_topic이면 null)
-   - "style": 스타일/색상 변경
-   - "content": 텍스트 내용 변경
-   - "structure": 구조 변경 (추가/삭제)
-   - "translation": 번역
-   - "deletion": 삭제
-
-3. targetDescription: 수정 대상 설명 (짧게)
-4. actionDescription: 수행할 작업 설명 (짧게)
-5. confidence: 분석 확신도 (0.0-1.0)
-6. useSearchResults: 검색 결과를 사용할지 여부
-7. reasoning: 분석 근거 (짧게)
+{INTENT_GUIDELINES}
 
 ## JSON 응답 형식 (반드시 JSON만 출력)
 {{
@@ -212,103 +320,69 @@ class IntentAnalyzer:
                 # Fallback: try to extract intent from raw text
                 return self._extract_from_raw_text(response_text)
 
-            # Convert camelCase to snake_case for field names
-            intent_str = data.get("intent", "unclear")
-            change_type_str = data.get("changeType")
-
-            # Convert to enums
-            try:
-                intent = IntentType(intent_str)
-            except ValueError:
-                logger.warning(f"Invalid intent value: {intent_str}, defaulting to UNCLEAR")
-                intent = IntentType.UNCLEAR
-
-            change_type = None
-            if change_type_str:
-                try:
-                    change_type = ChangeType(change_type_str)
-                except ValueError:
-                    logger.warning(f"Invalid changeType value: {change_type_str}")
-
-            # Create AnalysisResult (handle null values from LLM)
-            return AnalysisResult(
-                intent=intent,
-                change_type=change_type,
-                target_description=data.get("targetDescription") or "",
-                action_description=data.get("actionDescription") or "",
-                confidence=float(data.get("confidence") or 0.5),
-                use_search_results=bool(data.get("useSearchResults", False)),
-                reasoning=data.get("reasoning") or ""
-            )
+            return self._build_analysis(data)
 
         except Exception as e:
             logger.error(f"Error parsing analysis response: {e}")
             return self._get_fallback_result(False)
 
-    def _extract_json(self, text: str) -> Optional[Dict]:
+    def _build_analysis(self, data: Dict) -> AnalysisResult:
         """
-        Try multiple strategies to extract JSON from LLM response
+        Build AnalysisResult from parsed response JSON
 
         Args:
-            text: Raw LLM response
+            data: Parsed JSON (camelCase keys)
 
         Returns:
-            Parsed dict or None
+            AnalysisResult
         """
-        # Strategy 1: Remove markdown code blocks
-        clean_text = text.strip()
-        if clean_text.startswith("```json"):
-            clean_text = clean_text[7:]
-        elif clean_text.startswith("```"):
-            clean_text = clean_text[3:]
-        if clean_text.endswith("```"):
-            clean_text = clean_text[:-3]
-        clean_text = clean_text.strip()
-
-        # Try parsing directly
+        # Convert camelCase to snake_case for field names
+        intent_str = data.get("intent", "unclear")
+        change_type_str = data.get("changeType")
+
+        # Convert to enums
         try:
-            return json.loads(clean_text)
-        except json.JSONDecodeError:
-            pass
+            intent = IntentType(intent_str)
+        except ValueError:
+            logger.warning(f"Invalid intent value: {intent_str}, defaulting to UNCLEAR")
+            intent = IntentType.UNCLEAR
 
-        # Strategy 2: Find JSON object in text using regex
-        json_match = re.search(r'\{[^{}]*"intent"[^{}]*\}', text, re.DOTALL)
-        if json_match:
+        change_type = None
+        if change_type_str:
             try:
-                return json.loads(json_match.group())
-            except json.JSONDecodeError:
-                pass
+                change_type = ChangeType(change_type_str)
+            except ValueError:
+                logger.warning(f"Invalid changeType value: {change_type_str}")
 
-        # Strategy 3: Find JSON with nested braces
-        brace_match = re.search(r'\{(?:[^{}]|\{[^{}]*\})*\}', text, re.DOTALL)
-        if brace_match:
-            try:
-                return json.loads(brace_match.group())
-            except json.JSONDecodeError:
-                pass
-
-        # Strategy 4: Try to fix truncated JSON
-        # Find the start of JSON and try to complete it
-        if "{" in text:
-            json_start = text.index("{")
-            partial_json = text[json_start:]
-
-            # Try to fix common issues
-            # Add missing closing brace
-            if partial_json.count("{") > partial_json.count("}"):
-                partial_json += "}" * (partial_json.count("{") - partial_json.count("}"))
-
-            # Fix trailing commas
-            partial_json = re.sub(r',\s*}', '}', partial_json)
-            partial_json = re.sub(r',\s*$', '', partial_json)
-
-            # Fix unterminated strings by finding last complete key-value
-            try:
-                return json.loads(partial_json)
-            except json.JSONDecodeError:
-                pass
+        # Create AnalysisResult (handle null values from LLM)
+        return AnalysisResult(
+            intent=intent,
+            change_type=change_type,
+            target_description=data.get("targetDescription") or "",
+            action_description=data.get("actionDescription") or "",
+            confidence=float(data.get("confidence") or 0.5),
+            use_search_results=bool(data.get("useSearchResults", False)),
+            reasoning=data.get("reasoning") or ""
+        )
+
+    def _extract_json(self, text: str) -> Optional[Dict]:
+        """
+        Extract the JSON object from an LLM response
+
+        Code fences and surrounding text are skipped, trailing commas are
+        tolerated and a truncated object is repaired (JSONStreamParser).
+
+        Args:
+            text: Raw LLM response
+
+        Returns:
+            Parsed dict or None
+        """
+        data = JSONStreamParser.parse(text)
+        if isinstance(data, dict):
+            return data
 
-        logger.warning(f"All JSON extraction strategies failed for: {text[:200]}...")
+        logger.warning(f"No JSON object found in response: {text[:200]}...")
         return None
 
     def _extract_from_raw_text(self, text: str) -> AnalysisResult:
@@ -0,0 +1,249 @@
+"""
+Intent Analysis Cache
+
+Responsibilities:
+- Reuse IntentAnalyzer results for near-identical messages across sessions
+- Keep recent results in memory (TTL + LRU) with MongoDB as a shared
+  second tier
+- Count hits / misses per tier for tuning
+
+Dependencies:
+- motor (AsyncIOMotorCollection)
+- app.models.common (AnalysisResult)
+- app.models.chat (SearchResult)
+- app.utils.mongodb (get_collection, INTENT_CACHE_COLLECTION)
+
+Implementation Notes:
+- Key: normalized message (NFKC, lowercase, no whitespace or sentence
+  punctuation) plus a coarse signature of the top search results (result
+  type, section kind with numbering stripped, strong/weak score), so a
+  message that only matches sections in one page is not served the
+  classification made for another
+- Only confident LLM results are stored (INTENT_CACHE_MIN_CONFIDENCE);
+  fallback results of failed calls are never cached
+- The memory tier is per process (like DocumentCache); MongoDB entries
+  carry expires_at and expire through a TTL index created on first write
+- MongoDB errors are logged and treated as misses - the cache never
+  fails a chat request
+"""
+
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import hashlib
+import logging
+import re
+import time
+import unicodedata
+
+from app.models.chat import SearchResult
+from app.models.common import AnalysisResult
+from app.services.intent_rules import STRONG_SECTION_SCORE
+from app.utils.mongodb import get_collection, INTENT_CACHE_COLLECTION
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Search results that make up the context signature
+SIGNATURE_RESULTS = 3
+
+# Dropped when normalizing (quotes are kept: quoted values change the action)
+IGNORED_CHARS = re.compile(r"[\s.,!?~…]+")
+SECTION_NUMBERING = re.compile(r"[-_]?\d+$")
+
+
+def normalize_message(message: str) -> str:
+    """
+    Normalize a message for cache lookup
+
+    "헤더 배경색 바꿔 줘!" and "헤더 배경색 바꿔줘" map to the same key.
+
+    Args:
+        message: User message
+
+    Returns:
+        Normalized message
+    """
+    return IGNORED_CHARS.sub("", unicodedata.normalize("NFKC", message).lower())
+
+
+def context_signature(search_results: List[SearchResult]) -> str:
+    """
+    Coarse signature of the top search results
+
+    Args:
+        search_results: Section matches used for the analysis
+
+    Returns:
+        e.g. "section:header:strong|section:card:weak" ("none" without results)
+    """
+    ranked = sorted(search_results, key=lambda result: result.score, reverse=True)
+    parts = []
+    for result in ranked[:SIGNATURE_RESULTS]:
+        kind = SECTION_NUMBERING.sub("", (result.section_id or "").lower()) or "-"
+        strength = "strong" if result.score >= STRONG_SECTION_SCORE else "weak"
+        parts.append(f"{result.type}:{kind}:{strength}")
+    return "|".join(parts) or "none"
+
+
+def cache_key(message: str, search_results: List[SearchResult]) -> str:
+    """Cache key for a message and its search results"""
+    raw = f"{normalize_message(message)}\x00{context_signature(search_results)}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class IntentCache:
+    """
+    Two-tier cache of intent analysis results (memory LRU + MongoDB)
+
+    Usage:
+        cache = get_intent_cache()
+        key = cache_key(message, search_results)
+        analysis = await cache.get(key)  # None on a miss
+        await cache.put(key, analysis)
+        cache.get_stats()  # {"hits", "memory_hits", "mongo_hits", "misses", "hit_rate", ...}
+    """
+
+    _instance: Optional["IntentCache"] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        """Initialize cache state from settings"""
+        # key -> (monotonic expiry, analysis)
+        self._entries: "OrderedDict[str, Tuple[float, AnalysisResult]]" = OrderedDict()
+        self.max_entries = settings.INTENT_CACHE_MAX_ENTRIES
+        self.ttl_seconds = settings.INTENT_CACHE_TTL_SECONDS
+        self.use_mongo = settings.INTENT_CACHE_MONGO
+        self._ttl_index_ready = False
+        self._stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "mongo_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expired": 0,
+            "mongo_errors": 0,
+        }
+
+    async def get(self, key: str) -> Optional[AnalysisResult]:
+        """
+        Look up a cached analysis (memory first, then MongoDB)
+
+        Args:
+            key: Cache key (cache_key())
+
+        Returns:
+            Cached AnalysisResult or None
+        """
+        analysis = self._get_memory(key)
+        if analysis is not None:
+            self._stats["memory_hits"] += 1
+            return analysis
+
+        if self.use_mongo:
+            analysis = await self._get_mongo(key)
+            if analysis is not None:
+                self._stats["mongo_hits"] += 1
+                self._put_memory(key, analysis)
+                return analysis
+
+        self._stats["misses"] += 1
+        return None
+
+    async def put(self, key: str, analysis: AnalysisResult):
+        """
+        Store an analysis in both tiers
+
+        Args:
+            key: Cache key (cache_key())
+            analysis: Analysis result to reuse
+        """
+        self._stats["stores"] += 1
+        self._put_memory(key, analysis)
+        if self.use_mongo:
+            await self._put_mongo(key, analysis)
+
+    def clear(self):
+        """Drop the memory tier (MongoDB entries expire on their own)"""
+        self._entries.clear()
+
+    def _get_memory(self, key: str) -> Optional[AnalysisResult]:
+        """Memory tier lookup (drops an expired entry)"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires, analysis = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            self._stats["expired"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return analysis
+
+    def _put_memory(self, key: str, analysis: AnalysisResult):
+        """Memory tier store with LRU eviction"""
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, analysis)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def _get_mongo(self, key: str) -> Optional[AnalysisResult]:
+        """MongoDB tier lookup"""
+        try:
+            document = await get_collection(INTENT_CACHE_COLLECTION).find_one(
+                {"_id": key, "expires_at": {"$gt": datetime.utcnow()}}
+            )
+            if document is None:
+                return None
+            return AnalysisResult(**document["analysis"])
+        except Exception as e:
+            self._stats["mongo_errors"] += 1
+            logger.warning(f"Intent cache lookup failed: {e}")
+            return None
+
+    async def _put_mongo(self, key: str, analysis: AnalysisResult):
+        """MongoDB tier store (creates the TTL index on first use)"""
+        try:
+            collection = get_collection(INTENT_CACHE_COLLECTION)
+            if not self._ttl_index_ready:
+                await collection.create_index("expires_at", expireAfterSeconds=0)
+                self._ttl_index_ready = True
+
+            now = datetime.utcnow()
+            await collection.replace_one(
+                {"_id": key},
+                {
+                    "analysis": analysis.model_dump(mode="json"),
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=self.ttl_seconds),
+                },
+                upsert=True
+            )
+        except Exception as e:
+            self._stats["mongo_errors"] += 1
+            logger.warning(f"Intent cache store failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        hits = self._stats["memory_hits"] + self._stats["mongo_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+# Singleton instance getter
+def get_intent_cache() -> IntentCache:
+    """Get intent cache singleton"""
+    return IntentCache()
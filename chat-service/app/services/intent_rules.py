@@ -0,0 +1,327 @@
+"""
+Intent Rules - Deterministic pre-classifier for user requests
+
+Responsibilities:
+- Classify unambiguous requests without a Gemini call
+- Reuse the RequestMatch of SectionExtractor's keyword tables and global
+  request patterns, plus color / size / verb / question / off-topic lexicons
+- Emit an AnalysisResult with a calibrated confidence; IntentAnalyzer
+  calls the LLM only when it is below INTENT_RULES_MIN_CONFIDENCE
+
+Dependencies:
+- app.services.keyword_matcher (AhoCorasick, RequestMatch)
+- app.services.section_extractor (match_request, KEYWORD_MAPPINGS)
+- app.models.common (IntentType, ChangeType, AnalysisResult)
+
+Implementation Notes:
+- Lexicon words are found in one pass with an Aho–Corasick automaton
+- Each rule has a fixed base confidence; a strong section match raises a
+  local decision and no match lowers it. Base values come from the rule
+  precision on scripts/intent_corpus.json (see scripts/eval_intent_rules.py)
+- Requests no rule covers get UNCLEAR with confidence 0.0
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+import re
+
+from app.models.common import IntentType, ChangeType, AnalysisResult
+from app.services.keyword_matcher import AhoCorasick, RequestMatch
+from app.services.section_extractor import KEYWORD_MAPPINGS, match_request
+
+
+# 색상 표현
+COLOR_WORDS = [
+    "빨간", "빨강", "파란", "파랑", "노란", "노랑", "초록", "녹색", "검은", "검정",
+    "흰", "하얀", "하양", "회색", "보라", "주황", "분홍", "핑크", "하늘색", "남색",
+    "갈색", "금색", "은색", "투명", "민트", "네이비", "베이지",
+    "red", "blue", "green", "yellow", "black", "white", "gray", "grey",
+    "purple", "orange", "pink", "navy",
+]
+
+# 크기/굵기 표현
+SIZE_WORDS = [
+    "크게", "작게", "키워", "줄여", "늘려", "넓게", "좁게", "굵게", "얇게", "두껍게",
+    "진하게", "연하게", "bold", "bigger", "smaller", "larger",
+]
+
+# 수정 동사 (삭제/구조 변경은 변경 유형 판단에도 사용)
+EDIT_VERBS = [
+    "바꿔", "바꾸", "변경", "수정", "만들어", "적용", "교체", "설정", "정렬", "고정",
+    "change", "make", "set", "update",
+]
+# "해줘"류는 수정 요청이 아니어도 쓰임 ("농담 해줘", "설명해줘")
+GENERIC_VERBS = ["해줘", "해 줘", "해주세요", "하게", "으로 해", "로 해"]
+DELETE_VERBS = ["삭제", "지워", "없애", "제거", "빼줘", "숨겨", "remove", "delete", "hide"]
+STRUCTURE_VERBS = ["추가", "넣어", "달아", "붙여", "이동", "옮겨", "add", "insert", "move"]
+
+# 질문 표현 (수정 동사가 없을 때만 query)
+QUESTION_WORDS = [
+    "?", "몇 개", "몇개", "몇 가지", "뭐야", "뭐지", "뭔가요", "무엇", "무슨", "어디",
+    "어떤", "어떻게 돼", "알려줘", "알려 줘", "설명해", "있어", "있나요", "인가요",
+    "얼마", "what", "how many", "which", "where",
+]
+
+# HTML 수정과 무관한 주제
+OFF_TOPIC_WORDS = [
+    "날씨", "점심", "저녁", "아침 메뉴", "맛집", "음식", "레시피", "농담", "재밌는 얘기",
+    "심심", "노래", "영화", "드라마", "게임", "주식", "코인", "뉴스", "스포츠", "축구",
+    "야구", "여행", "운세", "연애", "숙제", "수학", "파이썬", "python", "자바스크립트 코드",
+    "코드 짜", "번역기", "weather", "joke",
+]
+GREETING_WORDS = ["안녕", "반가워", "고마워", "감사합니다", "감사해요", "hello"]
+
+# 페이지 전체에 해당하는 표현
+PAGE_WORDS = [
+    "전체", "모든", "전부", "다크 모드", "다크모드", "라이트 모드", "테마", "반응형",
+    "모바일", "레이아웃", "페이지 전체", "사이트 전체",
+]
+
+# 모호한 수정 요청
+VAGUE_WORDS = ["좀", "알아서", "적당히", "예쁘게", "이쁘게", "멋있게", "멋지게", "괜찮게", "뭔가", "느낌"]
+
+# 값 지정 (따옴표, 단위, hex 색상)
+QUOTED_VALUE = re.compile(r"['\"“”‘’「」].+?['\"“”‘’「」]")
+UNIT_VALUE = re.compile(r"\d+\s*(px|rem|em|%|pt|포인트|픽셀)", re.IGNORECASE)
+HEX_COLOR = re.compile(r"#[0-9a-fA-F]{3,8}\b")
+
+# 번역 요청 표현 ("번역 버튼", "영어로 항목"처럼 단어만 있는 경우는 제외)
+TRANSLATION_REQUEST = re.compile(
+    r"번역\s*(?:해|하|좀|부탁)"
+    r"|(?:영어|한국어|한글|중국어|일본어|스페인어|프랑스어|독일어|베트남어)\s*(?:으로|로)\s*(?:번역|바꿔|변경|변환)"
+    r"|한글을?\s*영어로"
+    r"|\btranslate\b",
+    re.IGNORECASE
+)
+# 번역 요청에서 대상 요소로 보지 않는 키워드 ("전체 텍스트 번역해줘")
+TRANSLATION_NEUTRAL_TARGETS = {"텍스트"}
+
+# 대상 요소가 없는 스타일 키워드 (KEYWORD_MAPPINGS 중 elements가 빈 항목)
+STYLE_KEYWORDS = {keyword for keyword, mapping in KEYWORD_MAPPINGS.items() if not mapping["elements"]}
+
+# 섹션 점수 기준 (SectionIndex: 요소 키워드 일치 +2.0)
+STRONG_SECTION_SCORE = 2.0
+
+LEXICONS: Dict[str, List[str]] = {
+    "color": COLOR_WORDS,
+    "size": SIZE_WORDS,
+    "edit": EDIT_VERBS,
+    "generic": GENERIC_VERBS,
+    "delete": DELETE_VERBS,
+    "structure": STRUCTURE_VERBS,
+    "question": QUESTION_WORDS,
+    "off_topic": OFF_TOPIC_WORDS,
+    "greeting": GREETING_WORDS,
+    "page": PAGE_WORDS,
+    "vague": VAGUE_WORDS,
+}
+
+
+@dataclass
+class RequestSignals:
+    """Lexicon hits of one request"""
+    targets: List[str]          # Element keywords (버튼, 헤더, ...)
+    styles: List[str]           # Style keywords (색, 배경, 크기, ...)
+    hits: Dict[str, Set[str]]   # Lexicon name → words found
+    has_value: bool             # Quoted text, unit or hex color given
+
+    def has(self, lexicon: str) -> bool:
+        return bool(self.hits[lexicon])
+
+    @property
+    def is_edit(self) -> bool:
+        """Explicit edit verb (not just "해줘")"""
+        return self.has("edit") or self.has("delete") or self.has("structure") or self.has("size")
+
+    @property
+    def is_request(self) -> bool:
+        """Any verb asking for something"""
+        return self.is_edit or self.has("generic")
+
+    @property
+    def is_styled(self) -> bool:
+        return bool(self.styles) or self.has("color") or self.has("size")
+
+
+class IntentRules:
+    """
+    Rule-based intent pre-classifier
+
+    Usage:
+        rules = IntentRules()
+        analysis = rules.classify("헤더 배경 파란색으로", top_score=3.0)
+        if analysis.confidence >= settings.INTENT_RULES_MIN_CONFIDENCE:
+            ...  # skip the LLM classifier
+    """
+
+    def __init__(self):
+        """Compile lexicons into one automaton"""
+        self._word_lexicons: Dict[str, List[str]] = {}
+        for name, words in LEXICONS.items():
+            for word in words:
+                self._word_lexicons.setdefault(word.lower(), []).append(name)
+        self.automaton = AhoCorasick(self._word_lexicons)
+
+    def signals(self, message: str, match: Optional[RequestMatch] = None) -> RequestSignals:
+        """
+        Collect lexicon and keyword hits
+
+        Args:
+            message: User message
+            match: RequestMatch of the message (computed if omitted)
+
+        Returns:
+            RequestSignals
+        """
+        if match is None:
+            match = match_request(message)
+
+        hits: Dict[str, Set[str]] = {name: set() for name in LEXICONS}
+        for word in self.automaton.find_all(message.lower()):
+            for name in self._word_lexicons[word]:
+                hits[name].add(word)
+
+        return RequestSignals(
+            targets=[keyword for keyword in match.keywords if keyword not in STYLE_KEYWORDS],
+            styles=[keyword for keyword in match.keywords if keyword in STYLE_KEYWORDS],
+            hits=hits,
+            has_value=bool(
+                QUOTED_VALUE.search(message) or UNIT_VALUE.search(message) or HEX_COLOR.search(message)
+            )
+        )
+
+    def classify(
+        self,
+        message: str,
+        match: Optional[RequestMatch] = None,
+        top_score: float = 0.0
+    ) -> AnalysisResult:
+        """
+        Classify a request by rules
+
+        Args:
+            message: User message
+            match: RequestMatch of the message (computed if omitted)
+            top_score: Score of the best matching section (0 if none)
+
+        Returns:
+            AnalysisResult (confidence 0.0 when no rule applies)
+        """
+        if match is None:
+            match = match_request(message)
+        signals = self.signals(message, match)
+
+        # 1. Translation: an actual translation request ("영어로 번역해줘"); one
+        #    naming an element ("헤더 메뉴 영어로 바꿔줘") may be a local change
+        if TRANSLATION_REQUEST.search(message):
+            targets = [target for target in signals.targets if target not in TRANSLATION_NEUTRAL_TARGETS]
+            confidence = 0.95 if not targets else 0.75
+            return self._result(
+                IntentType.GLOBAL_CHANGE, ChangeType.TRANSLATION, confidence,
+                ", ".join(targets) or "전체 텍스트", message, "translation pattern"
+            )
+
+        # 2. Off-topic: topic word or bare greeting, no edit intent. A topic
+        #    word next to an element is often page content ("영화 카드 제목이
+        #    뭐야?"): questions go on to the question rule, the rest to the LLM
+        if not signals.is_edit and not signals.is_styled and not signals.has_value:
+            if signals.has("off_topic") and not signals.targets:
+                return self._result(IntentType.OFF_TOPIC, None, 0.95, "", "", "off-topic lexicon")
+            if signals.has("off_topic") and not signals.has("question"):
+                return self._result(IntentType.OFF_TOPIC, None, 0.7, "", "", "off-topic lexicon + target")
+            if signals.has("greeting") and not signals.targets and len(message) <= 20:
+                return self._result(IntentType.OFF_TOPIC, None, 0.9, "", "", "greeting")
+
+        # 3. Whole-page change ("전체 배경", "모든 버튼", "다 바꿔", "다크 모드로")
+        if match.is_global:
+            confidence = 0.9 if signals.is_styled else 0.75
+            return self._result(
+                IntentType.GLOBAL_CHANGE, self._change_type(signals), confidence,
+                ", ".join(signals.targets) or "전체 페이지", message, "global pattern"
+            )
+        if signals.has("page") and (signals.is_request or signals.is_styled):
+            # "모든 카드에 ..." may still mean one section
+            confidence = 0.85 if not signals.targets else 0.75
+            return self._result(
+                IntentType.GLOBAL_CHANGE, self._change_type(signals), confidence,
+                ", ".join(signals.targets) or "전체 페이지", message, "page-wide words"
+            )
+
+        # 4. Question without an edit verb
+        if signals.has("question") and not signals.is_edit:
+            confidence = 0.9 if signals.targets else 0.7
+            return self._result(
+                IntentType.QUERY, None, confidence,
+                ", ".join(signals.targets), "", "question lexicon"
+            )
+
+        # 5. Local change: a target and something to do to it
+        if signals.targets and (signals.is_edit or signals.is_styled or signals.has_value):
+            confidence = 0.9
+            if top_score >= STRONG_SECTION_SCORE:
+                confidence += 0.05
+            elif top_score <= 0:
+                confidence -= 0.15
+            if signals.has("vague") and not (signals.is_styled or signals.has_value):
+                confidence -= 0.2
+            return self._result(
+                IntentType.LOCAL_CHANGE, self._change_type(signals), confidence,
+                ", ".join(signals.targets), message, "target + edit"
+            )
+
+        # 6. Styling without a target: local or global is a judgement call
+        if signals.is_styled and (signals.is_request or signals.has_value or signals.has("color")):
+            return self._result(
+                IntentType.LOCAL_CHANGE, self._change_type(signals), 0.6,
+                ", ".join(signals.styles), message, "style without target"
+            )
+
+        # 7. Edit verb with nothing to edit ("좀 바꿔줘")
+        if signals.is_request and not signals.has_value:
+            confidence = 0.9 if signals.has("vague") else 0.6
+            return self._result(IntentType.UNCLEAR, None, confidence, "", "", "edit without target")
+
+        return self._result(IntentType.UNCLEAR, None, 0.0, "", "", "no rule")
+
+    def _change_type(self, signals: RequestSignals) -> Optional[ChangeType]:
+        """Change type from verb and style hits"""
+        if signals.has("delete"):
+            return ChangeType.DELETION
+        if signals.has("structure"):
+            return ChangeType.STRUCTURE
+        if signals.is_styled:
+            return ChangeType.STYLE
+        if signals.has_value or signals.has("edit"):
+            return ChangeType.CONTENT
+        return None
+
+    def _result(
+        self,
+        intent: IntentType,
+        change_type: Optional[ChangeType],
+        confidence: float,
+        target: str,
+        action: str,
+        rule: str
+    ) -> AnalysisResult:
+        """Build AnalysisResult for a rule decision"""
+        return AnalysisResult(
+            intent=intent,
+            change_type=change_type,
+            target_description=target,
+            action_description=action,
+            confidence=round(min(max(confidence, 0.0), 1.0), 2),
+            use_search_results=intent == IntentType.LOCAL_CHANGE,
+            reasoning=f"규칙 기반 분류: {rule}"
+        )
+
+
+_rules: Optional[IntentRules] = None
+
+
+def get_intent_rules() -> IntentRules:
+    """Get compiled intent rules (built once per process)"""
+    global _rules
+    if _rules is None:
+        _rules = IntentRules()
+    return _rules
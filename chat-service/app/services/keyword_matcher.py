@@ -0,0 +1,174 @@
+"""
+Keyword Matcher - Multi-pattern matching of user requests
+
+Responsibilities:
+- Find every known keyword in a request with a single pass (Aho–Corasick)
+- Confirm regex request patterns only when their literal anchor occurs
+- Produce one RequestMatch shared by section scoring and intent checks
+
+Dependencies:
+- None (standard library only)
+
+Implementation Notes:
+- Matching is done on the lowercased request (keywords are lowercased too)
+- Regex patterns are compiled once; each is tried only if its anchor hit
+"""
+
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple, Iterable, Pattern
+import re
+
+
+class AhoCorasick:
+    """
+    Aho–Corasick automaton over a fixed set of literals
+
+    Usage:
+        automaton = AhoCorasick(["버튼", "색", "색깔"])
+        automaton.find_all("버튼 색깔")  # {"버튼", "색", "색깔"}
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Build automaton
+
+        Args:
+            patterns: Literals to find (empty strings are ignored)
+        """
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern: str):
+        """Insert pattern into the trie"""
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(pattern)
+
+    def _build_failure_links(self):
+        """Breadth-first failure links; outputs include those of the fail state"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> Set[str]:
+        """
+        Find all patterns occurring in text
+
+        Args:
+            text: Text to scan
+
+        Returns:
+            Set of patterns found
+        """
+        found: Set[str] = set()
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state]:
+                found |= self._output[state]
+        return found
+
+
+@dataclass
+class RequestMatch:
+    """Keyword hits of one user request"""
+    keywords: List[str] = field(default_factory=list)          # Mapping keywords, in mapping order
+    global_keywords: List[str] = field(default_factory=list)   # Global style keywords
+    global_patterns: List[str] = field(default_factory=list)   # Matched global request regexes
+    target_elements: List[str] = field(default_factory=list)   # Elements of matched keywords
+
+    @property
+    def is_global(self) -> bool:
+        """Request matches a global (whole-page) pattern"""
+        return bool(self.global_patterns)
+
+
+class KeywordMatcher:
+    """
+    Precompiled matcher over keyword mappings, global keywords and global patterns
+
+    Usage:
+        matcher = KeywordMatcher(KEYWORD_MAPPINGS, GLOBAL_STYLE_KEYWORDS, GLOBAL_REQUEST_PATTERNS)
+        match = matcher.match("모든 버튼 색 바꿔줘")
+        # match.keywords - ["버튼", "색"]
+        # match.is_global - True
+    """
+
+    def __init__(
+        self,
+        keyword_mappings: Dict[str, Dict[str, List[str]]],
+        global_keywords: List[str],
+        global_patterns: List[Tuple[str, str]]
+    ):
+        """
+        Initialize matcher
+
+        Args:
+            keyword_mappings: Keyword → {"elements": [...], "classes": [...]}
+            global_keywords: Keywords hinting at whole-page changes
+            global_patterns: (literal anchor, regex) pairs; the regex is only
+                tried when its anchor occurs in the request
+        """
+        self.keyword_mappings = keyword_mappings
+        self.global_keywords = global_keywords
+        self.global_patterns: List[Tuple[str, str, Pattern]] = [
+            (anchor.lower(), pattern, re.compile(pattern, re.IGNORECASE))
+            for anchor, pattern in global_patterns
+        ]
+        self.automaton = AhoCorasick(
+            [keyword.lower() for keyword in keyword_mappings]
+            + [keyword.lower() for keyword in global_keywords]
+            + [anchor for anchor, _, _ in self.global_patterns]
+        )
+
+    def match(self, request: str) -> RequestMatch:
+        """
+        Match request against all keywords and patterns in one pass
+
+        Args:
+            request: User request message
+
+        Returns:
+            RequestMatch
+        """
+        hits = self.automaton.find_all(request.lower())
+
+        keywords = [keyword for keyword in self.keyword_mappings if keyword.lower() in hits]
+
+        target_elements: Set[str] = set()
+        for keyword in keywords:
+            target_elements.update(self.keyword_mappings[keyword]["elements"])
+
+        return RequestMatch(
+            keywords=keywords,
+            global_keywords=[keyword for keyword in self.global_keywords if keyword.lower() in hits],
+            global_patterns=[
+                pattern for anchor, pattern, compiled in self.global_patterns
+                if anchor in hits and compiled.search(request)
+            ],
+            target_elements=sorted(target_elements)
+        )
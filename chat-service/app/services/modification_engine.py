@@ -4,32 +4,113 @@ Modification Engine
 Responsibilities:
 - Generate HTML modifications based on user request
 - Create Patch objects for local changes
-- Generate full HTML for global changes
+- Generate global changes as a compact edit script applied as patches,
+  or as full HTML
 - Handle special cases like translation
 
 Dependencies:
 - app.services.gemini_client
 - app.models.chat (Patch, PatchAction, ChatResponse, ChatResponseType)
 - app.models.common (AnalysisResult, IntentType, ChangeType)
+- app.services.patch_cache (PatchCache)
+- app.services.edit_script (compile_edit)
+- app.services.section_rewrite (SectionRewriteJob)
+- app.services.translation_memory (TranslationMemory)
+- app.services.structure_compressor (compress_context)
 
 Implementation Notes:
 - Use different strategies for local vs global changes
-- Parse Patch JSON from LLM response
-- Optimize translation by extracting text nodes
+- Parse Patch JSON from LLM response (incrementally, so streamed
+  patches can be yielded as soon as each object closes)
+- Optimize translation by extracting text nodes: unique texts are
+  looked up in the translation memory, the rest is translated in
+  token-budgeted chunks concurrently (Gemini key scheduler spreads them
+  across keys) with id-keyed JSON so translations never shift
 - Always include summary message
+- Global changes first ask for an edit script (CSS rules, class
+  substitutions, selector-scoped patches) so the output scales with the
+  change, not the page; the whole document is regenerated only when the
+  model asks for it or none of the edits applies to the document
+- Documents with several sections are regenerated section by section:
+  a short style brief is generated first and shared by all sections,
+  units of sections are rewritten concurrently and stitched back into
+  the untouched skeleton (no call approaches the output token cap)
+- Local changes are looked up in the PatchCache first (same request on
+  identical sections); hits are re-validated against the current DOM
+- Local-change sections are sent with repeated rows collapsed to a few
+  exemplars (CONTEXT_REPEAT_COMPRESSION); patches on an exemplar run
+  ([data-chat-run]) are expanded to the whole run, and patches on one
+  exemplar ([data-chat-row]) to its real row, before they are returned
+  or cached
 """
 
-from typing import List, Dict, Optional, Any
+from collections import Counter
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
+import asyncio
 import json
+import re
 import time
 import logging
 
+from bs4 import BeautifulSoup
+from bs4.element import PreformattedString
+
 from app.models.chat import Patch, PatchAction, ChatResponse, ChatResponseType
 from app.models.common import AnalysisResult, IntentType, ChangeType
-from app.services.gemini_client import GeminiClient
+from app.services.gemini_client import GeminiClient, estimate_tokens
+from app.services.edit_script import compile_edit
+from app.services.patch_cache import CachedPatches, get_patch_cache, patch_cache_key, selectors_resolve
+from app.services.section_rewrite import SectionRewriteJob, group_units, read_sections, section_spans, stitch
+from app.services.structure_compressor import CompressedContext, RepeatRun, compress_context
+from app.services.translation_memory import get_translation_memory, target_language
+from app.utils.json_stream import JSONStreamParser
+from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Prompt parts shared with the combined (single-call) prompt
+VALUE_RULES = """## 🎯 가장 중요한 규칙
+**사용자가 지정한 값을 절대 변경하지 마세요!**
+- 사용자가 "빨간색"이라고 하면 → 반드시 "red" 사용 (orange, crimson 금지)
+- 사용자가 "파란색"이라고 하면 → 반드시 "blue" 사용
+- 사용자가 "20px"라고 하면 → 반드시 "20px" 사용
+- 사용자가 특정 텍스트를 지정하면 → 그대로 사용"""
+
+# Lower temperature for more consistent JSON (also part of the patch cache key)
+LOCAL_CHANGE_TEMPERATURE = 0.3
+
+# Global edit scripts are JSON like local patches
+EDIT_SCRIPT_TEMPERATURE = 0.3
+
+# Streamed HTML: tail held back until more text follows (may be the closing fence)
+HELD_BACK_CHARS = " \t\r\n`"
+
+# Closing fence of a fenced HTML response: a line starting with ```
+CLOSING_FENCE = re.compile(r"\n[ \t]*```")
+
+# Section-parallel regeneration: shared style brief
+STYLE_BRIEF_MAX_TOKENS = 512
+STYLE_BRIEF_CLASSES = 60
+CLASS_ATTRIBUTE = re.compile(r'class="([^"]*)"')
+
+# Translation: JSON wrapping per text ({"id": 12, "text": ...}) and attempts per text
+TRANSLATION_ITEM_OVERHEAD_TOKENS = 8
+TRANSLATION_ROUNDS = 2
+
+PATCH_ACTIONS = "|".join(action.value for action in PatchAction)
+
+PATCH_NOTES = """주의사항:
+1. selector는 반드시 유효한 CSS 선택자여야 함
+2. setStyle: value에 "속성명: 값" 형식 (예: "background-color: red")
+3. setText/setHtml: newValue에 새 내용
+4. 여러 요소를 수정해야 하면 patches 배열에 여러 항목 포함"""
+
+REPEAT_NOTES = """## 반복 요소
+같은 구조가 반복되는 요소는 몇 개만 표시했습니다 (data-chat-run 속성, 주석에 전체 개수와 표시된 위치).
+- 반복 요소 전체를 수정하려면 선택자에 [data-chat-run="반복 ID"]를 쓰세요 (예: [data-chat-run="r1"] td) - 생략된 요소까지 모두 적용됩니다
+- 표시된 요소 하나만 수정하려면 id가 있으면 id를, 없으면 [data-chat-row="전체 중 순번"]을 쓰세요 (예: [data-chat-run="r1"][data-chat-row="30"] td)
+- 표시된 HTML에서의 위치는 실제 위치와 다르므로 반복 요소에 :nth-child를 쓰지 마세요"""
+
 
 class ModificationEngine:
     """
@@ -61,7 +142,8 @@ class ModificationEngine:
         self,
         message: str,
         context: Dict[str, str],
-        analysis: AnalysisResult
+        analysis: AnalysisResult,
+        document: Optional[BeautifulSoup] = None
     ) -> ChatResponse:
         """
         Process local change request
@@ -70,40 +152,41 @@ class ModificationEngine:
             message: User message
             context: Section ID -> HTML mapping
             analysis: Intent analysis result
+            document: Current session DOM, used to validate cached patches
+                (the context sections are parsed if omitted)
 
         Returns:
             ChatResponse with patches
         """
         start_time = time.time()
 
+        cache_key, document, cached = self._lookup_patch_cache(message, context, document)
+        if cached is not None:
+            return self._patch_response(cached.patches, cached.summary, 0, start_time, patch_cache="hit")
+
         try:
-            # Build prompt for patch generation
-            prompt = self._build_local_change_prompt(message, context, analysis)
+            # Build prompt for patch generation (repeated rows collapsed)
+            compressed = self._compress_context(message, context)
+            prompt = self._build_local_change_prompt(message, compressed.sections, analysis, compressed.runs)
 
             # Call Gemini
             result = await self.gemini.generate_content(
                 prompt=prompt,
-                temperature=0.3  # Lower temperature for more consistent JSON
+                temperature=LOCAL_CHANGE_TEMPERATURE
             )
 
             # Parse patches and summary from response
             patches, summary = self._parse_patches(result["text"])
+            patches = compressed.expand(patches)
 
-            processing_time = time.time() - start_time
-
-            # Use summary from LLM, fallback to default message
-            response_message = summary if summary else f"수정 패치 {len(patches)}개 생성됨"
+            if cache_key is not None:
+                get_patch_cache().put(cache_key, patches, summary, document)
 
-            return ChatResponse(
-                type=ChatResponseType.PATCH,
-                patches=patches,
-                message=response_message,
-                metadata={
-                    "tokens_used": result.get("tokens_used", 0),
-                    "processing_time": processing_time
-                }
-            )
+            return self._patch_response(patches, summary, result.get("tokens_used", 0), start_time)
 
+        except asyncio.TimeoutError:
+            # Surfaces as 504 (routes/chat.py), not as an ERROR response
+            raise
         except Exception as e:
             logger.error(f"Local change processing failed: {e}", exc_info=True)
             processing_time = time.time() - start_time
@@ -112,22 +195,399 @@ class ModificationEngine:
                 processing_time
             )
 
-    async def process_global_change(
+    async def stream_local_change(
+        self,
+        message: str,
+        context: Dict[str, str],
+        analysis: AnalysisResult,
+        document: Optional[BeautifulSoup] = None
+    ) -> AsyncIterator[Union[Patch, ChatResponse]]:
+        """
+        Process local change request, yielding each patch as soon as it is
+        parsed from the streamed response
+
+        Args:
+            message: User message
+            context: Section ID -> HTML mapping
+            analysis: Intent analysis result
+            document: Current session DOM, used to validate cached patches
+
+        Yields:
+            Patch objects, then the complete ChatResponse (same as
+            process_local_change)
+        """
+        start_time = time.time()
+
+        cache_key, document, cached = self._lookup_patch_cache(message, context, document)
+        if cached is not None:
+            response = self._patch_response(cached.patches, cached.summary, 0, start_time, patch_cache="hit")
+            for patch in response.patches:
+                yield patch
+            yield response
+            return
+
+        try:
+            compressed = self._compress_context(message, context)
+            prompt = self._build_local_change_prompt(message, compressed.sections, analysis, compressed.runs)
+            stream = self.gemini.generate_content_stream(
+                prompt=prompt,
+                temperature=LOCAL_CHANGE_TEMPERATURE
+            )
+
+            parser = JSONStreamParser(array_key="patches")
+            patches: List[Patch] = []
+            first_patch_time = None
+            async for chunk in stream:
+                for patch in compressed.expand(self._build_patches(parser.feed(chunk))):
+                    if first_patch_time is None:
+                        first_patch_time = time.time() - start_time
+                    patches.append(patch)
+                    yield patch
+
+            summary = self._patch_summary(parser, len(patches))
+
+            if cache_key is not None:
+                get_patch_cache().put(cache_key, patches, summary, document)
+
+            yield self._patch_response(
+                patches, summary, stream.tokens_used, start_time, first_patch_time=first_patch_time
+            )
+
+        except asyncio.TimeoutError:
+            # Surfaces as 504 (routes/chat.py), not as an ERROR response
+            raise
+        except Exception as e:
+            logger.error(f"Local change streaming failed: {e}", exc_info=True)
+            yield self._create_error_response(
+                f"수정 처리 실패: {str(e)}",
+                time.time() - start_time
+            )
+
+    def _lookup_patch_cache(
+        self,
+        message: str,
+        context: Dict[str, str],
+        document: Optional[BeautifulSoup]
+    ) -> Tuple[Optional[str], Optional[BeautifulSoup], Optional[CachedPatches]]:
+        """
+        Look up cached patches for a local change
+
+        Args:
+            message: User message
+            context: Section ID -> HTML mapping
+            document: Current session DOM (None: parse the context sections)
+
+        Returns:
+            (cache key, DOM used for validation, cached patches); the key is
+            None when the cache is disabled
+        """
+        if not settings.PATCH_CACHE_ENABLED:
+            return None, document, None
+
+        if document is None:
+            document = BeautifulSoup("".join(context.values()), 'html.parser')
+        cache_key = patch_cache_key(
+            message, context, self.gemini.generation_model, LOCAL_CHANGE_TEMPERATURE
+        )
+        cached = get_patch_cache().get(cache_key, document)
+        if cached is not None:
+            logger.info(f"Local change served from patch cache ({len(cached.patches)} patches)")
+        return cache_key, document, cached
+
+    def _patch_response(
+        self,
+        patches: List[Patch],
+        summary: str,
+        tokens_used: int,
+        start_time: float,
+        **metadata: Any
+    ) -> ChatResponse:
+        """
+        Build the PATCH response of a local change (or global edit script)
+
+        Args:
+            patches: Generated (or cached) patches
+            summary: Summary from the LLM (default message if empty)
+            tokens_used: Tokens spent
+            start_time: time.time() at the start of processing
+            **metadata: Extra metadata entries
+
+        Returns:
+            ChatResponse
+        """
+        # Use summary from LLM, fallback to default message
+        response_message = summary if summary else f"수정 패치 {len(patches)}개 생성됨"
+
+        return ChatResponse(
+            type=ChatResponseType.PATCH,
+            patches=[patch.model_copy() for patch in patches],
+            message=response_message,
+            metadata={
+                "tokens_used": tokens_used,
+                "processing_time": time.time() - start_time,
+                **metadata
+            }
+        )
+
+    def _compile_edit(self, edit: Any, document: BeautifulSoup) -> List[Patch]:
+        """
+        Patches of one edit-script edit that resolve in the document
+
+        Args:
+            edit: Element of the "edits" array
+            document: Current session DOM (read only)
+
+        Returns:
+            Patch objects (empty if the edit cannot apply)
+        """
+        return [
+            patch for patch in self._build_patches(compile_edit(edit, document))
+            if selectors_resolve([patch], document)
+        ]
+
+    def _edit_script_response(
+        self,
+        parser: JSONStreamParser,
+        patches: List[Patch],
+        edit_count: int,
+        dropped: int,
+        tokens_used: int,
+        start_time: float
+    ) -> Optional[ChatResponse]:
+        """
+        PATCH response of an edit script, or None to regenerate the document
+
+        Args:
+            parser: Parser that consumed the whole edit-script response
+            patches: Patches compiled from the edits
+            edit_count: Edits parsed
+            dropped: Edits that compiled to no applicable patch
+            tokens_used: Tokens spent on the edit script
+            start_time: time.time() at the start of processing
+
+        Returns:
+            ChatResponse, or None if no edit applies
+        """
+        data = parser.result(repair=True)
+        if not isinstance(data, dict):
+            data = {}
+
+        if not patches:
+            reason = "requested by the model" if data.get("fullRegeneration") else f"0/{edit_count} edits applicable"
+            logger.info(f"Edit script not usable ({reason}), regenerating the full document")
+            return None
+
+        if dropped:
+            logger.warning(f"Edit script: {dropped}/{edit_count} edits did not apply to the document")
+
+        summary = data.get("summary")
+        return self._patch_response(
+            patches,
+            summary if isinstance(summary, str) else "",
+            tokens_used,
+            start_time,
+            global_mode="edit_script",
+            edit_script={"edits": edit_count, "dropped": dropped, "patches": len(patches)}
+        )
+
+    async def _start_section_rewrite(
+        self,
+        message: str,
+        full_html: str,
+        analysis: AnalysisResult
+    ) -> Optional[SectionRewriteJob]:
+        """
+        Generate the style brief and start rewriting the sections
+
+        Args:
+            message: User message
+            full_html: Full HTML document
+            analysis: Intent analysis result
+
+        Returns:
+            SectionRewriteJob with one running task per unit, or None if
+            the document fits a single call (or has no sections)
+        """
+        spans = section_spans(full_html, settings.GLOBAL_CHANGE_UNIT_TOKENS)
+        units = group_units(spans, settings.GLOBAL_CHANGE_UNIT_TOKENS)
+        if len(units) < 2:
+            return None
+
+        job = SectionRewriteJob(spans=spans, units=units)
+        job.brief, job.tokens_used = await self._style_brief(message, full_html, analysis)
+        logger.info(f"Rewriting {len(spans)} sections in {len(units)} concurrent calls")
+
+        semaphore = asyncio.Semaphore(settings.GLOBAL_CHANGE_MAX_CONCURRENCY)
+        job.tasks = [
+            asyncio.create_task(self._rewrite_unit(job, index, message, full_html, analysis, semaphore))
+            for index in range(len(units))
+        ]
+        return job
+
+    async def _style_brief(
         self,
         message: str,
         full_html: str,
         analysis: AnalysisResult
+    ) -> Tuple[str, int]:
+        """
+        Short style brief shared by all section rewrites
+
+        Args:
+            message: User message
+            full_html: Full HTML document (only its class usage is sent)
+            analysis: Intent analysis result
+
+        Returns:
+            (brief text, tokens used)
+        """
+        classes = Counter(
+            token for value in CLASS_ATTRIBUTE.findall(full_html) for token in value.split()
+        )
+        prompt = f"""HTML 문서를 섹션별로 나누어 동시에 수정합니다.
+모든 섹션이 일관되게 수정되도록 섹션 작업자들이 공유할 짧은 스타일 가이드를 작성하세요.
+
+## 수정 요청
+"{message}"
+
+## 분석된 작업
+- 대상: {analysis.target_description}
+- 작업: {analysis.action_description}
+- 변경 유형: {analysis.change_type}
+
+## 문서에서 자주 쓰이는 클래스
+{", ".join(name for name, _ in classes.most_common(STYLE_BRIEF_CLASSES))}
+
+## 응답 형식
+구체적인 값(색상, 교체할 클래스, 폰트, 문구 규칙 등)만 5~10개 항목의 목록으로 작성하세요."""
+
+        result = await self.gemini.generate_content(
+            prompt=prompt,
+            temperature=0.3,
+            max_tokens=STYLE_BRIEF_MAX_TOKENS
+        )
+        return result["text"].strip(), result.get("tokens_used", 0)
+
+    async def _rewrite_unit(
+        self,
+        job: SectionRewriteJob,
+        index: int,
+        message: str,
+        full_html: str,
+        analysis: AnalysisResult,
+        semaphore: asyncio.Semaphore
+    ) -> Dict[str, str]:
+        """
+        Rewrite the sections of one unit
+
+        Failures are recorded on the job instead of raised, so the other
+        units still complete.
+
+        Args:
+            job: Rewrite job (brief, token and error accounting)
+            index: Unit index
+            message: User message
+            full_html: Full HTML document
+            analysis: Intent analysis result
+            semaphore: Bounds the calls in flight
+
+        Returns:
+            Section ID -> rewritten HTML for the sections returned intact
+        """
+        unit = job.units[index]
+        try:
+            prompt = self._build_section_rewrite_prompt(
+                message, analysis, job.brief, unit.html(full_html), unit.section_ids
+            )
+            async with semaphore:
+                result = await self.gemini.generate_content(
+                    prompt=prompt,
+                    temperature=0.5
+                )
+            job.tokens_used += result.get("tokens_used", 0)
+
+            found = read_sections(self._extract_html(result["text"]), unit.section_ids)
+            if len(found) < len(unit.sections):
+                logger.warning(f"Unit {index}: {len(found)}/{len(unit.sections)} sections returned intact")
+            return found
+
+        except Exception as e:
+            logger.error(f"Section rewrite failed for unit {index} ({', '.join(unit.section_ids)}): {e}")
+            job.errors.append(e)
+            return {}
+
+    def _sections_response(
+        self,
+        job: SectionRewriteJob,
+        modified_html: str,
+        replaced: int,
+        tokens_used: int,
+        start_time: float
+    ) -> ChatResponse:
+        """
+        FULL response of a section-parallel regeneration
+
+        Args:
+            job: Completed rewrite job
+            modified_html: Stitched document
+            replaced: Sections replaced
+            tokens_used: Tokens spent before the rewrite (edit script)
+            start_time: time.time() at the start of processing
+
+        Returns:
+            ChatResponse
+
+        Raises:
+            Exception: The first unit error if every unit failed
+        """
+        if job.errors and len(job.errors) == len(job.units):
+            raise job.errors[0]
+
+        message = "전체 HTML 수정 완료"
+        if replaced < len(job.spans):
+            message += f" ({replaced}/{len(job.spans)}개 섹션)"
+
+        return ChatResponse(
+            type=ChatResponseType.FULL,
+            html=modified_html,
+            message=message,
+            metadata={
+                "tokens_used": tokens_used + job.tokens_used,
+                "processing_time": time.time() - start_time,
+                "global_mode": "sections",
+                "sections": {
+                    "total": len(job.spans),
+                    "rewritten": replaced,
+                    "units": len(job.units),
+                    "failed_units": len(job.errors),
+                }
+            }
+        )
+
+    async def process_global_change(
+        self,
+        message: str,
+        full_html: str,
+        analysis: AnalysisResult,
+        document: Optional[BeautifulSoup] = None
     ) -> ChatResponse:
         """
         Process global change request
 
+        With GLOBAL_CHANGE_EDIT_SCRIPT the change is generated as an edit
+        script and returned as patches; the full document is regenerated
+        only if the script has no applicable edit - section by section
+        (GLOBAL_CHANGE_SECTION_PARALLEL) when it has several sections.
+
         Args:
             message: User message
             full_html: Full HTML document
             analysis: Intent analysis result
+            document: Current session DOM, read to check the edit script
+                (full_html is parsed if omitted)
 
         Returns:
-            ChatResponse with modified HTML
+            ChatResponse with patches or modified HTML
         """
         start_time = time.time()
 
@@ -136,6 +596,43 @@ class ModificationEngine:
             if analysis.change_type == ChangeType.TRANSLATION:
                 return await self._process_translation(message, full_html)
 
+            tokens_used = 0
+            if settings.GLOBAL_CHANGE_EDIT_SCRIPT:
+                if document is None:
+                    document = BeautifulSoup(full_html, 'html.parser')
+                result = await self.gemini.generate_content(
+                    prompt=self._build_edit_script_prompt(message, full_html, analysis),
+                    temperature=EDIT_SCRIPT_TEMPERATURE
+                )
+                tokens_used = result.get("tokens_used", 0)
+
+                parser = JSONStreamParser(array_key="edits")
+                edits = parser.feed(result["text"])
+                patches: List[Patch] = []
+                dropped = 0
+                for edit in edits:
+                    compiled = self._compile_edit(edit, document)
+                    dropped += not compiled
+                    patches.extend(compiled)
+
+                response = self._edit_script_response(
+                    parser, patches, len(edits), dropped, tokens_used, start_time
+                )
+                if response is not None:
+                    return response
+
+            if settings.GLOBAL_CHANGE_SECTION_PARALLEL:
+                job = await self._start_section_rewrite(message, full_html, analysis)
+                if job is not None:
+                    try:
+                        rewritten: Dict[str, str] = {}
+                        for found in await asyncio.gather(*job.tasks):
+                            rewritten.update(found)
+                    finally:
+                        job.cancel()
+                    modified_html, replaced = stitch(full_html, job.spans, rewritten)
+                    return self._sections_response(job, modified_html, replaced, tokens_used, start_time)
+
             # Build prompt for global modification
             prompt = self._build_global_change_prompt(message, full_html, analysis)
 
@@ -155,11 +652,15 @@ class ModificationEngine:
                 html=modified_html,
                 message="전체 HTML 수정 완료",
                 metadata={
-                    "tokens_used": result.get("tokens_used", 0),
-                    "processing_time": processing_time
+                    "tokens_used": tokens_used + result.get("tokens_used", 0),
+                    "processing_time": processing_time,
+                    "global_mode": "full"
                 }
             )
 
+        except asyncio.TimeoutError:
+            # Surfaces as 504 (routes/chat.py), not as an ERROR response
+            raise
         except Exception as e:
             logger.error(f"Global change processing failed: {e}", exc_info=True)
             processing_time = time.time() - start_time
@@ -168,6 +669,137 @@ class ModificationEngine:
                 processing_time
             )
 
+    async def stream_global_change(
+        self,
+        message: str,
+        full_html: str,
+        analysis: AnalysisResult,
+        document: Optional[BeautifulSoup] = None
+    ) -> AsyncIterator[Union[Patch, str, ChatResponse]]:
+        """
+        Process global change request, yielding the patches of the edit
+        script as each edit is parsed, or the new HTML in chunks as it is
+        generated when the document is regenerated
+
+        Translations are not streamed (the HTML is rebuilt server-side).
+
+        Args:
+            message: User message
+            full_html: Full HTML document
+            analysis: Intent analysis result
+            document: Current session DOM, read to check the edit script
+
+        Yields:
+            Patch objects (edit script) or HTML chunks (concatenated they
+            equal response.html), then the complete ChatResponse
+        """
+        if analysis.change_type == ChangeType.TRANSLATION:
+            yield await self.process_global_change(message, full_html, analysis)
+            return
+
+        start_time = time.time()
+
+        try:
+            tokens_used = 0
+            if settings.GLOBAL_CHANGE_EDIT_SCRIPT:
+                if document is None:
+                    document = BeautifulSoup(full_html, 'html.parser')
+                stream = self.gemini.generate_content_stream(
+                    prompt=self._build_edit_script_prompt(message, full_html, analysis),
+                    temperature=EDIT_SCRIPT_TEMPERATURE
+                )
+
+                parser = JSONStreamParser(array_key="edits")
+                patches: List[Patch] = []
+                edit_count = dropped = 0
+                async for chunk in stream:
+                    for edit in parser.feed(chunk):
+                        compiled = self._compile_edit(edit, document)
+                        edit_count += 1
+                        dropped += not compiled
+                        for patch in compiled:
+                            patches.append(patch)
+                            yield patch
+                tokens_used = stream.tokens_used
+
+                response = self._edit_script_response(
+                    parser, patches, edit_count, dropped, tokens_used, start_time
+                )
+                if response is not None:
+                    yield response
+                    return
+
+            if settings.GLOBAL_CHANGE_SECTION_PARALLEL:
+                job = await self._start_section_rewrite(message, full_html, analysis)
+                if job is not None:
+                    # Emit in document order as each section's unit completes
+                    parts: List[str] = []
+                    position = replaced = 0
+                    try:
+                        unit_of = job.unit_of()
+                        for span in job.spans:
+                            section_html = (await job.tasks[unit_of[span.section_id]]).get(span.section_id)
+                            if section_html is None:
+                                continue
+                            parts.append(full_html[position:span.start] + section_html)
+                            yield parts[-1]
+                            position = span.end
+                            replaced += 1
+                    finally:
+                        job.cancel()
+                    if position < len(full_html):
+                        parts.append(full_html[position:])
+                        yield parts[-1]
+                    yield self._sections_response(job, "".join(parts), replaced, tokens_used, start_time)
+                    return
+
+            prompt = self._build_global_change_prompt(message, full_html, analysis)
+            stream = self.gemini.generate_content_stream(
+                prompt=prompt,
+                temperature=0.5
+            )
+
+            # Same fence parsing as _extract_html (/chat): the start is found
+            # once, and only the text after what was emitted is scanned for
+            # the closing fence, so emitted text is a prefix of the result
+            html_start: Optional[int] = None
+            emitted = 0
+            async for _ in stream:
+                span = self._html_span(stream.text, final=False, start=html_start, search_from=emitted)
+                if span is None:
+                    continue
+                if html_start is None:
+                    html_start = emitted = span[0]
+                if span[1] > emitted:
+                    yield stream.text[emitted:span[1]]
+                    emitted = span[1]
+
+            span = self._html_span(stream.text, start=html_start, search_from=emitted)
+            modified_html = stream.text[span[0]:span[1]] if span is not None else ""
+            if span is not None and span[1] > max(emitted, span[0]):
+                yield stream.text[max(emitted, span[0]):span[1]]
+
+            yield ChatResponse(
+                type=ChatResponseType.FULL,
+                html=modified_html,
+                message="전체 HTML 수정 완료",
+                metadata={
+                    "tokens_used": tokens_used + stream.tokens_used,
+                    "processing_time": time.time() - start_time,
+                    "global_mode": "full"
+                }
+            )
+
+        except asyncio.TimeoutError:
+            # Surfaces as 504 (routes/chat.py), not as an ERROR response
+            raise
+        except Exception as e:
+            logger.error(f"Global change streaming failed: {e}", exc_info=True)
+            yield self._create_error_response(
+                f"전체 수정 처리 실패: {str(e)}",
+                time.time() - start_time
+            )
+
     async def process_query(
         self,
         message: str,
@@ -225,6 +857,9 @@ class ModificationEngine:
                 }
             )
 
+        except asyncio.TimeoutError:
+            # Surfaces as 504 (routes/chat.py), not as an ERROR response
+            raise
         except Exception as e:
             logger.error(f"Query processing failed: {e}", exc_info=True)
             processing_time = time.time() - start_time
@@ -277,8 +912,11 @@ class ModificationEngine:
         """
         Process translation request efficiently
 
-        Extracts text nodes and translates them separately
-        for better token efficiency.
+        Extracts text nodes and translates the unique ones: known
+        translations come from the translation memory, the rest is split
+        into token-budgeted chunks translated concurrently (id-keyed, so
+        every translation is matched to its source). Missing ids are
+        retried once; the HTML is rebuilt by replacing the text nodes.
 
         Args:
             message: User message
@@ -290,85 +928,99 @@ class ModificationEngine:
         start_time = time.time()
 
         try:
-            from bs4 import BeautifulSoup
-
             # Parse HTML
             soup = BeautifulSoup(full_html, 'html.parser')
 
-            # Extract all text nodes (non-empty)
-            text_nodes = []
-            for text in soup.find_all(string=True):
-                if text.strip() and text.parent.name not in ['script', 'style']:
-                    text_nodes.append(text.strip())
+            # Text nodes worth translating (no comments / doctype, not only digits or symbols)
+            text_nodes = [
+                text for text in soup.find_all(string=True)
+                if not isinstance(text, PreformattedString)
+                and text.parent.name not in ['script', 'style']
+                and any(char.isalpha() for char in text)
+            ]
 
             # Remove duplicates while preserving order
-            unique_texts = list(dict.fromkeys(text_nodes))
+            unique_texts = list(dict.fromkeys(text.strip() for text in text_nodes))
 
             if not unique_texts:
                 return self._create_error_response("번역할 텍스트가 없습니다")
 
-            # Build translation prompt
-            prompt = f"""다음 텍스트들을 번역하세요.
-
-요청: "{message}"
-
-텍스트 목록:
-{chr(10).join(f"{i+1}. {text}" for i, text in enumerate(unique_texts))}
-
-응답 형식 (JSON):
-{{
-    "translations": [
-        "번역된 텍스트 1",
-        "번역된 텍스트 2",
-        ...
-    ]
-}}
-
-주의: 순서를 정확히 유지하고, HTML 태그는 포함하지 마세요."""
-
-            # Call Gemini for translation
-            result = await self.gemini.generate_content(
-                prompt=prompt,
-                temperature=0.3
-            )
-
-            # Parse translation results
-            response_text = result["text"].strip()
-
-            # Remove markdown code blocks if present
-            if response_text.startswith("```"):
-                lines = response_text.split("\n")
-                response_text = "\n".join(lines[1:-1] if len(lines) > 2 else lines)
-
-            # Parse JSON
-            try:
-                translation_data = json.loads(response_text)
-                translations = translation_data.get("translations", [])
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse translation JSON: {e}")
-                translations = []
-
-            # Create text replacement mapping
-            text_map = {unique_texts[i]: translations[i]
-                       for i in range(min(len(unique_texts), len(translations)))}
-
-            # Replace text nodes in HTML
-            modified_html = full_html
-            for original, translated in text_map.items():
-                modified_html = modified_html.replace(original, translated)
+            # Reuse known translations (not when the target language is unclear)
+            target = target_language(message)
+            memory = get_translation_memory()
+            text_map = await memory.get_many(unique_texts, target) if target is not None else {}
+            memory_hits = len(text_map)
+
+            # Translate the rest in concurrent chunks (one retry for missing ids)
+            semaphore = asyncio.Semaphore(settings.TRANSLATION_MAX_CONCURRENCY)
+            translated: Dict[str, str] = {}
+            tokens_used = 0
+            chunk_count = 0
+            errors: List[Exception] = []
+            pending = [text for text in unique_texts if text not in text_map]
+            for _ in range(TRANSLATION_ROUNDS):
+                if not pending:
+                    break
+                chunks = self._translation_chunks(pending)
+                chunk_count += len(chunks)
+                results = await asyncio.gather(
+                    *(self._translate_chunk(message, chunk, semaphore) for chunk in chunks),
+                    return_exceptions=True
+                )
+                for result in results:
+                    if isinstance(result, BaseException):
+                        errors.append(result)
+                        continue
+                    chunk_map, chunk_tokens = result
+                    translated.update(chunk_map)
+                    tokens_used += chunk_tokens
+                pending = [text for text in pending if text not in translated]
+
+            if pending and not translated and not text_map:
+                raise errors[0] if errors else ValueError("번역 결과가 없습니다")
+            if pending:
+                logger.warning(f"{len(pending)}/{len(unique_texts)} texts left untranslated")
+
+            if target is not None:
+                await memory.put_many(translated, target)
+            text_map.update(translated)
+
+            # Replace text nodes (surrounding whitespace kept)
+            for text in text_nodes:
+                stripped = text.strip()
+                translation = text_map.get(stripped)
+                if translation is None or translation == stripped:
+                    continue
+                leading = text[:len(text) - len(text.lstrip())]
+                trailing = text[len(text.rstrip()):]
+                text.replace_with(leading + translation + trailing)
 
+            modified_html = str(soup)
             processing_time = time.time() - start_time
 
+            summary = f"{len(unique_texts) - len(pending)}개 텍스트 번역 완료"
+            if pending:
+                summary += f" ({len(pending)}개 실패)"
+
             return ChatResponse(
                 type=ChatResponseType.FULL,
                 html=modified_html,
-                message=f"{len(translations)}개 텍스트 번역 완료",
+                message=summary,
                 metadata={
-                    "tokens_used": result.get("tokens_used", 0),
-                    "processing_time": processing_time
+                    "tokens_used": tokens_used,
+                    "processing_time": processing_time,
+                    "translation": {
+                        "texts": len(unique_texts),
+                        "memory_hits": memory_hits,
+                        "chunks": chunk_count,
+                        "untranslated": len(pending),
+                    }
                 }
             )
 
+        except asyncio.TimeoutError:
+            # Surfaces as 504 (routes/chat.py), not as an ERROR response
+            raise
         except Exception as e:
             logger.error(f"Translation processing failed: {e}", exc_info=True)
             processing_time = time.time() - start_time
@@ -377,11 +1029,130 @@ class ModificationEngine:
                 processing_time
             )
 
+    def _translation_chunks(self, texts: List[str]) -> List[List[str]]:
+        """
+        Split texts into chunks of about TRANSLATION_CHUNK_TOKENS
+
+        A text larger than the budget gets a chunk of its own.
+
+        Args:
+            texts: Source texts in document order
+
+        Returns:
+            Chunks of texts (order preserved)
+        """
+        chunks: List[List[str]] = []
+        current: List[str] = []
+        current_tokens = 0
+        for text in texts:
+            tokens = estimate_tokens(text) + TRANSLATION_ITEM_OVERHEAD_TOKENS
+            if current and current_tokens + tokens > settings.TRANSLATION_CHUNK_TOKENS:
+                chunks.append(current)
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _translate_chunk(
+        self,
+        message: str,
+        texts: List[str],
+        semaphore: asyncio.Semaphore
+    ) -> Tuple[Dict[str, str], int]:
+        """
+        Translate one chunk of texts
+
+        Args:
+            message: User message
+            texts: Source texts of the chunk
+            semaphore: Bounds the chunks in flight
+
+        Returns:
+            (source text -> translation for the ids answered, tokens used)
+        """
+        prompt = self._build_translation_prompt(message, texts)
+        async with semaphore:
+            result = await self.gemini.generate_content(
+                prompt=prompt,
+                temperature=0.3
+            )
+
+        # Items of a truncated list that closed are kept
+        parser = JSONStreamParser(array_key="translations")
+        items = parser.feed(result["text"])
+        if not parser.done:
+            logger.warning(f"Translation response incomplete, {len(items)}/{len(texts)} translations parsed")
+
+        translations: Dict[str, str] = {}
+        for item in items:
+            if not isinstance(item, dict) or not isinstance(item.get("text"), str):
+                continue
+            try:
+                index = int(item.get("id")) - 1
+            except (TypeError, ValueError):
+                continue
+            if 0 <= index < len(texts):
+                translations[texts[index]] = item["text"]
+
+        return translations, result.get("tokens_used", 0)
+
+    def _build_translation_prompt(self, message: str, texts: List[str]) -> str:
+        """
+        Build prompt for one translation chunk
+
+        Args:
+            message: User message
+            texts: Source texts (ids are 1-based positions)
+
+        Returns:
+            Formatted prompt
+        """
+        source = json.dumps(
+            [{"id": i + 1, "text": text} for i, text in enumerate(texts)],
+            ensure_ascii=False,
+            indent=0
+        )
+        return f"""다음 텍스트들을 번역하세요.
+
+요청: "{message}"
+
+텍스트 목록 (JSON):
+{source}
+
+응답 형식 (JSON):
+{{
+    "translations": [
+        {{"id": 1, "text": "번역된 텍스트"}},
+        {{"id": 2, "text": "번역된 텍스트"}},
+        ...
+    ]
+}}
+
+주의: 모든 id를 한 번씩 그대로 포함하고, HTML 태그는 포함하지 마세요."""
+
+    def _compress_context(self, message: str, context: Dict[str, str]) -> CompressedContext:
+        """
+        Collapse repeated rows of local-change sections
+
+        Args:
+            message: User message (rows it names stay visible)
+            context: Section ID -> HTML mapping
+
+        Returns:
+            CompressedContext (unchanged sections if disabled)
+        """
+        if not settings.CONTEXT_REPEAT_COMPRESSION:
+            return CompressedContext(sections=context)
+        return compress_context(context, message)
+
     def _build_local_change_prompt(
         self,
         message: str,
         context: Dict[str, str],
-        analysis: AnalysisResult
+        analysis: AnalysisResult,
+        runs: Optional[Dict[str, RepeatRun]] = None
     ) -> str:
         """
         Build prompt for local change
@@ -390,24 +1161,18 @@ class ModificationEngine:
             message: User message
             context: Section HTML mapping
             analysis: Analysis result
+            runs: Repeated-row runs collapsed in context
 
         Returns:
             Prompt string
         """
-        # Build HTML sections string
-        html_sections = "\n\n".join(
-            f"## Section: {section_id}\n{html}"
-            for section_id, html in context.items()
-        )
+        html_sections = self._format_sections(context)
+        if runs:
+            html_sections += f"\n\n{REPEAT_NOTES}"
 
         prompt = f"""HTML 섹션을 수정하세요.
 
-## 🎯 가장 중요한 규칙
-**사용자가 지정한 값을 절대 변경하지 마세요!**
-- 사용자가 "빨간색"이라고 하면 → 반드시 "red" 사용 (orange, crimson 금지)
-- 사용자가 "파란색"이라고 하면 → 반드시 "blue" 사용
-- 사용자가 "20px"라고 하면 → 반드시 "20px" 사용
-- 사용자가 특정 텍스트를 지정하면 → 그대로 사용
+{VALUE_RULES}
 
 ## 수정 요청
 "{message}"
@@ -426,7 +1191,7 @@ class ModificationEngine:
     "patches": [
         {{
             "selector": "CSS 선택자 (예: #header, .button, div.card)",
-            "action": "addClass|removeClass|replaceClass|setText|setHtml|setAttribute|removeAttribute|setStyle|removeElement|appendChild|prependChild",
+            "action": "{PATCH_ACTIONS}",
             "oldValue": "기존 값 (setText, replaceClass 등에서 사용)",
             "newValue": "새 값",
             "value": "적용할 값 (단일 값인 경우)"
@@ -435,14 +1200,127 @@ class ModificationEngine:
     "summary": "수정 내용 요약"
 }}
 
-주의사항:
-1. selector는 반드시 유효한 CSS 선택자여야 함
-2. setStyle: value에 "속성명: 값" 형식 (예: "background-color: red")
-3. setText/setHtml: newValue에 새 내용
-4. 여러 요소를 수정해야 하면 patches 배열에 여러 항목 포함"""
+{PATCH_NOTES}"""
 
         return prompt
 
+    def _format_sections(self, context: Dict[str, str]) -> str:
+        """
+        Format section HTML for prompts
+
+        Args:
+            context: Section ID -> HTML mapping
+
+        Returns:
+            Sections string
+        """
+        return "\n\n".join(
+            f"## Section: {section_id}\n{html}"
+            for section_id, html in context.items()
+        )
+
+    def _build_edit_script_prompt(
+        self,
+        message: str,
+        full_html: str,
+        analysis: AnalysisResult
+    ) -> str:
+        """
+        Build prompt for a global change as an edit script
+
+        Args:
+            message: User message
+            full_html: Full HTML
+            analysis: Analysis result
+
+        Returns:
+            Prompt string
+        """
+        return f"""전체 HTML 문서에 적용할 수정을 편집 스크립트(JSON)로 작성하세요.
+문서 전체를 다시 작성하지 말고, 변경에 필요한 편집만 반환하세요.
+
+## 현재 HTML
+{full_html}
+
+## 수정 요청
+"{message}"
+
+## 분석된 작업
+- 대상: {analysis.target_description}
+- 작업: {analysis.action_description}
+- 변경 유형: {analysis.change_type}
+
+{VALUE_RULES}
+
+## 편집 종류
+1. css: 문서에 추가할 CSS 규칙 (테마, 색상, 폰트 등 여러 요소에 걸친 스타일)
+   {{"type": "css", "css": "h1, h2 {{ color: red; }}"}}
+2. classMap: 문서 전체에서 클래스 교체 (Tailwind 클래스 변경에 우선 사용)
+   {{"type": "classMap", "from": "bg-blue-500", "to": "bg-red-500"}}
+3. patch: 특정 요소 수정 (선택자 기준)
+   {{"type": "patch", "selector": "CSS 선택자", "action": "{PATCH_ACTIONS}", "oldValue": "기존 값", "newValue": "새 값", "value": "적용할 값"}}
+
+## 응답 형식 (JSON)
+{{
+    "edits": [ ... ],
+    "summary": "변경 사항 요약 (한국어, 1문장)"
+}}
+
+편집으로 표현할 수 없는 변경(문서 전체 구조 재작성 등)이면 다음을 반환하세요:
+{{"edits": [], "fullRegeneration": true, "summary": ""}}
+
+{PATCH_NOTES}
+5. 이 응답에서는 patch도 edits 배열에 "type": "patch" 항목으로 작성
+6. classMap의 from은 문서에 실제로 있는 클래스 하나여야 함"""
+
+    def _build_section_rewrite_prompt(
+        self,
+        message: str,
+        analysis: AnalysisResult,
+        brief: str,
+        sections_html: str,
+        section_ids: List[str]
+    ) -> str:
+        """
+        Build prompt for rewriting one unit of sections
+
+        Args:
+            message: User message
+            analysis: Analysis result
+            brief: Style brief shared by all units
+            sections_html: HTML of the unit's sections
+            section_ids: Section IDs of the unit (document order)
+
+        Returns:
+            Prompt string
+        """
+        return f"""다음 HTML 섹션들을 수정하세요.
+문서 전체를 여러 섹션 묶음으로 나누어 동시에 수정하고 있으므로, 아래 스타일 가이드를 반드시 따르세요.
+
+## 스타일 가이드 (모든 섹션 공통)
+{brief}
+
+## 수정 요청
+"{message}"
+
+## 분석된 작업
+- 대상: {analysis.target_description}
+- 작업: {analysis.action_description}
+- 변경 유형: {analysis.change_type}
+
+## 섹션 HTML
+{sections_html}
+
+## 응답 형식
+수정된 섹션 HTML만 같은 순서로 반환하세요 ({", ".join(section_ids)}).
+마크다운 코드 블록으로 감싸도 좋습니다.
+
+주의사항:
+1. 각 섹션의 루트 요소와 data-section-id 속성은 그대로 유지
+2. 섹션 밖의 HTML(DOCTYPE, head, body 등)은 작성하지 말 것
+3. 기존 ID와 클래스는 가능한 유지
+4. 요청된 변경사항만 적용"""
+
     def _build_global_change_prompt(
         self,
         message: str,
@@ -490,59 +1368,77 @@ class ModificationEngine:
         """
         Parse patches and summary from LLM response
 
+        Uses the incremental parser, so patches that closed before a
+        truncated or malformed ending are kept.
+
         Args:
             response_text: Raw response
 
         Returns:
             Tuple of (List of Patch objects, summary string)
         """
-        # Remove markdown code blocks if present
-        text = response_text.strip()
-        if text.startswith("```"):
-            lines = text.split("\n")
-            # Remove first line (```json or ```) and last line (```)
-            text = "\n".join(lines[1:-1] if len(lines) > 2 else lines)
-            text = text.strip()
+        parser = JSONStreamParser(array_key="patches")
+        patches_data = parser.feed(response_text)
+        return self._build_patches(patches_data), self._patch_summary(parser, len(patches_data))
 
-        # Parse JSON
-        try:
-            data = json.loads(text)
-            patches_data = data.get("patches", [])
-            summary = data.get("summary", "")
-
-            # Convert to Patch objects
-            patches = []
-            for patch_dict in patches_data:
-                # Validate required fields
-                if "selector" not in patch_dict or "action" not in patch_dict:
-                    logger.warning(f"Invalid patch (missing selector or action): {patch_dict}")
-                    continue
+    def _patch_summary(self, parser: JSONStreamParser, patch_count: int) -> str:
+        """
+        Summary of a parsed patch response (logs incomplete responses)
 
-                try:
-                    patch = Patch(
-                        selector=patch_dict["selector"],
-                        action=PatchAction(patch_dict["action"]),
-                        old_value=patch_dict.get("oldValue"),
-                        new_value=patch_dict.get("newValue"),
-                        value=patch_dict.get("value")
-                    )
-                    patches.append(patch)
-                except (ValueError, KeyError) as e:
-                    logger.warning(f"Failed to create patch from {patch_dict}: {e}")
-                    continue
+        Args:
+            parser: Parser that consumed the whole response
+            patch_count: Number of closed "patches" elements
 
-            return patches, summary
+        Returns:
+            Summary string ("" if missing)
+        """
+        data = parser.result(repair=True)
+        if not isinstance(data, dict):
+            logger.error(f"Failed to parse patches JSON: {parser.text[:500]}")
+            return ""
+        if parser.repaired:
+            logger.warning(f"Patch response truncated, keeping {patch_count} closed patches")
+        return data.get("summary") or ""
+
+    def _build_patches(self, patches_data: List[Dict[str, Any]]) -> List[Patch]:
+        """
+        Convert patch dicts (camelCase keys) to Patch objects
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse patches JSON: {e}")
-            logger.error(f"Response text: {text[:500]}")
-            return [], ""
+        Invalid entries are logged and skipped.
+
+        Args:
+            patches_data: "patches" array from the LLM response
+
+        Returns:
+            List of Patch objects
+        """
+        patches = []
+        for patch_dict in patches_data:
+            # Validate required fields
+            if "selector" not in patch_dict or "action" not in patch_dict:
+                logger.warning(f"Invalid patch (missing selector or action): {patch_dict}")
+                continue
+
+            try:
+                patch = Patch(
+                    selector=patch_dict["selector"],
+                    action=PatchAction(patch_dict["action"]),
+                    old_value=patch_dict.get("oldValue"),
+                    new_value=patch_dict.get("newValue"),
+                    value=patch_dict.get("value")
+                )
+                patches.append(patch)
+            except (ValueError, KeyError) as e:
+                logger.warning(f"Failed to create patch from {patch_dict}: {e}")
+                continue
+
+        return patches
 
     def _extract_html(self, response_text: str) -> str:
         """
         Extract HTML from LLM response
 
-        Remove markdown code blocks if present.
+        Remove markdown code blocks if present (see _html_span).
 
         Args:
             response_text: Raw response
@@ -550,21 +1446,82 @@ class ModificationEngine:
         Returns:
             Clean HTML string
         """
-        text = response_text.strip()
+        span = self._html_span(response_text)
+        return response_text[span[0]:span[1]] if span is not None else ""
 
-        # Remove markdown code blocks
-        # Pattern 1: ```html ... ```
-        # Pattern 2: ``` ... ```
-        if text.startswith("```"):
-            lines = text.split("\n")
-            # Remove first line and last line
-            if len(lines) > 2:
-                text = "\n".join(lines[1:-1])
-            else:
-                text = "\n".join(lines)
-            text = text.strip()
+    def _html_start(self, text: str) -> Optional[int]:
+        """
+        Offset where the HTML of a response starts
+
+        Skips leading whitespace, an opening ```html line and the
+        whitespace after it.
 
-        return text
+        Args:
+            text: Response text so far
+
+        Returns:
+            Offset, or None while the start is not known yet (only
+            whitespace or an unfinished fence line so far)
+        """
+        start = len(text) - len(text.lstrip())
+        if "```".startswith(text[start:start + 3]):
+            newline = text.find("\n", start)
+            if newline < 0:
+                return None
+            start = newline + 1
+            start += len(text[start:]) - len(text[start:].lstrip())
+        return start if start < len(text) else None
+
+    def _html_span(
+        self,
+        text: str,
+        final: bool = True,
+        start: Optional[int] = None,
+        search_from: int = 0
+    ) -> Optional[Tuple[int, int]]:
+        """
+        Where the HTML of a (possibly fenced) response lies
+
+        The one fence parser behind _extract_html (/chat) and the global
+        change stream (/chat/stream), so the same output gives the same
+        HTML on both. The HTML starts after an opening ```html line and
+        ends at the closing fence line; text after the closing fence (a
+        note from the model) is dropped. Without a closing fence the HTML
+        runs to the end, minus a trailing ``` on its last line.
+
+        Args:
+            text: Response text (so far)
+            final: False while streaming: trailing whitespace and backticks
+                are held back, as they may begin the closing fence
+            start: HTML start found by an earlier call on the same stream
+            search_from: Offset to look for the closing fence from (what a
+                stream has emitted holds no fence)
+
+        Returns:
+            (start, end) offsets into text, or None while the HTML has not
+            started
+        """
+        if start is None:
+            start = self._html_start(text)
+            if start is None:
+                return None
+
+        fenced = text[:start].lstrip().startswith("`")
+        end = len(text)
+        if fenced:
+            # The fence's newline may be the one just before the HTML start
+            fence = CLOSING_FENCE.search(text, max(start, search_from) - 1)
+            if fence is not None:
+                end, final = max(fence.start(), start), True
+
+        held_back = " \t\r\n" if final else HELD_BACK_CHARS
+        while end > start and text[end - 1] in held_back:
+            end -= 1
+        if final and fenced and text.endswith("```", start, end):
+            end -= 3
+            while end > start and text[end - 1] in held_back:
+                end -= 1
+        return start, end
 
     def _create_error_response(
         self,
@@ -0,0 +1,180 @@
+"""
+Local Change Patch Cache
+
+Responsibilities:
+- Reuse generated patches when the same request is made on identical
+  sections (pages built from the same component templates)
+- Only store patches whose selectors resolved when they were generated
+- Re-check selectors against the current DOM on every hit
+
+Dependencies:
+- beautifulsoup4 (soupsieve for CSS selectors)
+- app.models.chat (Patch)
+- app.services.intent_cache (normalize_message)
+
+Implementation Notes:
+- Content-addressed key: normalized message, sorted md5 hashes of the
+  context section HTML, model and temperature - any edit to a section
+  changes its hash, so stale patches are never looked up
+- Section IDs are part of the hashed HTML, so cached selectors refer to
+  the same section attributes they were generated for
+- A hit whose selectors no longer all resolve is dropped and counted as
+  rejected; the caller regenerates the patches
+- In-process LRU only (like DocumentCache); no TTL since the key pins
+  the exact input of the generation
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+import hashlib
+import logging
+
+from bs4 import BeautifulSoup
+
+from app.models.chat import Patch
+from app.services.intent_cache import normalize_message
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CachedPatches:
+    """Validated patches of one local change"""
+    patches: List[Patch]
+    summary: str
+
+
+def patch_cache_key(message: str, context: Dict[str, str], model: str, temperature: float) -> str:
+    """
+    Cache key for a local change request
+
+    Args:
+        message: User message
+        context: Section ID -> HTML mapping given to the model
+        model: Generation model name
+        temperature: Sampling temperature
+
+    Returns:
+        Hex digest identifying the generation input
+    """
+    section_hashes = sorted(hashlib.md5(html.encode("utf-8")).hexdigest() for html in context.values())
+    raw = "\x00".join([normalize_message(message), ",".join(section_hashes), model, f"{temperature:g}"])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def selectors_resolve(patches: List[Patch], soup: BeautifulSoup) -> bool:
+    """
+    Whether every patch selector matches at least one element
+
+    Args:
+        patches: Patches to check
+        soup: Document (or section fragments) the patches target
+
+    Returns:
+        True if all selectors are valid and match
+    """
+    for patch in patches:
+        try:
+            if soup.select_one(patch.selector) is None:
+                return False
+        except Exception:
+            # Invalid CSS selector
+            return False
+    return True
+
+
+class PatchCache:
+    """
+    Deterministic patch cache (LRU)
+
+    Usage:
+        cache = get_patch_cache()
+        key = patch_cache_key(message, context, model, temperature)
+        cached = cache.get(key, soup)  # None on a miss or unresolved selectors
+        cache.put(key, patches, summary, soup)
+    """
+
+    _instance: Optional["PatchCache"] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        """Initialize cache state from settings"""
+        self._entries: "OrderedDict[str, CachedPatches]" = OrderedDict()
+        self.max_entries = settings.PATCH_CACHE_MAX_ENTRIES
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "rejected": 0, "stores": 0, "evictions": 0}
+
+    def get(self, key: str, soup: BeautifulSoup) -> Optional[CachedPatches]:
+        """
+        Get cached patches if their selectors resolve in the current DOM
+
+        Args:
+            key: Cache key (patch_cache_key())
+            soup: Current DOM the patches will be applied to
+
+        Returns:
+            CachedPatches or None
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+
+        if not selectors_resolve(entry.patches, soup):
+            del self._entries[key]
+            self._stats["rejected"] += 1
+            logger.info("Cached patches no longer resolve against the DOM, regenerating")
+            return None
+
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry
+
+    def put(self, key: str, patches: List[Patch], summary: str, soup: BeautifulSoup) -> bool:
+        """
+        Cache patches if they are valid against the DOM they were made for
+
+        Args:
+            key: Cache key (patch_cache_key())
+            patches: Generated patches
+            summary: Summary message of the generation
+            soup: DOM the patches were generated against
+
+        Returns:
+            True if stored
+        """
+        if not patches or not selectors_resolve(patches, soup):
+            return False
+
+        self._entries[key] = CachedPatches(patches=list(patches), summary=summary)
+        self._entries.move_to_end(key)
+        self._stats["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+        return True
+
+    def clear(self):
+        """Drop all cached patches"""
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics"""
+        lookups = self._stats["hits"] + self._stats["misses"] + self._stats["rejected"]
+        return {
+            **self._stats,
+            "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+# Singleton instance getter
+def get_patch_cache() -> PatchCache:
+    """Get patch cache singleton"""
+    return PatchCache()
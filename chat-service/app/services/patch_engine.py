@@ -0,0 +1,453 @@
+"""
+Patch Engine
+
+Responsibilities:
+- Apply Patch lists (the same ones sent to the frontend) to the session DOM
+- Re-serialize only the sections touched by the patches
+- Splice those sections into current_html and update the section features
+
+Dependencies:
+- beautifulsoup4 (soupsieve for CSS selectors)
+- app.services.section_extractor (SectionExtractor)
+- app.models.chat (Patch, PatchAction)
+- app.models.ast (SectionFeatures)
+
+Implementation Notes:
+- Action semantics follow applyPatches() in lib/patch-utils.ts (JSDOM):
+  `value || newValue` precedence, "attr=value" / JSON attribute values,
+  "prop: value; ..." / JSON style values, all matches of the selector
+- Serialization follows the HTML serializer used by JSDOM: void elements
+  without "/", attributes in source order and always double-quoted,
+  & < > and nbsp escaped
+- A patch touches the outermost data-section-id ancestor of each matched
+  element; everything outside touched sections is kept byte for byte
+- Features of a touched section (and of sections nested in it) are
+  rebuilt from the new section HTML only; the other features just shift
+- Falls back to serializing the whole document when a patch touches
+  content outside any section or section offsets are unknown
+- The given soup is modified in place (pass the cached session DOM)
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+import json
+import logging
+
+from bs4 import BeautifulSoup, Tag
+from bs4.formatter import HTMLFormatter
+
+from app.models.ast import SectionFeatures
+from app.models.chat import Patch, PatchAction
+from app.services.section_extractor import SectionExtractor
+
+logger = logging.getLogger(__name__)
+
+
+class DOMSerializationFormatter(HTMLFormatter):
+    """Serialize like the HTML fragment serialization algorithm (JSDOM)"""
+
+    TEXT_ESCAPES = {"&": "&amp;", "<": "&lt;", ">": "&gt;", "\xa0": "&nbsp;"}
+    ATTRIBUTE_ESCAPES = {"&": "&amp;", '"': "&quot;", "\xa0": "&nbsp;"}
+
+    def __init__(self):
+        super().__init__(entity_substitution=self._escape_text, void_element_close_prefix=None)
+
+    @classmethod
+    def _escape(cls, value: str, escapes: Dict[str, str]) -> str:
+        for char, entity in escapes.items():
+            if char in value:
+                value = value.replace(char, entity)
+        return value
+
+    @classmethod
+    def _escape_text(cls, value: str) -> str:
+        return cls._escape(value, cls.TEXT_ESCAPES)
+
+    def attributes(self, tag):
+        # Source order (bs4 sorts attributes by default)
+        return list(tag.attrs.items()) if tag.attrs else []
+
+    def attribute_value(self, value: str) -> str:
+        # Quotes are escaped, so bs4 always wraps the value in double quotes
+        return self._escape(value, self.ATTRIBUTE_ESCAPES)
+
+
+DOM_FORMATTER = DOMSerializationFormatter()
+
+
+def serialize(element) -> str:
+    """Outer HTML of an element (or a whole document)"""
+    return element.decode(formatter=DOM_FORMATTER)
+
+
+@dataclass
+class PatchResult:
+    """Result of applying patches to a document"""
+    html: str
+    soup: BeautifulSoup
+    features: List[SectionFeatures]
+    applied: int = 0                                         # Patches that matched and applied
+    failed: List[str] = field(default_factory=list)          # "selector: reason" per failed patch
+    touched_sections: List[str] = field(default_factory=list)
+    full_serialization: bool = False                         # Whole document was re-serialized
+
+
+class PatchEngine:
+    """
+    Apply patches to a parsed document and update it incrementally
+
+    Usage:
+        engine = PatchEngine()
+        document = get_document_cache().get_or_parse(session_id, current_html)
+        result = engine.apply(current_html, patches, document.soup, document.features)
+        # result.html - new current_html
+        # result.features - section features of result.html
+    """
+
+    def __init__(self):
+        """Initialize patch engine"""
+        self.extractor = SectionExtractor()
+
+    def apply(
+        self,
+        html: str,
+        patches: List[Patch],
+        soup: Optional[BeautifulSoup] = None,
+        features: Optional[List[SectionFeatures]] = None
+    ) -> PatchResult:
+        """
+        Apply patches and return the new HTML and section features
+
+        Args:
+            html: Current HTML (the source of soup and features)
+            patches: Patches to apply, in order
+            soup: Parsed html, modified in place (parsed from html if omitted)
+            features: Section features of html (built from html if omitted)
+
+        Returns:
+            PatchResult
+        """
+        if soup is None:
+            soup = self.extractor.parse_document(html)
+        if features is None:
+            features = self.extractor.build_section_features(html, soup=soup)
+
+        result = PatchResult(html=html, soup=soup, features=features)
+
+        # Outermost touched section elements, in the order first touched
+        touched: List[Tag] = []
+        outside_sections = False
+
+        for patch in patches:
+            try:
+                elements = soup.select(patch.selector)
+            except Exception as e:
+                result.failed.append(f"{patch.selector}: invalid selector ({e})")
+                continue
+
+            if not elements:
+                logger.warning(f"No elements found for selector: {patch.selector}")
+                result.failed.append(f"{patch.selector}: no match")
+                continue
+
+            # Sections are resolved before the patch detaches anything
+            for element in elements:
+                section = self._outermost_section(element)
+                if section is None:
+                    outside_sections = True
+                elif not any(section is seen for seen in touched):
+                    touched.append(section)
+
+            try:
+                for element in elements:
+                    self._apply_to_element(soup, element, patch)
+                result.applied += 1
+            except Exception as e:
+                logger.warning(f"Failed to apply patch: {patch.selector} ({e})")
+                result.failed.append(f"{patch.selector}: {e}")
+
+        if not touched and not outside_sections:
+            return result
+
+        result.touched_sections = [section.get('data-section-id') for section in touched]
+
+        spliced = None if outside_sections else self._splice_sections(html, features, touched)
+        if spliced is None:
+            # Patched content outside the known sections: serialize everything
+            result.html = serialize(soup)
+            result.soup = self.extractor.parse_document(result.html)
+            result.features = self.extractor.build_section_features(result.html, soup=result.soup)
+            result.full_serialization = True
+        else:
+            result.html, result.features = spliced
+
+        return result
+
+    def _splice_sections(
+        self,
+        html: str,
+        features: List[SectionFeatures],
+        touched: List[Tag]
+    ) -> Optional[Tuple[str, List[SectionFeatures]]]:
+        """
+        Replace the spans of touched sections with their new HTML
+
+        Args:
+            html: Current HTML
+            features: Section features of html
+            touched: Outermost section elements changed by the patches
+
+        Returns:
+            (new HTML, new features), or None if a section cannot be located
+        """
+        if any(feature.start is None or feature.end is None for feature in features):
+            return None
+
+        by_id: Dict[str, Optional[SectionFeatures]] = {}
+        for feature in features:
+            if feature.section_id in by_id:
+                # Duplicate IDs: the feature of an element is ambiguous
+                by_id[feature.section_id] = None
+            else:
+                by_id[feature.section_id] = feature
+
+        replacements = []  # (old start, old end, new section HTML)
+        for section in touched:
+            feature = by_id.get(section.get('data-section-id'))
+            if feature is None:
+                return None
+            new_html = serialize(section) if self._is_attached(section) else ""
+            replacements.append((feature.start, feature.end, new_html))
+        replacements.sort(key=lambda replacement: replacement[0])
+
+        parts: List[str] = []
+        new_features: List[SectionFeatures] = []
+        cursor = 0       # Position in the old HTML
+        shift = 0        # New offset - old offset after the last replacement
+        remaining = iter(features)
+        pending = next(remaining, None)
+
+        for start, end, section_html in replacements:
+            # Untouched sections before this one only move
+            while pending is not None and pending.start < start:
+                new_features.append(self._shifted(pending, shift))
+                pending = next(remaining, None)
+            # Sections inside the old span are rebuilt from the new HTML
+            while pending is not None and pending.start < end:
+                pending = next(remaining, None)
+
+            parts.append(html[cursor:start])
+            new_start = start + shift
+            if section_html:
+                for feature in self.extractor.build_section_features(section_html):
+                    new_features.append(self._shifted(feature, new_start))
+            parts.append(section_html)
+
+            cursor = end
+            shift += len(section_html) - (end - start)
+
+        while pending is not None:
+            new_features.append(self._shifted(pending, shift))
+            pending = next(remaining, None)
+        parts.append(html[cursor:])
+
+        for position, feature in enumerate(new_features):
+            feature.position = position
+
+        return "".join(parts), new_features
+
+    @staticmethod
+    def _shifted(feature: SectionFeatures, shift: int) -> SectionFeatures:
+        """Copy of a feature with its offsets moved by shift"""
+        return feature.model_copy(update={
+            "start": feature.start + shift if feature.start is not None else None,
+            "end": feature.end + shift if feature.end is not None else None,
+        })
+
+    @staticmethod
+    def _outermost_section(element: Tag) -> Optional[Tag]:
+        """Outermost ancestor-or-self carrying data-section-id"""
+        section = None
+        current = element
+        while isinstance(current, Tag) and not isinstance(current, BeautifulSoup):
+            if current.get('data-section-id'):
+                section = current
+            current = current.parent
+        return section
+
+    @staticmethod
+    def _is_attached(element: Tag) -> bool:
+        """Whether the element is still part of the document"""
+        current = element
+        while current.parent is not None:
+            current = current.parent
+        return isinstance(current, BeautifulSoup)
+
+    def _apply_to_element(self, soup: BeautifulSoup, element: Tag, patch: Patch):
+        """
+        Apply one patch to one element (same rules as applyPatch in patch-utils.ts)
+
+        Raises:
+            ValueError: If a class token is empty (classList throws on "")
+        """
+        action = patch.action
+        # `patch.value || patch.newValue` (empty strings fall through)
+        value = patch.value or patch.new_value
+
+        if action == PatchAction.ADD_CLASS:
+            if patch.new_value:
+                self._add_classes(element, self._class_tokens(patch.new_value))
+
+        elif action == PatchAction.REMOVE_CLASS:
+            if patch.old_value:
+                self._remove_classes(element, self._class_tokens(patch.old_value))
+
+        elif action == PatchAction.REPLACE_CLASS:
+            if patch.old_value and patch.new_value:
+                self._remove_classes(element, self._class_tokens(patch.old_value))
+                self._add_classes(element, self._class_tokens(patch.new_value))
+
+        elif action == PatchAction.SET_TEXT:
+            if value is not None:
+                element.clear()
+                element.append(value)
+
+        elif action == PatchAction.SET_HTML:
+            if value is not None:
+                element.clear()
+                self._insert_fragment(element, value, append=True)
+
+        elif action == PatchAction.SET_ATTRIBUTE:
+            if value is not None:
+                attributes = self._parse_json_entries(value)
+                if attributes is None:
+                    # "attr=value" format
+                    name, _, attr_value = value.partition("=")
+                    attributes = [(name, attr_value)]
+                for name, attr_value in attributes:
+                    self._set_attribute(element, name, attr_value)
+
+        elif action == PatchAction.REMOVE_ATTRIBUTE:
+            name = patch.value or patch.old_value
+            if name:
+                del element[name.strip().lower()]
+
+        elif action == PatchAction.SET_STYLE:
+            if value is not None:
+                styles = self._parse_json_entries(value)
+                if styles is None:
+                    # CSS format: "prop: value; prop: value"
+                    styles = []
+                    for declaration in value.split(";"):
+                        prop, separator, prop_value = declaration.partition(":")
+                        if prop and separator:
+                            styles.append((prop, prop_value))
+                self._set_styles(element, styles)
+
+        elif action == PatchAction.REMOVE_ELEMENT:
+            element.extract()
+
+        elif action == PatchAction.APPEND_CHILD:
+            if value:
+                self._insert_fragment(element, value, append=True)
+
+        elif action == PatchAction.PREPEND_CHILD:
+            if value:
+                self._insert_fragment(element, value, append=False)
+
+        else:
+            logger.warning(f"Unknown action: {action}")
+
+    @staticmethod
+    def _class_tokens(value: str) -> List[str]:
+        """Split like value.split(' '); classList rejects empty tokens"""
+        tokens = value.split(" ")
+        if "" in tokens:
+            raise ValueError(f"empty class token in {value!r}")
+        return tokens
+
+    @staticmethod
+    def _add_classes(element: Tag, tokens: List[str]):
+        classes = list(element.get('class') or [])
+        for token in tokens:
+            if token not in classes:
+                classes.append(token)
+        element['class'] = classes
+
+    @staticmethod
+    def _remove_classes(element: Tag, tokens: List[str]):
+        if not element.has_attr('class'):
+            return
+        element['class'] = [css_class for css_class in element.get('class') or [] if css_class not in tokens]
+
+    @staticmethod
+    def _set_attribute(element: Tag, name: str, value):
+        """setAttribute(): lower-cased name, value converted like a JS string"""
+        name = name.lower()
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        elif value is None:
+            value = "null"
+        elif not isinstance(value, str):
+            value = json.dumps(value) if isinstance(value, (int, float)) else str(value)
+
+        if name == 'class':
+            element['class'] = value.split()
+        else:
+            element[name] = value
+
+    @staticmethod
+    def _set_styles(element: Tag, styles: List[Tuple[str, object]]):
+        """style.setProperty() per entry; an empty value removes the property"""
+        declarations: Dict[str, str] = {}
+        for declaration in (element.get('style') or "").split(";"):
+            prop, separator, prop_value = declaration.partition(":")
+            if separator and prop.strip():
+                declarations[prop.strip().lower()] = prop_value.strip()
+
+        for prop, prop_value in styles:
+            prop = prop.strip().lower()
+            prop_value = str(prop_value).strip()
+            if not prop:
+                continue
+            if prop_value:
+                declarations[prop] = prop_value
+            else:
+                declarations.pop(prop, None)
+
+        if declarations:
+            element['style'] = " ".join(f"{prop}: {prop_value};" for prop, prop_value in declarations.items())
+        elif element.has_attr('style'):
+            element['style'] = ""
+
+    @staticmethod
+    def _parse_json_entries(value: str) -> Optional[List[Tuple[str, object]]]:
+        """
+        Object.entries(JSON.parse(value))
+
+        Returns:
+            (key, value) entries, or None where the TypeScript code falls
+            back to the plain-text format (invalid JSON or null)
+        """
+        try:
+            data = json.loads(value)
+        except ValueError:
+            return None
+        if data is None:
+            return None
+        if isinstance(data, dict):
+            return list(data.items())
+        if isinstance(data, (str, list)):
+            return [(str(index), item) for index, item in enumerate(data)]
+        return []
+
+    def _insert_fragment(self, element: Tag, html: str, append: bool):
+        """Parse an HTML fragment and add its nodes as children of element"""
+        fragment = self.extractor.parse_document(html)
+        nodes = list(fragment.contents)
+        if append:
+            for node in nodes:
+                element.append(node.extract())
+        else:
+            for offset, node in enumerate(nodes):
+                element.insert(offset, node.extract())
@@ -8,14 +8,24 @@ Features:
 - 키워드 기반 매칭 (버튼, 헤더, 테이블 등)
 - 요소 타입 기반 매칭 (button, h1, table 등)
 - CSS 클래스 기반 매칭
+- 섹션 특징(SectionFeatures)을 한 번 계산해 저장, 이후 DOM 없이 점수 계산
+- 키워드 → 섹션 역색인(SectionIndex)으로 매칭 가능한 섹션만 점수 계산
+- 요청 키워드는 Aho–Corasick 매처로 한 번에 매칭 (RequestMatch 공유)
 """
 
 import re
+import hashlib
 import logging
 from typing import List, Dict, Optional, Tuple
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag, NavigableString, CData
 from dataclasses import dataclass
 
+from app.models.ast import SectionFeatures
+from app.services.context_packer import pack_context
+from app.services.source_spans import SourceElement, SourceSpanScanner
+from app.services.section_index import get_section_index
+from app.services.keyword_matcher import KeywordMatcher, RequestMatch
+
 logger = logging.getLogger(__name__)
 
 
@@ -79,53 +89,192 @@ GLOBAL_STYLE_KEYWORDS = [
     "언어", "변환"
 ]
 
+# 전역 요청 패턴: (리터럴 앵커, 정규식) - 앵커가 요청에 있을 때만 정규식 확인
+GLOBAL_REQUEST_PATTERNS = [
+    ("전체", r'전체\s*(색|배경|폰트)'),
+    ("모든", r'모든\s*(버튼|텍스트|요소)'),
+    ("다", r'다\s*(바꿔|변경)'),
+    ("전부", r'전부\s*(바꿔|변경)'),
+    # 번역 요청
+    ("영어로", r'영어로\s*(번역|바꿔|변경|변환)'),
+    ("영어로", r'한글을?\s*영어로'),
+    ("번역해", r'번역해'),
+    ("translate", r'translate'),
+]
+
+# 요청 키워드 매처 (한 번 컴파일, 섹션 점수와 의도 분석이 결과 공유)
+REQUEST_MATCHER = KeywordMatcher(KEYWORD_MAPPINGS, GLOBAL_STYLE_KEYWORDS, GLOBAL_REQUEST_PATTERNS)
+
+
+def match_request(user_request: str) -> RequestMatch:
+    """
+    사용자 요청의 키워드/전역 패턴을 한 번에 매칭
+
+    Args:
+        user_request: 사용자 요청 메시지
+
+    Returns:
+        RequestMatch (find_relevant_sections 등에 전달하여 재사용)
+    """
+    return REQUEST_MATCHER.match(user_request)
+
 
 class SectionExtractor:
     """규칙 기반 HTML 섹션 추출기"""
 
+    # get_text()가 포함하는 문자열 타입 (Comment, Script, Stylesheet 제외)
+    TEXT_STRING_TYPES = frozenset([NavigableString, CData])
+
     def __init__(self):
         self.keyword_mappings = KEYWORD_MAPPINGS
 
-    def extract_sections(self, html: str) -> List[ExtractedSection]:
+    def parse_document(self, html: str) -> BeautifulSoup:
         """
-        HTML에서 모든 편집 가능 섹션 추출
+        HTML 파싱 (DocumentCache가 결과를 세션별로 재사용)
 
         Args:
             html: 전체 HTML 문자열
 
         Returns:
-            ExtractedSection 리스트
+            BeautifulSoup 문서
+        """
+        return BeautifulSoup(html, 'html.parser')
+
+    def build_section_features(
+        self,
+        html: str,
+        soup: Optional[BeautifulSoup] = None
+    ) -> List[SectionFeatures]:
+        """
+        모든 편집 가능 섹션의 매칭용 특징 계산
+
+        세션 시작 시 한 번 계산하여 section_index와 함께 저장하고,
+        이후 요청에서는 DOM 없이 저장된 특징으로 점수를 계산합니다.
+
+        Args:
+            html: 전체 HTML 문자열
+            soup: 이미 파싱된 문서 (없으면 html을 파싱)
+
+        Returns:
+            SectionFeatures 리스트 (문서 순서)
         """
-        soup = BeautifulSoup(html, 'html.parser')
-        sections = []
+        if soup is None:
+            soup = self.parse_document(html)
+
+        # 원본 내 섹션 위치: html.parser 태그의 시작 위치 -> 끝 오프셋
+        line_starts = [0] + [m.end() for m in re.finditer("\n", html)]
+        span_ends = {
+            element.start: element.end
+            for element in SourceSpanScanner(html).scan()
+        }
 
         # data-editable="true" 또는 data-section-id를 가진 요소 찾기
         editable_elements = soup.find_all(
             lambda tag: tag.get('data-editable') == 'true' or tag.get('data-section-id')
         )
 
+        located = []
         for element in editable_elements:
+            span = None
+            if element.sourceline is not None:
+                start = line_starts[element.sourceline - 1] + element.sourcepos
+                end = span_ends.get(start)
+                if end is not None:
+                    span = (start, end)
+            located.append((element, span))
+
+        return self.features_from_elements(html, located)
+
+    def features_from_elements(
+        self,
+        html: str,
+        elements: List[Tuple[Tag, Optional[Tuple[int, int]]]],
+        source_elements: Optional[List[SourceElement]] = None
+    ) -> List[SectionFeatures]:
+        """
+        원본 위치를 이미 아는 섹션 요소들로 특징 계산
+
+        HTMLParser처럼 자체 파싱 중에 요소 위치를 찾은 경우,
+        문서를 다시 파싱하거나 스캔하지 않고 그 결과로 특징을 만듭니다.
+
+        source_elements를 주면 위치를 교차 검증합니다: 같은 섹션 ID의 n번째
+        요소는 원본 스캔에서 그 ID를 가진 n번째 요소(build_section_features가
+        찾는 위치)와 span이 같아야 하며, 다르면 그 섹션은 제외합니다.
+        잘못된 위치로 패치를 splice하면 current_html이 깨지기 때문입니다.
+
+        Args:
+            html: 전체 HTML 문자열
+            elements: (요소, (start, end) 또는 None) 리스트 (문서 순서)
+            source_elements: 같은 html의 SourceSpanScanner 결과 (교차 검증용)
+
+        Returns:
+            SectionFeatures 리스트 (문서 순서)
+        """
+        features = []
+
+        # 섹션 ID -> 원본에서 그 ID를 가진 요소들의 span (문서 순서)
+        source_spans: Optional[Dict[str, List[Tuple[int, int]]]] = None
+        if source_elements is not None:
+            source_spans = {}
+            for source in source_elements:
+                if source.attrs.get('data-section-id'):
+                    source_spans.setdefault(source.attrs['data-section-id'], []).append((source.start, source.end))
+        occurrences: Dict[str, int] = {}
+
+        for element, span in elements:
             section_id = element.get('data-section-id', '')
             if not section_id:
                 continue
 
-            # 섹션 내 요소 타입들 수집
-            element_types = self._get_element_types(element)
+            if source_spans is not None:
+                occurrence = occurrences.get(section_id, 0)
+                occurrences[section_id] = occurrence + 1
+                candidates = source_spans.get(section_id, [])
+                if occurrence >= len(candidates) or candidates[occurrence] != span:
+                    logger.warning(f"Section {section_id}: parsed span {span} does not match the source, skipped")
+                    continue
 
-            # 텍스트 콘텐츠 추출
-            text_content = element.get_text(separator=' ', strip=True)[:500]
+            start, end = span or (None, None)
+            section_html = html[start:end] if end is not None else str(element)
 
-            # CSS 클래스 수집
-            css_classes = self._get_all_classes(element)
+            # 태그, 클래스, 텍스트를 서브트리 한 번 순회로 수집
+            tags, classes, text_content = self._collect_subtree(element)
 
-            sections.append(ExtractedSection(
+            features.append(SectionFeatures(
                 section_id=section_id,
-                html=str(element),
-                element_types=element_types,
+                position=len(features),
+                tags=sorted(tags),
+                classes=sorted(classes),
+                tokens=sorted(set(text_content.lower().split())),
                 text_content=text_content,
-                css_classes=css_classes
+                byte_size=len(section_html.encode('utf-8')),
+                subtree_hash=hashlib.md5(section_html.encode('utf-8')).hexdigest(),
+                start=start,
+                end=end,
+                tag=element.name
             ))
 
+        logger.info(f"Built features for {len(features)} editable sections")
+        return features
+
+    def extract_sections(
+        self,
+        html: str,
+        soup: Optional[BeautifulSoup] = None
+    ) -> List[ExtractedSection]:
+        """
+        HTML에서 모든 편집 가능 섹션 추출
+
+        Args:
+            html: 전체 HTML 문자열
+            soup: 이미 파싱된 문서 (없으면 html을 파싱)
+
+        Returns:
+            ExtractedSection 리스트
+        """
+        features = self.build_section_features(html, soup=soup)
+        sections = [self._to_section(html, feature) for feature in features]
+
         logger.info(f"Extracted {len(sections)} editable sections from HTML")
         return sections
 
@@ -133,7 +282,9 @@ class SectionExtractor:
         self,
         html: str,
         user_request: str,
-        max_sections: int = 5
+        max_sections: int = 5,
+        features: Optional[List[SectionFeatures]] = None,
+        match: Optional[RequestMatch] = None
     ) -> List[ExtractedSection]:
         """
         사용자 요청과 관련된 섹션들 찾기
@@ -142,170 +293,110 @@ class SectionExtractor:
             html: 전체 HTML
             user_request: 사용자 요청 메시지
             max_sections: 최대 반환 섹션 수
+            features: 저장된 섹션 특징 (없으면 html에서 계산)
+            match: 요청 키워드 매칭 결과 (없으면 user_request를 매칭)
 
         Returns:
-            관련도 순으로 정렬된 섹션 리스트
+            관련도 순으로 정렬된 섹션 리스트 (HTML은 상위 섹션만 잘라냄)
         """
-        all_sections = self.extract_sections(html)
+        all_features = features if features is not None else self.build_section_features(html)
 
-        if not all_sections:
+        if not all_features:
             logger.warning("No editable sections found in HTML")
             return []
 
-        # 전역 스타일 요청인지 확인
-        is_global_request = self._is_global_request(user_request)
+        if match is None:
+            match = match_request(user_request)
 
-        if is_global_request:
+        scored = self._score_sections(all_features, user_request, match)[:max_sections]
+
+        logger.info(f"Found {len(scored)} relevant sections for request: {user_request[:50]}...")
+        return [self._to_section(html, feature, score) for feature, score in scored]
+
+    def _score_sections(
+        self,
+        all_features: List[SectionFeatures],
+        user_request: str,
+        match: RequestMatch
+    ) -> List[Tuple[SectionFeatures, float]]:
+        """섹션 특징으로 점수 계산 (DOM 사용 안 함), 점수순 (섹션, 점수) 리스트 반환"""
+        index = get_section_index(all_features, self.keyword_mappings)
+
+        if match.is_global:
             # 전역 요청: 모든 섹션 반환 (또는 특정 요소 타입 필터링)
-            target_elements = self._extract_target_elements(user_request)
-            if target_elements:
+            if match.target_elements:
                 # "모든 버튼" 같은 요청
-                scored_sections = []
-                for section in all_sections:
-                    score = self._calculate_element_match_score(section, target_elements)
-                    if score > 0:
-                        section.score = score
-                        scored_sections.append(section)
-                return sorted(scored_sections, key=lambda x: x.score, reverse=True)[:max_sections]
+                ranked = index.rank(index.element_match_scores(match.target_elements))
             else:
                 # "전체 색깔 변경" 같은 요청 - 모든 섹션
-                for section in all_sections:
-                    section.score = 1.0
-                return all_sections[:max_sections]
-
-        # 특정 대상 요청: 키워드 매칭으로 점수 계산
-        scored_sections = []
-        for section in all_sections:
-            score = self._calculate_relevance_score(section, user_request)
-            if score > 0:
-                section.score = score
-                scored_sections.append(section)
-
-        # 점수순 정렬
-        scored_sections.sort(key=lambda x: x.score, reverse=True)
-
-        # 매칭되는 섹션이 없으면 텍스트 매칭 시도
-        if not scored_sections:
-            scored_sections = self._fallback_text_matching(all_sections, user_request)
-
-        logger.info(f"Found {len(scored_sections)} relevant sections for request: {user_request[:50]}...")
-        return scored_sections[:max_sections]
-
-    def _is_global_request(self, request: str) -> bool:
-        """전역 스타일 요청인지 확인"""
-        global_patterns = [
-            r'전체\s*(색|배경|폰트)',
-            r'모든\s*(버튼|텍스트|요소)',
-            r'다\s*(바꿔|변경)',
-            r'전부\s*(바꿔|변경)',
-            # 번역 요청
-            r'영어로\s*(번역|바꿔|변경|변환)',
-            r'한글을?\s*영어로',
-            r'번역해',
-            r'translate',
-        ]
-        for pattern in global_patterns:
-            if re.search(pattern, request, re.IGNORECASE):
-                return True
-        return False
-
-    def _extract_target_elements(self, request: str) -> List[str]:
-        """요청에서 대상 요소 타입 추출"""
-        target_elements = []
-        for keyword, mapping in self.keyword_mappings.items():
-            if keyword in request and mapping["elements"]:
-                target_elements.extend(mapping["elements"])
-        return list(set(target_elements))
-
-    def _calculate_relevance_score(self, section: ExtractedSection, request: str) -> float:
-        """섹션과 요청 간의 관련도 점수 계산"""
-        score = 0.0
-
-        for keyword, mapping in self.keyword_mappings.items():
-            if keyword not in request:
-                continue
-
-            # 요소 타입 매칭
-            for elem_type in mapping["elements"]:
-                if elem_type in section.element_types:
-                    score += 2.0
-                    break
-
-            # CSS 클래스 매칭
-            for class_pattern in mapping["classes"]:
-                for css_class in section.css_classes:
-                    if class_pattern in css_class:
-                        score += 1.0
-                        break
-
-        # 텍스트 콘텐츠 매칭 (보너스 점수)
-        request_words = set(request.replace('?', '').replace('.', '').split())
-        section_words = set(section.text_content.lower().split())
-        common_words = request_words & section_words
-        if common_words:
-            score += len(common_words) * 0.5
-
-        return score
-
-    def _calculate_element_match_score(self, section: ExtractedSection, target_elements: List[str]) -> float:
-        """특정 요소 타입 매칭 점수"""
-        score = 0.0
-        for elem in target_elements:
-            if elem in section.element_types:
-                score += 1.0
-        return score
-
-    def _fallback_text_matching(
-        self,
-        sections: List[ExtractedSection],
-        request: str
-    ) -> List[ExtractedSection]:
-        """키워드 매칭 실패 시 텍스트 기반 폴백"""
-        scored = []
-        request_lower = request.lower()
-
-        for section in sections:
-            text_lower = section.text_content.lower()
-            # 단순 단어 오버랩 계산
-            request_words = set(request_lower.split())
-            text_words = set(text_lower.split())
-            overlap = len(request_words & text_words)
-            if overlap > 0:
-                section.score = overlap * 0.3
-                scored.append(section)
-
-        scored.sort(key=lambda x: x.score, reverse=True)
-        return scored
-
-    def _get_element_types(self, element) -> List[str]:
-        """섹션 내 모든 요소 타입 수집"""
-        types = set()
-        types.add(element.name)
-
-        for child in element.find_all(True):  # 모든 태그
-            types.add(child.name)
+                ranked = [(position, 1.0) for position in range(len(all_features))]
+        else:
+            # 특정 대상 요청: 키워드 매칭으로 점수 계산 (매칭 가능한 섹션만)
+            ranked = index.rank(index.relevance_scores(user_request, match.keywords))
 
-        return list(types)
+            # 매칭되는 섹션이 없으면 텍스트 매칭 시도
+            if not ranked:
+                ranked = index.rank(index.text_overlap_scores(user_request))
 
-    def _get_all_classes(self, element) -> List[str]:
-        """섹션 내 모든 CSS 클래스 수집"""
-        classes = set()
+        return [(all_features[position], score) for position, score in ranked]
 
-        # 현재 요소의 클래스
-        if element.get('class'):
-            classes.update(element.get('class'))
-
-        # 자식 요소들의 클래스
-        for child in element.find_all(True):
-            if child.get('class'):
-                classes.update(child.get('class'))
-
-        return list(classes)
+    def _to_section(
+        self,
+        html: str,
+        feature: SectionFeatures,
+        score: float = 0.0
+    ) -> ExtractedSection:
+        """섹션 특징 + 원본 HTML 조각으로 ExtractedSection 생성"""
+        section_html = feature.get_html(html)
+        if section_html is None:
+            # 오프셋이 없거나 HTML과 맞지 않음 - 섹션만 다시 찾기
+            element = self.parse_document(html).find(attrs={'data-section-id': feature.section_id})
+            section_html = str(element) if element else ""
+
+        return ExtractedSection(
+            section_id=feature.section_id,
+            html=section_html,
+            element_types=feature.tags,
+            text_content=feature.text_content,
+            css_classes=feature.classes,
+            score=score
+        )
 
+    def _collect_subtree(self, element) -> Tuple[set, set, str]:
+        """
+        섹션 서브트리를 한 번 순회하여 태그, 클래스, 텍스트 수집
 
-def build_context_from_sections(sections: List[ExtractedSection]) -> Tuple[str, int]:
+        Returns:
+            (태그 집합, 클래스 집합, 텍스트 최대 500자)
+            텍스트는 get_text(separator=' ', strip=True)와 동일
+        """
+        tags = {element.name}
+        classes = set(element.get('class') or [])
+        texts = []
+
+        for descendant in element.descendants:
+            if isinstance(descendant, Tag):
+                tags.add(descendant.name)
+                if descendant.get('class'):
+                    classes.update(descendant.get('class'))
+            elif type(descendant) in self.TEXT_STRING_TYPES:
+                text = descendant.strip()
+                if text:
+                    texts.append(text)
+
+        return tags, classes, ' '.join(texts)[:500]
+
+
+def build_context_from_sections(
+    sections: List[ExtractedSection],
+    max_tokens: Optional[int] = None
+) -> Tuple[str, int]:
     """
-    추출된 섹션들로 LLM 컨텍스트 구성
+    추출된 섹션들로 LLM 컨텍스트 구성 (토큰 예산 안에서, pack_context 참고)
+
+    Args:
+        sections: 관련도 순 섹션 리스트
+        max_tokens: 토큰 예산 (기본: CONTEXT_TOKEN_BUDGET)
 
     Returns:
         (html_context, total_size_bytes)
@@ -313,9 +404,14 @@ def build_context_from_sections(sections: List[ExtractedSection]) -> Tuple[str,
     if not sections:
         return "", 0
 
-    html_parts = []
-    for section in sections:
-        html_parts.append(f"<!-- section: {section.section_id} -->\n{section.html}")
+    packed = pack_context(
+        [(section.section_id, section.html, section.score) for section in sections],
+        max_tokens
+    )
+    html_parts = [
+        f"<!-- section: {section_id} -->\n{html}"
+        for section_id, html in packed.fragments.items()
+    ]
 
     context = "\n\n".join(html_parts)
     return context, len(context.encode('utf-8'))
@@ -0,0 +1,219 @@
+"""
+Section Index - Inverted keyword → section index for rule-based matching
+
+Responsibilities:
+- Compile KEYWORD_MAPPINGS against a document's section features into postings
+  (keyword → element / class-pattern postings → section positions)
+- Score a request by touching only the sections listed in matching postings
+
+Dependencies:
+- app.models.ast (SectionFeatures)
+
+Implementation Notes:
+- Class patterns match as substrings ("bg-" matches "hover:bg-red-500"),
+  so classes are indexed by all of their suffixes in a sorted list: a
+  substring match is a prefix match of some suffix, found with bisect
+- Sections are identified by position (SectionFeatures.position order)
+- Indexes depend only on section content and are cached by a signature
+  of section ids + subtree hashes, so repeated turns reuse them
+"""
+
+from bisect import bisect_left
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Set, Tuple, Iterable, Optional
+import hashlib
+
+from app.models.ast import SectionFeatures
+
+# Number of compiled indexes kept in memory
+INDEX_CACHE_SIZE = 64
+
+
+@dataclass
+class KeywordPostings:
+    """Sections a keyword can score"""
+    element_sections: Set[int] = field(default_factory=set)  # +2.0 (any mapped element)
+    class_sections: List[Set[int]] = field(default_factory=list)  # +1.0 per class pattern
+
+
+class SectionIndex:
+    """
+    Inverted index over section features
+
+    Usage:
+        index = get_section_index(features, KEYWORD_MAPPINGS)
+        scores = index.relevance_scores(request, matched_keywords)
+        ranked = index.rank(scores)  # [(position, score), ...]
+    """
+
+    def __init__(
+        self,
+        features: List[SectionFeatures],
+        keyword_mappings: Dict[str, Dict[str, List[str]]]
+    ):
+        """
+        Build index
+
+        Args:
+            features: Section features in document order
+            keyword_mappings: Keyword → {"elements": [...], "classes": [...]}
+        """
+        self.size = len(features)
+        self.tag_postings: Dict[str, Set[int]] = {}
+        self.token_postings: Dict[str, Set[int]] = {}
+        class_postings: Dict[str, Set[int]] = {}
+
+        for position, feature in enumerate(features):
+            for tag in feature.tags:
+                self.tag_postings.setdefault(tag, set()).add(position)
+            for token in feature.tokens:
+                self.token_postings.setdefault(token, set()).add(position)
+            for css_class in feature.classes:
+                class_postings.setdefault(css_class, set()).add(position)
+
+        # Sorted (suffix, class id) list for substring lookups
+        self._class_sections: List[Set[int]] = list(class_postings.values())
+        self._suffixes: List[Tuple[str, int]] = sorted(
+            (css_class[start:], class_id)
+            for class_id, css_class in enumerate(class_postings)
+            for start in range(len(css_class))
+        )
+
+        self.keyword_postings: Dict[str, KeywordPostings] = {}
+        for keyword, mapping in keyword_mappings.items():
+            element_sections: Set[int] = set()
+            for element in mapping["elements"]:
+                element_sections |= self.tag_postings.get(element, set())
+            self.keyword_postings[keyword] = KeywordPostings(
+                element_sections=element_sections,
+                class_sections=[self.sections_with_class(pattern) for pattern in mapping["classes"]]
+            )
+
+    def sections_with_class(self, pattern: str) -> Set[int]:
+        """
+        Sections having a CSS class that contains `pattern`
+
+        Args:
+            pattern: Class substring (e.g. "bg-", "btn")
+
+        Returns:
+            Section positions
+        """
+        sections: Set[int] = set()
+        seen: Set[int] = set()
+        index = bisect_left(self._suffixes, (pattern,))
+        while index < len(self._suffixes) and self._suffixes[index][0].startswith(pattern):
+            class_id = self._suffixes[index][1]
+            if class_id not in seen:
+                seen.add(class_id)
+                sections |= self._class_sections[class_id]
+            index += 1
+        return sections
+
+    def relevance_scores(self, request: str, keywords: Iterable[str]) -> Dict[int, float]:
+        """
+        Keyword + text overlap scores
+
+        Args:
+            request: User request
+            keywords: KEYWORD_MAPPINGS keys found in the request
+
+        Returns:
+            Section position → score (only sections with score > 0)
+        """
+        scores: Dict[int, float] = {}
+
+        for keyword in keywords:
+            postings = self.keyword_postings[keyword]
+            for position in postings.element_sections:
+                scores[position] = scores.get(position, 0.0) + 2.0
+            for sections in postings.class_sections:
+                for position in sections:
+                    scores[position] = scores.get(position, 0.0) + 1.0
+
+        # 텍스트 콘텐츠 매칭 (보너스 점수)
+        request_words = set(request.replace('?', '').replace('.', '').split())
+        for position, count in self._token_overlap(request_words).items():
+            scores[position] = scores.get(position, 0.0) + count * 0.5
+
+        return scores
+
+    def element_match_scores(self, target_elements: Iterable[str]) -> Dict[int, float]:
+        """
+        +1 per target element present in the section
+
+        Args:
+            target_elements: Element types (button, h1, ...)
+
+        Returns:
+            Section position → score
+        """
+        scores: Dict[int, float] = {}
+        for element in target_elements:
+            for position in self.tag_postings.get(element, ()):
+                scores[position] = scores.get(position, 0.0) + 1.0
+        return scores
+
+    def text_overlap_scores(self, request: str) -> Dict[int, float]:
+        """
+        Fallback word overlap scores (0.3 per shared word)
+
+        Args:
+            request: User request
+
+        Returns:
+            Section position → score
+        """
+        request_words = set(request.lower().split())
+        return {
+            position: count * 0.3
+            for position, count in self._token_overlap(request_words).items()
+        }
+
+    def _token_overlap(self, words: Set[str]) -> Dict[int, int]:
+        """Section position → number of shared words"""
+        counts: Dict[int, int] = {}
+        for word in words:
+            for position in self.token_postings.get(word, ()):
+                counts[position] = counts.get(position, 0) + 1
+        return counts
+
+    @staticmethod
+    def rank(scores: Dict[int, float]) -> List[Tuple[int, float]]:
+        """Order by score, then document order"""
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+
+_index_cache: "OrderedDict[str, SectionIndex]" = OrderedDict()
+
+
+def get_section_index(
+    features: List[SectionFeatures],
+    keyword_mappings: Dict[str, Dict[str, List[str]]]
+) -> SectionIndex:
+    """
+    Get compiled index for the given features (cached by content signature)
+
+    Args:
+        features: Section features in document order
+        keyword_mappings: Keyword mappings to compile
+
+    Returns:
+        SectionIndex
+    """
+    digest = hashlib.md5()
+    for feature in features:
+        digest.update(f"{feature.section_id}:{feature.subtree_hash}|".encode("utf-8"))
+    signature = f"{id(keyword_mappings)}:{digest.hexdigest()}"
+
+    index: Optional[SectionIndex] = _index_cache.get(signature)
+    if index is not None:
+        _index_cache.move_to_end(signature)
+        return index
+
+    index = SectionIndex(features, keyword_mappings)
+    _index_cache[signature] = index
+    while len(_index_cache) > INDEX_CACHE_SIZE:
+        _index_cache.popitem(last=False)
+    return index
@@ -0,0 +1,190 @@
+"""
+Section Rewrite (map / reduce helpers)
+
+Responsibilities:
+- Split a document into its outermost data-section-id sections (map
+  inputs), grouped into units that fit one generation call
+- Read the rewritten sections back out of a model response
+- Stitch rewritten sections into the original skeleton (reduce)
+
+Dependencies:
+- app.services.source_spans (SourceSpanScanner)
+- app.services.gemini_client (estimate_tokens)
+
+Implementation Notes:
+- Sections are located by source offsets, so everything outside them
+  (doctype, head, scripts, non-section markup) is kept byte for byte
+- A section larger than the unit budget is not sent whole: its nested
+  sections are used instead, and its own markup between them stays
+  unchanged (a section without nested sections is left as is)
+- Consecutive sections are grouped up to the budget, so small sections
+  share a call (the per-key RPM limit counts calls, not tokens)
+- A rewritten section is accepted only if the response contains a
+  closed outermost element with the same data-section-id; missing or
+  cut-off ones keep their original HTML
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+import asyncio
+import logging
+
+from app.services.gemini_client import estimate_tokens
+from app.services.source_spans import SourceSpanScanner
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class SectionSpan:
+    """Outermost section of the document to rewrite"""
+    section_id: str
+    start: int
+    end: int
+    tokens: int
+
+
+@dataclass
+class RewriteUnit:
+    """Sections rewritten by one generation call"""
+    sections: List[SectionSpan] = field(default_factory=list)
+    tokens: int = 0
+
+    @property
+    def section_ids(self) -> List[str]:
+        return [section.section_id for section in self.sections]
+
+    def html(self, source: str) -> str:
+        """Section HTML sent to the model (sections separated by blank lines)"""
+        return "\n\n".join(source[section.start:section.end] for section in self.sections)
+
+
+@dataclass
+class SectionRewriteJob:
+    """Sections of one global change being rewritten concurrently"""
+    spans: List[SectionSpan]
+    units: List[RewriteUnit]
+    brief: str = ""
+    tasks: List["asyncio.Task[Dict[str, str]]"] = field(default_factory=list)  # one per unit
+    tokens_used: int = 0
+    errors: List[Exception] = field(default_factory=list)
+
+    def unit_of(self) -> Dict[str, int]:
+        """Section ID -> index of its unit (and task)"""
+        return {section.section_id: index for index, unit in enumerate(self.units) for section in unit.sections}
+
+    def cancel(self):
+        """Cancel unit calls still in flight"""
+        for task in self.tasks:
+            task.cancel()
+
+
+def section_spans(html: str, max_tokens: int) -> List[SectionSpan]:
+    """
+    Outermost sections of at most `max_tokens` each, in document order
+
+    Args:
+        html: Full HTML
+        max_tokens: Largest section sent to the model
+
+    Returns:
+        Non-overlapping SectionSpan list
+    """
+    spans: List[SectionSpan] = []
+    covered_until = -1
+    for element in SourceSpanScanner(html).scan():
+        section_id = element.attrs.get("data-section-id")
+        if not section_id or element.start < covered_until or element.end <= element.start:
+            continue
+
+        tokens = estimate_tokens(html[element.start:element.end])
+        if tokens > max_tokens:
+            # Nested sections (visited next, in document order) are used instead
+            logger.info(f"Section {section_id} ({tokens} tokens) too large, rewriting its nested sections")
+            continue
+
+        spans.append(SectionSpan(section_id=section_id, start=element.start, end=element.end, tokens=tokens))
+        covered_until = element.end
+
+    return spans
+
+
+def group_units(spans: List[SectionSpan], max_tokens: int) -> List[RewriteUnit]:
+    """
+    Group consecutive sections into units of about `max_tokens`
+
+    Args:
+        spans: Sections in document order
+        max_tokens: Token budget per unit
+
+    Returns:
+        RewriteUnit list (document order)
+    """
+    units: List[RewriteUnit] = []
+    current = RewriteUnit()
+    for span in spans:
+        if current.sections and current.tokens + span.tokens > max_tokens:
+            units.append(current)
+            current = RewriteUnit()
+        current.sections.append(span)
+        current.tokens += span.tokens
+    if current.sections:
+        units.append(current)
+    return units
+
+
+def read_sections(output: str, section_ids: List[str]) -> Dict[str, str]:
+    """
+    Rewritten sections in a model response
+
+    Args:
+        output: Response HTML (fences already stripped)
+        section_ids: Sections the unit asked for
+
+    Returns:
+        Section ID -> rewritten outer HTML, for the expected sections found
+    """
+    expected = set(section_ids)
+    found: Dict[str, str] = {}
+    covered_until = -1
+    for element in SourceSpanScanner(output).scan():
+        if element.start < covered_until:
+            continue
+        section_id = element.attrs.get("data-section-id")
+        if section_id not in expected or section_id in found:
+            continue
+        section_html = output[element.start:element.end]
+        if not section_html.lower().endswith(f"</{element.tag}>"):
+            # Cut off (unclosed elements end with the response)
+            logger.warning(f"Rewritten section {section_id} is incomplete, keeping the original")
+            continue
+        found[section_id] = section_html
+        covered_until = element.end
+    return found
+
+
+def stitch(html: str, spans: List[SectionSpan], rewritten: Dict[str, str]) -> Tuple[str, int]:
+    """
+    Replace sections of the original document
+
+    Args:
+        html: Original HTML
+        spans: Sections (document order, non-overlapping)
+        rewritten: Section ID -> new outer HTML
+
+    Returns:
+        (new HTML, number of sections replaced)
+    """
+    parts: List[str] = []
+    position = 0
+    replaced = 0
+    for span in spans:
+        new_html = rewritten.get(span.section_id)
+        if new_html is None:
+            continue
+        parts.append(html[position:span.start])
+        parts.append(new_html)
+        position = span.end
+        replaced += 1
+    parts.append(html[position:])
+    return "".join(parts), replaced
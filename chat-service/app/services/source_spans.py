@@ -0,0 +1,262 @@
+"""
+Source Span Scanner
+
+Responsibilities:
+- Locate every element of an HTML string by character offsets
+- Provide (start, end) spans so callers slice the source on demand
+  instead of storing serialized copies of each subtree
+
+Dependencies:
+- html.parser (standard library)
+
+Implementation Notes:
+- Offsets are character offsets into the scanned string (Python str indices)
+- Elements are reported in document (pre-)order
+- Void elements and self-closing tags end at the end of their start tag
+- Common implied end tags (li, p, td, tr, option, ...) are honoured
+- Elements that are never closed end where their parent closes
+- Contents of raw text / RCDATA elements (script, style, textarea, title,
+  ...) are text, as in browsers and lxml: markup inside a <textarea> is
+  never reported as an element
+- SpanAligner only accepts a source element whose attributes match the
+  tree element and whose end tag closes the span; otherwise no span
+"""
+
+from dataclasses import dataclass, field
+from html.parser import HTMLParser as _StdlibHTMLParser
+from typing import Dict, List, Optional
+import re
+
+
+# Elements that never have contents
+VOID_ELEMENTS = frozenset([
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link",
+    "meta", "param", "source", "track", "wbr",
+])
+
+# Elements whose contents are text up to their own end tag (raw text and
+# RCDATA elements of the HTML parsing algorithm; noscript is parsed as
+# markup, as with scripting disabled)
+RAW_TEXT_ELEMENTS = frozenset([
+    "script", "style", "textarea", "title", "xmp", "iframe", "noembed", "noframes",
+])
+
+# Start tags that implicitly close an open element on top of the stack
+_BLOCK_CLOSES_P = frozenset([
+    "address", "article", "aside", "blockquote", "details", "div", "dl",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3",
+    "h4", "h5", "h6", "header", "hr", "main", "menu", "nav", "ol", "p",
+    "pre", "section", "summary", "table", "ul",
+])
+IMPLIED_END_TAGS: Dict[str, frozenset] = {
+    **{tag: frozenset(["p"]) for tag in _BLOCK_CLOSES_P},
+    "li": frozenset(["li", "p"]),
+    "dt": frozenset(["dt", "dd", "p"]),
+    "dd": frozenset(["dt", "dd", "p"]),
+    "tr": frozenset(["tr", "td", "th"]),
+    "td": frozenset(["td", "th"]),
+    "th": frozenset(["td", "th"]),
+    "thead": frozenset(["thead", "tbody", "tfoot", "tr", "td", "th"]),
+    "tbody": frozenset(["thead", "tbody", "tfoot", "tr", "td", "th"]),
+    "tfoot": frozenset(["thead", "tbody", "tfoot", "tr", "td", "th"]),
+    "option": frozenset(["option"]),
+}
+
+
+@dataclass
+class SourceElement:
+    """Element located in the source string"""
+    tag: str
+    attrs: Dict[str, str] = field(default_factory=dict)
+    start: int = 0          # Offset of "<" of the start tag
+    end: int = -1           # Offset just past the end tag (or start tag for void)
+    parent: int = -1        # Index of the parent element, -1 at top level
+    end_tag: bool = False   # Closed by its own end tag (not implied, void or EOF)
+
+
+class SourceSpanScanner(_StdlibHTMLParser):
+    """
+    Scan an HTML string and record the span of every element
+
+    Usage:
+        elements = SourceSpanScanner(html).scan()
+        first = elements[0]
+        html[first.start:first.end]  # outer HTML of the first element
+    """
+
+    # Read by the stdlib parser: contents up to the matching end tag are data
+    CDATA_CONTENT_ELEMENTS = tuple(sorted(RAW_TEXT_ELEMENTS))
+
+    def __init__(self, source: str):
+        """
+        Initialize scanner
+
+        Args:
+            source: HTML string to scan
+        """
+        super().__init__(convert_charrefs=True)
+        self.source = source
+        self.elements: List[SourceElement] = []
+        self._stack: List[int] = []
+        self._line_starts = [0] + [m.end() for m in re.finditer("\n", source)]
+
+    def scan(self) -> List[SourceElement]:
+        """
+        Scan the source
+
+        Returns:
+            SourceElement list in document order
+        """
+        self.feed(self.source)
+        self.close()
+
+        # Anything still open ends with the document
+        for index in self._stack:
+            self.elements[index].end = len(self.source)
+        self._stack = []
+
+        return self.elements
+
+    def _offset(self) -> int:
+        """Character offset of the token currently being handled"""
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
+
+    def _open(self, tag: str, attrs: list, start: int) -> int:
+        """Record a new element and return its index"""
+        # Duplicate attributes: the first one wins, as in browsers
+        attributes: Dict[str, str] = {}
+        for key, value in attrs:
+            attributes.setdefault(key, value or "")
+        element = SourceElement(
+            tag=tag,
+            attrs=attributes,
+            start=start,
+            parent=self._stack[-1] if self._stack else -1,
+        )
+        self.elements.append(element)
+        return len(self.elements) - 1
+
+    def handle_starttag(self, tag, attrs):
+        start = self._offset()
+
+        # Close elements whose end tag is implied by this start tag
+        closes = IMPLIED_END_TAGS.get(tag)
+        while closes and self._stack and self.elements[self._stack[-1]].tag in closes:
+            self.elements[self._stack.pop()].end = start
+
+        index = self._open(tag, attrs, start)
+        if tag in VOID_ELEMENTS:
+            self.elements[index].end = start + len(self.get_starttag_text() or "")
+        else:
+            self._stack.append(index)
+
+    def handle_startendtag(self, tag, attrs):
+        start = self._offset()
+        index = self._open(tag, attrs, start)
+        self.elements[index].end = start + len(self.get_starttag_text() or "")
+
+    def handle_endtag(self, tag):
+        start = self._offset()
+        close = self.source.find(">", start)
+        end = len(self.source) if close == -1 else close + 1
+
+        # Stray end tags are ignored
+        for depth in range(len(self._stack) - 1, -1, -1):
+            if self.elements[self._stack[depth]].tag == tag:
+                break
+        else:
+            return
+
+        # Unclosed children end where the matching end tag starts
+        while len(self._stack) - 1 > depth:
+            self.elements[self._stack.pop()].end = start
+        element = self.elements[self._stack.pop()]
+        element.end = end
+        element.end_tag = True
+
+
+class SpanAligner:
+    """
+    Match elements of a parsed tree to elements found in the source
+
+    Tree elements must be offered in document order. Elements the parser
+    created without a source tag (html/head/body) get no span.
+
+    A candidate is checked before its span is used: its attributes must
+    equal the tree element's, and a span closed by an end tag must end
+    with that tag. A tree element without a valid candidate gets no span
+    (looking a few same-tag elements ahead, so one source element the
+    tree does not have does not shift every later span).
+
+    Usage:
+        aligner = SpanAligner(SourceSpanScanner(html).scan(), html)
+        for tag in tree_elements_in_document_order:
+            span = aligner.match(tag.name, tag.attrs)  # (start, end) or None
+    """
+
+    # Same-tag source elements tried past a mismatching one
+    LOOKAHEAD = 8
+
+    def __init__(self, elements: List[SourceElement], source: Optional[str] = None):
+        """
+        Args:
+            elements: Scanned source elements
+            source: Scanned HTML (enables the end tag check)
+        """
+        self.elements = elements
+        self.source = source
+        self._position = 0
+
+    def match(self, tag: str, attrs: Optional[dict] = None) -> Optional[tuple]:
+        """
+        Find the span of the next tree element
+
+        Args:
+            tag: Tag name of the tree element
+            attrs: Attributes of the tree element (None: not checked)
+
+        Returns:
+            (start, end) tuple, or None if the element has no valid source tag
+        """
+        candidates = 0
+        for index in range(self._position, len(self.elements)):
+            element = self.elements[index]
+            if element.tag != tag:
+                continue
+
+            if self._valid(element, attrs):
+                self._position = index + 1
+                return element.start, element.end
+
+            candidates += 1
+            if attrs is None or candidates > self.LOOKAHEAD:
+                break
+
+        # Not in the source (implied by the parser) or not verifiable: keep position
+        return None
+
+    def _valid(self, element: SourceElement, attrs: Optional[dict]) -> bool:
+        """Whether a same-tag source element is the tree element"""
+        if attrs is not None and _normalized(element.attrs) != _normalized(attrs):
+            return False
+
+        if element.end_tag and self.source is not None:
+            close = self.source.rfind("</", element.start, element.end)
+            if close == -1 or not _END_TAG.match(self.source, close, element.end) or \
+                    self.source[close + 2:close + 2 + len(element.tag)].lower() != element.tag:
+                return False
+
+        return True
+
+
+# End tag filling the rest of a span: "</tag>" with optional whitespace
+_END_TAG = re.compile(r"</[^\s>/]+\s*>$")
+
+
+def _normalized(attrs: dict) -> Dict[str, str]:
+    """Attributes with list values (class) joined and whitespace collapsed"""
+    return {
+        key: " ".join(" ".join(value).split() if isinstance(value, list) else str(value).split())
+        for key, value in attrs.items()
+    }
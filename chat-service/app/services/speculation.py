@@ -0,0 +1,201 @@
+"""
+Speculative Local Change
+
+Responsibilities:
+- Start patch generation concurrently with intent analysis when the
+  rule-based section match makes a local change likely
+- Use the speculative result when the intent comes back local; cancel
+  or discard it otherwise
+- Count hits / misses and wasted tokens for tuning
+
+Dependencies:
+- app.services.modification_engine (ModificationEngine)
+- app.services.gemini_client (estimate_tokens)
+- app.models.common (AnalysisResult, IntentType)
+- app.models.chat (ChatResponse, ChatResponseType)
+
+Implementation Notes:
+- Enabled by CHAT_SPECULATIVE_MODE; starts only when the top section
+  score reaches CHAT_SPECULATIVE_MIN_SCORE and the request is not global
+- The speculative prompt cannot use the analysis, so target/action are
+  the matched section IDs and the user message
+- Wasted tokens: actual usage of a discarded completed call, or the
+  estimated prompt tokens of a cancelled one (upper bound of what the
+  API may bill for it)
+- A failed speculative call is discarded and the local change is
+  generated again with the real analysis
+- Stats are per process (like DocumentCache); each outcome is also
+  returned for the chat history record
+"""
+
+from typing import Any, Dict, Optional
+import asyncio
+import logging
+
+from bs4 import BeautifulSoup
+
+from app.models.chat import ChatResponse, ChatResponseType
+from app.models.common import AnalysisResult, IntentType
+from app.services.gemini_client import estimate_tokens
+from app.services.modification_engine import ModificationEngine
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculationStats:
+    """
+    Process-wide speculation counters
+
+    Usage:
+        stats = get_speculation_stats()
+        stats.record("hit")
+        stats.get_stats()  # {"started", "hits", "misses", "failures", "hit_rate", "wasted_tokens"}
+    """
+
+    _instance: Optional["SpeculationStats"] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._stats = {"hits": 0, "misses": 0, "failures": 0, "wasted_tokens": 0}
+        return cls._instance
+
+    def record(self, outcome: str, wasted_tokens: int = 0):
+        """
+        Record one speculation outcome
+
+        Args:
+            outcome: "hit", "miss" or "failure"
+            wasted_tokens: Tokens spent on a discarded result
+        """
+        key = {"hit": "hits", "miss": "misses", "failure": "failures"}[outcome]
+        self._stats[key] += 1
+        self._stats["wasted_tokens"] += wasted_tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get speculation statistics"""
+        started = self._stats["hits"] + self._stats["misses"] + self._stats["failures"]
+        return {
+            **self._stats,
+            "started": started,
+            "hit_rate": self._stats["hits"] / started if started else 0.0,
+        }
+
+
+def get_speculation_stats() -> SpeculationStats:
+    """Get speculation stats singleton"""
+    return SpeculationStats()
+
+
+def should_speculate(top_score: float, is_global: bool) -> bool:
+    """
+    Whether the section match makes a local change likely enough
+
+    Args:
+        top_score: Score of the best matching section (0 if none)
+        is_global: Whether the request matched a global pattern
+
+    Returns:
+        True if patch generation should start before the intent is known
+    """
+    return (
+        settings.CHAT_SPECULATIVE_MODE
+        and not is_global
+        and top_score >= settings.CHAT_SPECULATIVE_MIN_SCORE
+    )
+
+
+class SpeculativeLocalChange:
+    """
+    Patch generation started before intent analysis finishes
+
+    Usage:
+        speculation = SpeculativeLocalChange(engine, message, context)  # starts the task
+        analysis = await analyzer.analyze(...)
+        response = await speculation.resolve(analysis)  # None: not usable
+        speculation.outcome  # {"outcome": "hit", "wasted_tokens": 0}
+    """
+
+    def __init__(
+        self,
+        modification_engine: ModificationEngine,
+        message: str,
+        context: Dict[str, str],
+        document: Optional[BeautifulSoup] = None
+    ):
+        """
+        Start the speculative local change
+
+        Args:
+            modification_engine: Engine generating the patches
+            message: User message
+            context: Section ID -> HTML mapping
+            document: Current session DOM (validates cached patches)
+        """
+        analysis = AnalysisResult(
+            intent=IntentType.LOCAL_CHANGE,
+            target_description=", ".join(context),
+            action_description=message,
+            confidence=0.0,
+            use_search_results=True,
+            reasoning="Speculative (started before intent analysis)"
+        )
+        self.prompt_tokens = estimate_tokens(
+            modification_engine._build_local_change_prompt(message, context, analysis)
+        )
+        self.outcome: Optional[Dict[str, Any]] = None
+        self._task = asyncio.create_task(
+            modification_engine.process_local_change(
+                message=message, context=context, analysis=analysis, document=document
+            )
+        )
+
+    async def resolve(self, analysis: AnalysisResult) -> Optional[ChatResponse]:
+        """
+        Use or discard the speculative result
+
+        Args:
+            analysis: Intent analysis result
+
+        Returns:
+            Speculative ChatResponse on a local intent, otherwise None
+        """
+        if analysis.intent != IntentType.LOCAL_CHANGE:
+            self.discard("miss")
+            return None
+
+        try:
+            response = await self._task
+        except asyncio.TimeoutError:
+            self._record("failure", self.prompt_tokens)
+            raise
+        if response.type == ChatResponseType.ERROR:
+            self._record("failure", 0)
+            return None
+
+        self._record("hit", 0)
+        return response
+
+    def discard(self, outcome: str = "miss"):
+        """
+        Cancel the speculative call (or drop its result) and count the waste
+
+        Args:
+            outcome: Outcome to record
+        """
+        if self.outcome is not None:
+            return
+
+        if self._task.done() and not self._task.cancelled() and self._task.exception() is None:
+            wasted = self._task.result().metadata.get("tokens_used", 0)
+        else:
+            self._task.cancel()
+            wasted = self.prompt_tokens
+        self._record(outcome, wasted)
+
+    def _record(self, outcome: str, wasted_tokens: int):
+        """Record the outcome once (process stats + per-request result)"""
+        self.outcome = {"outcome": outcome, "wasted_tokens": wasted_tokens}
+        get_speculation_stats().record(outcome, wasted_tokens)
+        logger.info(f"Speculative local change: {outcome} (wasted tokens: {wasted_tokens})")
@@ -0,0 +1,327 @@
+"""
+Structure Compressor
+
+Responsibilities:
+- Collapse runs of repeated sibling elements (table rows, list items,
+  cards) in the section HTML of a local-change prompt: a few exemplars,
+  the count and an index map instead of every row
+- Expand patches that target the exemplars of a run to every element of
+  the run in the real document, and patches on one exemplar to that row
+
+Dependencies:
+- beautifulsoup4
+- app.models.chat (Patch)
+- app.services.gemini_client (estimate_tokens)
+
+Implementation Notes:
+- Run: REPEAT_MIN_RUN+ consecutive sibling elements with the same tag and
+  classes (whitespace between them ignored), worth REPEAT_MIN_TOKENS+;
+  runs nested in the exemplars are collapsed too
+- Exemplars: the first REPEAT_EXEMPLARS rows plus rows the request names
+  ("주문 120번": numbers and words found in only a few rows of the run).
+  They carry data-chat-run="<run id>" and data-chat-row="<position in the
+  run>" (1-based, as in the real document: positions in the compressed
+  HTML are not); a comment before the run gives the count, the positions
+  shown and the first / last row id, and one "×N" comment replaces each
+  omitted stretch
+- Run selector: path from the nearest ancestor with an id or
+  data-section-id (tag:nth-of-type steps), then "> tag[class~=...]",
+  limited with :nth-child() when other siblings have the same shape. A
+  run without such an ancestor is not collapsed (it could not be
+  addressed in the real document)
+- [data-chat-run="r1"] in a patch selector becomes :is(<run selector>);
+  [data-chat-row="30"] (with or without the run attribute) becomes
+  :is(<parent> > tag:nth-child(<real index>)); a bare row attribute is
+  resolved to the one run showing that position (left as is - matching
+  nothing - if several do). Selectors naming a row by its own id are
+  left alone since the id addresses that row in the real document too
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+import re
+
+from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+from bs4.element import PreformattedString
+
+from app.models.chat import Patch
+from app.services.gemini_client import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+RUN_ATTRIBUTE = "data-chat-run"
+ROW_ATTRIBUTE = "data-chat-row"
+REPEAT_MIN_RUN = 6
+REPEAT_MIN_TOKENS = 300
+REPEAT_EXEMPLARS = 2
+
+QUERY_TERM = re.compile(r"\d+|[a-z]+|[가-힣]+")
+
+def _attribute_selector(name: str) -> str:
+    """[name=value] with any quoting; the value is the only named group"""
+    return rf"""\[\s*{name}\s*=\s*(?:"(?P<{{0}}q>[^"]*)"|'(?P<{{0}}s>[^']*)'|(?P<{{0}}b>[\w-]+))\s*\]"""
+
+
+_RUN = _attribute_selector(RUN_ATTRIBUTE)
+_ROW = _attribute_selector(ROW_ATTRIBUTE)
+# Run and row attributes of one exemplar, in either order, or either alone
+RUN_ROW_SELECTOR = re.compile(
+    "|".join([
+        _RUN.format("run1") + _ROW.format("row1"),
+        _ROW.format("row2") + _RUN.format("run2"),
+        _ROW.format("row3"),
+        _RUN.format("run4"),
+    ])
+)
+SIMPLE_ID = re.compile(r"^[A-Za-z_][\w-]*$")
+
+
+@dataclass
+class RepeatRun:
+    """Collapsed run of repeated siblings"""
+    run_id: str
+    tag: str
+    count: int
+    selector: str  # every row of the run, in the real document
+    parent_selector: str  # parent of the rows, in the real document
+    first_child: int  # :nth-child() index of the first row
+    shown: List[int] = field(default_factory=list)  # 1-based positions of the exemplars
+
+    def row_selector(self, position: int) -> str:
+        """Selector of the row at a 1-based position of the run"""
+        return f"{self.parent_selector} > {self.tag}:nth-child({self.first_child + position - 1})"
+
+
+@dataclass
+class CompressedContext:
+    """Section HTML with repeated structure collapsed"""
+    sections: Dict[str, str]  # section ID -> HTML
+    runs: Dict[str, RepeatRun] = field(default_factory=dict)
+
+    def expand(self, patches: List[Patch]) -> List[Patch]:
+        """
+        Point patches that target run exemplars at the whole run, and
+        patches that target one exemplar at its row
+
+        Args:
+            patches: Patches generated against the compressed HTML
+
+        Returns:
+            Patches with real-document selectors
+        """
+        if not self.runs:
+            return patches
+
+        expanded = []
+        for patch in patches:
+            selector = RUN_ROW_SELECTOR.sub(self._real_selector, patch.selector)
+            if selector != patch.selector:
+                logger.info(f"Expanded run selector: {patch.selector} -> {selector}")
+                patch = patch.model_copy(update={"selector": selector})
+            expanded.append(patch)
+        return expanded
+
+    def _real_selector(self, match: re.Match) -> str:
+        """Real-document selector of a run / row attribute selector"""
+        values = {name[:-1]: value for name, value in match.groupdict().items() if value is not None}
+        run_id = next((value for name, value in values.items() if name.startswith("run")), None)
+        row = next((value for name, value in values.items() if name.startswith("row")), None)
+
+        if run_id is not None:
+            run = self.runs.get(run_id)
+        else:
+            showing = [run for run in self.runs.values() if row.isdigit() and int(row) in run.shown]
+            run = showing[0] if len(showing) == 1 else None
+        if run is None:
+            logger.warning(f"Patch targets unknown run / row {match.group(0)!r}")
+            return match.group(0)
+
+        if row is None:
+            return f":is({run.selector})"
+        if not row.isdigit() or not 1 <= int(row) <= run.count:
+            logger.warning(f"Patch targets row {row!r} outside run {run.run_id} ({run.count} rows)")
+            return match.group(0)
+        return f":is({run.row_selector(int(row))})"
+
+
+def compress_context(context: Dict[str, str], query: str = "") -> CompressedContext:
+    """
+    Collapse repeated structure in every section of a prompt context
+
+    Args:
+        context: Section ID -> HTML
+        query: User request (rows it names stay visible)
+
+    Returns:
+        CompressedContext (run IDs unique across sections)
+    """
+    compressed = CompressedContext(sections={})
+    for section_id, html in context.items():
+        compressed.sections[section_id] = compress_html(html, query, compressed.runs)
+    return compressed
+
+
+def compress_html(html: str, query: str = "", runs: Optional[Dict[str, RepeatRun]] = None) -> str:
+    """
+    Collapse repeated structure in one section
+
+    Args:
+        html: Section HTML
+        query: User request (rows it names stay visible)
+        runs: Collapsed runs are added here (IDs continue its numbering)
+
+    Returns:
+        Compressed HTML (the input itself if nothing repeats)
+    """
+    runs = runs if runs is not None else {}
+    before = len(runs)
+    fragment = BeautifulSoup(html, "html.parser")
+    _compress(fragment, query_terms(query), runs)
+    return fragment.decode() if len(runs) > before else html
+
+
+def query_terms(query: str) -> List[re.Pattern]:
+    """Numbers and words (2+ chars) of a request, as row text patterns"""
+    terms = []
+    for term in set(QUERY_TERM.findall(query.lower())):
+        if term.isdigit():
+            terms.append(re.compile(rf"(?<!\d){term}(?!\d)"))
+        elif len(term) >= 2:
+            terms.append(re.compile(re.escape(term)))
+    return terms
+
+
+def _is_blank(node) -> bool:
+    """Whitespace-only text between elements"""
+    return isinstance(node, NavigableString) and not isinstance(node, PreformattedString) and not node.strip()
+
+
+def _shape(element: Tag) -> tuple:
+    """Siblings with the same tag and classes count as repeated rows"""
+    return element.name, tuple(element.get("class") or ())
+
+
+def _compress(element: Tag, terms: List[re.Pattern], runs: Dict[str, RepeatRun]):
+    """Collapse the runs among an element's children, then inside the rest"""
+    run: List[Tag] = []
+    for child in list(element.children) + [None]:
+        if _is_blank(child):
+            continue
+        if isinstance(child, Tag) and run and _shape(child) == _shape(run[0]):
+            run.append(child)
+            continue
+        if len(run) >= REPEAT_MIN_RUN:
+            _collapse(run, terms, runs)
+        run = [child] if isinstance(child, Tag) else []
+
+    for child in element.find_all(True, recursive=False):
+        _compress(child, terms, runs)
+
+
+def _collapse(run: List[Tag], terms: List[re.Pattern], runs: Dict[str, RepeatRun]):
+    """Replace the rows past the exemplars by comments"""
+    if sum(estimate_tokens(str(row)) for row in run) < REPEAT_MIN_TOKENS:
+        return
+    addressed = _run_selector(run)
+    if addressed is None:
+        return
+    selector, parent_selector, first_child = addressed
+
+    keep = set(range(REPEAT_EXEMPLARS)) | _named_rows(run, terms)
+    run_id = f"r{len(runs) + 1}"
+    tag = run[0].name
+    shown = sorted(index + 1 for index in keep)
+    runs[run_id] = RepeatRun(
+        run_id=run_id, tag=tag, count=len(run), selector=selector,
+        parent_selector=parent_selector, first_child=first_child, shown=shown
+    )
+
+    ids = f", id {run[0]['id']} … {run[-1]['id']}" if run[0].get("id") and run[-1].get("id") else ""
+    run[0].insert_before(Comment(
+        f" 반복 {run_id}: <{tag}> {len(run)}개 중 {', '.join(map(str, shown))}번째만 표시{ids} "
+    ))
+
+    omitted = 0
+    gap: Optional[Tag] = None
+    for index, row in enumerate(run + [None]):
+        if row is not None and index not in keep:
+            previous = row.previous_sibling
+            if _is_blank(previous):
+                previous.extract()
+            if omitted:
+                row.decompose()
+            else:
+                gap = row  # replaced by the comment once the stretch is counted
+            omitted += 1
+            continue
+        if omitted:
+            gap.replace_with(Comment(f" {run_id}: ×{omitted} 생략 "))
+            omitted = 0
+        if row is not None:
+            row[RUN_ATTRIBUTE] = run_id
+            row[ROW_ATTRIBUTE] = str(index + 1)
+
+
+def _named_rows(run: List[Tag], terms: List[re.Pattern]) -> Set[int]:
+    """Rows matched by a request term that only a few rows of the run contain"""
+    if not terms:
+        return set()
+    texts = [row.get_text(" ").lower() for row in run]
+    named: Set[int] = set()
+    for term in terms:
+        matched = [index for index, text in enumerate(texts) if term.search(text)]
+        if len(matched) <= REPEAT_EXEMPLARS:
+            named.update(matched)
+    return named
+
+
+def _quote(value: str) -> str:
+    """CSS string literal"""
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def _anchor_path(element: Tag) -> Optional[str]:
+    """Selector of an element, from its nearest ancestor with an id or data-section-id"""
+    steps: List[str] = []
+    while isinstance(element, Tag) and not isinstance(element, BeautifulSoup):
+        element_id = element.get("id")
+        if element_id:
+            anchor = f"#{element_id}" if SIMPLE_ID.match(element_id) else f"[id={_quote(element_id)}]"
+            return " > ".join([anchor] + steps)
+        section_id = element.get("data-section-id")
+        if section_id:
+            return " > ".join([f"[data-section-id={_quote(section_id)}]"] + steps)
+
+        position = 1 + sum(1 for sibling in element.find_previous_siblings(element.name))
+        steps.insert(0, f"{element.name}:nth-of-type({position})")
+        element = element.parent
+    return None
+
+
+def _run_selector(run: List[Tag]) -> Optional[Tuple[str, str, int]]:
+    """
+    Selectors of a run in the real document
+
+    Returns:
+        (selector of exactly the rows of the run, parent selector,
+        :nth-child() index of the first row), or None if the run cannot
+        be addressed
+    """
+    parent_path = _anchor_path(run[0].parent)
+    if parent_path is None:
+        return None
+
+    tag, classes = _shape(run[0])
+    row = tag + "".join(f"[class~={_quote(css_class)}]" for css_class in classes)
+
+    siblings = run[0].parent.find_all(True, recursive=False)
+    members = {id(element) for element in run}
+    positions = [index + 1 for index, sibling in enumerate(siblings) if id(sibling) in members]
+    if any(
+        id(sibling) not in members and sibling.name == tag and set(classes) <= set(sibling.get("class") or ())
+        for sibling in siblings
+    ):
+        row += f":nth-child(n+{positions[0]}):nth-child(-n+{positions[-1]})"
+
+    return f"{parent_path} > {row}", parent_path, positions[0]
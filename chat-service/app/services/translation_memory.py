@@ -0,0 +1,269 @@
+"""
+Translation Memory
+
+Responsibilities:
+- Remember translated text nodes per target language across sessions
+  and pages (shared headers, footers, navigation are translated once)
+- Keep recent entries in memory (LRU) with MongoDB as the persistent,
+  shared tier
+- Count hits / misses for tuning
+
+Dependencies:
+- motor (AsyncIOMotorCollection), pymongo (UpdateOne)
+- app.utils.mongodb (get_collection, TRANSLATION_MEMORY_COLLECTION)
+
+Implementation Notes:
+- Key: target language + exact source text (whitespace trimmed); the
+  source is not normalized further since punctuation and case are part
+  of what gets translated
+- The target language is read from "<언어>로" / "to <language>" only
+  ("한국어 페이지를 영어로" -> "en"); a request naming no target or
+  several is not looked up or stored, since a wrong guess would be
+  shared by every later session
+- Words other than the target, source language and the request itself
+  (tone, "브랜드명 유지", ...) are appended to the target, so only
+  requests with the same instructions share translations
+- Lookups and stores are batched: one find / bulk_write per request
+- Entries do not expire (a translation of the same text stays valid);
+  the memory tier is bounded by TRANSLATION_MEMORY_MAX_ENTRIES
+- MongoDB errors are logged and treated as misses - the memory never
+  fails a translation
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+import hashlib
+import logging
+import re
+import unicodedata
+
+from pymongo import UpdateOne
+
+from app.utils.mongodb import get_collection, TRANSLATION_MEMORY_COLLECTION
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 요청에 나타나는 언어 이름 -> 언어 코드
+LANGUAGE_NAMES = {
+    "영어": "en", "english": "en",
+    "한국어": "ko", "한글": "ko", "korean": "ko",
+    "일본어": "ja", "japanese": "ja",
+    "중국어": "zh", "chinese": "zh",
+    "스페인어": "es", "spanish": "es",
+    "프랑스어": "fr", "french": "fr",
+    "독일어": "de", "german": "de",
+    "베트남어": "vi", "vietnamese": "vi",
+}
+
+_KOREAN_NAMES = "|".join(name for name in LANGUAGE_NAMES if not name.isascii())
+_ENGLISH_NAMES = "|".join(name for name in LANGUAGE_NAMES if name.isascii())
+# "영어로" / "to English" (not "영어로 된 페이지": that names the source)
+TARGET_PHRASE = re.compile(
+    rf"({_KOREAN_NAMES})\s*(?:으로|로)(?!\s*(?:된|되어|쓰인|쓰여|작성))"
+    rf"|\b(?:to|into)\s+({_ENGLISH_NAMES})\b"
+)
+LANGUAGE_NAME = re.compile("|".join(sorted(LANGUAGE_NAMES, key=len, reverse=True)))
+WORD = re.compile(r"[가-힣]+|[a-z]+")
+
+# 번역 지시 외의 내용이 없는 요청으로 보는 단어 (나머지 단어는 톤 / 용어 지시로 간주)
+PLAIN_WORDS = {
+    "전체", "전부", "모두", "모든", "다", "페이지", "화면", "사이트", "웹사이트", "문서", "내용",
+    "텍스트", "글", "글자", "문구", "좀", "줘", "주세요", "해줘", "해주세요", "된", "되어", "쓰인", "작성된",
+    "translate", "the", "this", "page", "whole", "entire", "all", "text", "content",
+    "site", "website", "please", "everything", "it",
+}
+PLAIN_PREFIXES = ("번역", "바꿔", "바꾸", "변경", "옮겨", "부탁")
+PARTICLES = ("에서", "으로", "를", "을", "은", "는", "의", "도", "로", "에")
+
+
+def target_language(message: str) -> Optional[str]:
+    """
+    Memory target of a translation request
+
+    Args:
+        message: User message (e.g. "전체 페이지 영어로 번역해줘")
+
+    Returns:
+        Language code ("en"), followed by the request's other instructions
+        when it has some ("en+브랜드명 그대로 유지"), or None if the target
+        language is not named exactly once as "<언어>로" / "to <language>"
+    """
+    lowered = unicodedata.normalize("NFKC", message).lower()
+    targets = {LANGUAGE_NAMES[korean or english] for korean, english in TARGET_PHRASE.findall(lowered)}
+    if len(targets) != 1:
+        return None
+    target = targets.pop()
+
+    # Source language mentions ("한국어 페이지를") do not change the translation
+    rest = LANGUAGE_NAME.sub(" ", TARGET_PHRASE.sub(" ", lowered))
+    instructions = [word for word in WORD.findall(rest) if not _is_plain(word)]
+    return f"{target}+{' '.join(instructions)}" if instructions else target
+
+
+def _strip_particle(word: str) -> str:
+    """Word without a trailing Korean particle ("페이지를" -> "페이지")"""
+    for particle in PARTICLES:
+        if word.endswith(particle) and len(word) > len(particle):
+            return word[:-len(particle)]
+    return word
+
+
+def _is_plain(word: str) -> bool:
+    """Word that only restates the translation request"""
+    stem = _strip_particle(word)
+    return word in PARTICLES or stem in PLAIN_WORDS or stem.startswith(PLAIN_PREFIXES)
+
+
+def memory_key(source: str, target: str) -> str:
+    """Memory key of a source text in a target language"""
+    raw = f"{target}\x00{source}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationMemory:
+    """
+    Two-tier translation memory (memory LRU + MongoDB)
+
+    Usage:
+        memory = get_translation_memory()
+        target = target_language(message)
+        if target is not None:
+            known = await memory.get_many(texts, target)  # source -> translation
+            await memory.put_many({source: translation, ...}, target)
+    """
+
+    _instance: Optional["TranslationMemory"] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        """Initialize memory state from settings"""
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self.max_entries = settings.TRANSLATION_MEMORY_MAX_ENTRIES
+        self.use_mongo = settings.TRANSLATION_MEMORY_MONGO
+        self._stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "mongo_hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "mongo_errors": 0,
+        }
+
+    async def get_many(self, texts: List[str], target: str) -> Dict[str, str]:
+        """
+        Look up translations of several texts (memory first, then MongoDB)
+
+        Args:
+            texts: Source texts
+            target: Target language (target_language())
+
+        Returns:
+            Source text -> translation for the texts found
+        """
+        found: Dict[str, str] = {}
+        missing: Dict[str, str] = {}  # key -> source
+        for text in texts:
+            key = memory_key(text, target)
+            translation = self._entries.get(key)
+            if translation is None:
+                missing[key] = text
+                continue
+            self._entries.move_to_end(key)
+            found[text] = translation
+        self._stats["memory_hits"] += len(found)
+
+        if missing and self.use_mongo:
+            for key, translation in (await self._get_mongo(list(missing))).items():
+                found[missing.pop(key)] = translation
+                self._put_memory(key, translation)
+                self._stats["mongo_hits"] += 1
+
+        self._stats["misses"] += len(missing)
+        return found
+
+    async def put_many(self, translations: Dict[str, str], target: str):
+        """
+        Store translations in both tiers
+
+        Args:
+            translations: Source text -> translation
+            target: Target language (target_language())
+        """
+        if not translations:
+            return
+
+        entries = {memory_key(source, target): translation for source, translation in translations.items()}
+        for key, translation in entries.items():
+            self._put_memory(key, translation)
+        self._stats["stores"] += len(entries)
+
+        if self.use_mongo:
+            await self._put_mongo(entries, target)
+
+    def clear(self):
+        """Drop the memory tier (MongoDB entries are kept)"""
+        self._entries.clear()
+
+    def _put_memory(self, key: str, translation: str):
+        """Memory tier store with LRU eviction"""
+        self._entries[key] = translation
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    async def _get_mongo(self, keys: List[str]) -> Dict[str, str]:
+        """MongoDB tier batch lookup"""
+        try:
+            cursor = get_collection(TRANSLATION_MEMORY_COLLECTION).find(
+                {"_id": {"$in": keys}},
+                {"translation": 1}
+            )
+            return {document["_id"]: document["translation"] async for document in cursor}
+        except Exception as e:
+            self._stats["mongo_errors"] += 1
+            logger.warning(f"Translation memory lookup failed: {e}")
+            return {}
+
+    async def _put_mongo(self, entries: Dict[str, str], target: str):
+        """MongoDB tier batch store"""
+        try:
+            now = datetime.utcnow()
+            await get_collection(TRANSLATION_MEMORY_COLLECTION).bulk_write(
+                [
+                    UpdateOne(
+                        {"_id": key},
+                        {"$set": {"translation": translation, "target": target, "updated_at": now}},
+                        upsert=True
+                    )
+                    for key, translation in entries.items()
+                ],
+                ordered=False
+            )
+        except Exception as e:
+            self._stats["mongo_errors"] += 1
+            logger.warning(f"Translation memory store failed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get memory statistics"""
+        hits = self._stats["memory_hits"] + self._stats["mongo_hits"]
+        lookups = hits + self._stats["misses"]
+        return {
+            **self._stats,
+            "hits": hits,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+# Singleton instance getter
+def get_translation_memory() -> TranslationMemory:
+    """Get translation memory singleton"""
+    return TranslationMemory()
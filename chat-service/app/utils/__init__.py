@@ -5,6 +5,7 @@ Utility modules for Chat Service
 from .mongodb import get_database, get_collection, MongoDBClient
 from .pinecone_client import PineconeClient
 from .api_key_manager import GeminiKeyManager
+from .gemini_client_pool import GeminiClientPool
 
 __all__ = [
     "get_database",
@@ -12,4 +13,5 @@ __all__ = [
     "MongoDBClient",
     "PineconeClient",
     "GeminiKeyManager",
+    "GeminiClientPool",
 ]
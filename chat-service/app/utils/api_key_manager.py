@@ -1,17 +1,54 @@
 """
 Gemini API Key Manager with Load Balancing
-Strategy: Least Connection + Round Robin
+Strategy: Rate-limit headroom (token buckets) + Least Connection + Round Robin
 """
 
 from typing import List, Optional, Tuple
 from dataclasses import dataclass, field
+import asyncio
 import logging
+import time
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass
+class TokenBucket:
+    """토큰 버킷 (분당 한도를 초당 비율로 채움)"""
+    capacity: float
+    tokens: float
+    refill_per_second: float
+    updated_at: float = field(default_factory=time.monotonic)
+
+    @classmethod
+    def per_minute(cls, limit: float) -> "TokenBucket":
+        """분당 limit 한도 버킷 (가득 찬 상태로 시작)"""
+        return cls(capacity=limit, tokens=limit, refill_per_second=limit / 60.0)
+
+    def refill(self, now: float):
+        """경과 시간만큼 토큰 채움"""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """amount만큼 사용 가능해질 때까지 남은 시간 (초)"""
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float):
+        """토큰 사용 (정산 시 음수 가능 - 초과 사용분은 이후 채움에서 차감)"""
+        self.tokens -= amount
+
+    @property
+    def headroom(self) -> float:
+        """남은 비율 (0.0 ~ 1.0)"""
+        return max(0.0, self.tokens) / self.capacity
+
+
 @dataclass
 class APIKeyInfo:
     """API 키 정보"""
@@ -20,6 +57,23 @@ class APIKeyInfo:
     active_requests: int = 0
     total_requests: int = 0
     error_count: int = 0
+    rate_limited_count: int = 0
+    requests: TokenBucket = field(default_factory=lambda: TokenBucket.per_minute(settings.GEMINI_RPM_LIMIT))
+    tokens: TokenBucket = field(default_factory=lambda: TokenBucket.per_minute(settings.GEMINI_TPM_LIMIT))
+    cooldown_until: float = 0.0  # time.monotonic() 기준, 429 이후 사용 금지
+
+    def wait_time(self, estimated_tokens: int, now: float) -> float:
+        """요청 1건 + estimated_tokens를 쓸 수 있을 때까지 남은 시간"""
+        return max(
+            self.cooldown_until - now,
+            self.requests.wait_time(1),
+            self.tokens.wait_time(estimated_tokens),
+        )
+
+    @property
+    def headroom(self) -> float:
+        """RPM/TPM 중 더 부족한 쪽의 남은 비율"""
+        return min(self.requests.headroom, self.tokens.headroom)
 
 
 class GeminiKeyManager:
@@ -29,6 +83,11 @@ class GeminiKeyManager:
     Load Balancing Strategy:
     1. Least Connection: 현재 활성 요청이 가장 적은 키 선택
     2. Round Robin: 동일한 활성 요청 수일 경우 순차 선택
+
+    Rate-limit scheduling (acquire):
+    - 키마다 RPM/TPM 토큰 버킷, 한도 여유가 가장 큰 키 선택
+    - 모든 키가 포화 상태면 여유가 생길 때까지 대기 (FIFO)
+    - 429를 받은 키는 서버가 알려준 시간 동안 cool-down
     """
 
     _instance: Optional["GeminiKeyManager"] = None
@@ -45,6 +104,7 @@ class GeminiKeyManager:
         """Initialize API keys from settings"""
         self._keys = []
         self._round_robin_index = 0
+        self._acquire_lock = asyncio.Lock()
 
         # Collect all GEMINI_API_KEY_N from settings
         for i in range(1, 11):  # Support up to 10 keys
@@ -72,9 +132,13 @@ class GeminiKeyManager:
         if not self._keys:
             raise ValueError("No API keys available")
 
+        # Skip keys cooling down after a 429 (unless all are)
+        now = time.monotonic()
+        available = [k for k in self._keys if k.cooldown_until <= now] or self._keys
+
         # Find key with minimum active requests
-        min_active = min(k.active_requests for k in self._keys)
-        candidates = [k for k in self._keys if k.active_requests == min_active]
+        min_active = min(k.active_requests for k in available)
+        candidates = [k for k in available if k.active_requests == min_active]
 
         # Round robin among candidates
         if len(candidates) == 1:
@@ -102,20 +166,127 @@ class GeminiKeyManager:
 
         return selected.key, selected.index
 
-    def release_key(self, key_index: int, is_error: bool = False):
+    async def acquire(self, estimated_tokens: int = 0) -> Tuple[str, int]:
+        """
+        Get the key with the most rate-limit headroom, waiting if all are saturated
+
+        Consumes one request and estimated_tokens from the key's buckets;
+        pass the actual usage to release_key() to settle the difference.
+
+        Args:
+            estimated_tokens: Expected tokens (prompt + output) of the request
+
+        Returns:
+            Tuple of (api_key, key_index)
+
+        Raises:
+            asyncio.TimeoutError: If no key frees up within GEMINI_QUEUE_TIMEOUT_SECONDS
+        """
+        if not self._keys:
+            raise ValueError("No API keys available")
+
+        deadline = time.monotonic() + settings.GEMINI_QUEUE_TIMEOUT_SECONDS
+
+        # Waiters are served in arrival order
+        async with self._acquire_lock:
+            while True:
+                now = time.monotonic()
+                for key_info in self._keys:
+                    key_info.requests.refill(now)
+                    key_info.tokens.refill(now)
+
+                ready = [k for k in self._keys if k.wait_time(estimated_tokens, now) <= 0]
+                if ready:
+                    selected = self._select(ready, key=lambda k: (-k.headroom, k.active_requests))
+                    break
+
+                wait = min(k.wait_time(estimated_tokens, now) for k in self._keys)
+                if now + wait > deadline:
+                    raise asyncio.TimeoutError("All Gemini API keys are rate limited")
+
+                logger.info(f"All Gemini API keys saturated, queueing for {wait:.1f}s")
+                await asyncio.sleep(wait)
+
+        selected.requests.consume(1)
+        selected.tokens.consume(estimated_tokens)
+        selected.active_requests += 1
+        selected.total_requests += 1
+
+        logger.debug(
+            f"Acquired key {selected.index} "
+            f"(headroom: {selected.headroom:.2f}, active: {selected.active_requests})"
+        )
+
+        return selected.key, selected.index
+
+    def _select(self, candidates: List[APIKeyInfo], key) -> APIKeyInfo:
+        """Pick the best candidate by `key`, round robin among ties"""
+        best = min(key(k) for k in candidates)
+        tied = [k for k in candidates if key(k) == best]
+        if len(tied) == 1:
+            return tied[0]
+
+        for _ in range(len(self._keys)):
+            self._round_robin_index = (self._round_robin_index + 1) % len(self._keys)
+            if self._keys[self._round_robin_index] in tied:
+                return self._keys[self._round_robin_index]
+        return tied[0]
+
+    def release_key(
+        self,
+        key_index: int,
+        is_error: bool = False,
+        tokens_used: Optional[int] = None,
+        estimated_tokens: int = 0
+    ):
         """
         Release a key after request completion
 
         Args:
             key_index: The index of the key to release
             is_error: Whether the request resulted in an error
+            tokens_used: Actual tokens reported by the API (settles the TPM bucket)
+            estimated_tokens: Tokens consumed at acquire()
+        """
+        key_info = self._find(key_index)
+        if key_info is None:
+            return
+
+        key_info.active_requests = max(0, key_info.active_requests - 1)
+        if is_error:
+            key_info.error_count += 1
+        if tokens_used is not None:
+            key_info.tokens.consume(tokens_used - estimated_tokens)
+
+    def mark_rate_limited(self, key_index: int, retry_after: Optional[float] = None):
+        """
+        Put a key into cool-down after a 429
+
+        Args:
+            key_index: The index of the rate-limited key
+            retry_after: Server-indicated retry delay in seconds
+                (GEMINI_RATE_LIMIT_COOLDOWN_SECONDS if unknown)
         """
+        key_info = self._find(key_index)
+        if key_info is None:
+            return
+
+        if retry_after is None:
+            retry_after = settings.GEMINI_RATE_LIMIT_COOLDOWN_SECONDS
+        key_info.cooldown_until = max(key_info.cooldown_until, time.monotonic() + retry_after)
+        key_info.rate_limited_count += 1
+
+        # The server disagrees with our bucket: treat the minute as used up
+        key_info.requests.tokens = min(key_info.requests.tokens, 0.0)
+
+        logger.warning(f"Key {key_index} rate limited, cooling down for {retry_after:.1f}s")
+
+    def _find(self, key_index: int) -> Optional[APIKeyInfo]:
+        """Find key info by index"""
         for key_info in self._keys:
             if key_info.index == key_index:
-                key_info.active_requests = max(0, key_info.active_requests - 1)
-                if is_error:
-                    key_info.error_count += 1
-                break
+                return key_info
+        return None
 
     def get_stats(self) -> List[dict]:
         """Get statistics for all keys"""
@@ -124,11 +295,19 @@ class GeminiKeyManager:
                 "index": k.index,
                 "active_requests": k.active_requests,
                 "total_requests": k.total_requests,
-                "error_count": k.error_count
+                "error_count": k.error_count,
+                "rate_limited_count": k.rate_limited_count,
+                "headroom": round(k.headroom, 3),
+                "cooling_down": k.cooldown_until > time.monotonic()
             }
             for k in self._keys
         ]
 
+    @property
+    def keys(self) -> List[Tuple[int, str]]:
+        """Configured (key_index, api_key) pairs"""
+        return [(k.index, k.key) for k in self._keys]
+
     @property
     def key_count(self) -> int:
         """Number of configured keys"""
@@ -0,0 +1,141 @@
+"""
+Gemini Client Pool
+
+Responsibilities:
+- Create one long-lived async API client per Gemini key (at startup)
+- Hand out GenerativeModel instances bound to a key's client
+- Close channels on shutdown
+
+Dependencies:
+- google-generativeai (google.ai.generativelanguage clients)
+- app.utils.api_key_manager
+
+Implementation Notes:
+- Each key gets its own client with the key in client_options, so no
+  process-global genai.configure() is needed on the request path and
+  concurrent requests can never pick up another request's key
+- Clients use the grpc_asyncio transport: one HTTP/2 channel per key,
+  multiplexing concurrent calls, kept alive between requests
+- gRPC asyncio channels are bound to the event loop they were created
+  in, so clients are created lazily from within the running loop
+"""
+
+from functools import partial
+from typing import Dict, Optional, Tuple
+import logging
+
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from google.ai.generativelanguage_v1beta.services.generative_service.transports import (
+    GenerativeServiceGrpcAsyncIOTransport,
+)
+from google.api_core import gapic_v1
+
+from app.utils.api_key_manager import get_key_manager
+
+logger = logging.getLogger(__name__)
+
+# HTTP/2 keep-alive pings so idle channels are not dropped between chat turns
+KEEPALIVE_OPTIONS = [
+    ("grpc.keepalive_time_ms", 30000),
+    ("grpc.keepalive_timeout_ms", 10000),
+    ("grpc.keepalive_permit_without_calls", 1),
+    ("grpc.http2.max_pings_without_data", 0),
+]
+
+
+def _create_channel(*args, options=(), **kwargs):
+    """Default transport channel with keep-alive options added"""
+    return GenerativeServiceGrpcAsyncIOTransport.create_channel(
+        *args,
+        options=list(options) + KEEPALIVE_OPTIONS,
+        **kwargs
+    )
+
+
+class GeminiClientPool:
+    """
+    Per-key Gemini client pool
+
+    Usage:
+        pool = get_client_pool()
+        await pool.warm_up()                       # at startup
+        model = pool.get_model(key_index, "gemini-2.5-flash")
+        response = await model.generate_content_async(prompt)
+        client = pool.get_async_client(key_index)  # e.g. genai.embed_content_async(client=...)
+    """
+
+    _instance: Optional["GeminiClientPool"] = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialize()
+        return cls._instance
+
+    def _initialize(self):
+        """Initialize empty pool"""
+        self._keys: Dict[int, str] = dict(get_key_manager().keys)
+        self._clients: Dict[int, glm.GenerativeServiceAsyncClient] = {}
+        self._models: Dict[Tuple[int, str], genai.GenerativeModel] = {}
+
+    async def warm_up(self):
+        """Create clients for all keys (call from the running event loop)"""
+        for key_index in self._keys:
+            self.get_async_client(key_index)
+        logger.info(f"Gemini client pool ready ({len(self._clients)} clients)")
+
+    def get_async_client(self, key_index: int) -> glm.GenerativeServiceAsyncClient:
+        """
+        Get the async client of a key (created on first use)
+
+        Args:
+            key_index: Key index from GeminiKeyManager
+
+        Returns:
+            GenerativeServiceAsyncClient bound to the key
+        """
+        client = self._clients.get(key_index)
+        if client is None:
+            client = glm.GenerativeServiceAsyncClient(
+                transport=partial(GenerativeServiceGrpcAsyncIOTransport, channel=_create_channel),
+                client_options={"api_key": self._keys[key_index]},
+                client_info=gapic_v1.client_info.ClientInfo(
+                    user_agent=f"genai-py/{genai.__version__}"
+                ),
+            )
+            self._clients[key_index] = client
+        return client
+
+    def get_model(self, key_index: int, model_name: str) -> genai.GenerativeModel:
+        """
+        Get a generation model bound to a key's client
+
+        Args:
+            key_index: Key index from GeminiKeyManager
+            model_name: Gemini model name
+
+        Returns:
+            GenerativeModel whose async calls go through the key's client
+        """
+        model = self._models.get((key_index, model_name))
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            # The SDK has no public hook for the client; it only falls back
+            # to the global default client when this is unset
+            model._async_client = self.get_async_client(key_index)
+            self._models[(key_index, model_name)] = model
+        return model
+
+    async def close(self):
+        """Close all client channels"""
+        for client in self._clients.values():
+            await client.transport.close()
+        self._clients = {}
+        self._models = {}
+
+
+# Singleton instance getter
+def get_client_pool() -> GeminiClientPool:
+    """Get client pool singleton"""
+    return GeminiClientPool()
@@ -0,0 +1,351 @@
+"""
+Incremental JSON Stream Parser
+
+Responsibilities:
+- Consume an LLM's JSON output chunk by chunk
+- Yield each element of one array (e.g. "patches") as soon as it closes
+- Parse the whole document once its root closes, or repair a truncated
+  document without re-scanning it
+
+Dependencies:
+- json, re (standard library)
+
+Implementation Notes:
+- Text before the root "{" / "[" (markdown fences, prose) is skipped,
+  and so is anything after the root closes (closing fence)
+- One pass over the text: a regex jumps to the next structural
+  character (or the end of the current string), and a stack keeps each
+  open container's state (expecting key / colon / value / separator)
+- Trailing commas ("[1, 2,]", '{"a": 1,}') are recorded while scanning
+  and dropped when a slice is decoded
+- Repair: after every complete value (and every opened container) the
+  parser records a safe end; a truncated document is decoded as the text
+  up to that point plus the closers of the open containers, i.e. the
+  partial key / value / literal at the end is dropped, never guessed
+- The watched array is a member of the root object (array_key), or the
+  root array itself (array_key=None)
+- Elements that fail to decode are skipped (logged), the rest of the
+  stream is unaffected
+"""
+
+from bisect import bisect_left
+from typing import Any, List, Optional
+import json
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# Next structural character outside strings / next quote or escape inside
+STRUCTURAL = re.compile(r'[{}\[\],:"]')
+STRING_SPECIAL = re.compile(r'["\\]')
+
+# Container states
+KEY = 0      # object: expecting a key (or "}")
+COLON = 1    # object: key read, expecting ":"
+VALUE = 2    # expecting a value (or "]" right after "[")
+LITERAL = 3  # number / true / false / null in progress
+AFTER = 4    # value complete, expecting "," or a closer
+
+CLOSERS = {"{": "}", "[": "]"}
+
+
+class _Frame:
+    """Open container on the parser stack"""
+    __slots__ = ("kind", "state", "key", "watched", "comma")
+
+    def __init__(self, kind: str, watched: bool = False):
+        self.kind = kind              # "{" or "["
+        self.state = KEY if kind == "{" else VALUE
+        self.key: Optional[str] = None
+        self.watched = watched        # elements of this array are yielded
+        self.comma: Optional[int] = None  # position of the last ","
+
+
+class JSONStreamParser:
+    """
+    Incremental parser for a JSON document streamed in chunks
+
+    Usage:
+        parser = JSONStreamParser(array_key="patches")
+        async for chunk in stream:
+            for patch in parser.feed(chunk):
+                ...  # each "patches" element as soon as it closes
+        data = parser.result(repair=True)  # whole document (repaired if truncated)
+
+        # Whole responses
+        data = JSONStreamParser.parse(text)
+    """
+
+    def __init__(self, array_key: Optional[str] = None):
+        """
+        Args:
+            array_key: Member of the root object whose array elements are
+                yielded (None: elements of a root array)
+        """
+        self.array_key = array_key
+        self.text = ""
+        self.repaired = False
+        self._pos = 0
+        self._root_start: Optional[int] = None
+        self._root_end: Optional[int] = None
+        self._safe_end = 0
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._element_start: Optional[int] = None
+        self._element_depth = 0
+        self._dropped: List[int] = []  # trailing comma positions
+        self._result: Any = None
+        self._decoded = False
+
+    @classmethod
+    def parse(cls, text: str, repair: bool = True) -> Any:
+        """
+        Parse a complete response in one call
+
+        Args:
+            text: Response text (fences and surrounding prose allowed)
+            repair: Repair a truncated document
+
+        Returns:
+            Decoded document, or None
+        """
+        parser = cls()
+        parser.feed(text)
+        return parser.result(repair=repair)
+
+    @property
+    def done(self) -> bool:
+        """Whether the root value has closed"""
+        return self._root_end is not None
+
+    def feed(self, chunk: str) -> List[Any]:
+        """
+        Add a chunk of output
+
+        Args:
+            chunk: Next piece of the response text
+
+        Returns:
+            Elements of the watched array completed by this chunk
+        """
+        self.text += chunk
+        completed: List[Any] = []
+        text = self.text
+        end = len(text)
+        pos = self._pos
+
+        if self._root_start is None:
+            starts = [i for i in (text.find("{", pos), text.find("[", pos)) if i >= 0]
+            if self.array_key is not None:
+                # Watching a member: the root must be an object
+                starts = [i for i in starts if text[i] == "{"]
+            if not starts:
+                self._pos = end
+                return completed
+            pos = min(starts)
+            self._root_start = pos
+            self._open(text[pos], pos)
+            pos += 1
+
+        while pos < end and self._root_end is None:
+            if self._in_string:
+                pos = self._scan_string(text, pos, completed)
+                continue
+
+            match = STRUCTURAL.search(text, pos)
+            stop = match.start() if match else end
+            if stop > pos:
+                self._gap(text, pos, stop)
+            if match is None:
+                pos = end
+                break
+
+            char = text[stop]
+            frame = self._stack[-1]
+
+            if char == '"':
+                if frame.watched and frame.state == VALUE and self._element_start is None:
+                    self._start_element(stop)
+                self._in_string = True
+                self._escape = False
+                self._string_start = stop
+                pos = stop + 1
+            elif char == "{" or char == "[":
+                if frame.watched and frame.state == VALUE and self._element_start is None:
+                    self._start_element(stop)
+                self._open(char, stop)
+                pos = stop + 1
+            elif char == "}" or char == "]":
+                self._close(text, stop, frame, completed)
+                pos = stop + 1
+            elif char == ",":
+                if frame.state == LITERAL:
+                    self._end_literal(text, stop, completed)
+                    self._safe_end = stop
+                frame.state = KEY if frame.kind == "{" else VALUE
+                frame.comma = stop
+                pos = stop + 1
+            else:  # ":"
+                if frame.state == COLON:
+                    frame.state = VALUE
+                pos = stop + 1
+
+        self._pos = pos
+        return completed
+
+    def result(self, repair: bool = False) -> Any:
+        """
+        Parsed root value
+
+        Args:
+            repair: Decode a truncated document from its last safe end
+                (the partial member at the end is dropped)
+
+        Returns:
+            Decoded document, or None if incomplete (without repair) or invalid
+        """
+        if self._root_end is not None:
+            if not self._decoded:
+                self._decoded = True
+                try:
+                    self._result = json.loads(self._slice(self._root_start, self._root_end))
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Streamed JSON document is invalid: {e}")
+            return self._result
+
+        if not repair or self._root_start is None:
+            return None
+
+        closers = "".join(CLOSERS[frame.kind] for frame in reversed(self._stack))
+        try:
+            data = json.loads(self._slice(self._root_start, self._safe_end) + closers)
+        except json.JSONDecodeError as e:
+            logger.warning(f"Truncated JSON could not be repaired: {e}")
+            return None
+        self.repaired = True
+        return data
+
+    def _scan_string(self, text: str, pos: int, completed: List[Any]) -> int:
+        """Advance inside a string; returns the next position"""
+        end = len(text)
+        if self._escape:
+            if pos >= end:
+                return pos
+            self._escape = False
+            pos += 1
+
+        while True:
+            match = STRING_SPECIAL.search(text, pos)
+            if match is None:
+                return end
+            if match.group() == "\\":
+                if match.start() + 1 >= end:
+                    self._escape = True
+                    return end
+                pos = match.start() + 2
+                continue
+
+            close = match.start()
+            self._in_string = False
+            self._close_string(text, close, completed)
+            return close + 1
+
+    def _gap(self, text: str, start: int, stop: int):
+        """Text between structural characters: a literal starts here"""
+        frame = self._stack[-1]
+        if frame.state != VALUE:
+            return
+        stripped = text[start:stop].lstrip()
+        if not stripped:
+            return
+        if frame.watched and self._element_start is None:
+            self._start_element(stop - len(stripped))
+        frame.state = LITERAL
+
+    def _start_element(self, pos: int):
+        """First character of an element of the watched array"""
+        self._element_start = pos
+        self._element_depth = len(self._stack)
+
+    def _open(self, kind: str, pos: int):
+        """Push a container, marking the watched array"""
+        parent = self._stack[-1] if self._stack else None
+        if parent is None:
+            watched = kind == "[" and self.array_key is None
+        else:
+            watched = (
+                kind == "["
+                and len(self._stack) == 1
+                and parent.kind == "{"
+                and parent.key == self.array_key
+            )
+        self._stack.append(_Frame(kind, watched))
+        self._safe_end = pos + 1
+
+    def _close(self, text: str, pos: int, frame: _Frame, completed: List[Any]):
+        """Pop a container (dropping a trailing comma)"""
+        if frame.state == LITERAL:
+            self._end_literal(text, pos, completed)
+        elif frame.comma is not None and frame.state in (KEY, VALUE):
+            self._dropped.append(frame.comma)
+
+        self._stack.pop()
+        self._safe_end = pos + 1
+        if not self._stack:
+            self._root_end = pos + 1
+            return
+
+        self._stack[-1].state = AFTER
+        if self._element_start is not None and len(self._stack) == self._element_depth:
+            self._emit(self._element_start, pos + 1, completed)
+
+    def _close_string(self, text: str, pos: int, completed: List[Any]):
+        """Handle a closed string: object key or value"""
+        frame = self._stack[-1]
+        if frame.kind == "{" and frame.state == KEY:
+            try:
+                frame.key = json.loads(text[self._string_start:pos + 1])
+            except json.JSONDecodeError:
+                frame.key = None
+            frame.state = COLON
+            return
+
+        frame.state = AFTER
+        self._safe_end = pos + 1
+        if frame.watched and self._element_start == self._string_start:
+            self._emit(self._element_start, pos + 1, completed)
+
+    def _end_literal(self, text: str, pos: int, completed: List[Any]):
+        """A number / true / false / null ends at "," or a closer"""
+        self._stack[-1].state = AFTER
+        if self._element_start is not None and len(self._stack) == self._element_depth:
+            end = pos
+            while end > self._element_start and text[end - 1] in " \t\r\n":
+                end -= 1
+            self._emit(self._element_start, end, completed)
+
+    def _emit(self, start: int, end: int, completed: List[Any]):
+        """Decode a completed element"""
+        self._element_start = None
+        fragment = self._slice(start, end)
+        try:
+            completed.append(json.loads(fragment))
+        except json.JSONDecodeError as e:
+            logger.warning(f"Skipping invalid streamed element ({e}): {fragment[:200]}")
+
+    def _slice(self, start: int, end: int) -> str:
+        """Text between two positions without the dropped trailing commas"""
+        first = bisect_left(self._dropped, start)
+        last = bisect_left(self._dropped, end)
+        if first == last:
+            return self.text[start:end]
+
+        parts = []
+        for comma in self._dropped[first:last]:
+            parts.append(self.text[start:comma])
+            start = comma + 1
+        parts.append(self.text[start:end])
+        return "".join(parts)
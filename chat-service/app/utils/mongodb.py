@@ -72,3 +72,5 @@ def get_collection(collection_name: str, db_name: Optional[str] = None) -> Async
 SESSIONS_COLLECTION = "chat_sessions"
 CHAT_HISTORY_COLLECTION = "chat_history"
 USAGE_LOGS_COLLECTION = "gemini_usage"
+INTENT_CACHE_COLLECTION = "intent_cache"
+TRANSLATION_MEMORY_COLLECTION = "translation_memory"
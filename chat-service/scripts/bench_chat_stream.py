@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Streaming Latency Benchmark
+
+Measures what /chat/stream gains over /chat for the modification step:
+time to the first patch (local changes) and to the first HTML chunk
+(global changes) against the total generation time, using
+ModificationEngine.stream_local_change / stream_global_change with a
+stubbed streaming Gemini.
+
+The stub replaces GeminiClient.generate_content_stream and emits a canned
+response in chunks: time to first token + prompt tokens / prefill rate,
+then chunks of --chunk-tokens at --decode-rate. Times are scaled by
+--time-scale while running and reported unscaled.
+
+Usage:
+    python3 scripts/bench_chat_stream.py
+    python3 scripts/bench_chat_stream.py -n 50 --patches 8 --decode-rate 100
+"""
+
+import argparse
+import asyncio
+import codecs
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.models.chat import ChatResponse, Patch
+from app.models.common import AnalysisResult, IntentType
+from app.services.gemini_client import GeminiClient, estimate_tokens
+from app.services.modification_engine import ModificationEngine
+
+CONTEXT = {
+    "summary": (
+        '<section data-section-id="summary" class="p-6">'
+        + "".join(f'<div class="card p-4"><span>지표 {i}</span><b>{i * 1000:,}원</b></div>' for i in range(12))
+        + "</section>"
+    ),
+}
+FULL_HTML = (
+    "<!DOCTYPE html><html><head><title>대시보드</title></head><body>"
+    + "".join(
+        f'<section data-section-id="s{i}" class="p-6"><h2>섹션 {i}</h2>'
+        + "".join(f'<p class="text-gray-600">내용 {i}-{j}</p>' for j in range(20))
+        + "</section>"
+        for i in range(20)
+    )
+    + "</body></html>"
+)
+
+
+def patch_response(count: int) -> str:
+    """Canned local-change response with `count` patches"""
+    patches = [
+        {"selector": f'[data-section-id="summary"] .card:nth-child({i + 1})', "action": "replaceClass",
+         "oldValue": "p-4", "newValue": "p-6"}
+        for i in range(count)
+    ]
+    data = {"patches": patches, "summary": f"카드 {count}개의 여백을 넓혔습니다"}
+    return "```json\n" + json.dumps(data, ensure_ascii=False, indent=2) + "\n```"
+
+
+class StubStream:
+    """ContentStream stand-in emitting canned text at a modelled rate"""
+
+    def __init__(self, text: str, prompt: str, args: argparse.Namespace):
+        self.full_text = text
+        self.prompt = prompt
+        self.args = args
+        self.text = ""
+        self.tokens_used = 0
+
+    def __aiter__(self):
+        return self._stream()
+
+    async def _stream(self):
+        args = self.args
+        await asyncio.sleep((args.ttft + estimate_tokens(self.prompt) / args.prefill_rate) * args.time_scale)
+        # ~4 bytes of UTF-8 per token (as estimate_tokens)
+        step = args.chunk_tokens * 4
+        data = self.full_text.encode("utf-8")
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        for start in range(0, len(data), step):
+            chunk = decoder.decode(data[start:start + step], final=start + step >= len(data))
+            await asyncio.sleep(args.chunk_tokens / args.decode_rate * args.time_scale)
+            self.text += chunk
+            yield chunk
+        self.tokens_used = estimate_tokens(self.prompt) + estimate_tokens(self.full_text)
+
+
+async def measure(stream, time_scale: float) -> dict:
+    """Time to first partial item and to the final response (unscaled seconds)"""
+    start = time.perf_counter()
+    first = None
+    async for item in stream:
+        if isinstance(item, ChatResponse):
+            total = (time.perf_counter() - start) / time_scale
+            return {"first": first if first is not None else total, "total": total, "response": item}
+        if first is None:
+            first = (time.perf_counter() - start) / time_scale
+    raise RuntimeError("stream ended without a response")
+
+
+def report(name: str, runs: list):
+    first = [run["first"] for run in runs]
+    total = [run["total"] for run in runs]
+    print(
+        f"{name:<8} first {statistics.median(first):6.2f}s   total {statistics.median(total):6.2f}s   "
+        f"first/total {statistics.median(f / t for f, t in zip(first, total)):.0%}"
+    )
+
+
+async def run(args: argparse.Namespace):
+    engine = ModificationEngine()
+    local_text = patch_response(args.patches)
+    global_text = "```html\n" + FULL_HTML.replace("p-6", "p-8") + "\n```"
+
+    def stub(client, prompt, temperature=0.7, max_tokens=None):
+        text = local_text if '"patches"' in prompt else global_text
+        return StubStream(text, prompt, args)
+
+    original = GeminiClient.generate_content_stream
+    GeminiClient.generate_content_stream = stub
+    try:
+        local_runs, global_runs = [], []
+        analysis = AnalysisResult(intent=IntentType.LOCAL_CHANGE, confidence=0.9)
+        for _ in range(args.requests):
+            local_runs.append(await measure(
+                engine.stream_local_change("카드 여백 넓혀줘", CONTEXT, analysis), args.time_scale
+            ))
+            global_runs.append(await measure(
+                engine.stream_global_change("전체 여백 넓혀줘", FULL_HTML, analysis), args.time_scale
+            ))
+    finally:
+        GeminiClient.generate_content_stream = original
+
+    local_response = local_runs[-1]["response"]
+    assert len(local_response.patches) == args.patches and all(isinstance(p, Patch) for p in local_response.patches)
+    assert global_runs[-1]["response"].html == FULL_HTML.replace("p-6", "p-8")
+
+    report("local", local_runs)
+    report("global", global_runs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time to first patch / HTML chunk (stubbed streaming Gemini)")
+    parser.add_argument("-n", "--requests", type=int, default=20, help="Requests per change type")
+    parser.add_argument("--patches", type=int, default=5, help="Patches in the local-change response")
+    parser.add_argument("--ttft", type=float, default=0.6, help="Time to first token (s)")
+    parser.add_argument("--prefill-rate", type=float, default=20000, help="Prompt tokens per second")
+    parser.add_argument("--decode-rate", type=float, default=150, help="Output tokens per second")
+    parser.add_argument("--chunk-tokens", type=int, default=20, help="Tokens per streamed chunk")
+    parser.add_argument("--time-scale", type=float, default=0.02, help="Sleep this fraction of modelled time")
+    args = parser.parse_args()
+
+    # Measure generation only (global changes as streamed full HTML)
+    settings.PATCH_CACHE_ENABLED = False
+    settings.GLOBAL_CHANGE_EDIT_SCRIPT = False
+    settings.GLOBAL_CHANGE_SECTION_PARALLEL = False
+
+    print(f"=== Streaming benchmark ({args.requests} requests per change type) ===\n")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
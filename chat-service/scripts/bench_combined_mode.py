@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Combined Mode Latency Benchmark
+
+Runs the /chat analysis + modification step (_analyze_and_modify) in the
+two-step flow, with speculative patch generation (CHAT_SPECULATIVE_MODE)
+and in CHAT_COMBINED_MODE against a stubbed Gemini, and reports median /
+p95 latency and Gemini calls per request side by side.
+
+The stub replaces GeminiClient.generate_content (no API keys, no rate
+limiter) and answers each prompt type with a canned response. Its
+latency models a real call: time to first token + prompt tokens /
+prefill rate + output tokens / decode rate, with log-normal jitter.
+Times are scaled by --time-scale while running and reported unscaled.
+The rule-based intent fast path, the intent cache and the patch cache
+are off unless --intent-rules / --intent-cache / --patch-cache is given,
+so every mode pays for its LLM calls. The intent cache runs in memory
+only (no MongoDB tier); caches are cleared between modes.
+
+Usage:
+    python3 scripts/bench_combined_mode.py
+    python3 scripts/bench_combined_mode.py -n 200 --unusable-rate 0.1
+    python3 scripts/bench_combined_mode.py --ttft 0.8 --decode-rate 100
+    python3 scripts/bench_combined_mode.py --intent-rules --intent-cache --patch-cache
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.models.chat import SearchResult
+from app.routes.chat import _analyze_and_modify
+from app.services.gemini_client import GeminiClient, estimate_tokens
+from app.services.intent_cache import get_intent_cache
+from app.services.patch_cache import get_patch_cache
+from app.services.speculation import get_speculation_stats
+
+CONTEXT = {
+    "header": '<header data-section-id="header" class="bg-white shadow"><h1 class="text-2xl font-bold">매출 대시보드</h1></header>',
+    "summary": (
+        '<section data-section-id="summary" class="p-6"><p class="text-gray-600">이번 달 매출 요약</p>'
+        + "".join(f'<div class="card p-4"><span>지표 {i}</span><b>{i * 1000:,}원</b></div>' for i in range(12))
+        + '<button class="px-4 py-2 bg-blue-500 text-white rounded">자세히 보기</button></section>'
+    ),
+}
+
+# (message, intent, weight) - typical request mix
+WORKLOAD = [
+    ("헤더 배경색 파란색으로 바꿔줘", "local", 0.45),
+    ("버튼 텍스트를 '더 보기'로 바꿔줘", "local", 0.25),
+    ("이 페이지에 카드가 몇 개 있어?", "query", 0.15),
+    ("점심 메뉴 추천해줘", "off_topic", 0.10),
+    ("좀 바꿔줘", "unclear", 0.05),
+]
+INTENTS = {message: intent for message, intent, _ in WORKLOAD}
+
+ANALYSIS = {
+    "changeType": "style",
+    "targetDescription": "헤더 배경",
+    "actionDescription": "배경색을 파란색으로 변경",
+    "confidence": 0.92,
+    "useSearchResults": True,
+    "reasoning": "특정 섹션의 스타일 변경 요청",
+}
+PATCHES = {
+    "patches": [
+        {"selector": "header", "action": "replaceClass", "oldValue": "bg-white", "newValue": "bg-blue-500"},
+        {"selector": "header h1", "action": "addClass", "newValue": "text-white"},
+    ],
+    "summary": "헤더 배경색을 파란색으로 변경했습니다",
+}
+ANSWER = "요약 섹션에 카드가 12개 있습니다. 각 카드는 지표 이름과 금액을 표시합니다."
+
+
+class StubGemini:
+    """Canned responses with a token-based latency model"""
+
+    def __init__(self, args: argparse.Namespace, rng: random.Random):
+        self.args = args
+        self.rng = rng
+        self.calls = 0
+
+    def respond(self, prompt: str) -> str:
+        message = next(m for m in INTENTS if f'"{m}"' in prompt)
+        intent = INTENTS[message]
+        analysis = dict(ANALYSIS, intent=intent)
+
+        if "필요하면 바로 수정 패치나 답변을 작성하세요" in prompt:
+            if self.rng.random() < self.args.unusable_rate:
+                return '```json\n{"intent": "loc'   # truncated output
+            payload = dict(analysis, patches=[], summary="", answer=None)
+            if intent == "local":
+                payload.update(PATCHES)
+            elif intent == "query":
+                payload["answer"] = ANSWER
+            return json.dumps(payload, ensure_ascii=False, indent=2)
+        if "## 분석 지침" in prompt:
+            return json.dumps(analysis, ensure_ascii=False, indent=2)
+        if "HTML 섹션을 수정하세요" in prompt:
+            return json.dumps(PATCHES, ensure_ascii=False, indent=2)
+        return ANSWER
+
+    async def generate_content(self, client, prompt: str, temperature: float = 0.7, max_tokens=None):
+        self.calls += 1
+        text = self.respond(prompt)
+        seconds = (
+            self.args.ttft
+            + estimate_tokens(prompt) / self.args.prefill_rate
+            + estimate_tokens(text) / self.args.decode_rate
+        ) * self.rng.lognormvariate(0, self.args.jitter)
+        await asyncio.sleep(seconds * self.args.time_scale)
+        return {"text": text, "tokens_used": estimate_tokens(prompt) + estimate_tokens(text), "key_index": 0, "attempts": []}
+
+
+def percentile(values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+async def run_mode(
+    combined: bool,
+    speculate: bool,
+    messages: list,
+    stub: StubGemini,
+    time_scale: float
+) -> dict:
+    """Run every message through one flow; latencies in unscaled seconds"""
+    search_results = [
+        SearchResult(section_id=section_id, type="section", content=html[:200], score=1.0)
+        for section_id, html in CONTEXT.items()
+    ]
+    latencies = []
+    stub.calls = 0
+    get_intent_cache().clear()
+    get_patch_cache().clear()
+    for message in messages:
+        start = time.perf_counter()
+        await _analyze_and_modify(
+            message=message,
+            html_fragments=CONTEXT,
+            search_results=search_results,
+            full_html="".join(CONTEXT.values()),
+            combined=combined,
+            # The route speculates on strong section matches; every workload
+            # message targets the context sections
+            speculate=speculate
+        )
+        latencies.append((time.perf_counter() - start) / time_scale)
+    return {
+        "median": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "calls": stub.calls / len(messages),
+    }
+
+
+async def run(args: argparse.Namespace):
+    rng = random.Random(args.seed)
+    messages = rng.choices(
+        [message for message, _, _ in WORKLOAD],
+        weights=[weight for _, _, weight in WORKLOAD],
+        k=args.requests
+    )
+
+    stub = StubGemini(args, rng)
+    original = GeminiClient.generate_content
+    GeminiClient.generate_content = lambda client, *a, **kw: stub.generate_content(client, *a, **kw)
+    try:
+        results = {
+            "two-step": await run_mode(False, False, messages, stub, args.time_scale),
+            "speculative": await run_mode(False, True, messages, stub, args.time_scale),
+            "combined": await run_mode(True, False, messages, stub, args.time_scale),
+        }
+    finally:
+        GeminiClient.generate_content = original
+
+    print(f"{'mode':<12} {'median':>9} {'p95':>9} {'calls/req':>10}")
+    for mode, result in results.items():
+        print(f"{mode:<12} {result['median']:8.2f}s {result['p95']:8.2f}s {result['calls']:10.2f}")
+
+    two_step = results["two-step"]
+    print()
+    for mode in ("speculative", "combined"):
+        print(
+            f"{mode} vs two-step: median {results[mode]['median'] / two_step['median']:.2f}x, "
+            f"p95 {results[mode]['p95'] / two_step['p95']:.2f}x"
+        )
+
+    stats = get_speculation_stats().get_stats()
+    print(
+        f"\nspeculation: {stats['hits']} hits, {stats['misses']} misses, "
+        f"{stats['failures']} failures (hit rate {stats['hit_rate']:.0%}), "
+        f"{stats['wasted_tokens']} wasted tokens"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Two-step vs speculative vs combined latency (stubbed Gemini)")
+    parser.add_argument("-n", "--requests", type=int, default=100, help="Requests per mode")
+    parser.add_argument("--ttft", type=float, default=0.6, help="Time to first token (s)")
+    parser.add_argument("--prefill-rate", type=float, default=20000, help="Prompt tokens per second")
+    parser.add_argument("--decode-rate", type=float, default=150, help="Output tokens per second")
+    parser.add_argument("--jitter", type=float, default=0.25, help="Sigma of the log-normal latency jitter")
+    parser.add_argument("--unusable-rate", type=float, default=0.05,
+                        help="Share of combined responses that are unusable (forces the two-step fallback)")
+    parser.add_argument("--time-scale", type=float, default=0.02, help="Sleep this fraction of modelled time")
+    parser.add_argument("--intent-rules", action="store_true",
+                        help="Enable the rule-based intent fast path (INTENT_RULES_ENABLED)")
+    parser.add_argument("--intent-cache", action="store_true",
+                        help="Enable the in-memory intent cache (INTENT_CACHE_ENABLED)")
+    parser.add_argument("--patch-cache", action="store_true",
+                        help="Enable the local change patch cache (PATCH_CACHE_ENABLED)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    settings.INTENT_RULES_ENABLED = args.intent_rules
+    settings.INTENT_CACHE_ENABLED = args.intent_cache
+    settings.INTENT_CACHE_MONGO = False
+    settings.PATCH_CACHE_ENABLED = args.patch_cache
+
+    # Fallbacks are expected at --unusable-rate; keep the report readable
+    logging.basicConfig(level=logging.ERROR)
+
+    print(f"=== Combined mode benchmark ({args.requests} requests per mode) ===\n")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Context Packer Replay Benchmark
+
+Replays local-change requests against a generated table-heavy page
+through ModificationEngine.process_local_change with a stubbed Gemini,
+in three modes:
+- unbounded: every relevant section sent whole (the old context)
+- compressed: repeated rows collapsed to exemplars (structure_compressor)
+- packed: compressed, within CONTEXT_TOKEN_BUDGET (knapsack + skeletons)
+
+Each request has reference patches. The stub "sees" only the section
+HTML in its prompt: it returns a reference patch only if the patch
+selector matches there, as a model can only target what it is shown.
+A reference patch selecting every exemplar of a collapsed run is
+returned on [data-chat-run="<id>"] instead, and one addressing a row by
+position (tr:nth-child(30)) on [data-chat-row="30"], as the prompt
+asks, so the expansion to the run / the real row is exercised. The returned patches are
+applied to the real document with PatchEngine and compared with the
+reference result (accuracy), and prompt tokens are counted per request.
+
+Usage:
+    python3 scripts/bench_context_packer.py
+    python3 scripts/bench_context_packer.py --rows 300 --cards 60 --budget 1500
+"""
+
+import argparse
+import asyncio
+import json
+import re
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bs4 import BeautifulSoup
+
+from app.config import settings
+from app.models.common import AnalysisResult, ChangeType, IntentType
+from app.services.context_packer import pack_context
+from app.services.gemini_client import GeminiClient, estimate_tokens
+from app.services.modification_engine import ModificationEngine
+from app.services.patch_engine import PatchEngine
+from app.services.section_extractor import SectionExtractor, match_request
+
+# Row addressed by position: written as [data-chat-row] against collapsed rows
+ROW_POSITION = re.compile(r"\b(tr|li):nth-child\((\d+)\)")
+
+# (request, reference patches)
+REPLAY = [
+    ("헤더 배경색을 파란색으로 바꿔줘",
+     [{"selector": '[data-section-id="header"]', "action": "setStyle", "value": "background-color: blue"}]),
+    ("메인 제목을 '봄 세일'로 바꿔줘",
+     [{"selector": "#hero-title", "action": "setText", "newValue": "봄 세일"}]),
+    ("주문 테이블 행 간격 좁게 해줘",
+     [{"selector": '[data-section-id="orders"] td', "action": "replaceClass", "oldValue": "py-3", "newValue": "py-1"}]),
+    ("주문 120번 상태를 완료로 바꿔줘",
+     [{"selector": "#order-120 .status", "action": "setText", "newValue": "완료"}]),
+    ("주문 테이블 30번째 행 금액 굵게",
+     [{"selector": '[data-section-id="orders"] tbody > tr:nth-child(30) td:nth-child(3)', "action": "addClass", "value": "font-bold"}]),
+    ("테이블 제목에 밑줄 추가",
+     [{"selector": "#orders-title", "action": "addClass", "value": "underline"}]),
+    ("상품 카드 버튼 색을 빨간색으로",
+     [{"selector": ".card button", "action": "replaceClass", "oldValue": "bg-blue-500", "newValue": "bg-red-500"}]),
+    ("마지막 상품 카드 제목 굵게",
+     [{"selector": ".card:last-child h3", "action": "addClass", "value": "font-bold"}]),
+    ("자주 묻는 질문 제목 글자 크게",
+     [{"selector": '[data-section-id="faq"] summary', "action": "addClass", "value": "text-lg"}]),
+    ("푸터 텍스트 작게 해줘",
+     [{"selector": "footer p", "action": "replaceClass", "oldValue": "text-sm", "newValue": "text-xs"}]),
+    ("버튼 모서리 둥글게",
+     [{"selector": ".card button", "action": "addClass", "value": "rounded-full"}]),
+    ("주문 테이블 모든 행 배경을 회색으로",
+     [{"selector": '[data-section-id="orders"] tbody > tr', "action": "addClass", "value": "bg-gray-100"}]),
+    ("상품 카드 전부 테두리 추가",
+     [{"selector": ".card", "action": "addClass", "value": "border"}]),
+    ("자주 묻는 질문 항목 간격 넓게",
+     [{"selector": '[data-section-id="faq"] details', "action": "replaceClass", "oldValue": "py-2", "newValue": "py-4"}]),
+]
+
+
+def page_html(rows: int, cards: int) -> str:
+    """Page with a long order table, a product grid and a FAQ"""
+    header = (
+        '<header data-section-id="header" class="flex justify-between p-4 bg-white shadow">'
+        '<a href="/" class="text-xl font-bold">쇼핑몰</a><nav class="flex gap-4">'
+        + "".join(f'<a href="#m{i}" class="text-gray-700 hover:text-blue-600">메뉴 {i}</a>' for i in range(8))
+        + "</nav></header>"
+    )
+    hero = (
+        '<section data-section-id="hero" class="py-20 text-center bg-gray-50">'
+        '<h1 id="hero-title" class="text-4xl font-bold">여름 신상품 특가 행사</h1>'
+        '<p class="mt-4 text-gray-600">이번 주말까지 모든 신상품을 최대 50% 할인된 가격으로 만나보세요. '
+        '회원 전용 쿠폰과 무료 배송 혜택도 함께 제공합니다.</p></section>'
+    )
+    statuses = ["결제완료", "배송준비", "배송중", "배송완료"]
+    orders = (
+        '<section data-section-id="orders" class="p-6"><h2 id="orders-title" class="text-2xl font-semibold">주문 현황</h2>'
+        '<table class="w-full text-left"><thead><tr><th class="px-4 py-2">번호</th><th class="px-4 py-2">고객</th>'
+        '<th class="px-4 py-2">금액</th><th class="px-4 py-2">상태</th></tr></thead><tbody>'
+        + "".join(
+            f'<tr id="order-{i}" class="border-b hover:bg-gray-50"><td class="px-4 py-3">#{i}</td>'
+            f'<td class="px-4 py-3">고객{i}</td><td class="px-4 py-3">{(i * 7919) % 90000 + 10000:,}원</td>'
+            f'<td class="px-4 py-3 status">{statuses[i % 4]}</td></tr>'
+            for i in range(1, rows + 1)
+        )
+        + "</tbody></table></section>"
+    )
+    products = (
+        '<section data-section-id="products" class="p-6"><h2 class="text-2xl">추천 상품</h2>'
+        '<div class="grid grid-cols-4 gap-4">'
+        + "".join(
+            f'<div id="product-{i}" class="card p-4 rounded shadow"><h3 class="text-lg">상품 {i}</h3>'
+            f'<p class="text-gray-600">가볍고 튼튼한 소재로 만든 제품으로 매일 사용하기 좋습니다. 상품 {i}의 상세 설명입니다.</p>'
+            f'<button class="px-4 py-2 bg-blue-500 text-white">장바구니 담기</button></div>'
+            for i in range(1, cards + 1)
+        )
+        + "</div></section>"
+    )
+    faq = (
+        '<section data-section-id="faq" class="p-6"><h2 class="text-2xl">자주 묻는 질문</h2>'
+        + "".join(
+            f'<details class="border-b py-2"><summary class="font-medium">질문 {i}: 배송은 얼마나 걸리나요?</summary>'
+            f'<p class="text-gray-600">주문 후 평균 2~3일 이내에 배송됩니다. 도서 산간 지역은 추가로 1~2일이 더 걸릴 수 있으며, '
+            f'연휴 기간에는 택배사 사정에 따라 지연될 수 있습니다.</p></details>'
+            for i in range(1, 21)
+        )
+        + "</section>"
+    )
+    footer = (
+        '<footer data-section-id="footer" class="p-6 bg-gray-800 text-white">'
+        + "".join(f'<p class="text-sm">회사 정보 {i} · 사업자등록번호 123-45-6789{i} · 고객센터 1588-0000</p>' for i in range(4))
+        + "</footer>"
+    )
+    return (
+        "<!DOCTYPE html><html><head><title>쇼핑몰</title></head><body>"
+        f"{header}{hero}{orders}{products}{faq}{footer}</body></html>"
+    )
+
+
+def stub_factory(reference: list, prompts: list):
+    async def stub(client, prompt, temperature=0.7, max_tokens=None):
+        prompts.append(estimate_tokens(prompt))
+        shown = prompt.split("## 대상 HTML\n", 1)[1].split("\n\n## 분석된 작업", 1)[0]
+        seen = BeautifulSoup(shown, "html.parser")
+        patches = []
+        for patch in reference:
+            row = ROW_POSITION.sub(r'\1[data-chat-row="\2"]', patch["selector"])
+            if row != patch["selector"] and seen.select('[data-chat-row]'):
+                patch = {**patch, "selector": row}
+            matched = seen.select(patch["selector"])
+            if not matched:
+                continue
+            runs = {element.get("data-chat-run") for element in matched}
+            if len(runs) == 1 and None not in runs:
+                run_id = runs.pop()
+                if len(matched) == len(seen.select(f'[data-chat-run="{run_id}"]')):
+                    patch = {**patch, "selector": f'[data-chat-run="{run_id}"]'}
+            patches.append(patch)
+        text = "```json\n" + json.dumps({"patches": patches, "summary": "수정했습니다"}, ensure_ascii=False) + "\n```"
+        return {"text": text, "tokens_used": estimate_tokens(prompt) + estimate_tokens(text), "key_index": 0, "attempts": []}
+    return stub
+
+
+def apply(html: str, patches: list) -> str:
+    """Apply patches to a fresh parse of the document"""
+    return PatchEngine().apply(html, patches).html
+
+
+async def run_mode(name: str, html: str, budget: int, compression: bool) -> dict:
+    settings.CONTEXT_REPEAT_COMPRESSION = compression
+    engine = ModificationEngine()
+    extractor = SectionExtractor()
+    features = extractor.build_section_features(html)
+    analysis = AnalysisResult(intent=IntentType.LOCAL_CHANGE, change_type=ChangeType.STYLE, confidence=0.9)
+
+    prompt_tokens, correct, skeletons = [], 0, 0
+    original = GeminiClient.generate_content
+    try:
+        for message, reference in REPLAY:
+            # Route step 3-4: relevant sections, then the packed context
+            sections = extractor.find_relevant_sections(
+                html=html, user_request=message, max_sections=5, features=features, match=match_request(message)
+            )
+            packed = pack_context(
+                [(section.section_id, section.html, section.score) for section in sections], budget, query=message
+            )
+            skeletons += len(packed.skeletons)
+
+            prompts: list = []
+            GeminiClient.generate_content = stub_factory(reference, prompts)
+            response = await engine.process_local_change(message, packed.fragments, analysis)
+            prompt_tokens.append(prompts[0])
+
+            expected = apply(html, engine._build_patches(reference))
+            ok = apply(html, response.patches) == expected
+            correct += ok
+            if not ok:
+                print(f"  [{name}] missed: {message}  (sections {list(packed.fragments)}, skeletons {packed.skeletons})")
+    finally:
+        GeminiClient.generate_content = original
+
+    total = sum(prompt_tokens)
+    print(
+        f"{name:<10} prompt tokens {total:7d} total  {total / len(REPLAY):7.0f} avg  {max(prompt_tokens):6d} max   "
+        f"skeletons {skeletons:2d}   accuracy {correct}/{len(REPLAY)}"
+    )
+    return {"tokens": total, "correct": correct}
+
+
+async def run(args: argparse.Namespace):
+    html = page_html(args.rows, args.cards)
+    print(f"=== Context packer replay ({len(REPLAY)} requests, page {len(html.encode('utf-8')) / 1024:.0f} KB, "
+          f"budget {args.budget} tokens) ===\n")
+
+    unbounded = await run_mode("unbounded", html, 10 ** 9, compression=False)
+    compressed = await run_mode("compressed", html, 10 ** 9, compression=True)
+    packed = await run_mode("packed", html, args.budget, compression=True)
+
+    print(
+        f"\nprompt tokens vs unbounded: compressed {compressed['tokens'] / unbounded['tokens']:.0%}, "
+        f"packed {packed['tokens'] / unbounded['tokens']:.0%}"
+    )
+    assert compressed["correct"] == packed["correct"] == unbounded["correct"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prompt tokens and patch accuracy of local-change context (stubbed Gemini)")
+    parser.add_argument("--rows", type=int, default=200, help="Rows in the order table")
+    parser.add_argument("--cards", type=int, default=40, help="Product cards")
+    parser.add_argument("--budget", type=int, default=settings.CONTEXT_TOKEN_BUDGET, help="Context token budget")
+    args = parser.parse_args()
+
+    # Every request reaches the (stubbed) model
+    settings.PATCH_CACHE_ENABLED = False
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
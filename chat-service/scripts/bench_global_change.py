@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Global Change Benchmark
+
+Compares the global-change modes of ModificationEngine on a theme change
+of a generated page (~150 KB by default) against a stubbed Gemini:
+- full: the whole document is regenerated in one call
+- sections: the document is regenerated section by section, concurrently
+  (style brief first, then units of GLOBAL_CHANGE_UNIT_TOKENS)
+- edit_script: the model returns class substitutions / CSS rules, applied
+  server-side by PatchEngine
+
+The stub's latency models a real call: time to first token + prompt
+tokens / prefill rate + output tokens / decode rate, and output beyond
+--max-output-tokens is cut off (the full document is then truncated).
+Times are scaled by --time-scale while running and reported unscaled.
+Each result is checked: no element may keep an old theme class and no
+card may be lost (the truncated full regeneration is only reported).
+
+Usage:
+    python3 scripts/bench_global_change.py
+    python3 scripts/bench_global_change.py --sections 10 --cards 20 --concurrency 16
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bs4 import BeautifulSoup
+
+from app.config import settings
+from app.models.common import AnalysisResult, ChangeType, IntentType
+from app.services.gemini_client import GeminiClient, estimate_tokens
+from app.services.modification_engine import ModificationEngine
+from app.services.patch_engine import PatchEngine
+
+MESSAGE = "전체 테마 색상을 파란색에서 초록색으로 바꿔줘"
+THEME = {
+    "bg-blue-500": "bg-green-500",
+    "hover:bg-blue-600": "hover:bg-green-600",
+    "text-blue-600": "text-green-600",
+    "border-blue-200": "border-green-200",
+}
+
+
+def page_html(sections: int, cards: int) -> str:
+    """Dashboard-like page using the blue theme classes throughout"""
+    body = "".join(
+        f'<section data-section-id="s{i}" class="p-6 border border-blue-200">'
+        f'<h2 class="text-2xl font-bold text-blue-600">섹션 {i}</h2>'
+        + "".join(
+            f'<div class="card p-4 rounded shadow"><h3 class="text-lg text-blue-600">카드 {i}-{j}</h3>'
+            f'<p class="text-gray-600">설명 문장 {i}-{j} 입니다. 상품의 특징을 간단히 소개합니다.</p>'
+            f'<button class="px-4 py-2 bg-blue-500 hover:bg-blue-600 text-white rounded">자세히 보기</button></div>'
+            for j in range(cards)
+        )
+        + "</section>"
+        for i in range(sections)
+    )
+    return (
+        '<!DOCTYPE html><html><head><title>대시보드</title></head>'
+        f'<body class="bg-gray-50">{body}</body></html>'
+    )
+
+
+def stub_factory(args: argparse.Namespace, calls: list):
+    async def stub(client, prompt, temperature=0.7, max_tokens=None):
+        if '"edits"' in prompt:
+            edits = [{"type": "classMap", "from": old, "to": new} for old, new in THEME.items()]
+            text = "```json\n" + json.dumps(
+                {"edits": edits, "summary": "테마 색상을 초록색으로 변경했습니다"}, ensure_ascii=False, indent=2
+            ) + "\n```"
+        elif "스타일 가이드를 작성하세요" in prompt:
+            text = "\n".join(f"- {old} -> {new}" for old, new in THEME.items())
+        else:
+            if "## 섹션 HTML\n" in prompt:
+                html = prompt.split("## 섹션 HTML\n", 1)[1].split("\n\n## 응답 형식", 1)[0]
+            else:
+                html = prompt.split("## 현재 HTML\n", 1)[1].split("\n\n## 수정 요청", 1)[0]
+            for old, new in THEME.items():
+                html = html.replace(old, new)
+            text = "```html\n" + html + "\n```"
+
+        # Output beyond the limit is cut off (~4 bytes of UTF-8 per token)
+        limit = args.max_output_tokens * 4
+        data = text.encode("utf-8")
+        truncated = len(data) > limit
+        text = data[:limit].decode("utf-8", errors="ignore")
+
+        prompt_tokens, output_tokens = estimate_tokens(prompt), estimate_tokens(text)
+        calls.append({"output_tokens": output_tokens, "truncated": truncated})
+        latency = args.ttft + prompt_tokens / args.prefill_rate + output_tokens / args.decode_rate
+        await asyncio.sleep(latency * args.time_scale)
+        return {"text": text, "tokens_used": prompt_tokens + output_tokens, "key_index": 0, "attempts": []}
+    return stub
+
+
+def leftover_theme_classes(html: str) -> int:
+    """Elements still carrying an old theme class"""
+    soup = BeautifulSoup(html, "html.parser")
+    return sum(len(soup.select(f'[class~="{old}"]')) for old in THEME)
+
+
+def count_cards(html: str) -> int:
+    """Cards in a document (a truncated document loses the tail)"""
+    return len(BeautifulSoup(html, "html.parser").select(".card"))
+
+
+async def run_mode(name: str, args: argparse.Namespace, html: str):
+    settings.GLOBAL_CHANGE_EDIT_SCRIPT = name == "edit_script"
+    settings.GLOBAL_CHANGE_SECTION_PARALLEL = name == "sections"
+    engine = ModificationEngine()
+    analysis = AnalysisResult(intent=IntentType.GLOBAL_CHANGE, change_type=ChangeType.STYLE, confidence=0.9)
+    calls: list = []
+    # The route passes the cached session DOM
+    document = BeautifulSoup(html, "html.parser")
+
+    original = GeminiClient.generate_content
+    GeminiClient.generate_content = stub_factory(args, calls)
+    try:
+        start = time.perf_counter()
+        response = await engine.process_global_change(MESSAGE, html, analysis, document=document)
+        elapsed = (time.perf_counter() - start) / args.time_scale
+    finally:
+        GeminiClient.generate_content = original
+
+    apply_ms = 0.0
+    if response.patches:
+        # Cached session DOM and section features, as in the route
+        patch_engine = PatchEngine()
+        soup = patch_engine.extractor.parse_document(html)
+        features = patch_engine.extractor.build_section_features(html, soup=soup)
+        start = time.perf_counter()
+        result = patch_engine.apply(html, response.patches, soup, features)
+        apply_ms = (time.perf_counter() - start) * 1000
+        new_html = result.html
+    else:
+        new_html = response.html or ""
+
+    output_tokens = sum(call["output_tokens"] for call in calls)
+    truncated = any(call["truncated"] for call in calls)
+    print(
+        f"{name:<12} {response.metadata.get('global_mode', '-'):<12} {elapsed:7.1f}s   calls {len(calls):3d}   "
+        f"max output {max(call['output_tokens'] for call in calls):5d}   "
+        f"output tokens {output_tokens:6d}   response {len(response.model_dump_json()) / 1024:7.1f} KB   "
+        f"apply {apply_ms:6.1f} ms   truncated {'yes' if truncated else 'no':<3}   "
+        f"cards {count_cards(new_html)}/{count_cards(html)}   old classes left {leftover_theme_classes(new_html)}"
+    )
+    return response, new_html
+
+
+async def run(args: argparse.Namespace):
+    html = page_html(args.sections, args.cards)
+    print(f"=== Global change benchmark (page {len(html.encode('utf-8')) / 1024:.0f} KB) ===\n")
+
+    settings.GLOBAL_CHANGE_MAX_CONCURRENCY = args.concurrency
+
+    await run_mode("full", args, html)
+    for mode in ("sections", "edit_script"):
+        response, new_html = await run_mode(mode, args, html)
+        assert response.metadata["global_mode"] == mode
+        assert leftover_theme_classes(new_html) == 0 and count_cards(new_html) == count_cards(html)
+        if mode == "sections":
+            # Skeleton outside the sections is untouched
+            first = html.index("<section")
+            assert new_html[:first] == html[:first] and new_html.endswith("</body></html>")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Global change modes: full / section-parallel / edit script (stubbed Gemini)")
+    parser.add_argument("--sections", type=int, default=16, help="Sections in the page")
+    parser.add_argument("--cards", type=int, default=32, help="Cards per section")
+    parser.add_argument("--ttft", type=float, default=0.6, help="Time to first token (s)")
+    parser.add_argument("--prefill-rate", type=float, default=20000, help="Prompt tokens per second")
+    parser.add_argument("--decode-rate", type=float, default=150, help="Output tokens per second")
+    parser.add_argument("--concurrency", type=int, default=settings.GLOBAL_CHANGE_MAX_CONCURRENCY,
+                        help="Section rewrite calls in flight")
+    parser.add_argument("--max-output-tokens", type=int, default=8192, help="Output token limit per call")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="Sleep this fraction of modelled time")
+    args = parser.parse_args()
+
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+HTMLParser Benchmark
+
+Parses synthetic dashboards of growing size and reports parse time per KB.
+With a linear parser the time per KB stays flat as the document grows.
+
+Usage:
+    python3 scripts/bench_html_parser.py
+    python3 scripts/bench_html_parser.py --sizes 50 100 200 400 --repeat 5
+    python3 scripts/bench_html_parser.py --depth 40  # deeply nested sections
+    python3 scripts/bench_html_parser.py --with-gc   # keep the cyclic GC running
+
+The cyclic garbage collector is paused while timing by default: its
+passes over the large BeautifulSoup object graph add noise that is not
+part of the parser's own cost.
+"""
+
+import argparse
+import gc
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.html_parser import HTMLParser
+
+
+def build_dashboard(sections: int, depth: int) -> str:
+    """Build a dashboard-like page with `sections` sections nested `depth` divs deep"""
+    parts = [
+        '<!DOCTYPE html><html><head><title>Dashboard</title>',
+        '<script src="https://cdn.tailwindcss.com"></script></head>',
+        '<body class="bg-gray-50 min-h-screen">',
+    ]
+    for i in range(sections):
+        parts.append(f'<section data-section-id="section-{i}" class="p-6 bg-white rounded-lg shadow">')
+        parts.append('<div class="flex flex-col gap-2">' * depth)
+        parts.append(f'<h2 class="text-xl font-bold text-gray-800">매출 현황 {i}</h2>')
+        parts.append('<table class="w-full text-sm"><tbody>')
+        for row in range(10):
+            parts.append(
+                f'<tr class="border-b hover:bg-gray-50"><td class="px-4 py-2">항목 {row}</td>'
+                f'<td class="px-4 py-2 text-right">{row * 1000:,}원</td></tr>'
+            )
+        parts.append('</tbody></table>')
+        parts.append('<button class="px-4 py-2 bg-blue-500 text-white rounded">자세히 보기</button>')
+        parts.append('</div>' * depth)
+        parts.append('</section>')
+    parts.append('</body></html>')
+    return "".join(parts)
+
+
+def time_parse(html: str, repeat: int, with_gc: bool) -> float:
+    """Return the median parse time in seconds"""
+    timings = []
+    for _ in range(repeat):
+        gc.collect()
+        if not with_gc:
+            gc.disable()
+        try:
+            start = time.perf_counter()
+            HTMLParser(html).parse()
+            timings.append(time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTMLParser parse-time benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[25, 50, 100, 200, 400],
+                        help="Number of sections per document")
+    parser.add_argument("--depth", type=int, default=8, help="Wrapper divs per section")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (median is reported)")
+    parser.add_argument("--with-gc", action="store_true", help="Keep the cyclic GC enabled while timing")
+    args = parser.parse_args()
+
+    # Warm up imports and lxml before timing
+    HTMLParser(build_dashboard(1, args.depth)).parse()
+
+    print(f"=== HTMLParser benchmark (depth={args.depth}, repeat={args.repeat}) ===\n")
+    print(f"{'sections':>8} {'size (KB)':>10} {'nodes':>8} {'time (ms)':>10} {'ms/KB':>8}")
+
+    per_kb = []
+    for sections in args.sizes:
+        html = build_dashboard(sections, args.depth)
+        size_kb = len(html.encode("utf-8")) / 1024
+        nodes = HTMLParser(html).parse().total_nodes
+        elapsed = time_parse(html, args.repeat, args.with_gc)
+        per_kb.append(elapsed * 1000 / size_kb)
+        print(f"{sections:>8} {size_kb:>10.1f} {nodes:>8} {elapsed * 1000:>10.1f} {per_kb[-1]:>8.3f}")
+
+    # Linear growth keeps ms/KB roughly constant across sizes
+    growth = per_kb[-1] / per_kb[0]
+    print(f"\nms/KB growth from smallest to largest document: {growth:.2f}x")
+    print("✓ Linear" if growth < 1.5 else "✗ Super-linear growth detected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+JSON Stream Parser Throughput Benchmark
+
+Measures JSONStreamParser on local-change responses of increasing size
+(fenced, indented like Gemini output) fed whole and in small chunks,
+against json.loads on the same text with the fence stripped.
+
+Usage:
+    python3 scripts/bench_json_stream.py
+    python3 scripts/bench_json_stream.py --sizes 10 100 --chunks 0 16 -r 10
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.json_stream import JSONStreamParser
+
+
+def patch_response(count: int) -> str:
+    """Local-change response with `count` patches"""
+    patches = [
+        {"selector": f'[data-section-id="s{i % 20}"] .card:nth-child({i + 1}) > h3', "action": "setText",
+         "oldValue": f"기존 제목 {i}", "newValue": f"새 \"제목\" {i}\n부제목"}
+        for i in range(count)
+    ]
+    data = {"patches": patches, "summary": f"카드 {count}개의 제목을 변경했습니다"}
+    return "```json\n" + json.dumps(data, ensure_ascii=False, indent=2) + "\n```"
+
+
+def timed(func, repeat: int) -> float:
+    """Median seconds of `repeat` runs"""
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+    return statistics.median(runs)
+
+
+def stream(text: str, chunk: int) -> int:
+    parser = JSONStreamParser(array_key="patches")
+    count = 0
+    if chunk <= 0:
+        count += len(parser.feed(text))
+    else:
+        for start in range(0, len(text), chunk):
+            count += len(parser.feed(text[start:start + chunk]))
+    parser.result()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONStreamParser throughput vs json.loads")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000], help="Patches per response")
+    parser.add_argument("--chunks", type=int, nargs="+", default=[0, 64, 8], help="Chunk sizes in chars (0: whole)")
+    parser.add_argument("-r", "--repeat", type=int, default=20, help="Runs per measurement")
+    args = parser.parse_args()
+
+    print("=== JSON stream parser benchmark (MB/s, UTF-8) ===\n")
+    header = f"{'patches':>8} {'KB':>8} {'json.loads':>11}" + "".join(
+        f" {('whole' if chunk <= 0 else f'{chunk}-char'):>11}" for chunk in args.chunks
+    )
+    print(header)
+
+    for size in args.sizes:
+        text = patch_response(size)
+        body = text[len("```json\n"):-len("\n```")]
+        megabytes = len(text.encode("utf-8")) / 1e6
+        assert stream(text, 0) == size
+
+        row = f"{size:>8} {megabytes * 1000:>8.1f} {megabytes / timed(lambda: json.loads(body), args.repeat):>11.1f}"
+        for chunk in args.chunks:
+            assert stream(text, chunk) == size
+            row += f" {megabytes / timed(lambda: stream(text, chunk), args.repeat):>11.1f}"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Section Scoring Benchmark
+
+Scores requests against many sections with Tailwind-heavy class lists and
+compares the inverted SectionIndex with a direct scan over every keyword,
+class pattern and class of every section. Both must return the same ranking.
+
+Usage:
+    python3 scripts/bench_section_scoring.py
+    python3 scripts/bench_section_scoring.py --sections 500 --classes 60 --repeat 50
+"""
+
+import argparse
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.ast import SectionFeatures
+from app.services.section_extractor import KEYWORD_MAPPINGS
+from app.services.section_index import SectionIndex, get_section_index
+
+
+TAILWIND_PREFIXES = [
+    "bg-", "text-", "font-", "p-", "px-", "py-", "m-", "mx-", "my-", "w-", "h-",
+    "gap-", "space-y-", "border-", "rounded-", "shadow-", "grid-cols-", "col-span-",
+    "hover:bg-", "hover:text-", "md:w-", "lg:grid-cols-", "focus:ring-", "dark:bg-",
+]
+TAILWIND_VALUES = ["0", "1", "2", "4", "6", "8", "sm", "md", "lg", "xl", "full",
+                   "gray-50", "gray-800", "blue-500", "red-600", "green-100"]
+PLAIN_CLASSES = ["flex", "grid", "card", "btn", "btn-primary", "table", "nav-menu",
+                 "rounded", "shadow", "items-center", "justify-between", "truncate"]
+TAGS = ["div", "section", "h2", "h3", "p", "span", "button", "table", "tr", "td",
+        "ul", "li", "a", "img", "input", "form", "nav", "svg", "i"]
+WORDS = ["매출", "현황", "사용자", "주문", "버튼", "revenue", "orders", "total", "상세", "보기"]
+
+REQUESTS = [
+    "버튼 색 바꿔줘",
+    "헤더 제목 폰트 크게",
+    "테이블 간격 좁게",
+    "카드 그림자 추가하고 테두리 둥글게",
+    "매출 현황 배경 파란색으로",
+    "revenue 숫자 굵게",
+]
+
+
+def build_features(sections: int, classes: int, seed: int) -> list:
+    """Synthetic section features with Tailwind class lists"""
+    rng = random.Random(seed)
+    features = []
+    for position in range(sections):
+        class_set = {
+            rng.choice(TAILWIND_PREFIXES) + rng.choice(TAILWIND_VALUES)
+            for _ in range(classes)
+        }
+        class_set.update(rng.sample(PLAIN_CLASSES, 2))
+        text = " ".join(rng.choice(WORDS) for _ in range(30))
+        features.append(SectionFeatures(
+            section_id=f"section-{position}",
+            position=position,
+            tags=sorted(set(rng.sample(TAGS, 8))),
+            classes=sorted(class_set),
+            tokens=sorted(set(text.lower().split())),
+            text_content=text,
+            subtree_hash=f"{seed}-{position}",
+        ))
+    return features
+
+
+def scan_scores(features: list, request: str) -> list:
+    """Direct scan: every keyword × pattern × class × section"""
+    scores = {}
+    for position, section in enumerate(features):
+        score = 0.0
+        for keyword, mapping in KEYWORD_MAPPINGS.items():
+            if keyword not in request:
+                continue
+            for elem_type in mapping["elements"]:
+                if elem_type in section.tags:
+                    score += 2.0
+                    break
+            for class_pattern in mapping["classes"]:
+                for css_class in section.classes:
+                    if class_pattern in css_class:
+                        score += 1.0
+                        break
+        request_words = set(request.replace('?', '').replace('.', '').split())
+        common_words = request_words & set(section.tokens)
+        if common_words:
+            score += len(common_words) * 0.5
+        if score > 0:
+            scores[position] = score
+    return SectionIndex.rank(scores)
+
+
+def index_scores(features: list, request: str) -> list:
+    """Inverted index (compiled once per document and cached)"""
+    index = get_section_index(features, KEYWORD_MAPPINGS)
+    keywords = [keyword for keyword in KEYWORD_MAPPINGS if keyword in request]
+    return index.rank(index.relevance_scores(request, keywords))
+
+
+def median_ms(func, features: list, repeat: int) -> float:
+    """Median time in ms to score all requests once"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for request in REQUESTS:
+            func(features, request)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Section scoring benchmark")
+    parser.add_argument("--sections", type=int, default=500, help="Sections per document")
+    parser.add_argument("--classes", type=int, default=40, help="Tailwind classes per section")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs (median is reported)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    features = build_features(args.sections, args.classes, args.seed)
+
+    # Rankings must be identical
+    for request in REQUESTS:
+        assert scan_scores(features, request) == index_scores(features, request), request
+
+    start = time.perf_counter()
+    SectionIndex(features, KEYWORD_MAPPINGS)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    scan_ms = median_ms(scan_scores, features, args.repeat)
+    index_ms = median_ms(index_scores, features, args.repeat)
+
+    print(f"=== Section scoring benchmark ({args.sections} sections, "
+          f"~{args.classes} classes each, {len(REQUESTS)} requests) ===\n")
+    print(f"index build (once per document): {build_ms:>8.2f} ms")
+    print(f"direct scan:                     {scan_ms:>8.2f} ms")
+    print(f"inverted index:                  {index_ms:>8.2f} ms")
+    print(f"speedup:                         {scan_ms / index_ms:>8.1f}x")
+    print("✓ Rankings identical")
+
+
+if __name__ == "__main__":
+    main()
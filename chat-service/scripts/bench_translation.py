@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Translation Pipeline Benchmark
+
+Translates generated pages that share a header and footer with
+ModificationEngine._process_translation against a stubbed Gemini, in
+two modes:
+- single: every text in one call, no translation memory (the old
+  pipeline's shape)
+- chunked: token-budgeted chunks in parallel plus the translation memory
+  (in-process tier only)
+
+The stub answers the id-keyed prompt with "[EN] <source>" after a
+modelled latency (time to first token + output tokens / decode rate),
+shuffles the items and drops --drop of them to exercise the retry.
+Times are scaled by --time-scale while running and reported unscaled.
+Every translated page is checked for alignment: each text node must be
+the translation of its own source.
+
+Usage:
+    python3 scripts/bench_translation.py
+    python3 scripts/bench_translation.py --pages 5 --texts 400 --drop 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bs4 import BeautifulSoup
+from bs4.element import PreformattedString
+
+from app.config import settings
+from app.models.common import AnalysisResult, ChangeType, IntentType
+from app.services.gemini_client import GeminiClient, estimate_tokens
+from app.services.modification_engine import ModificationEngine
+from app.services.translation_memory import get_translation_memory
+
+SHARED_TEXTS = 40  # header / navigation / footer texts on every page
+
+
+def page_html(page: int, texts: int) -> str:
+    """Page with shared header and footer texts and its own body texts"""
+    header = "".join(f"<a href='#'>메뉴 항목 {i}</a>" for i in range(SHARED_TEXTS // 2))
+    footer = "".join(f"<p>회사 정보 {i} · 고객센터 안내</p>" for i in range(SHARED_TEXTS // 2))
+    body = "".join(
+        f'<div class="card"><h3>페이지 {page} 카드 제목 {i}</h3> <p>  이 카드는 {i}번째 상품을 설명하는 문장입니다.  </p></div>'
+        for i in range(texts // 2)
+    )
+    return (
+        f"<!DOCTYPE html><html><head><title>페이지 {page}</title><style>.card{{}}</style></head>"
+        f"<body><header>{header}</header><main>{body}<p>1,000 / 2,000</p></main>"
+        f"<footer>{footer}</footer></body></html>"
+    )
+
+
+def stub_factory(args: argparse.Namespace, rng: random.Random, calls: list):
+    async def stub(client, prompt, temperature=0.7, max_tokens=None):
+        source = prompt.split("텍스트 목록 (JSON):\n", 1)[1].split("\n\n응답 형식", 1)[0]
+        items = [{"id": item["id"], "text": "[EN] " + item["text"]} for item in json.loads(source)]
+        rng.shuffle(items)
+        items = [item for item in items if rng.random() >= args.drop]
+        text = "```json\n" + json.dumps({"translations": items}, ensure_ascii=False, indent=2) + "\n```"
+        output_tokens = estimate_tokens(text)
+        calls.append(output_tokens)
+        await asyncio.sleep((args.ttft + output_tokens / args.decode_rate) * args.time_scale)
+        return {"text": text, "tokens_used": estimate_tokens(prompt) + output_tokens, "key_index": 0, "attempts": []}
+    return stub
+
+
+def translatable_nodes(html: str) -> list:
+    """Text nodes the pipeline translates"""
+    return [
+        text for text in BeautifulSoup(html, "html.parser").find_all(string=True)
+        if not isinstance(text, PreformattedString)
+        and text.parent.name not in ("script", "style")
+        and any(char.isalpha() for char in text)
+    ]
+
+
+def check_alignment(original: str, translated: str) -> int:
+    """Text nodes that are not the translation of their own source"""
+    source_nodes = translatable_nodes(original)
+    result_nodes = translatable_nodes(translated)
+    assert len(source_nodes) == len(result_nodes)
+    return sum(result.strip() != "[EN] " + source.strip() for source, result in zip(source_nodes, result_nodes))
+
+
+async def run_mode(name: str, args: argparse.Namespace, pages: list) -> dict:
+    engine = ModificationEngine()
+    analysis = AnalysisResult(intent=IntentType.GLOBAL_CHANGE, change_type=ChangeType.TRANSLATION, confidence=0.95)
+    calls: list = []
+    rng = random.Random(args.seed)
+    get_translation_memory().clear()
+
+    original = GeminiClient.generate_content
+    GeminiClient.generate_content = stub_factory(args, rng, calls)
+    try:
+        times, tokens, wrong, untranslated = [], 0, 0, 0
+        for html in pages:
+            start = time.perf_counter()
+            response = await engine.process_global_change("전체 페이지 영어로 번역해줘", html, analysis)
+            times.append((time.perf_counter() - start) / args.time_scale)
+            assert response.html, response.message
+            tokens += response.metadata["tokens_used"]
+            untranslated += response.metadata["translation"]["untranslated"]
+            wrong += check_alignment(html, response.html) - response.metadata["translation"]["untranslated"]
+    finally:
+        GeminiClient.generate_content = original
+
+    print(
+        f"{name:<8} median {statistics.median(times):6.1f}s/page   first page {times[0]:6.1f}s   "
+        f"calls {len(calls):4d}   tokens {tokens:8d}   untranslated {untranslated:3d}   misaligned {wrong}"
+    )
+    return {"times": times, "tokens": tokens, "wrong": wrong}
+
+
+async def run(args: argparse.Namespace):
+    pages = [page_html(page, args.texts) for page in range(args.pages)]
+
+    chunk_tokens = settings.TRANSLATION_CHUNK_TOKENS
+    concurrency = settings.TRANSLATION_MAX_CONCURRENCY
+
+    # Old shape: one call with every text, nothing remembered
+    settings.TRANSLATION_CHUNK_TOKENS = 10 ** 9
+    settings.TRANSLATION_MAX_CONCURRENCY = 1
+    get_translation_memory().max_entries = 0
+    single = await run_mode("single", args, pages)
+
+    settings.TRANSLATION_CHUNK_TOKENS = chunk_tokens
+    settings.TRANSLATION_MAX_CONCURRENCY = concurrency
+    get_translation_memory().max_entries = settings.TRANSLATION_MEMORY_MAX_ENTRIES
+    before = get_translation_memory().get_stats()
+    chunked = await run_mode("chunked", args, pages)
+    after = get_translation_memory().get_stats()
+
+    assert single["wrong"] == 0 and chunked["wrong"] == 0
+    hits = after["hits"] - before["hits"]
+    lookups = hits + after["misses"] - before["misses"]
+    print(f"\ntranslation memory (chunked): {hits}/{lookups} texts reused ({hits / lookups:.0%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked parallel translation vs one call (stubbed Gemini)")
+    parser.add_argument("--pages", type=int, default=3, help="Pages translated in a row")
+    parser.add_argument("--texts", type=int, default=300, help="Body texts per page")
+    parser.add_argument("--drop", type=float, default=0.02, help="Fraction of items the stub leaves out")
+    parser.add_argument("--ttft", type=float, default=0.6, help="Time to first token (s)")
+    parser.add_argument("--decode-rate", type=float, default=150, help="Output tokens per second")
+    parser.add_argument("--time-scale", type=float, default=0.01, help="Sleep this fraction of modelled time")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # In-process memory tier only
+    settings.TRANSLATION_MEMORY_MONGO = False
+    get_translation_memory().use_mongo = False
+
+    print(
+        f"=== Translation benchmark ({args.pages} pages, {args.texts} body + {SHARED_TEXTS} shared texts, "
+        f"chunk {settings.TRANSLATION_CHUNK_TOKENS} tokens x {settings.TRANSLATION_MAX_CONCURRENCY}) ===\n"
+    )
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
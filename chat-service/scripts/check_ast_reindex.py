@@ -0,0 +1,349 @@
+#!/usr/bin/env python3
+"""
+AST Re-index Check
+
+Builds a synthetic dashboard session, applies edits (patches, a nested
+section change, a full replacement), and runs ASTReindexer on each. The
+resulting MongoDB update is applied to an in-memory copy of the session
+and compared with a full HTMLParser re-parse of the new HTML (node IDs
+aside), including the section root / parent / text node maps; every
+stored node must slice its own HTML out of the new current_html, starting
+with a tag that carries the node's own attributes (section 0 ends with a
+<textarea> holding markup, which must never be aligned as an element).
+ContextBuilder then expands a nested section to its parent and siblings
+on the re-indexed session. Also reports re-index time and update size
+against a full re-parse: node offsets are stored relative to their
+section, so re-index cost follows the edited section alone; the update for
+one edited section must not grow with the number of untouched sections.
+
+Usage:
+    python3 scripts/check_ast_reindex.py
+    python3 scripts/check_ast_reindex.py --sections 400 --repeat 5
+"""
+
+import argparse
+import copy
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from bs4 import BeautifulSoup
+
+from app.models.ast import SectionFeatures, anchored_node_dumps, resolve_node_offsets, slice_node_html
+from app.models.chat import Patch, SearchResult
+from app.services.ast_reindexer import ASTReindexer
+from app.services.context_builder import ContextBuilder
+from app.services.html_parser import HTMLParser
+from app.services.patch_engine import PatchEngine
+from app.services.section_extractor import SectionExtractor
+
+
+def build_dashboard(sections: int) -> str:
+    """Dashboard with layout wrappers between sections and one nested section"""
+    parts = [
+        '<!DOCTYPE html><html><head><title>Dashboard</title></head>',
+        '<body class="bg-gray-50"><main class="grid gap-4">',
+    ]
+    for i in range(sections):
+        parts.append(f'<div class="col-span-1"><section data-section-id="section-{i}" class="p-6 bg-white">')
+        parts.append(f'<h2 class="text-xl font-bold">매출 현황 {i}</h2><ul>')
+        for row in range(5):
+            parts.append(f'<li class="py-1">항목 {row}: {row * 1000:,}원</li>')
+        parts.append('</ul>')
+        if i == 1:
+            parts.append('<div data-section-id="section-1-chart" class="h-40"><p>차트 영역</p></div>')
+        parts.append('<button class="px-4 py-2 bg-blue-500 text-white">자세히 보기</button>')
+        if i == 0:
+            # Markup inside RCDATA is text: the next section's wrapper must not align to it
+            parts.append('<textarea class="memo"><div class="note">메모</div></textarea>')
+        parts.append('</section></div>')
+    parts.append('</main><footer class="p-4">© 2025</footer></body></html>')
+    return "".join(parts)
+
+
+def make_session(html: str) -> dict:
+    """Session document as stored by POST /session/start"""
+    parser = HTMLParser(html)
+    parse_result = parser.parse()
+    features = SectionExtractor().features_from_elements(html, parser.section_elements, parser.source_elements)
+    return {
+        "session_id": "check",
+        "current_html": html,
+        "ast_nodes": anchored_node_dumps(parse_result.nodes, features),
+        "section_index": parse_result.section_index,
+        "section_roots": parse_result.section_roots,
+        "section_parents": parse_result.section_parents,
+        "section_text_nodes": parse_result.section_text_nodes,
+        "section_features": [f.model_dump() for f in features],
+        "stats": {
+            "node_count": parse_result.total_nodes,
+            "text_node_count": parse_result.total_text_nodes,
+            "section_count": parse_result.total_sections,
+            "vector_count": 0,
+            "html_size": parse_result.html_size,
+        },
+    }
+
+
+def apply_update(session: dict, update: dict) -> dict:
+    """Apply $set / $unset with dotted field paths, like MongoDB"""
+    session = copy.deepcopy(session)
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            *parents, key = path.split(".")
+            target = session
+            for part in parents:
+                target = target.setdefault(part, {})
+            if operator == "$set":
+                target[key] = value
+            else:
+                target.pop(key, None)
+    return session
+
+
+def node_html(session: dict, node: dict) -> str:
+    """HTML a stored node's (section-relative) offsets slice out of current_html"""
+    sections = {f["section_id"]: SectionFeatures(**f) for f in session["section_features"]}
+    start, end = resolve_node_offsets(node, sections)
+    return slice_node_html(session["current_html"], start, end, node["tag"])
+
+
+def section_view(session: dict) -> dict:
+    """Nodes per section, with the HTML their offsets slice out of current_html"""
+    view = {}
+    for section_id, node_ids in session["section_index"].items():
+        nodes = [session["ast_nodes"][node_id] for node_id in node_ids]
+        view[section_id] = [
+            (n["tag"], n["path"], n["classes"], n["attributes"], n["text_content"],
+             node_html(session, n))
+            for n in nodes
+        ]
+    return view
+
+
+def misaligned_nodes(session: dict) -> list:
+    """Nodes whose offsets slice out an element with other attributes"""
+    misaligned = []
+    for node in session["ast_nodes"].values():
+        sliced = node_html(session, node)
+        if sliced is None:
+            continue
+        element = BeautifulSoup(sliced, "html.parser").find(node["tag"])
+        attributes = {key: " ".join(value) if isinstance(value, list) else value for key, value in element.attrs.items()}
+        if attributes.pop("class", "").split() != node["classes"] or attributes != node["attributes"]:
+            misaligned.append(node["path"])
+    return misaligned
+
+
+def section_map_view(session: dict) -> dict:
+    """Parent and root node (path, tag) per section; roots must head section_index"""
+    view = {}
+    for section_id, root_id in session["section_roots"].items():
+        assert session["section_index"][section_id][0] == root_id
+        root = session["ast_nodes"][root_id]
+        view[section_id] = (session["section_parents"][section_id], root["path"], root["tag"])
+    return view
+
+
+def check_start_features(html: str) -> bool:
+    """Session-start features (HTMLParser spans, cross-checked) locate sections like the html.parser path"""
+    parser = HTMLParser(html)
+    parser.parse()
+    extractor = SectionExtractor()
+    started = extractor.features_from_elements(html, parser.section_elements, parser.source_elements)
+    reference = extractor.build_section_features(html)
+
+    # A patch on the section after the textarea must land in that section
+    patch = Patch(selector='[data-section-id="section-1"] h2', action="setText", value="패치됨")
+    ok = (
+        [(f.section_id, f.start, f.end) for f in started] == [(f.section_id, f.start, f.end) for f in reference]
+        and PatchEngine().apply(html, [patch], None, started).html == PatchEngine().apply(html, [patch]).html
+    )
+    print(f"{'✓' if ok else '✗'} session start features: section spans match the html.parser path")
+    return ok
+
+
+def check_context_builder(session: dict) -> bool:
+    """Parent / sibling expansion of the nested section on a re-indexed session"""
+    result = ContextBuilder(session, max_context_tokens=10 ** 6).build_context(
+        [SearchResult(node_id=None, section_id="section-1-chart", selector=None, type="section", content="", score=1.0)],
+        include_parents=True,
+        include_siblings=True
+    )
+    builder = ContextBuilder(session)
+    ok = (
+        set(result.sections_included) == {"section-1-chart", "section-1"}
+        and builder._find_sibling_sections("section-3") == ["section-2", "section-4"]
+        and builder._find_parent_section("section-1") is None
+        and result.html_fragments["section-1"].startswith('<section data-section-id="section-1"')
+    )
+    print(f"{'✓' if ok else '✗'} context builder: parent of section-1-chart, siblings of section-3")
+    return ok
+
+
+def layout_view(session: dict) -> list:
+    """Nodes outside sections with their HTML"""
+    return sorted(
+        (n["path"], n["tag"], node_html(session, n) if n["start"] is not None else None)
+        for n in session["ast_nodes"].values() if not n.get("section_id")
+    )
+
+
+def check_edit(name: str, session: dict, new_html: str, features) -> tuple:
+    """Re-index one edit and compare with a full re-parse; returns (ok, new session)"""
+    result = ASTReindexer().reindex(session, new_html, features)
+    updated = apply_update(session, result.update)
+    updated["current_html"] = new_html
+    updated["section_features"] = [f.model_dump() for f in features]
+
+    expected = make_session(new_html)
+    problems = []
+    if section_view(updated) != section_view(expected):
+        problems.append("section nodes differ")
+    if layout_view(updated) != layout_view(expected):
+        problems.append("layout nodes differ")
+    stats = {key: updated["stats"].get(key) for key in expected["stats"]}
+    if stats != expected["stats"]:
+        problems.append(f"stats {stats} != {expected['stats']}")
+    if len(updated["ast_nodes"]) != expected["stats"]["node_count"]:
+        problems.append("orphaned or missing nodes")
+    if section_map_view(updated) != section_map_view(expected):
+        problems.append("section root / parent maps differ")
+    if updated["section_text_nodes"] != expected["section_text_nodes"]:
+        problems.append("section text node counts differ")
+    if any(
+        node_html(updated, n) is None
+        for n in updated["ast_nodes"].values() if n["start"] is not None
+    ):
+        problems.append("stale node offsets")
+    if misaligned_nodes(updated):
+        problems.append(f"misaligned node offsets: {misaligned_nodes(updated)[:3]}")
+
+    mode = "full" if result.full else f"sections {result.changed_sections}"
+    print(f"{'✓' if not problems else '✗'} {name}: {mode}")
+    for problem in problems:
+        print(f"  - {problem}")
+    return not problems, updated
+
+
+def run_checks(sections: int) -> bool:
+    """Chain edits on one session so stale offsets are exercised"""
+    engine, extractor = PatchEngine(), SectionExtractor()
+    session = make_session(build_dashboard(sections))
+    misaligned = misaligned_nodes(session)
+    print(f"{'✓' if not misaligned else '✗'} initial parse: node offsets slice their own elements")
+    ok = not misaligned
+    ok &= check_start_features(session["current_html"])
+    edits = [
+        ("patch text (longer)", [Patch(selector='[data-section-id="section-0"] h2', action="setText", value="매출 현황 (전년 대비 증가)")]),
+        ("patch attribute", [Patch(selector='[data-section-id="section-5"] button', action="addClass", new_value="shadow-lg")]),
+        ("patch nested section", [Patch(selector='[data-section-id="section-1-chart"] p', action="setText", value="월별 차트")]),
+        ("patch two sections", [
+            Patch(selector='[data-section-id="section-2"] li', action="setText", value="없음"),
+            Patch(selector='[data-section-id="section-3"] h2', action="setStyle", value="color: red"),
+        ]),
+    ]
+
+    for name, patches in edits:
+        result = engine.apply(session["current_html"], patches)
+        passed, session = check_edit(name, session, result.html, result.features)
+        ok &= passed
+
+    # Full replacement: one section gets new children, layout untouched
+    html = session["current_html"].replace("<ul>", "<ol><li>신규</li></ol><ul>", 1)
+    passed, session = check_edit("full replacement", session, html, extractor.build_section_features(html))
+    ok &= passed
+
+    # Content outside sections changed: must fall back to a full re-parse
+    html = session["current_html"].replace("© 2025", "© 2026")
+    passed, session = check_edit("footer change (fallback)", session, html, extractor.build_section_features(html))
+    ok &= passed
+
+    ok &= check_context_builder(session)
+    ok &= check_update_size()
+    ok &= check_legacy_session()
+    return ok
+
+
+def check_update_size() -> bool:
+    """A one-section edit writes the same update however many sections follow it"""
+    sizes = []
+    for sections in (20, 60, 180):
+        session = make_session(build_dashboard(sections))
+        patch = Patch(selector='[data-section-id="section-5"] h2', action="setText", value="매출 현황 (전년 대비 증가)")
+        result = PatchEngine().apply(session["current_html"], [patch])
+        update = ASTReindexer().reindex(session, result.html, result.features).update
+        # stats.* hold page-wide counts (their digits grow with the page)
+        sizes.append(len(json.dumps({
+            operator: {path: value for path, value in fields.items() if not path.startswith("stats.")}
+            for operator, fields in update.items()
+        }, ensure_ascii=False)))
+
+    ok = len(set(sizes)) == 1
+    print(f"{'✓' if ok else '✗'} update size for a section-5 edit with 20 / 60 / 180 sections: {sizes} bytes")
+    return ok
+
+
+def check_legacy_session() -> bool:
+    """Sessions stored with absolute node offsets are re-indexed in full"""
+    session = make_session(build_dashboard(6))
+    sections = {f["section_id"]: SectionFeatures(**f) for f in session["section_features"]}
+    for node in session["ast_nodes"].values():
+        node["start"], node["end"] = resolve_node_offsets(node, sections)
+        for key in ("anchor", "start_after", "end_after"):
+            del node[key]
+
+    patch = Patch(selector='[data-section-id="section-2"] h2', action="setText", value="수정됨")
+    result = PatchEngine().apply(session["current_html"], [patch])
+    ok = ASTReindexer().reindex(session, result.html, result.features).full
+    print(f"{'✓' if ok else '✗'} session with absolute node offsets: full re-parse")
+    return ok
+
+
+def bench(sections: int, repeat: int):
+    """Time a one-section patch: incremental re-index vs full re-parse"""
+    session = make_session(build_dashboard(sections))
+    patch = Patch(selector=f'[data-section-id="section-{sections // 2}"] h2', action="setText", value="수정됨")
+    result = PatchEngine().apply(session["current_html"], [patch])
+
+    incremental, full = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        update = ASTReindexer().reindex(session, result.html, result.features).update
+        incremental.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        full_update = ASTReindexer()._full(result.html, result.features).update
+        full.append(time.perf_counter() - start)
+
+    size = len(json.dumps(update, ensure_ascii=False))
+    full_size = len(json.dumps(full_update, ensure_ascii=False))
+    print(
+        f"{sections:>5} sections | re-index {statistics.median(incremental) * 1000:7.2f} ms, "
+        f"{size / 1024:7.1f} KB update | full {statistics.median(full) * 1000:7.2f} ms, "
+        f"{full_size / 1024:8.1f} KB update"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ASTReindexer correctness check and benchmark")
+    parser.add_argument("--sections", type=int, default=200, help="Sections in the largest benchmark page")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (median is reported)")
+    args = parser.parse_args()
+
+    ok = run_checks(20)
+
+    print()
+    for sections in sorted({max(args.sections // 4, 1), max(args.sections // 2, 1), args.sections}):
+        bench(sections, args.repeat)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+HTML Fence Parity Check
+
+Feeds the same model outputs to both paths that turn a regenerated
+document into HTML and checks that they agree:
+- /chat:        ModificationEngine._extract_html on the complete text
+- /chat/stream: ModificationEngine.stream_global_change with a stubbed
+                streaming Gemini, split into chunks of every size from 1
+                to --max-chunk characters
+
+For each output, the streamed chunks concatenated, the HTML of the final
+FULL response and _extract_html must all equal the expected HTML: fences
+removed, and nothing after the closing fence (e.g. a trailing note).
+
+Usage:
+    python3 scripts/check_html_fence.py
+    python3 scripts/check_html_fence.py --max-chunk 40
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.models.chat import ChatResponse
+from app.models.common import AnalysisResult, IntentType
+from app.services.gemini_client import GeminiClient
+from app.services.modification_engine import ModificationEngine
+
+HTML = '<main class="p-8">\n  <h1 class="text-2xl">매출</h1>\n  <pre>a ` b</pre>\n</main>'
+
+# (name, model output, expected HTML)
+CASES = [
+    ("fenced", f"```html\n{HTML}\n```", HTML),
+    ("fenced, trailing note", f"```html\n{HTML}\n```\n\n참고: 여백을 p-8로 넓혔습니다.", HTML),
+    ("fenced, note after fence on same line", f"```html\n{HTML}\n``` 변경 완료", HTML),
+    ("fenced, indented closing fence", f"  ```html\n{HTML}\n  ```  \n", HTML),
+    ("fenced, no closing fence", f"```html\n{HTML}\n", HTML),
+    ("fenced, fence glued to the HTML", f"```html\n{HTML}```", HTML),
+    ("bare fence", f"```\n{HTML}\n```\nDone.", HTML),
+    ("unfenced", f"\n{HTML}\n\n", HTML),
+    ("empty fence", "```html\n```\n설명", ""),
+]
+
+
+class ChunkedStream:
+    """ContentStream stand-in emitting text in fixed-size chunks"""
+
+    def __init__(self, text: str, size: int):
+        self.full_text = text
+        self.size = size
+        self.text = ""
+        self.tokens_used = 0
+
+    def __aiter__(self):
+        return self._stream()
+
+    async def _stream(self):
+        for offset in range(0, len(self.full_text), self.size):
+            chunk = self.full_text[offset:offset + self.size]
+            self.text += chunk
+            yield chunk
+
+
+async def stream_html(engine: ModificationEngine, output: str, size: int) -> tuple:
+    """(concatenated chunks, final response HTML) of one streamed output"""
+    def stub(client, prompt, temperature=0.7, max_tokens=None):
+        return ChunkedStream(output, size)
+
+    GeminiClient.generate_content_stream = stub
+    chunks, response = [], None
+    analysis = AnalysisResult(intent=IntentType.GLOBAL_CHANGE, confidence=0.9)
+    async for item in engine.stream_global_change("전체 여백 넓혀줘", HTML, analysis):
+        if isinstance(item, str):
+            chunks.append(item)
+        elif isinstance(item, ChatResponse):
+            response = item
+    return "".join(chunks), response.html if response is not None else None
+
+
+async def run(max_chunk: int) -> bool:
+    engine = ModificationEngine()
+    ok = True
+    for name, output, expected in CASES:
+        problems = []
+        extracted = engine._extract_html(output)
+        if extracted != expected:
+            problems.append(f"/chat: {extracted!r}")
+        for size in range(1, max_chunk + 1):
+            streamed, final = await stream_html(engine, output, size)
+            if streamed != expected or final != expected:
+                problems.append(f"/chat/stream, {size}-char chunks: streamed {streamed!r}, final {final!r}")
+                break
+
+        ok &= not problems
+        print(f"{'✓' if not problems else '✗'} {name}")
+        for problem in problems:
+            print(f"  - {problem}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fence parsing parity of /chat and /chat/stream")
+    parser.add_argument("--max-chunk", type=int, default=24, help="Largest stream chunk size (characters)")
+    args = parser.parse_args()
+
+    # Regenerate the document directly (no edit script / section rewrite)
+    original = GeminiClient.generate_content_stream
+    flags = (settings.GLOBAL_CHANGE_EDIT_SCRIPT, settings.GLOBAL_CHANGE_SECTION_PARALLEL)
+    settings.GLOBAL_CHANGE_EDIT_SCRIPT = settings.GLOBAL_CHANGE_SECTION_PARALLEL = False
+    try:
+        ok = asyncio.run(run(args.max_chunk))
+    finally:
+        GeminiClient.generate_content_stream = original
+        settings.GLOBAL_CHANGE_EDIT_SCRIPT, settings.GLOBAL_CHANGE_SECTION_PARALLEL = flags
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
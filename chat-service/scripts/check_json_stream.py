@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+JSON Stream Parser Fuzz Check
+
+Generates random JSON documents shaped like LLM responses (nested
+objects and arrays, escapes, unicode, numbers), serializes them with
+random formatting, optional code fences / surrounding prose and
+injected trailing commas, and feeds them to JSONStreamParser in random
+chunks. Checks:
+- complete documents: every element of the watched array is yielded
+  once, in order, and result() equals the document
+- truncated documents (cut at a random point): result(repair=True) is
+  a prefix of the document - every value it keeps is complete and equal
+  to the original, only the tail is dropped
+- the elements yielded before the cut are exactly the closed ones
+- corrupted documents (random characters deleted / inserted) never
+  raise
+
+Usage:
+    python3 scripts/check_json_stream.py
+    python3 scripts/check_json_stream.py --cases 20000 --seed 3
+"""
+
+import argparse
+import json
+import logging
+import random
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.json_stream import JSONStreamParser
+
+ALPHABET = 'abc xyz 가나다 "\\/{}[],:\n\t é😀'
+KEYS = ["selector", "action", "newValue", "oldValue", "value", "summary", "a", "b", "키"]
+
+
+def random_string(rng: random.Random) -> str:
+    return "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 12)))
+
+
+def random_value(rng: random.Random, depth: int):
+    roll = rng.random()
+    if depth <= 0 or roll < 0.45:
+        return rng.choice([
+            lambda: random_string(rng),
+            lambda: rng.randint(-10 ** 6, 10 ** 6),
+            lambda: round(rng.uniform(-1000, 1000), rng.randint(0, 6)),
+            lambda: rng.choice([True, False, None]),
+        ])()
+    if roll < 0.75:
+        return {rng.choice(KEYS) + str(i): random_value(rng, depth - 1) for i in range(rng.randint(0, 4))}
+    return [random_value(rng, depth - 1) for _ in range(rng.randint(0, 4))]
+
+
+def random_document(rng: random.Random, array_key):
+    elements = [random_value(rng, 3) for _ in range(rng.randint(0, 6))]
+    if array_key is None:
+        return elements
+    document = {key: random_value(rng, 2) for key in rng.sample(KEYS, rng.randint(0, 3))}
+    document[array_key] = elements
+    # Members after the array too
+    document["summary"] = random_string(rng)
+    return document
+
+
+def add_trailing_commas(text: str, rng: random.Random) -> str:
+    """Insert "," before some closers outside strings (not after an opener)"""
+    out = []
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "}]" and rng.random() < 0.3:
+            previous = "".join(out).rstrip()
+            if previous and previous[-1] not in "[{,":
+                out.append(",")
+        out.append(char)
+    return "".join(out)
+
+
+def serialize(document, rng: random.Random) -> str:
+    indent = rng.choice([None, 2, 4])
+    text = json.dumps(document, ensure_ascii=rng.random() < 0.3, indent=indent)
+    if rng.random() < 0.5:
+        text = add_trailing_commas(text, rng)
+    if rng.random() < 0.5:
+        text = "```json\n" + text + "\n```"
+    if rng.random() < 0.2:
+        text = "Here is the result:\n" + text + "\nDone."
+    return text
+
+
+def feed_chunks(parser: JSONStreamParser, text: str, rng: random.Random) -> list:
+    elements = []
+    pos = 0
+    while pos < len(text):
+        size = rng.choice([1, 2, 3, 7, 16, 64, 1024])
+        elements.extend(parser.feed(text[pos:pos + size]))
+        pos += size
+    return elements
+
+
+def is_prefix(partial, original) -> bool:
+    """Whether `partial` is `original` with only a tail dropped"""
+    if isinstance(original, dict):
+        if not isinstance(partial, dict) or len(partial) > len(original):
+            return False
+        keys = list(original)[:len(partial)]
+        if list(partial) != keys:
+            return False
+        return all(partial[key] == original[key] for key in keys[:-1]) and (
+            not keys or is_prefix(partial[keys[-1]], original[keys[-1]])
+        )
+    if isinstance(original, list):
+        if not isinstance(partial, list) or len(partial) > len(original):
+            return False
+        return all(a == b for a, b in zip(partial[:-1], original)) and (
+            not partial or is_prefix(partial[-1], original[len(partial) - 1])
+        )
+    return partial == original
+
+
+def closed_elements(text: str, cut: int, array_key):
+    """Elements of the watched array that are complete before `cut` (reference parser)"""
+    parser = JSONStreamParser(array_key)
+    return parser.feed(text[:cut])
+
+
+def run(cases: int, seed: int) -> bool:
+    rng = random.Random(seed)
+    failures = 0
+
+    for case in range(cases):
+        array_key = rng.choice([None, "patches", "translations"])
+        document = random_document(rng, array_key)
+        text = serialize(document, rng)
+        expected = document if array_key is None else document[array_key]
+
+        # Complete document
+        parser = JSONStreamParser(array_key)
+        elements = feed_chunks(parser, text, rng)
+        if elements != expected or parser.result() != document:
+            failures += 1
+            if failures <= 5:
+                print(f"✗ case {case}: complete document mismatch\n  {text[:300]!r}")
+            continue
+
+        # Truncated document
+        cut = rng.randint(0, len(text))
+        parser = JSONStreamParser(array_key)
+        elements = feed_chunks(parser, text[:cut], rng)
+        repaired = parser.result(repair=True)
+        reference = closed_elements(text, cut, array_key)
+        ok = elements == reference and elements == expected[:len(elements)]
+        if parser.done:
+            ok = ok and repaired == document
+        elif repaired is None:
+            # Nothing to repair only before the root opened
+            ok = ok and "{" not in text[:cut] and "[" not in text[:cut]
+        else:
+            ok = ok and is_prefix(repaired, document)
+        if not ok:
+            failures += 1
+            if failures <= 5:
+                print(f"✗ case {case}: truncated at {cut}\n  {text[:cut][-200:]!r}\n  repaired: {repaired!r}")
+
+        # Corrupted document: any result is fine, exceptions are not
+        corrupted = list(text)
+        for _ in range(rng.randint(1, 5)):
+            index = rng.randrange(len(corrupted) + 1)
+            if rng.random() < 0.5 and index < len(corrupted):
+                del corrupted[index]
+            else:
+                corrupted.insert(index, rng.choice('{}[],:"\\ x1'))
+        try:
+            parser = JSONStreamParser(array_key)
+            feed_chunks(parser, "".join(corrupted), rng)
+            parser.result(repair=True)
+        except Exception as e:
+            failures += 1
+            if failures <= 5:
+                print(f"✗ case {case}: corrupted document raised {e!r}\n  {''.join(corrupted)[:300]!r}")
+
+    print(f"{cases - failures}/{cases} fuzz cases pass")
+    return failures == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="JSONStreamParser fuzz check")
+    parser.add_argument("--cases", type=int, default=5000, help="Random documents")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Truncated / corrupted cases log decode warnings by design
+    logging.getLogger("app.utils.json_stream").setLevel(logging.ERROR)
+
+    sys.exit(0 if run(args.cases, args.seed) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Patch Parity Check
+
+Applies every case in patch_parity_cases.json with the Python PatchEngine
+and compares the result with the output of applyPatches() in
+lib/patch-utils.ts (the "expected" HTML recorded for each case). Also
+checks that the incrementally updated section features equal the
+features of a full re-parse of the patched HTML.
+
+Each case records where its expected HTML came from (expected_source):
+"typescript" once --update has run patch_parity_reference.ts against the
+JSDOM-backed applyPatches, "hand-written" for cases written before that.
+A hand-written expectation only checks Python against the DOM rules as
+someone wrote them down, so the check fails on every case that was not
+recorded from TypeScript: run --update after adding or changing a case.
+
+Usage:
+    python3 scripts/check_patch_parity.py
+    python3 scripts/check_patch_parity.py --case set_style_css --verbose
+    python3 scripts/check_patch_parity.py --update   # re-record expected via JSDOM (needs npx tsx + jsdom)
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.models.chat import Patch
+from app.services.patch_engine import PatchEngine
+from app.services.section_extractor import SectionExtractor
+
+SCRIPTS_DIR = Path(__file__).parent
+CASES_PATH = SCRIPTS_DIR / "patch_parity_cases.json"
+REPO_ROOT = SCRIPTS_DIR.parent.parent
+REFERENCE_SOURCE = "typescript"
+
+
+def to_patches(patch_dicts: list) -> list:
+    """API (camelCase) patch dicts → Patch objects"""
+    return [
+        Patch(
+            selector=patch["selector"],
+            action=patch["action"],
+            old_value=patch.get("oldValue"),
+            new_value=patch.get("newValue"),
+            value=patch.get("value"),
+        )
+        for patch in patch_dicts
+    ]
+
+
+def record_expected(data: dict):
+    """Run the TypeScript reference and store its output as expected HTML"""
+    try:
+        output = subprocess.run(
+            ["npx", "tsx", str(SCRIPTS_DIR / "patch_parity_reference.ts"), str(CASES_PATH)],
+            cwd=REPO_ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+    except (OSError, subprocess.CalledProcessError) as e:
+        stderr = getattr(e, "stderr", "") or ""
+        print(f"TypeScript reference failed (needs `npm install` at the repo root and npx tsx): {e}")
+        if stderr:
+            print(stderr.strip().splitlines()[-1])
+        sys.exit(1)
+    results = json.loads(output)
+    for case in data["cases"]:
+        case["expected"] = results[case["name"]]
+        case["expected_source"] = REFERENCE_SOURCE
+    CASES_PATH.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"Recorded expected HTML for {len(data['cases'])} cases")
+
+
+def check_case(engine: PatchEngine, extractor: SectionExtractor, case: dict) -> list:
+    """Apply one case and return a list of mismatch descriptions"""
+    result = engine.apply(case["html"], to_patches(case["patches"]))
+    problems = []
+
+    if result.html != case["expected"]:
+        problems.append(f"html\n    expected: {case['expected']}\n    actual:   {result.html}")
+
+    full = [feature.model_dump() for feature in extractor.build_section_features(result.html)]
+    incremental = [feature.model_dump() for feature in result.features]
+    if incremental != full:
+        problems.append("section features differ from a full re-parse")
+
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Patch engine parity check against lib/patch-utils.ts")
+    parser.add_argument("--case", help="Run a single case by name")
+    parser.add_argument("--update", action="store_true", help="Re-record expected HTML with JSDOM")
+    parser.add_argument("--verbose", action="store_true", help="Print every case")
+    args = parser.parse_args()
+
+    data = json.loads(CASES_PATH.read_text(encoding="utf-8"))
+    if args.update:
+        record_expected(data)
+
+    engine = PatchEngine()
+    extractor = SectionExtractor()
+    cases = [case for case in data["cases"] if args.case in (None, case["name"])]
+
+    failures = 0
+    for case in cases:
+        problems = check_case(engine, extractor, case)
+        if problems:
+            failures += 1
+            print(f"✗ {case['name']}")
+            for problem in problems:
+                print(f"  - {problem}")
+        elif args.verbose:
+            print(f"✓ {case['name']}")
+
+    unrecorded = [case["name"] for case in cases if case.get("expected_source") != REFERENCE_SOURCE]
+    print(f"\n{len(cases) - failures}/{len(cases)} cases match their expected HTML")
+    if unrecorded:
+        print(f"✗ {len(unrecorded)}/{len(cases)} expectations not recorded from lib/patch-utils.ts "
+              f"(run with --update): {', '.join(unrecorded[:5])}{', ...' if len(unrecorded) > 5 else ''}")
+    else:
+        print("All expectations recorded from lib/patch-utils.ts")
+    sys.exit(1 if failures or unrecorded else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Intent Rules Evaluation
+
+Runs the rule-based pre-classifier (IntentRules) over the labeled corpus
+in intent_corpus.json and reports, for the configured threshold:
+- accuracy of the requests decided by rules (no LLM call)
+- LLM calls saved (share of requests decided by rules)
+- calibration: accuracy per confidence bucket
+- a threshold sweep (saved calls vs. accuracy)
+- the same accuracy on held-out cases (added after the lexicons were
+  tuned, so not fitted to them)
+
+Section scores come from a sample dashboard, as in /chat.
+
+Usage:
+    python3 scripts/eval_intent_rules.py
+    python3 scripts/eval_intent_rules.py --threshold 0.8 --verbose
+    python3 scripts/eval_intent_rules.py --corpus my_requests.json
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.services.intent_rules import get_intent_rules
+from app.services.section_extractor import SectionExtractor, match_request
+
+CORPUS_PATH = Path(__file__).parent / "intent_corpus.json"
+
+SAMPLE_HTML = """<!DOCTYPE html>
+<html><head><title>Sample</title></head>
+<body>
+<header data-section-id="header" class="bg-white shadow"><h1 class="text-2xl font-bold">MyCompany</h1>
+  <nav class="nav menu"><ul><li><a href="/">홈</a></li><li><a href="/about">소개</a></li></ul></nav></header>
+<section data-section-id="hero" class="p-8"><h2 class="title text-4xl">혁신적인 솔루션</h2>
+  <p class="text-gray-600">10년 이상의 경험과 전문성</p>
+  <img class="rounded" src="hero.png" alt="hero">
+  <button class="btn px-4 py-2 bg-blue-500 text-white rounded">무료 상담 받기</button></section>
+<section data-section-id="cards" class="grid gap-4">
+  <div class="card shadow p-4"><i class="icon">⚡</i><h3>빠른 성능</h3><p>최적화된 처리 속도</p></div>
+  <div class="card shadow p-4"><i class="icon">🛡</i><h3>안전한 보안</h3><p>데이터 보호</p></div></section>
+<section data-section-id="table" class="p-6"><table class="table w-full"><thead><tr><th>항목</th><th>금액</th></tr></thead>
+  <tbody><tr><td>매출</td><td>1,000원</td></tr></tbody></table></section>
+<section data-section-id="contact" class="p-6"><form class="form"><input class="input" placeholder="이메일">
+  <textarea class="input"></textarea><button class="btn bg-green-500">문의 보내기</button></form></section>
+<div data-section-id="popup" class="popup modal hidden"><p>알림</p><button class="btn">닫기</button></div>
+<footer data-section-id="footer" class="footer bg-gray-800 text-white"><p>© 2025 MyCompany</p>
+  <a class="link" href="/privacy">개인정보처리방침</a></footer>
+</body></html>"""
+
+
+def evaluate(cases: list, features: list, extractor: SectionExtractor) -> list:
+    """Classify every case; returns (case, analysis) pairs"""
+    rules = get_intent_rules()
+    results = []
+    for case in cases:
+        match = match_request(case["message"])
+        sections = extractor.find_relevant_sections(
+            SAMPLE_HTML, case["message"], max_sections=1, features=features, match=match
+        )
+        top_score = sections[0].score if sections else 0.0
+        results.append((case, rules.classify(case["message"], match=match, top_score=top_score)))
+    return results
+
+
+def summarize(results: list, threshold: float) -> dict:
+    """Fast-path coverage and accuracy at a threshold"""
+    decided = [(case, analysis) for case, analysis in results if analysis.confidence >= threshold]
+    correct = sum(1 for case, analysis in decided if analysis.intent == case["intent"])
+    return {
+        "decided": len(decided),
+        "correct": correct,
+        "saved": len(decided) / len(results) if results else 0.0,
+        "accuracy": correct / len(decided) if decided else 1.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rule-based intent classifier evaluation")
+    parser.add_argument("--corpus", type=Path, default=CORPUS_PATH, help="Labeled corpus (JSON)")
+    parser.add_argument("--threshold", type=float, default=settings.INTENT_RULES_MIN_CONFIDENCE,
+                        help="Confidence needed to skip the LLM")
+    parser.add_argument("--verbose", action="store_true", help="List wrong and deferred requests")
+    args = parser.parse_args()
+
+    cases = json.loads(args.corpus.read_text(encoding="utf-8"))["cases"]
+    extractor = SectionExtractor()
+    features = extractor.build_section_features(SAMPLE_HTML)
+    results = evaluate(cases, features, extractor)
+
+    summary = summarize(results, args.threshold)
+    print(f"=== Intent rules on {len(cases)} requests (threshold {args.threshold:.2f}) ===\n")
+    print(f"decided by rules:  {summary['decided']:4d}  ({summary['saved']:.0%} LLM calls saved)")
+    print(f"rule accuracy:     {summary['correct']:4d}/{summary['decided']}  ({summary['accuracy']:.1%})")
+    print(f"sent to LLM:       {len(cases) - summary['decided']:4d}")
+
+    held_out = [(case, analysis) for case, analysis in results if case.get("held_out")]
+    if held_out:
+        held_out_summary = summarize(held_out, args.threshold)
+        print(f"held-out requests: {held_out_summary['correct']:4d}/{held_out_summary['decided']} decided correctly "
+              f"({held_out_summary['decided']}/{len(held_out)} decided)")
+
+    print("\nCalibration (confidence bucket → accuracy)")
+    buckets = {}
+    for case, analysis in results:
+        bucket = min(int(analysis.confidence * 10), 9) / 10
+        total, correct = buckets.get(bucket, (0, 0))
+        buckets[bucket] = (total + 1, correct + (analysis.intent == case["intent"]))
+    for bucket in sorted(buckets, reverse=True):
+        total, correct = buckets[bucket]
+        print(f"  {bucket:.1f}-{bucket + 0.1:.1f}: {correct:3d}/{total:<3d} ({correct / total:.0%})")
+
+    print("\nThreshold sweep")
+    for threshold in (0.6, 0.7, 0.75, 0.8, 0.85, 0.9, 0.95):
+        sweep = summarize(results, threshold)
+        print(f"  {threshold:.2f}: {sweep['saved']:4.0%} saved, {sweep['accuracy']:6.1%} accurate")
+
+    if args.verbose:
+        print("\nWrong (decided by rules)")
+        for case, analysis in results:
+            if analysis.confidence >= args.threshold and analysis.intent != case["intent"]:
+                print(f"  ✗ {case['message']!r}: {analysis.intent} ≠ {case['intent']} "
+                      f"({analysis.confidence:.2f}, {analysis.reasoning})")
+        print("\nDeferred to LLM")
+        for case, analysis in results:
+            if analysis.confidence < args.threshold:
+                mark = "✓" if analysis.intent == case["intent"] else "·"
+                print(f"  {mark} {case['message']!r}: {analysis.intent} ({analysis.confidence:.2f}, {analysis.reasoning})")
+
+
+if __name__ == "__main__":
+    main()
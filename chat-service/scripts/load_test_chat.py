@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Chat Concurrency Load Test
+
+Sends N concurrent requests and compares the wall-clock time with the sum
+of the individual latencies. When Gemini calls do not block the event
+loop, N requests finish in about max(latency) instead of sum(latency).
+
+Modes:
+- Live: start a session on a running server and send N concurrent /chat requests
+- Simulated (--simulate): run N concurrent GeminiClient.generate_content calls
+  in-process against a fake model with a fixed latency (no API keys used)
+  and measure the worst event-loop stall while they run
+
+Usage:
+    python3 scripts/load_test_chat.py --url http://localhost:8000 -n 10
+    python3 scripts/load_test_chat.py --simulate -n 20 --latency 2.0
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+SAMPLE_HTML = """<!DOCTYPE html>
+<html><head><title>Load Test</title></head>
+<body>
+<header data-section-id="header" data-editable="true"><h1 class="text-2xl font-bold">대시보드</h1></header>
+<section data-section-id="summary" data-editable="true">
+  <p class="text-gray-600">이번 달 매출 요약</p>
+  <button class="px-4 py-2 bg-blue-500 text-white rounded">자세히 보기</button>
+</section>
+</body></html>"""
+
+
+def print_report(latencies: list, wall: float):
+    """Print wall time vs. max/sum of latencies"""
+    total = sum(latencies)
+    slowest = max(latencies)
+    print(f"requests:        {len(latencies)}")
+    print(f"max latency:     {slowest:8.2f}s")
+    print(f"sum of latency:  {total:8.2f}s")
+    print(f"wall clock:      {wall:8.2f}s")
+    print(f"wall / max:      {wall / slowest:8.2f}x")
+    print("✓ Concurrent (wall ≈ max latency)" if wall < slowest * 1.5
+          else "✗ Requests are serialized (wall ≈ sum of latencies)")
+
+
+async def run_live(url: str, count: int, message: str):
+    """N concurrent /chat requests against a running server"""
+    import httpx
+
+    async with httpx.AsyncClient(base_url=url, timeout=300) as client:
+        response = await client.post("/session/start", json={"html": SAMPLE_HTML})
+        response.raise_for_status()
+        session_id = response.json()["session_id"]
+        print(f"Session: {session_id}\n")
+
+        async def one(i: int) -> float:
+            start = time.perf_counter()
+            result = await client.post("/chat", json={"session_id": session_id, "message": message})
+            elapsed = time.perf_counter() - start
+            print(f"  #{i:<3} {result.status_code} {elapsed:6.2f}s")
+            return elapsed
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(i) for i in range(count)))
+        wall = time.perf_counter() - start
+
+        await client.delete(f"/session/{session_id}")
+
+    print()
+    print_report(latencies, wall)
+
+
+class _FakeResponse:
+    text = '{"intent": "local", "confidence": 0.9}'
+
+
+class _FakeModel:
+    """Stands in for GenerativeModel: fixed latency, no network"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_content_async(self, *args, **kwargs):
+        await asyncio.sleep(self.latency)
+        return _FakeResponse()
+
+
+async def run_simulated(count: int, latency: float):
+    """N concurrent GeminiClient calls against a fake model"""
+    from app.services.gemini_client import GeminiClient
+
+    class SimulatedClient(GeminiClient):
+        def _get_model(self, key_index: int):
+            return _FakeModel(latency)
+
+    client = SimulatedClient()
+    max_stall = 0.0
+    running = True
+
+    async def heartbeat():
+        # Measures how long the event loop was unable to run this coroutine
+        nonlocal max_stall
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.01)
+            max_stall = max(max_stall, time.perf_counter() - start - 0.01)
+
+    async def one() -> float:
+        start = time.perf_counter()
+        await client.generate_content("load test")
+        return time.perf_counter() - start
+
+    monitor = asyncio.ensure_future(heartbeat())
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(one() for _ in range(count)))
+    wall = time.perf_counter() - start
+    running = False
+    await monitor
+
+    print_report(latencies, wall)
+    print(f"max loop stall:  {max_stall * 1000:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat concurrency load test")
+    parser.add_argument("-n", "--requests", type=int, default=10, help="Concurrent requests")
+    parser.add_argument("--url", default="http://localhost:8000", help="Chat service URL (live mode)")
+    parser.add_argument("--message", default="버튼 색을 초록색으로 바꿔줘", help="Chat message (live mode)")
+    parser.add_argument("--simulate", action="store_true", help="In-process run against a fake model")
+    parser.add_argument("--latency", type=float, default=2.0, help="Fake model latency in seconds")
+    args = parser.parse_args()
+
+    if args.simulate:
+        print(f"=== Simulated load test ({args.requests} requests, {args.latency}s each) ===\n")
+        asyncio.run(run_simulated(args.requests, args.latency))
+    else:
+        print(f"=== Live load test ({args.requests} requests → {args.url}) ===\n")
+        asyncio.run(run_live(args.url, args.requests, args.message))
+
+
+if __name__ == "__main__":
+    main()
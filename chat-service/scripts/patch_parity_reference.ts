@@ -0,0 +1,33 @@
+/**
+ * Patch Parity Reference
+ *
+ * patch_parity_cases.json의 각 케이스에 lib/patch-utils.ts의 applyPatches를 적용하고
+ * 결과 body HTML을 JSON으로 출력합니다. (check_patch_parity.py --update에서 사용)
+ *
+ * 실행 (저장소 루트에서, jsdom 설치 필요):
+ *   npx tsx chat-service/scripts/patch_parity_reference.ts chat-service/scripts/patch_parity_cases.json
+ */
+
+import { readFileSync } from 'fs';
+import { JSDOM } from 'jsdom';
+import { applyPatches } from '../../lib/patch-utils';
+
+interface ParityCase {
+  name: string;
+  html: string;
+  patches: Parameters<typeof applyPatches>[1];
+}
+
+const casesPath = process.argv[2];
+const cases: ParityCase[] = JSON.parse(readFileSync(casesPath, 'utf-8')).cases;
+
+// 패치 실패 경고는 결과 비교와 무관하므로 숨김
+console.warn = () => {};
+
+const results: Record<string, string> = {};
+for (const parityCase of cases) {
+  const patched = applyPatches(parityCase.html, parityCase.patches);
+  results[parityCase.name] = new JSDOM(patched).window.document.body.innerHTML;
+}
+
+process.stdout.write(JSON.stringify(results));
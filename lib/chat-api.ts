@@ -26,7 +26,7 @@ export interface SessionResponse {
 
 export interface Patch {
   selector: string;
-  action: 'addClass' | 'removeClass' | 'replaceClass' | 'setText' | 'setHtml' | 'setAttribute' | 'setStyle' | 'removeElement' | 'appendChild' | 'prependChild';
+  action: 'addClass' | 'removeClass' | 'replaceClass' | 'setText' | 'setHtml' | 'setAttribute' | 'removeAttribute' | 'setStyle' | 'removeElement' | 'appendChild' | 'prependChild';
   oldValue?: string;
   newValue?: string;
   value?: string;  // appendChild, prependChild 등에서 사용하는 단일 값
@@ -97,6 +97,13 @@ function applyPatch(document: Document, patch: Patch): void {
         }
         break;
 
+      case 'removeAttribute':
+        const attrName = patch.value || patch.oldValue;
+        if (attrName) {
+          element.removeAttribute(attrName.trim());
+        }
+        break;
+
       case 'setStyle':
         // value 또는 newValue 필드 사용 (백엔드 호환성)
         const styleValue = patch.value || patch.newValue;
@@ -193,7 +200,7 @@ export function validatePatches(patches: unknown[]): patches is Patch[] {
 
   const validActions = [
     'addClass', 'removeClass', 'replaceClass',
-    'setText', 'setHtml', 'setAttribute', 'setStyle', 'removeElement',
+    'setText', 'setHtml', 'setAttribute', 'removeAttribute', 'setStyle', 'removeElement',
     'appendChild', 'prependChild'
   ];
 
@@ -228,6 +235,8 @@ export function getPatchSummary(patches: Patch[]): string[] {
         return `Set HTML content on ${patch.selector}`;
       case 'setAttribute':
         return `Set attribute on ${patch.selector}`;
+      case 'removeAttribute':
+        return `Remove attribute "${patch.value || patch.oldValue}" from ${patch.selector}`;
       case 'setStyle':
         return `Set style on ${patch.selector}`;
       case 'removeElement':